@@ -11,6 +11,7 @@ from datetime import datetime
 
 from database.connection import get_db
 from schemas.transaction import TransactionResponse, TransactionListResponse
+from utils.pagination import paginate_keyset, count_total
 
 logger = logging.getLogger(__name__)
 
@@ -256,12 +257,13 @@ async def reject_transaction(
 async def list_all_transactions(
     status: Optional[str] = None,
     provider: Optional[str] = None,
-    page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
     page_size: int = Query(20, ge=1, le=100),
+    with_total: bool = Query(False, description="Inclui total estimado"),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Lista todas as transações (admin).
+    Lista todas as transações (admin), das mais recentes para as mais antigas.
     
     **Requer:** Admin role
     
@@ -269,12 +271,14 @@ async def list_all_transactions(
     - status: pending, paid, failed, waiting_approval, refunded
     - provider: stripe, asaas, opennode, wise, nomad
     
+    **Paginação:** por cursor sobre (created_at, id) — use `next_cursor`
+    
     **Rate Limit:** 50/minuto
     """
     # TODO: Verificar se usuário é admin
     
     try:
-        from database.models import Transaction
+        from database.payment_models import Transaction
         
         # Build query
         conditions = []
@@ -283,25 +287,20 @@ async def list_all_transactions(
         if provider:
             conditions.append(Transaction.provider == provider)
         
-        # Count
-        count_stmt = select(func.count(Transaction.id))
-        if conditions:
-            count_stmt = count_stmt.where(and_(*conditions))
-        
-        total_result = await db.execute(count_stmt)
-        total = total_result.scalar()
-        
-        # Fetch
-        offset = (page - 1) * page_size
-        stmt = select(Transaction).order_by(Transaction.created_at.desc())
-        
+        stmt = select(Transaction)
         if conditions:
             stmt = stmt.where(and_(*conditions))
         
-        stmt = stmt.offset(offset).limit(page_size)
+        total, total_is_estimate = None, False
+        if with_total:
+            total, total_is_estimate = await count_total(db, stmt)
         
-        result = await db.execute(stmt)
-        transactions = result.scalars().all()
+        transactions, next_cursor = await paginate_keyset(
+            db, stmt,
+            sort_columns=[Transaction.created_at, Transaction.id],
+            cursor=cursor,
+            limit=page_size
+        )
         
         return TransactionListResponse(
             transactions=[
@@ -322,10 +321,13 @@ async def list_all_transactions(
                 for t in transactions
             ],
             total=total,
-            page=page,
-            page_size=page_size
+            total_is_estimate=total_is_estimate,
+            page_size=page_size,
+            next_cursor=next_cursor
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing transactions: {e}")
         raise HTTPException(500, detail="Erro ao listar transações")
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Body
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from database.connection import get_db
-from utils.security import verify_password, get_password_hash, create_access_token, get_current_user
+from database.models import AuditLog
+from services.audit_service import auditoria
+from utils.security import (
+    verificar_senha, gerar_hash_senha, create_access_token, get_current_user,
+    check_role, invalidar_principal
+)
+from utils.limite_login import ip_cliente, limitar_cadastro, limitar_login
 from pydantic import BaseModel, EmailStr
 from datetime import timedelta
 import os
@@ -33,8 +39,8 @@ class GoogleLoginRequest(BaseModel):
 
 from fastapi.security import OAuth2PasswordRequestForm
 
-@router.post("/login", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+@router.post("/login", response_model=Token, dependencies=[Depends(limitar_login)])
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     # 1. Fetch User with Subscription Tier
     result = await db.execute(
         text("SELECT id, email, senha_hash as password_hash, tipo as role, ativo as active FROM usuarios WHERE email = :email"),
@@ -53,7 +59,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     s_hash = user["password_hash"].strip()
     
     # Verify password hash
-    if not verify_password(form_data.password, s_hash):
+    if not await verificar_senha(form_data.password, s_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciais inválidas",
@@ -75,12 +81,8 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         expires_delta=access_token_expires
     )
     
-    # 4. Audit Log (Async fire & forget usually, but here await)
-    await db.execute(
-        text("INSERT INTO audit_logs (usuario_email, acao, ip_address) VALUES (:email, 'LOGIN', :ip)"),
-        {"email": user["email"], "ip": "0.0.0.0"} # TODO: catch request IP
-    )
-    await db.commit()
+    # 4. Audit Log (enfileirado; gravado em lote pelo AuditSink)
+    auditoria.registrar(AuditLog, usuario_email=user["email"], acao="LOGIN", ip_address=ip_cliente(request))
 
     return {
         "access_token": access_token, 
@@ -93,7 +95,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         }
     }
 
-@router.post("/register", response_model=Token, status_code=201)
+@router.post("/register", response_model=Token, status_code=201, dependencies=[Depends(limitar_cadastro)])
 async def register(req: RegisterRequest, db: AsyncSession = Depends(get_db)):
     # 1. Check existing
     result = await db.execute(
@@ -104,7 +106,7 @@ async def register(req: RegisterRequest, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # 2. Hash Password
-    pwd_hash = get_password_hash(req.senha_hash)
+    pwd_hash = await gerar_hash_senha(req.senha_hash)
 
     # 3. Insert
     # Only allow safe roles for public registration
@@ -125,6 +127,8 @@ async def register(req: RegisterRequest, db: AsyncSession = Depends(get_db)):
     })
     new_user = result.mappings().first()
     await db.commit()
+    # Um token antigo deste email pode ter guardado "usuário inexistente"
+    await invalidar_principal(new_user["email"])
 
     # 4. Generate Token
     access_token = create_access_token(
@@ -176,6 +180,7 @@ async def google_login(req: GoogleLoginRequest, db: AsyncSession = Depends(get_d
             user_id = new_user["id"]
             user_role = new_user["role"]
             await db.commit()
+            await invalidar_principal(email)
         else:
             if not user["active"]:
                  raise HTTPException(status_code=400, detail="Inactive user")
@@ -262,6 +267,7 @@ async def update_profile(
     
     result = await db.execute(query, params)
     await db.commit()
+    await invalidar_principal(current_user.get('email'))
     
     updated_user = result.mappings().first()
     
@@ -270,7 +276,7 @@ async def update_profile(
     
     return dict(updated_user)
 
-@router.patch("/change-password")
+@router.patch("/change-password", dependencies=[Depends(limitar_login)])
 async def change_password(
     data: dict,
     current_user: dict = Depends(get_current_user),
@@ -301,11 +307,11 @@ async def change_password(
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     
     # Verificar senha antiga
-    if not bcrypt.checkpw(old_password.encode('utf-8'), user['senha_hash'].encode('utf-8')):
+    if not await verificar_senha(old_password, user['senha_hash']):
         raise HTTPException(status_code=401, detail="Senha atual incorreta")
     
     # Hash da nova senha
-    new_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    new_hash = await gerar_hash_senha(new_password)
     
     # Atualizar senha
     update_query = text("""
@@ -316,5 +322,39 @@ async def change_password(
     
     await db.execute(update_query, {"user_id": user_id, "new_hash": new_hash})
     await db.commit()
+    await invalidar_principal(current_user.get('email'))
     
     return {"message": "Senha alterada com sucesso"}
+
+
+@router.patch("/users/{user_id}/status")
+async def set_user_status(
+    user_id: int,
+    data: dict = Body(...),
+    current_user: dict = Depends(check_role(["admin"])),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Ativa ou desativa um usuário (admin). Vale já na próxima requisição do
+    usuário: o cache de autenticação é invalidado.
+    """
+    if "ativo" not in data:
+        raise HTTPException(status_code=400, detail="Campo 'ativo' é obrigatório")
+
+    result = await db.execute(
+        text("""
+            UPDATE usuarios
+            SET ativo = :ativo, atualizado_em = NOW()
+            WHERE id = :user_id
+            RETURNING id, email, ativo
+        """),
+        {"user_id": user_id, "ativo": bool(data["ativo"])}
+    )
+    await db.commit()
+
+    user = result.mappings().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+
+    await invalidar_principal(user["email"])
+    return dict(user)
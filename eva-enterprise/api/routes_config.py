@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.connection import get_db
+from database.models import Configuracao
 from database.repositories.config_repo import ConfigRepository
 from schemas import (
     ConfigCreate, ConfigUpdate, ConfigResponse,
@@ -9,6 +10,7 @@ from schemas import (
     MessageResponse
 )
 from typing import List
+from utils.etag import exigir_modificado
 
 router = APIRouter()
 
@@ -88,7 +90,8 @@ async def list_configs(db: AsyncSession = Depends(get_db)):
     return results[:10]
 
 @router.get("/{chave}", response_model=ConfigResponse)
-async def get_config(chave: str, db: AsyncSession = Depends(get_db)):
+async def get_config(chave: str, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    await exigir_modificado(request, response, db, Configuracao.atualizado_em, Configuracao.chave == chave)
     repo = ConfigRepository(db)
     config = await repo.get_config_by_key(chave)
     if not config:
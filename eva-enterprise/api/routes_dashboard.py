@@ -6,16 +6,19 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from typing import List, Dict, Any
-from database.connection import get_db
+from database.connection import get_db_with_timeout, DASHBOARD_STATEMENT_TIMEOUT_MS
 
 router = APIRouter()
 
+# Consultas analíticas pesadas: réplica de leitura e sem segurar conexão indefinidamente
+dashboard_db = get_db_with_timeout(DASHBOARD_STATEMENT_TIMEOUT_MS, read_only=True)
+
 # ==========================================
 # HEALTH TRIAGE METRICS
 # ==========================================
 
 @router.get("/dashboard/health-triage")
-async def get_health_triage_metrics(db: AsyncSession = Depends(get_db)):
+async def get_health_triage_metrics(db: AsyncSession = Depends(dashboard_db)):
     """
     Retorna métricas de triagem de saúde (Thinking Mode)
     """
@@ -71,7 +74,7 @@ async def get_health_triage_metrics(db: AsyncSession = Depends(get_db)):
 # ==========================================
 
 @router.get("/dashboard/ab-testing")
-async def get_ab_testing_metrics(db: AsyncSession = Depends(get_db)):
+async def get_ab_testing_metrics(db: AsyncSession = Depends(dashboard_db)):
     """
     Retorna resultados de A/B Testing (Thinking Mode vs Normal Mode)
     """
@@ -115,7 +118,7 @@ async def get_ab_testing_metrics(db: AsyncSession = Depends(get_db)):
 # ==========================================
 
 @router.get("/dashboard/medical-images")
-async def get_medical_image_stats(db: AsyncSession = Depends(get_db)):
+async def get_medical_image_stats(db: AsyncSession = Depends(dashboard_db)):
     """
     Retorna estatísticas de análise de imagens médicas
     """
@@ -152,7 +155,7 @@ async def get_medical_image_stats(db: AsyncSession = Depends(get_db)):
 # ==========================================
 
 @router.get("/dashboard/epidemiological")
-async def get_epidemiological_data(db: AsyncSession = Depends(get_db)):
+async def get_epidemiological_data(db: AsyncSession = Depends(dashboard_db)):
     """
     Retorna dados epidemiológicos para heatmap (Malária, TB, COVID, etc)
     """
@@ -188,7 +191,7 @@ async def get_epidemiological_data(db: AsyncSession = Depends(get_db)):
 # ==========================================
 
 @router.get("/dashboard/malaria-cases")
-async def get_malaria_cases(db: AsyncSession = Depends(get_db)):
+async def get_malaria_cases(db: AsyncSession = Depends(dashboard_db)):
     """
     Retorna casos de malária detectados
     """
@@ -228,7 +231,7 @@ async def get_malaria_cases(db: AsyncSession = Depends(get_db)):
 # ==========================================
 
 @router.get("/dashboard/tb-screening")
-async def get_tb_screening(db: AsyncSession = Depends(get_db)):
+async def get_tb_screening(db: AsyncSession = Depends(dashboard_db)):
     """
     Retorna triagens de tuberculose via raio-X
     """
@@ -268,7 +271,7 @@ async def get_tb_screening(db: AsyncSession = Depends(get_db)):
 # ==========================================
 
 @router.get("/dashboard/rapid-tests")
-async def get_rapid_tests(db: AsyncSession = Depends(get_db)):
+async def get_rapid_tests(db: AsyncSession = Depends(dashboard_db)):
     """
     Retorna resultados de testes rápidos (COVID, HIV, Dengue)
     """
@@ -310,7 +313,7 @@ async def get_rapid_tests(db: AsyncSession = Depends(get_db)):
 # ==========================================
 
 @router.get("/dashboard/skin-lesions")
-async def get_skin_lesions(db: AsyncSession = Depends(get_db)):
+async def get_skin_lesions(db: AsyncSession = Depends(dashboard_db)):
     """
     Retorna lesões cutâneas analisadas (Mpox, melanoma)
     """
@@ -352,7 +355,7 @@ async def get_skin_lesions(db: AsyncSession = Depends(get_db)):
 # ==========================================
 
 @router.get("/dashboard/system-health")
-async def get_system_health(db: AsyncSession = Depends(get_db)):
+async def get_system_health(db: AsyncSession = Depends(dashboard_db)):
     """
     Retorna métricas de saúde do sistema
     """
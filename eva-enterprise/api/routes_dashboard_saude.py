@@ -1,22 +1,27 @@
 """
 Rotas para dashboard e relatórios analíticos
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import date
+from datetime import date, datetime
+from typing import Optional
 
-from database.connection import get_db
+from database.connection import get_db_with_timeout, DASHBOARD_STATEMENT_TIMEOUT_MS
 from database.repositories import repository_saude
-from schemas import DashboardResumoResponse, RelatorioMensalResponse
+from database.serie_temporal import METRICAS, METODOS, SERIE_PONTOS_PADRAO, SERIE_MAX_PONTOS
+from schemas import DashboardResumoResponse, RelatorioMensalResponse, SerieTemporalResponse
 
 router = APIRouter()
 
+# Consultas analíticas pesadas: réplica de leitura e sem segurar conexão indefinidamente
+dashboard_db = get_db_with_timeout(DASHBOARD_STATEMENT_TIMEOUT_MS, read_only=True)
+
 
 @router.get("/dashboard/resumo-diario/{cliente_id}", response_model=DashboardResumoResponse)
 async def obter_resumo_diario(
     cliente_id: int,
     data: date = None,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(dashboard_db)
 ):
     """
     Resumo diário para dashboard
@@ -41,7 +46,7 @@ async def obter_relatorio_mensal(
     cliente_id: int,
     mes: int,
     ano: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(dashboard_db)
 ):
     """
     Relatório mensal para análise de tendências
@@ -67,3 +72,43 @@ async def obter_relatorio_mensal(
     
     relatorio = await repository_saude.get_relatorio_mensal(db, cliente_id, mes, ano)
     return relatorio
+
+
+@router.get("/series/{cliente_id}", response_model=SerieTemporalResponse)
+async def obter_serie_temporal(
+    cliente_id: int,
+    metrica: str = Query(..., description="bpm, spo2, pressao_sistolica, passos, ..."),
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    pontos: int = Query(SERIE_PONTOS_PADRAO, ge=3, le=SERIE_MAX_PONTOS),
+    metodo: str = Query("buckets", description="buckets (min/média/máx) ou lttb"),
+    db: AsyncSession = Depends(dashboard_db)
+):
+    """
+    Série temporal reduzida para gráficos
+
+    Retorna no máximo `pontos` pontos para qualquer intervalo (padrão: últimos 30 dias):
+    - buckets: mínimo, média, máximo, soma e contagem por bucket
+    - lttb: pontos reais escolhidos pelo Largest-Triangle-Three-Buckets
+    """
+    if metrica not in METRICAS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Métrica inválida. Opções: {', '.join(METRICAS)}"
+        )
+
+    if metodo not in METODOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Método inválido. Opções: {', '.join(METODOS)}"
+        )
+
+    if data_inicio and data_fim and data_inicio >= data_fim:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="data_inicio deve ser anterior a data_fim"
+        )
+
+    return await repository_saude.get_serie_temporal(
+        db, cliente_id, metrica, data_inicio, data_fim, pontos, metodo
+    )
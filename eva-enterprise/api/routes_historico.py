@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from database.connection import get_db
+from database.connection import get_db, get_read_db
+from database.models import Timeline
 from database.repositories.historico_repo import HistoricoRepository
+from utils.pagination import paginate_keyset
 from schemas import HistoricoResponse
 from typing import List, Optional
 from pydantic import BaseModel
@@ -40,39 +43,81 @@ async def registrar_atendimento(dados: RegistroAtendimento, db: AsyncSession = D
     await db.commit()
     return {"status": "success", "message": "Atendimento registrado na timeline"}
 
+# Header com o cursor da próxima página (as rotas abaixo mantêm a resposta como lista)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+async def _timeline_page(db: AsyncSession, response: Response, cursor: Optional[str], limit: int, idoso_id: Optional[int] = None):
+    query = select(
+        Timeline.id, Timeline.idoso_id, Timeline.tipo, Timeline.subtipo,
+        Timeline.titulo, Timeline.descricao, Timeline.data
+    )
+    if idoso_id is not None:
+        query = query.where(Timeline.idoso_id == idoso_id)
+
+    rows, next_cursor = await paginate_keyset(
+        db, query,
+        sort_columns=[Timeline.data, Timeline.id],
+        cursor=cursor,
+        limit=limit,
+        scalars=False
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    eventos = []
+    for row in rows:
+        evento = dict(row._mapping)
+        evento["data"] = row.data.strftime("%d/%m/%Y %H:%M") if row.data else None
+        eventos.append(evento)
+    return eventos
+
 @router.get("/timeline")
-async def get_all_timeline(db: AsyncSession = Depends(get_db)):
-    from sqlalchemy import select
-    from database.models import Timeline # Vou assumir que vou adicionar ao models ou usar texto puro
-    # Usando query textual para rapidez se o model não existir, ou adicionar ao models.
-    # Mas o correto é adicionar ao models.py
-    from sqlalchemy import text
-    query = text("SELECT id, idoso_id, tipo, subtipo, titulo, descricao, TO_CHAR(data, 'DD/MM/YYYY HH24:MI') as data FROM timeline ORDER BY data DESC LIMIT 50")
-    result = await db.execute(query)
-    return [dict(row._mapping) for row in result]
+async def get_all_timeline(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Valor do header X-Next-Cursor da página anterior"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Timeline geral, mais recentes primeiro (paginada por cursor)"""
+    return await _timeline_page(db, response, cursor, limit)
 
 @router.get("/timeline/{idoso_id}")
-async def get_idoso_timeline(idoso_id: int, db: AsyncSession = Depends(get_db)):
-    from sqlalchemy import text
-    query = text("SELECT id, idoso_id, tipo, subtipo, titulo, descricao, TO_CHAR(data, 'DD/MM/YYYY HH24:MI') as data FROM timeline WHERE idoso_id = :idoso_id ORDER BY data DESC")
-    result = await db.execute(query, {"idoso_id": idoso_id})
-    return [dict(row._mapping) for row in result]
+async def get_idoso_timeline(
+    idoso_id: int,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Valor do header X-Next-Cursor da página anterior"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Timeline de um idoso, mais recentes primeiro (paginada por cursor)"""
+    return await _timeline_page(db, response, cursor, limit, idoso_id=idoso_id)
 
 @router.get("/", response_model=List[HistoricoResponse])
 async def list_historico(
+    response: Response,
     idoso_id: Optional[int] = None,
     agendamento_id: Optional[int] = None,
+    cursor: Optional[str] = Query(None, description="Valor do header X-Next-Cursor da página anterior"),
     skip: int = 0,
     limit: Optional[int] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """Lista histórico de ligações.
-    Regra: se idoso_id ou agendamento_id for passado, limita a 1. Se não, 10 por padrão."""
+    """Lista histórico de ligações, mais recentes primeiro.
+    Regra: se idoso_id ou agendamento_id for passado, limita a 1. Se não, 10 por padrão.
+    Paginação por cursor: o cursor da próxima página vem no header X-Next-Cursor
+    (`skip` é mantido apenas por compatibilidade)."""
     if limit is None:
         limit = 1 if (idoso_id or agendamento_id) else 10
         
     repo = HistoricoRepository(db)
-    historico = await repo.list_all(skip=skip, limit=limit, idoso_id=idoso_id, agendamento_id=agendamento_id)
+    if skip and not cursor:
+        historico = await repo.list_all(skip=skip, limit=limit, idoso_id=idoso_id, agendamento_id=agendamento_id)
+    else:
+        historico, next_cursor = await repo.list_page(
+            cursor=cursor, limit=limit, idoso_id=idoso_id, agendamento_id=agendamento_id
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return [HistoricoResponse.model_validate(h) for h in historico]
 
 @router.get("/{id}", response_model=HistoricoResponse)
@@ -4,7 +4,10 @@ from sqlalchemy import select, update, delete as sql_delete
 from database.connection import get_db
 from database.ia_service import IAService
 from utils.security import require_subscription
-from utils.pagination import get_pagination_params, PaginationParams, PaginatedResponse
+from utils.pagination import (
+    get_pagination_params, PaginationParams, PaginatedResponse,
+    get_cursor_params, CursorParams
+)
 from schemas import (
     PadraoComportamentoResponse,
     PredicaoEmergenciaResponse,
@@ -22,23 +25,26 @@ router = APIRouter()
 async def listar_padroes(
     idoso_id: int,
     ativo: Optional[bool] = True,
-    pagination: PaginationParams = Depends(get_pagination_params),
+    pagination: CursorParams = Depends(get_cursor_params),
     db: AsyncSession = Depends(get_db)
 ):
-    """Lista padrões de comportamento detectados para um idoso (paginado)"""
+    """Lista padrões de comportamento detectados para um idoso (paginado por cursor)"""
     service = IAService(db)
-    items, total = await service.get_padroes(
+    items, next_cursor, total, total_is_estimate = await service.get_padroes(
         idoso_id, 
         ativo=ativo,
-        offset=pagination.offset,
-        limit=pagination.limit
+        cursor=pagination.cursor,
+        limit=pagination.limit,
+        with_total=pagination.with_total
     )
     
-    return PaginatedResponse[PadraoComportamentoResponse].create(
+    return PaginatedResponse[PadraoComportamentoResponse].create_from_cursor(
         items=items,
+        limit=pagination.limit,
+        next_cursor=next_cursor,
+        has_prev=pagination.cursor is not None,
         total=total,
-        page=pagination.page,
-        limit=pagination.limit
+        total_is_estimate=total_is_estimate
     )
 
 @router.post("/padroes/analisar", dependencies=[Depends(require_subscription("diamond"))])
@@ -89,23 +95,26 @@ async def desativar_padrao(id: int, db: AsyncSession = Depends(get_db)):
 async def listar_predicoes(
     idoso_id: int,
     ativas: Optional[bool] = True,
-    pagination: PaginationParams = Depends(get_pagination_params),
+    pagination: CursorParams = Depends(get_cursor_params),
     db: AsyncSession = Depends(get_db)
 ):
-    """Lista predições de emergência para um idoso (paginado)"""
+    """Lista predições de emergência para um idoso (paginado por cursor)"""
     service = IAService(db)
-    items, total = await service.get_predicoes(
+    items, next_cursor, total, total_is_estimate = await service.get_predicoes(
         idoso_id, 
         ativas=ativas,
-        offset=pagination.offset,
-        limit=pagination.limit
+        cursor=pagination.cursor,
+        limit=pagination.limit,
+        with_total=pagination.with_total
     )
     
-    return PaginatedResponse[PredicaoEmergenciaResponse].create(
+    return PaginatedResponse[PredicaoEmergenciaResponse].create_from_cursor(
         items=items,
+        limit=pagination.limit,
+        next_cursor=next_cursor,
+        has_prev=pagination.cursor is not None,
         total=total,
-        page=pagination.page,
-        limit=pagination.limit
+        total_is_estimate=total_is_estimate
     )
 
 @router.post("/predicoes/analisar", dependencies=[Depends(require_subscription("diamond"))])
@@ -191,26 +200,24 @@ async def analisar_emocao_chamada(
 async def historico_emocoes(
     idoso_id: int,
     dias: int = Query(30, description="Número de dias para buscar histórico"),
-    pagination: PaginationParams = Depends(get_pagination_params),
+    pagination: CursorParams = Depends(get_cursor_params),
     db: AsyncSession = Depends(get_db)
 ):
-    """Histórico de emoções detectadas nas chamadas (paginado)"""
+    """Histórico de emoções detectadas nas chamadas (paginado por cursor)"""
     service = IAService(db)
     
-    # Buscar todas as emoções do período
-    all_emocoes = await service.get_historico_emocoes(idoso_id, dias)
-    
-    # Aplicar paginação manual (já que get_historico_emocoes retorna lista processada)
-    total = len(all_emocoes)
-    start = pagination.offset
-    end = start + pagination.limit
-    items = all_emocoes[start:end]
+    items, next_cursor = await service.get_historico_emocoes(
+        idoso_id,
+        dias,
+        cursor=pagination.cursor,
+        limit=pagination.limit
+    )
     
-    return PaginatedResponse[EmocaoHistoricoResponse].create(
+    return PaginatedResponse[EmocaoHistoricoResponse].create_from_cursor(
         items=items,
-        total=total,
-        page=pagination.page,
-        limit=pagination.limit
+        limit=pagination.limit,
+        next_cursor=next_cursor,
+        has_prev=pagination.cursor is not None
     )
 
 # ==================== INSIGHTS PSICOLÓGICOS ====================
@@ -286,9 +293,12 @@ async def dashboard_ia(idoso_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Idoso não encontrado")
     
     # Buscar dados
-    padroes = await service.get_padroes(idoso_id, ativo=True)
-    predicoes = await service.get_predicoes(idoso_id, ativas=True)
-    emocoes = await service.get_historico_emocoes(idoso_id, dias=7)
+    padroes, _, _, _ = await service.get_padroes(idoso_id, ativo=True, limit=5)
+    predicoes, _, _, _ = await service.get_predicoes(idoso_id, ativas=True, limit=3)
+    # Contagens exatas (COUNT): o dashboard não mostra estimativa do planejador
+    total_padroes = await service.contar_padroes_ativos(idoso_id)
+    contagem_predicoes = await service.contar_predicoes_ativas(idoso_id)
+    emocoes, _ = await service.get_historico_emocoes(idoso_id, dias=7, limit=100)
     insights = await service.get_insights(idoso_id, tipo=None)
     
     return {
@@ -296,9 +306,9 @@ async def dashboard_ia(idoso_id: int, db: AsyncSession = Depends(get_db)):
             "id": idoso.id,
             "nome": idoso.nome
         },
-        "padroes_ativos": len(padroes),
-        "predicoes_ativas": len(predicoes),
-        "predicoes_alto_risco": len([p for p in predicoes if p.nivel_risco in ["alto", "critico"]]),
+        "padroes_ativos": total_padroes,
+        "predicoes_ativas": contagem_predicoes["ativas"],
+        "predicoes_alto_risco": contagem_predicoes["alto_risco"],
         "emocao_predominante": service.calcular_emocao_predominante(emocoes),
         "total_insights": len(insights),
         "padroes": padroes[:5],  # Top 5
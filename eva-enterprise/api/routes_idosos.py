@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.connection import get_db
+from database.models import Idoso
 from database.repositories.idoso_repo import IdosoRepository
 from database.repositories.perfil_repo import PerfilRepository
 from schemas import (
@@ -12,6 +13,7 @@ from schemas import (
 )
 from typing import List, Optional
 from utils.security import get_current_user, check_role
+from utils.etag import exigir_modificado
 
 router = APIRouter()
 
@@ -135,7 +137,9 @@ async def list_idosos(
 
 
 @router.get("/{id}", response_model=IdosoResponse)
-async def get_idoso(id: int, db: AsyncSession = Depends(get_db), current_user: dict = Depends(get_current_user)):
+async def get_idoso(id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    # 304 direto pelo atualizado_em, sem carregar o idoso
+    await exigir_modificado(request, response, db, Idoso.atualizado_em, Idoso.id == id)
     repo = IdosoRepository(db)
     idoso = await repo.get_by_id(id)
     if not idoso:
@@ -1,22 +1,24 @@
 """
 Rotas FastAPI para Sistema de Saúde Mental
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 import logging
 
-from database.connection import get_db
+from database.connection import get_db, get_read_db
+from database.estado_risco import montar_estado, obter_estado, pacientes_em_risco
 from database.repositories.mental_health_repository import MentalHealthRepository
+from services.nlp_lote import analisar_lote, colunas, linha_analise
 from api.schemas.mental_health_schemas import (
     AssessmentCreate, AssessmentResponse, AssessmentTrend,
     MoodDiaryCreate, MoodDiaryResponse, MoodStatistics,
     CrisisEventCreate, CrisisEventResponse,
     SafetyPlanCreate, SafetyPlanResponse,
-    NLPAnalysisCreate, SentimentTrend,
+    NLPAnalysisCreate, NLPBatchRequest, NLPBatchResponse, SentimentTrend,
     MLPredictionCreate, MLPredictionResponse,
-    PatientMentalHealthSummary,
+    PatientMentalHealthSummary, PatientRiskStateResponse,
     ScaleReference,
     ScaleType, RiskLevel
 )
@@ -98,7 +100,7 @@ async def get_assessment_history(
     patient_id: int,
     scale_type: ScaleType,
     days: int = 90,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Buscar histórico de avaliações"""
     assessments = await MentalHealthRepository.get_assessment_history(
@@ -112,7 +114,7 @@ async def get_assessment_trend(
     patient_id: int,
     scale_type: ScaleType,
     limit: int = 10,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Calcular tendência de scores (melhorando/piorando/estável)"""
     trend = await MentalHealthRepository.get_assessment_trend(
@@ -168,7 +170,7 @@ async def create_mood_entry(
 async def get_mood_history(
     patient_id: int,
     days: int = 30,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Buscar histórico de humor"""
     entries = await MentalHealthRepository.get_mood_history(db, patient_id, days)
@@ -179,7 +181,7 @@ async def get_mood_history(
 async def get_mood_statistics(
     patient_id: int,
     days: int = 7,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Calcular estatísticas de humor"""
     stats = await MentalHealthRepository.get_mood_statistics(db, patient_id, days)
@@ -310,11 +312,39 @@ async def create_nlp_analysis(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/nlp-analysis/batch", response_model=NLPBatchResponse, status_code=status.HTTP_201_CREATED)
+async def create_nlp_analysis_batch(
+    batch: NLPBatchRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Analisar vários textos de uma vez
+
+    Lotes grandes rodam num pool de processos (fora do event loop); com
+    `persist` as análises são gravadas num único INSERT de várias linhas.
+    """
+    analyses = await analisar_lote([item.text for item in batch.items])
+
+    ids = []
+    if batch.persist:
+        linhas = [
+            linha_analise(
+                analysis, item.patient_id,
+                conversation_session_id=item.conversation_session_id,
+                message_id=item.message_id
+            )
+            for item, analysis in zip(batch.items, analyses)
+        ]
+        ids = await MentalHealthRepository.create_nlp_analyses_bulk(db, linhas)
+
+    return {"count": len(analyses), "ids": ids, **colunas(analyses)}
+
+
 @router.get("/nlp-analysis/{patient_id}/sentiment-trend", response_model=SentimentTrend)
 async def get_sentiment_trend(
     patient_id: int,
     days: int = 7,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Calcular tendência de sentimento nas conversas"""
     trend = await MentalHealthRepository.get_recent_sentiment_trend(db, patient_id, days)
@@ -371,7 +401,7 @@ async def get_latest_prediction(
 @router.get("/summary/{patient_id}", response_model=PatientMentalHealthSummary)
 async def get_patient_summary(
     patient_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Obter resumo completo de saúde mental do paciente
@@ -388,6 +418,32 @@ async def get_patient_summary(
     return summary
 
 
+# =====================================================================
+# RISK STATE (Estado de Risco)
+# =====================================================================
+
+@router.get("/risk/at-risk", response_model=List[PatientRiskStateResponse])
+async def list_patients_at_risk(
+    levels: List[RiskLevel] = Query([RiskLevel.CRITICAL, RiskLevel.HIGH]),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Pacientes em risco agora, do mais grave para o menos grave"""
+    return await pacientes_em_risco(db, [nivel.value for nivel in levels], limit)
+
+
+@router.get("/risk/{patient_id}", response_model=PatientRiskStateResponse)
+async def get_patient_risk(
+    patient_id: int,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Risco atual do paciente (uma leitura por chave primária)"""
+    estado = await obter_estado(db, patient_id)
+    if not estado:
+        raise HTTPException(status_code=404, detail="Paciente sem estado de risco")
+    return montar_estado(estado)
+
+
 # =====================================================================
 # SCALE REFERENCES (Escalas de Referência)
 # =====================================================================
@@ -1,12 +1,15 @@
 """
 Rotas para atividade física e sinais vitais (endpoints principais)
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
 
 from database.connection import get_db
+from database.ingestao_bulk import BULK_MAX_REGISTROS, ingerir_ndjson
+from database.models import Atividade, SinaisVitaisHealth
 from database.repositories import repository_saude
 from schemas import (
     AtividadeCreate, AtividadeResponse, AtividadeBulkCreate,
@@ -14,12 +17,40 @@ from schemas import (
     SonoCreate, SonoResponse,
     MedicaoCorporalCreate, MedicaoCorporalResponse,
     NutricaoCreate, NutricaoResponse,
-    CicloMenstrualCreate, CicloMenstrualResponse
+    CicloMenstrualCreate, CicloMenstrualResponse,
+    BulkIngestaoResponse, StreamIngestaoResponse
 )
+from utils.respostas import resposta_orm
 
 router = APIRouter()
 
 
+def _validar_tamanho_lote(registros: list):
+    if len(registros) > BULK_MAX_REGISTROS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo de {BULK_MAX_REGISTROS} registros por requisição"
+        )
+
+
+async def _ingerir_stream(request: Request, db: AsyncSession, modelo, schema):
+    """
+    Corpo NDJSON (um registro por linha), opcionalmente gzip
+    (Content-Encoding: gzip ou Content-Type: application/gzip). gzip que
+    descompacta além de BULK_STREAM_MAX_DESCOMPACTADO responde 413.
+    """
+    gzip = (
+        "gzip" in request.headers.get("content-encoding", "").lower()
+        or request.headers.get("content-type", "").startswith(("application/gzip", "application/x-gzip"))
+    )
+    resumo = await ingerir_ndjson(db, modelo, schema, request.stream(), gzip=gzip)
+    if resumo["corpo_excedeu_limite"]:
+        return JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, content=resumo)
+    if resumo["erro_corpo"]:
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content=resumo)
+    return resumo
+
+
 # =====================================================
 # ATIVIDADE FÍSICA
 # =====================================================
@@ -33,18 +64,34 @@ async def criar_atividade(
     return await repository_saude.create_atividade(db, atividade)
 
 
-@router.post("/atividades/bulk", response_model=List[AtividadeResponse], status_code=status.HTTP_201_CREATED, tags=["Atividade"])
+@router.post("/atividades/bulk", response_model=BulkIngestaoResponse, status_code=status.HTTP_201_CREATED, tags=["Atividade"])
 async def criar_atividades_bulk(
     bulk_data: AtividadeBulkCreate,
     db: AsyncSession = Depends(get_db)
 ):
-    """Enviar múltiplos registros de atividade (sincronização offline)"""
-    if len(bulk_data.registros) > 100:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Máximo de 100 registros por requisição"
-        )
-    return await repository_saude.create_atividades_bulk(db, bulk_data.registros)
+    """
+    Enviar múltiplos registros de atividade (sincronização offline).
+
+    Até 10.000 registros. Itens inválidos são reportados em `erros` pelo
+    índice; reenvios de (cliente_id, timestamp_coleta) contam como duplicados.
+    """
+    _validar_tamanho_lote(bulk_data.registros)
+    resultado = await repository_saude.create_atividades_bulk(db, bulk_data.registros)
+    return resultado.to_dict()
+
+
+@router.post("/atividades/stream", response_model=StreamIngestaoResponse, tags=["Atividade"])
+async def stream_atividades(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Sincronização de grandes backlogs em NDJSON/gzip.
+
+    Processa o corpo em streaming e grava em lotes, com memória constante;
+    sem limite de registros. Retorna o resumo de cada lote gravado.
+    """
+    return await _ingerir_stream(request, db, Atividade, AtividadeCreate)
 
 
 @router.get("/atividades/{cliente_id}", response_model=List[AtividadeResponse], tags=["Atividade"])
@@ -57,9 +104,9 @@ async def listar_atividades(
     db: AsyncSession = Depends(get_db)
 ):
     """Recuperar histórico de atividades com paginação"""
-    return await repository_saude.get_atividades_by_usuario(
+    return resposta_orm(AtividadeResponse, await repository_saude.get_atividades_by_usuario(
         db, cliente_id, skip, limit, data_inicio, data_fim
-    )
+    ))
 
 
 # =====================================================
@@ -75,18 +122,24 @@ async def criar_sinais_vitais(
     return await repository_saude.create_sinais_vitais(db, sinais)
 
 
-@router.post("/sinais-vitais/bulk", response_model=List[SinaisVitaisHealthResponse], status_code=status.HTTP_201_CREATED, tags=["Sinais Vitais"])
+@router.post("/sinais-vitais/bulk", response_model=BulkIngestaoResponse, status_code=status.HTTP_201_CREATED, tags=["Sinais Vitais"])
 async def criar_sinais_vitais_bulk(
     bulk_data: SinaisVitaisHealthBulkCreate,
     db: AsyncSession = Depends(get_db)
 ):
-    """Enviar múltiplos registros de sinais vitais"""
-    if len(bulk_data.registros) > 100:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Máximo de 100 registros por requisição"
-        )
-    return await repository_saude.create_sinais_vitais_bulk(db, bulk_data.registros)
+    """Enviar múltiplos registros de sinais vitais (até 10.000, idempotente)"""
+    _validar_tamanho_lote(bulk_data.registros)
+    resultado = await repository_saude.create_sinais_vitais_bulk(db, bulk_data.registros)
+    return resultado.to_dict()
+
+
+@router.post("/sinais-vitais/stream", response_model=StreamIngestaoResponse, tags=["Sinais Vitais"])
+async def stream_sinais_vitais(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """Sincronização de sinais vitais em NDJSON/gzip (streaming, em lotes)"""
+    return await _ingerir_stream(request, db, SinaisVitaisHealth, SinaisVitaisHealthCreate)
 
 
 @router.get("/sinais-vitais/{cliente_id}", response_model=List[SinaisVitaisHealthResponse], tags=["Sinais Vitais"])
@@ -99,9 +152,9 @@ async def listar_sinais_vitais(
     db: AsyncSession = Depends(get_db)
 ):
     """Recuperar histórico de sinais vitais com paginação"""
-    return await repository_saude.get_sinais_vitais_by_usuario(
+    return resposta_orm(SinaisVitaisHealthResponse, await repository_saude.get_sinais_vitais_by_usuario(
         db, cliente_id, skip, limit, data_inicio, data_fim
-    )
+    ))
 
 
 # =====================================================
@@ -125,7 +178,7 @@ async def listar_sono(
     db: AsyncSession = Depends(get_db)
 ):
     """Recuperar histórico de sono"""
-    return await repository_saude.get_sono_by_usuario(db, cliente_id, skip, limit)
+    return resposta_orm(SonoResponse, await repository_saude.get_sono_by_usuario(db, cliente_id, skip, limit))
 
 
 # =====================================================
@@ -149,7 +202,7 @@ async def listar_medicoes_corporais(
     db: AsyncSession = Depends(get_db)
 ):
     """Recuperar histórico de medições corporais"""
-    return await repository_saude.get_medicoes_corporais_by_usuario(db, cliente_id, skip, limit)
+    return resposta_orm(MedicaoCorporalResponse, await repository_saude.get_medicoes_corporais_by_usuario(db, cliente_id, skip, limit))
 
 
 # =====================================================
@@ -173,7 +226,7 @@ async def listar_nutricao(
     db: AsyncSession = Depends(get_db)
 ):
     """Recuperar histórico de nutrição"""
-    return await repository_saude.get_nutricao_by_usuario(db, cliente_id, skip, limit)
+    return resposta_orm(NutricaoResponse, await repository_saude.get_nutricao_by_usuario(db, cliente_id, skip, limit))
 
 
 # =====================================================
@@ -197,4 +250,4 @@ async def listar_ciclo_menstrual(
     db: AsyncSession = Depends(get_db)
 ):
     """Recuperar histórico do ciclo menstrual"""
-    return await repository_saude.get_ciclo_menstrual_by_usuario(db, cliente_id, skip, limit)
+    return resposta_orm(CicloMenstrualResponse, await repository_saude.get_ciclo_menstrual_by_usuario(db, cliente_id, skip, limit))
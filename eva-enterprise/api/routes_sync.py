@@ -0,0 +1,40 @@
+"""
+Sync delta para os apps (Flutter)
+
+Substitui o re-fetch de /idosos, /medicamentos/{idoso_id},
+/cuidadores/idoso/{id} e /alertas a cada tela: o app envia o token da
+última sincronização e recebe só o que mudou, numa resposta compacta.
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.connection import get_read_db
+from database.repositories.sync_repo import SyncRepository
+from schemas import SyncResponse
+from utils.respostas import RespostaJSONRapida
+from utils.security import get_current_user
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SyncResponse)
+async def sincronizar(
+    token: Optional[str] = Query(None, description="Token devolvido na sincronização anterior (vazio = completa)"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Mudanças desde `token` em idosos, medicamentos, cuidadores e alertas
+
+    - alterados: linhas novas ou atualizadas (mesmo formato das listagens)
+    - removidos: ids desativados ou apagados
+    - tem_mais: chamar de novo com o token retornado até vir false
+    - reset: o app deve descartar o cache local e aplicar esta resposta como completa
+    """
+    repo = SyncRepository(db)
+    resposta = await repo.sincronizar(current_user["user_id"], current_user.get("role", "cuidador"), token)
+    # Já serializado pelo repositório: vai direto ao orjson, sem revalidar.
+    # A compressão fica com o CompressaoMiddleware.
+    return RespostaJSONRapida(resposta)
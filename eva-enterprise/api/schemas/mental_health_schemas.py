@@ -328,6 +328,31 @@ class NLPAnalysisCreate(BaseModel):
     topic_classification: List[str] = Field(default_factory=list)
 
 
+class NLPBatchItem(BaseModel):
+    """Texto a analisar no lote"""
+    patient_id: int = Field(..., gt=0)
+    text: str
+    conversation_session_id: Optional[int] = None
+    message_id: Optional[int] = None
+
+
+class NLPBatchRequest(BaseModel):
+    """Lote de textos para análise NLP"""
+    items: List[NLPBatchItem] = Field(..., min_length=1, max_length=5000)
+    persist: bool = True
+
+
+class NLPBatchResponse(BaseModel):
+    """Resultado do lote em vetores paralelos (posição i = items[i])"""
+    count: int
+    ids: List[int]
+    sentiment_scores: List[float]
+    sentiment_labels: List[str]
+    risk_levels: List[str]
+    danger_flags: List[List[str]]
+    topics: List[List[str]]
+
+
 class SentimentTrend(BaseModel):
     """Tendência de sentimento"""
     avg_sentiment: float
@@ -391,6 +416,22 @@ class PatientMentalHealthSummary(BaseModel):
     risk_level: RiskLevel
 
 
+class PatientRiskStateResponse(BaseModel):
+    """Estado de risco mantido na escrita (patient_risk_state)"""
+    patient_id: int
+    risk_level: RiskLevel
+    risk_reason: Optional[str] = None
+    phq9_score: Optional[int] = None
+    gad7_score: Optional[int] = None
+    cssrs_score: Optional[int] = None
+    ml_label: Optional[str] = None
+    sentiment_ewma: Optional[float] = None
+    danger_flags: List[str] = []
+    crisis_count: int = 0
+    last_crisis_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
 # =====================================================================
 # SCALE REFERENCE SCHEMAS
 # =====================================================================
@@ -76,6 +76,42 @@ celery_app.conf.update(
             "task": "tasks.scheduled_tasks.check_expiring_subscriptions",
             "schedule": 86400.0,  # 24 hours
         },
+        # Particoes mensais das series de saude (criar futuras / arquivar antigas)
+        "manter-particoes-saude": {
+            "task": "tasks.scheduled_tasks.manter_particoes_saude",
+            "schedule": 86400.0,  # 24 hours
+        },
+        # Relatorios mensais consolidados (meses fechados)
+        "consolidar-relatorios-mensais": {
+            "task": "tasks.scheduled_tasks.consolidar_relatorios_mensais",
+            "schedule": 21600.0,  # 6 hours
+        },
+        # Tombstones antigos do /sync delta
+        "expurgar-tombstones-sync": {
+            "task": "tasks.scheduled_tasks.expurgar_tombstones_sync",
+            "schedule": 86400.0,  # 24 hours
+        },
+        # Estado de risco cujas janelas venceram (patient_risk_state)
+        "recalcular-riscos-vencidos": {
+            "task": "tasks.scheduled_tasks.recalcular_riscos_vencidos",
+            "schedule": 900.0,  # 15 minutes
+        },
+        # Score de risco populacional em lote (ml_predictions)
+        "pontuar-risco-populacional": {
+            "task": "tasks.scheduled_tasks.pontuar_risco_populacional",
+            "schedule": 21600.0,  # 6 hours
+        },
+        # Padroes de comportamento: incremental (dado novo desde a ultima execucao)
+        "minerar-padroes-comportamento": {
+            "task": "tasks.scheduled_tasks.minerar_padroes_comportamento",
+            "schedule": 3600.0,  # 1 hour
+        },
+        # ... e completa, para rever padroes que sairam da janela sem dado novo
+        "minerar-padroes-comportamento-completo": {
+            "task": "tasks.scheduled_tasks.minerar_padroes_comportamento",
+            "schedule": 604800.0,  # 7 days
+            "kwargs": {"completo": True},
+        },
         # Health check do sistema de pagamentos
         "payment-health-check": {
             "task": "tasks.scheduled_tasks.payment_health_check",
@@ -1,7 +1,14 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy import event, exc, text
+from fastapi import Depends, Request
 
 import os
+import time
+import asyncio
+import hashlib
+import threading
 from dotenv import load_dotenv
 
 from pathlib import Path
@@ -31,17 +38,20 @@ if not DATABASE_URL:
     # Opcional: Levantar exceção para impedir fallback silencioso se for requisito estrito
     # raise ValueError("DATABASE_URL is required in .env")
 
-# Ajusta string de conexão para garantir asyncpg
-if DATABASE_URL:
-    if "postgresql+asyncpg" not in DATABASE_URL:
-        if DATABASE_URL.startswith("postgres://"):
-            DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
-        elif DATABASE_URL.startswith("postgresql://"):
-            DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
-        elif "://" in DATABASE_URL and (DATABASE_URL.startswith("postgresql+") or "postgres" in DATABASE_URL.split("://")[0]):
+def _to_asyncpg_url(url):
+    """Ajusta string de conexão para garantir asyncpg"""
+    if url and "postgresql+asyncpg" not in url:
+        if url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql+asyncpg://", 1)
+        elif url.startswith("postgresql://"):
+            url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+        elif "://" in url and (url.startswith("postgresql+") or "postgres" in url.split("://")[0]):
             # Trata casos como postgresql+psycopg2://
-            prefix = DATABASE_URL.split("://")[0]
-            DATABASE_URL = DATABASE_URL.replace(prefix, "postgresql+asyncpg", 1)
+            prefix = url.split("://")[0]
+            url = url.replace(prefix, "postgresql+asyncpg", 1)
+    return url
+
+DATABASE_URL = _to_asyncpg_url(DATABASE_URL)
 
 # Se for SQLite, garante o driver correto
 if DATABASE_URL and "sqlite" in DATABASE_URL:
@@ -52,8 +62,131 @@ if not DATABASE_URL:
 
 print(f"🔌 Conectando ao banco de dados (ASYNC): {DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else 'Local (SQLite)'}")
 
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# ==========================
+# POOL DE CONEXÕES (configurável por ambiente)
+# ==========================
+# DB_POOL_SIZE               conexões mantidas abertas
+# DB_MAX_OVERFLOW            conexões extras em pico
+# DB_POOL_TIMEOUT            segundos esperando uma conexão livre antes de falhar
+# DB_POOL_RECYCLE            segundos até reciclar uma conexão (evita conexões mortas no proxy)
+# DB_STATEMENT_CACHE_SIZE    cache de prepared statements do asyncpg por conexão
+# DB_STATEMENT_TIMEOUT_MS    statement_timeout padrão do servidor (0 = sem limite)
+# DB_DASHBOARD_STATEMENT_TIMEOUT_MS  limite das rotas analíticas (dashboards)
+POOL_SIZE = _env_int("DB_POOL_SIZE", 10)
+MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 20)
+POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 10)
+POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)
+STATEMENT_CACHE_SIZE = _env_int("DB_STATEMENT_CACHE_SIZE", 500)
+STATEMENT_TIMEOUT_MS = _env_int("DB_STATEMENT_TIMEOUT_MS", 30000)
+DASHBOARD_STATEMENT_TIMEOUT_MS = _env_int("DB_DASHBOARD_STATEMENT_TIMEOUT_MS", 5000)
+
+
+class PoolMetrics:
+    """Métricas de espera por conexão (checkout) do pool"""
+
+    BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self.histogram = {b: 0 for b in self.BUCKETS_MS}
+            self.histogram["+Inf"] = 0
+
+    def record(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            for bucket in self.BUCKETS_MS:
+                if wait_ms <= bucket:
+                    self.histogram[bucket] += 1
+                    break
+            else:
+                self.histogram["+Inf"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 3),
+                "wait_histogram_ms": {str(k): v for k, v in self.histogram.items()},
+            }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Pool que mede quanto tempo cada requisição esperou por uma conexão"""
+
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics:
+                self.metrics.record(0, timed_out=True)
+            raise
+        if self.metrics:
+            self.metrics.record((time.perf_counter() - inicio) * 1000)
+        return conn
+
+
+def create_engine_from_env(url: str, metrics: PoolMetrics = None, application_name: str = "eva-enterprise"):
+    """
+    Cria engine assíncrono com pool dimensionado pelo ambiente.
+
+    PostgreSQL: pool instrumentado, pre-ping, recycle, cache de prepared
+    statements do asyncpg e statement_timeout padrão no servidor.
+    SQLite (testes/local): usa os padrões do SQLAlchemy.
+    """
+    if "sqlite" in url:
+        return create_async_engine(url, echo=False)
+
+    pool_class = type("InstrumentedQueuePool", (InstrumentedQueuePool,), {"metrics": metrics})
+    server_settings = {"application_name": application_name}
+    if STATEMENT_TIMEOUT_MS > 0:
+        server_settings["statement_timeout"] = str(STATEMENT_TIMEOUT_MS)
+
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=pool_class,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=True,
+        connect_args={
+            "prepared_statement_cache_size": STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings,
+        },
+    )
+
+
+pool_metrics = PoolMetrics()
+
 try:
-    engine = create_async_engine(DATABASE_URL, echo=False)
+    engine = create_engine_from_env(DATABASE_URL, metrics=pool_metrics)
 except Exception as e:
     print(f"⚠️ Falha ao criar engine para {DATABASE_URL}: {e}")
     raise e
@@ -68,3 +201,198 @@ async def get_db():
             yield session
         finally:
             await session.close()
+
+
+# ==========================
+# RÉPLICA DE LEITURA
+# ==========================
+# DATABASE_URL_READ          réplica para rotas somente leitura (opcional)
+# DB_REPLICA_MAX_LAG_S       atraso máximo aceito antes de voltar ao primário
+# DB_REPLICA_LAG_CHECK_S     intervalo entre medições de atraso
+# DB_READ_YOUR_WRITES_S      após uma escrita, leituras do mesmo cliente vão ao primário
+READ_DATABASE_URL = _to_asyncpg_url(os.getenv("DATABASE_URL_READ"))
+REPLICA_MAX_LAG_S = _env_int("DB_REPLICA_MAX_LAG_S", 5)
+REPLICA_LAG_CHECK_S = _env_int("DB_REPLICA_LAG_CHECK_S", 5)
+READ_YOUR_WRITES_S = _env_int("DB_READ_YOUR_WRITES_S", 10)
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReplicaLagMonitor:
+    """Mede (com cache) o atraso de replicação e decide se a réplica pode ser usada"""
+
+    LAG_SQL = text("""
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """)
+
+    def __init__(self, engine, max_lag_s: int, check_interval_s: int):
+        self.engine = engine
+        self.max_lag_s = max_lag_s
+        self.check_interval_s = check_interval_s
+        self.available = False
+        self.last_lag_s = None
+        self.last_error = None
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def is_available(self) -> bool:
+        if time.monotonic() - self._checked_at < self.check_interval_s:
+            return self.available
+
+        async with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval_s:
+                return self.available
+            try:
+                async with self.engine.connect() as conn:
+                    lag = await conn.scalar(self.LAG_SQL)
+                self.last_lag_s = float(lag or 0)
+                self.available = self.last_lag_s <= self.max_lag_s
+                self.last_error = None
+            except Exception as e:
+                self.available = False
+                self.last_error = str(e)
+            self._checked_at = time.monotonic()
+        return self.available
+
+    def status(self) -> dict:
+        return {
+            "available": self.available,
+            "last_lag_s": self.last_lag_s,
+            "max_lag_s": self.max_lag_s,
+            "last_error": self.last_error,
+        }
+
+
+read_pool_metrics = PoolMetrics()
+read_engine = None
+ReadSessionLocal = None
+replica_monitor = None
+
+if READ_DATABASE_URL:
+    print(f"🔌 Réplica de leitura: {READ_DATABASE_URL.split('@')[1] if '@' in READ_DATABASE_URL else 'Local'}")
+    read_engine = create_engine_from_env(
+        READ_DATABASE_URL, metrics=read_pool_metrics, application_name="eva-enterprise-read"
+    )
+    ReadSessionLocal = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+    replica_monitor = ReplicaLagMonitor(read_engine, REPLICA_MAX_LAG_S, REPLICA_LAG_CHECK_S)
+
+
+# Clientes que escreveram recentemente: identidade -> leituras no primário até (monotonic)
+_recent_writers = {}
+_RECENT_WRITERS_MAX = 10000
+
+
+def _client_identity(request: Request) -> str:
+    credencial = request.headers.get("authorization")
+    if not credencial:
+        credencial = request.client.host if request.client else "anon"
+    return hashlib.sha1(credencial.encode()).hexdigest()
+
+
+def mark_recent_write(request: Request):
+    """Fixa as leituras deste cliente no primário pela janela de read-your-writes"""
+    agora = time.monotonic()
+    if len(_recent_writers) >= _RECENT_WRITERS_MAX:
+        for chave in [k for k, ate in _recent_writers.items() if ate <= agora]:
+            _recent_writers.pop(chave, None)
+        if len(_recent_writers) >= _RECENT_WRITERS_MAX:
+            _recent_writers.clear()
+    _recent_writers[_client_identity(request)] = agora + READ_YOUR_WRITES_S
+
+
+def _must_read_from_primary(request: Request) -> bool:
+    # Escrita na mesma requisição
+    if request.method not in SAFE_METHODS:
+        return True
+    # Escrita recente do mesmo cliente/sessão
+    ate = _recent_writers.get(_client_identity(request))
+    return ate is not None and ate > time.monotonic()
+
+
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Sessão para rotas somente leitura.
+
+    Usa a réplica (DATABASE_URL_READ) quando configurada e com atraso aceitável;
+    caso contrário, ou se o cliente escreveu há pouco, usa a sessão do primário.
+    A sessão do primário só abre conexão se for usada.
+    """
+    if (
+        ReadSessionLocal is None
+        or _must_read_from_primary(request)
+        or not await replica_monitor.is_available()
+    ):
+        yield db
+        return
+
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def apply_statement_timeout(session: AsyncSession, timeout_ms: int):
+    """
+    Aplica statement_timeout (SET LOCAL) a cada transação aberta pela sessão.
+    Sem efeito fora do PostgreSQL.
+    """
+    if session.bind is None or session.bind.dialect.name != "postgresql":
+        return
+
+    @event.listens_for(session.sync_session, "after_begin")
+    def _set_timeout(_session, _transaction, connection):
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+def get_db_with_timeout(timeout_ms: int, read_only: bool = False):
+    """
+    Dependency de sessão com statement_timeout próprio para a rota.
+    Com read_only=True a sessão vem de get_read_db (réplica quando disponível).
+
+    Uso:
+        dashboard_db = get_db_with_timeout(5000, read_only=True)
+
+        @router.get("/pesado")
+        async def rota(db: AsyncSession = Depends(dashboard_db)): ...
+    """
+    base_dependency = get_read_db if read_only else get_db
+
+    async def _get_db_with_timeout(db: AsyncSession = Depends(base_dependency)):
+        apply_statement_timeout(db, timeout_ms)
+        yield db
+
+    return _get_db_with_timeout
+
+
+def _describe_pool(pool, metrics: PoolMetrics) -> dict:
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": MAX_OVERFLOW,
+            "timeout_s": POOL_TIMEOUT,
+        })
+    status["checkout_wait"] = metrics.snapshot()
+    return status
+
+
+def get_pool_status() -> dict:
+    """Estado atual do pool + métricas de espera por conexão"""
+    return _describe_pool(engine.pool, pool_metrics)
+
+
+def get_read_pool_status() -> dict:
+    """Estado do pool da réplica de leitura (None se não configurada)"""
+    if read_engine is None:
+        return None
+    status = _describe_pool(read_engine.pool, read_pool_metrics)
+    status["replica"] = replica_monitor.status()
+    return status
@@ -0,0 +1,435 @@
+"""
+Estado de risco por paciente (patient_risk_state)
+
+- aplicar_avaliacoes() / aplicar_crises() / aplicar_analises() /
+  aplicar_predicoes(): chamados pelos caminhos de escrita do
+  MentalHealthRepository (e pelo backfill NLP), na mesma transação do
+  INSERT. Travam a linha do paciente (SELECT ... FOR UPDATE), incorporam o
+  evento (últimos scores, média móvel exponencial do sentimento, contadores
+  de crise) e recalculam o nível de risco.
+- avaliar() / motivo_emergencia(): nível de risco e trigger de emergência a
+  partir só da linha de estado, sem consultar as tabelas de eventos.
+  O que depende de janela (tentativa de suicídio em 30 dias, sentimento em
+  7 dias, validade da predição) vence em risk_expires_at: a leitura
+  recalcula o nível e a task recalcular_riscos_vencidos regrava a linha.
+- pacientes_em_risco(): quem está em risco agora, pelo índice de risk_level.
+- reconstruir_estado() / reconstruir_estados(): recalculam a partir dos
+  dados brutos (backfill da migration 013).
+"""
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, delete, desc, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.ingestao_bulk import insert_do_dialeto
+from database.models import (
+    CrisisEvent, Idoso, MentalHealthAssessment, MLPrediction, NLPConversationAnalysis, PatientRiskState
+)
+
+logger = logging.getLogger(__name__)
+
+# Peso da análise nova na média de sentimento
+RISCO_EWMA_ALFA = float(os.getenv("RISCO_EWMA_ALFA", "0.3"))
+RISCO_LOTE_PACIENTES = int(os.getenv("RISCO_LOTE_PACIENTES", "500"))
+
+JANELA_SENTIMENTO = timedelta(days=7)
+JANELA_TENTATIVA = timedelta(days=30)
+
+NIVEIS = ("CRITICAL", "HIGH", "MODERATE", "LOW")
+_PRIORIDADE = {nivel: len(NIVEIS) - i for i, nivel in enumerate(NIVEIS)}
+
+# scale_type -> prefixo das colunas em patient_risk_state
+_ESCALAS = {"PHQ9": "phq9", "GAD7": "gad7", "C-SSRS": "cssrs"}
+
+
+def _campo(evento, nome: str, padrao=None):
+    """Atributo de um model ou chave de uma linha (dict) do INSERT em lote"""
+    valor = evento.get(nome) if isinstance(evento, Mapping) else getattr(evento, nome, None)
+    return padrao if valor is None else valor
+
+
+def _float(valor) -> Optional[float]:
+    return float(valor) if valor is not None else None
+
+
+def _mais_recente(atual: Optional[datetime], quando: datetime) -> bool:
+    return atual is None or quando >= atual
+
+
+# =====================================================================
+# INCORPORAÇÃO DE EVENTOS (sem I/O)
+# =====================================================================
+
+def _incorporar_avaliacao(estado: PatientRiskState, avaliacao, agora: datetime) -> None:
+    prefixo = _ESCALAS.get(_campo(avaliacao, "scale_type"))
+    if prefixo is None:
+        return
+    quando = _campo(avaliacao, "assessed_at", agora)
+    # Avaliação retroativa não substitui uma mais nova
+    if not _mais_recente(getattr(estado, f"{prefixo}_at"), quando):
+        return
+    setattr(estado, f"{prefixo}_score", _campo(avaliacao, "score"))
+    setattr(estado, f"{prefixo}_at", quando)
+    if hasattr(estado, f"{prefixo}_severity"):
+        setattr(estado, f"{prefixo}_severity", _campo(avaliacao, "severity_level"))
+
+
+def _incorporar_crise(estado: PatientRiskState, crise, agora: datetime) -> None:
+    quando = _campo(crise, "occurred_at", agora)
+    estado.crisis_count = (estado.crisis_count or 0) + 1
+    if _mais_recente(estado.last_crisis_at, quando):
+        estado.last_crisis_at = quando
+    if _campo(crise, "crisis_type") == "suicide_attempt" and _mais_recente(estado.last_suicide_attempt_at, quando):
+        estado.last_suicide_attempt_at = quando
+
+
+def _incorporar_analise(estado: PatientRiskState, analise, agora: datetime) -> None:
+    quando = _campo(analise, "analyzed_at", agora)
+    score = _float(_campo(analise, "sentiment_score"))
+    if score is not None:
+        # Sem análise nos últimos 7 dias a média recomeça: só a janela conta
+        if estado.sentiment_ewma is None or estado.sentiment_at is None \
+                or quando - estado.sentiment_at > JANELA_SENTIMENTO:
+            estado.sentiment_ewma = score
+            estado.sentiment_count = 1
+        else:
+            estado.sentiment_ewma = RISCO_EWMA_ALFA * score + (1 - RISCO_EWMA_ALFA) * float(estado.sentiment_ewma)
+            estado.sentiment_count = (estado.sentiment_count or 0) + 1
+        if _mais_recente(estado.sentiment_at, quando):
+            estado.sentiment_at = quando
+
+    flags = _campo(analise, "danger_flags")
+    if flags and _mais_recente(estado.danger_flag_at, quando):
+        estado.danger_flags = list(flags)
+        estado.danger_flag_at = quando
+
+
+def _incorporar_predicao(estado: PatientRiskState, predicao, agora: datetime) -> None:
+    if _campo(predicao, "prediction_type") != "suicide_risk":
+        return
+    quando = _campo(predicao, "predicted_at", agora)
+    if not _mais_recente(estado.ml_predicted_at, quando):
+        return
+    estado.ml_model_name = _campo(predicao, "model_name")
+    estado.ml_label = _campo(predicao, "prediction_label")
+    estado.ml_value = _campo(predicao, "prediction_value")
+    estado.ml_confidence = _campo(predicao, "confidence_score")
+    estado.ml_predicted_at = quando
+    estado.ml_valid_until = _campo(predicao, "valid_until")
+
+
+# =====================================================================
+# AVALIAÇÃO DO RISCO (sem I/O)
+# =====================================================================
+
+def _recente(quando: Optional[datetime], janela: timedelta, agora: datetime) -> bool:
+    return quando is not None and agora - quando <= janela
+
+
+def motivo_emergencia(
+    estado: PatientRiskState,
+    agora: Optional[datetime] = None
+) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Primeiro trigger do protocolo de emergência que dispara, como
+    (nível, motivo, detalhes), na ordem de EmergencyProtocolService
+    """
+    agora = agora or datetime.now()
+    if estado.cssrs_score is not None and estado.cssrs_score >= 4:
+        return "CRITICAL", "c_ssrs_critical", {
+            "cssrs_score": estado.cssrs_score, "severity": estado.cssrs_severity
+        }
+    if estado.phq9_score is not None and estado.phq9_score >= 20:
+        return "HIGH", "severe_depression", {
+            "phq9_score": estado.phq9_score, "severity": estado.phq9_severity
+        }
+    if estado.ml_label in ("HIGH", "CRITICAL") and estado.ml_valid_until is not None \
+            and estado.ml_valid_until >= agora:
+        return estado.ml_label, "ml_prediction", {
+            "model": estado.ml_model_name,
+            "confidence": _float(estado.ml_confidence),
+            "prediction_value": _float(estado.ml_value),
+        }
+    if _recente(estado.sentiment_at, JANELA_SENTIMENTO, agora) \
+            and float(estado.sentiment_ewma) < -0.7 \
+            and _recente(estado.danger_flag_at, JANELA_SENTIMENTO, agora):
+        return "MODERATE", "persistent_negative_sentiment", {
+            "sentiment_ewma": round(float(estado.sentiment_ewma), 3),
+            "danger_flags": estado.danger_flags or [],
+        }
+    return None
+
+
+def avaliar(estado: PatientRiskState, agora: Optional[datetime] = None) -> Tuple[str, Optional[str]]:
+    """Nível de risco geral e o motivo (o trigger de emergência ganha no empate)"""
+    agora = agora or datetime.now()
+    candidatos: List[Tuple[str, str]] = []
+
+    emergencia = motivo_emergencia(estado, agora)
+    if emergencia:
+        candidatos.append(emergencia[:2])
+    if _recente(estado.last_suicide_attempt_at, JANELA_TENTATIVA, agora):
+        candidatos.append(("CRITICAL", "suicide_attempt_30d"))
+    if estado.cssrs_score is not None and estado.cssrs_score >= 2:
+        candidatos.append(("HIGH", "c_ssrs_high"))
+    if estado.gad7_score is not None and estado.gad7_score >= 15:
+        candidatos.append(("HIGH", "severe_anxiety"))
+    if estado.phq9_score is not None and estado.phq9_score >= 10:
+        candidatos.append(("MODERATE", "moderate_depression"))
+    if estado.gad7_score is not None and estado.gad7_score >= 10:
+        candidatos.append(("MODERATE", "moderate_anxiety"))
+
+    return max(candidatos, key=lambda c: _PRIORIDADE[c[0]], default=("LOW", None))
+
+
+def _vencimento(estado: PatientRiskState, agora: datetime) -> Optional[datetime]:
+    """Próximo instante em que alguma parte do risco sai da janela"""
+    limites = [
+        estado.last_suicide_attempt_at and estado.last_suicide_attempt_at + JANELA_TENTATIVA,
+        estado.sentiment_at and estado.sentiment_at + JANELA_SENTIMENTO,
+        estado.danger_flag_at and estado.danger_flag_at + JANELA_SENTIMENTO,
+        estado.ml_valid_until,
+    ]
+    futuros = [limite for limite in limites if limite is not None and limite > agora]
+    return min(futuros, default=None)
+
+
+def recalcular(estado: PatientRiskState, agora: datetime) -> None:
+    """Regrava nível, motivo e vencimento na linha (quem grava é o commit do chamador)"""
+    estado.risk_level, estado.risk_reason = avaliar(estado, agora)
+    estado.risk_expires_at = _vencimento(estado, agora)
+
+
+def risco_atual(estado: PatientRiskState, agora: Optional[datetime] = None) -> Tuple[str, Optional[str]]:
+    """Nível gravado, ou recalculado da própria linha se já venceu"""
+    agora = agora or datetime.now()
+    if estado.risk_expires_at is not None and estado.risk_expires_at <= agora:
+        return avaliar(estado, agora)
+    return estado.risk_level, estado.risk_reason
+
+
+def montar_estado(estado: PatientRiskState, agora: Optional[datetime] = None) -> Dict[str, Any]:
+    """Linha de estado no formato da API"""
+    agora = agora or datetime.now()
+    nivel, motivo = risco_atual(estado, agora)
+    sentimento_recente = _recente(estado.sentiment_at, JANELA_SENTIMENTO, agora)
+    return {
+        "patient_id": estado.patient_id,
+        "risk_level": nivel,
+        "risk_reason": motivo,
+        "phq9_score": estado.phq9_score,
+        "gad7_score": estado.gad7_score,
+        "cssrs_score": estado.cssrs_score,
+        "ml_label": estado.ml_label if estado.ml_valid_until and estado.ml_valid_until >= agora else None,
+        "sentiment_ewma": round(float(estado.sentiment_ewma), 3) if sentimento_recente else None,
+        "danger_flags": (estado.danger_flags or []) if _recente(estado.danger_flag_at, JANELA_SENTIMENTO, agora) else [],
+        "crisis_count": estado.crisis_count or 0,
+        "last_crisis_at": estado.last_crisis_at,
+        "updated_at": estado.updated_at,
+    }
+
+
+# =====================================================================
+# ESCRITA (mesma transação do INSERT do evento)
+# =====================================================================
+
+def _travar_consulta(ids: Sequence[int]):
+    # Ordem fixa de travamento: dois lotes com os mesmos pacientes não se travam
+    return (
+        select(PatientRiskState)
+        .where(PatientRiskState.patient_id.in_(ids))
+        .order_by(PatientRiskState.patient_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+
+
+async def _travar(db: AsyncSession, patient_ids: Iterable[int]) -> Dict[int, PatientRiskState]:
+    """Linhas de estado dos pacientes, travadas; cria as que faltam"""
+    ids = sorted(set(patient_ids))
+    estados = {e.patient_id: e for e in (await db.execute(_travar_consulta(ids))).scalars()}
+    faltantes = [i for i in ids if i not in estados]
+    if faltantes:
+        stmt, _ = insert_do_dialeto(db, PatientRiskState)
+        await db.execute(
+            stmt.on_conflict_do_nothing(index_elements=["patient_id"]),
+            [{"patient_id": i} for i in faltantes]
+        )
+        estados.update({e.patient_id: e for e in (await db.execute(_travar_consulta(faltantes))).scalars()})
+    return estados
+
+
+async def _aplicar(db: AsyncSession, eventos: Iterable[Any], incorporar: Callable, campo_ts: str) -> None:
+    eventos = list(eventos)
+    if not eventos:
+        return
+    agora = datetime.now()
+    estados = await _travar(db, (_campo(e, "patient_id") for e in eventos))
+    # Em ordem cronológica: a média móvel depende da ordem
+    for evento in sorted(eventos, key=lambda e: _campo(e, campo_ts, agora)):
+        incorporar(estados[_campo(evento, "patient_id")], evento, agora)
+    for estado in estados.values():
+        recalcular(estado, agora)
+
+
+async def aplicar_avaliacoes(db: AsyncSession, avaliacoes: Iterable[Any]) -> None:
+    await _aplicar(db, (a for a in avaliacoes if _campo(a, "scale_type") in _ESCALAS),
+                   _incorporar_avaliacao, "assessed_at")
+
+
+async def aplicar_crises(db: AsyncSession, crises: Iterable[Any]) -> None:
+    await _aplicar(db, crises, _incorporar_crise, "occurred_at")
+
+
+async def aplicar_analises(db: AsyncSession, analises: Iterable[Any]) -> None:
+    await _aplicar(db, analises, _incorporar_analise, "analyzed_at")
+
+
+async def aplicar_predicoes(db: AsyncSession, predicoes: Iterable[Any]) -> None:
+    await _aplicar(db, (p for p in predicoes if _campo(p, "prediction_type") == "suicide_risk"),
+                   _incorporar_predicao, "predicted_at")
+
+
+# =====================================================================
+# LEITURA
+# =====================================================================
+
+async def obter_estado(db: AsyncSession, patient_id: int) -> Optional[PatientRiskState]:
+    return await db.get(PatientRiskState, patient_id)
+
+
+async def pacientes_em_risco(
+    db: AsyncSession,
+    niveis: Sequence[str] = ("CRITICAL", "HIGH"),
+    limite: int = 100
+) -> List[Dict[str, Any]]:
+    """
+    Pacientes nos níveis pedidos, do mais grave para o menos grave e, no
+    mesmo nível, do estado atualizado mais recentemente
+
+    Uma varredura do índice (risk_level, updated_at) por nível, só com
+    estados ainda válidos: o LIMIT não gasta vagas com quem já venceu. Os
+    vencidos (poucos: a task recalcular_riscos_vencidos os regrava) vêm numa
+    consulta à parte, pelo índice de risk_expires_at, e são recalculados
+    aqui. O risco só cai com o tempo, então bastam os gravados num nível
+    igual ou acima do menor pedido.
+    """
+    agora = datetime.now()
+    pedidos = sorted(set(niveis) & set(NIVEIS), key=lambda n: -_PRIORIDADE[n])
+    if not pedidos:
+        return []
+    vencidos: Dict[str, List[Dict[str, Any]]] = {}
+    for estado in (await db.execute(
+        select(PatientRiskState).where(
+            PatientRiskState.risk_expires_at <= agora,
+            PatientRiskState.risk_level.in_([n for n in NIVEIS if _PRIORIDADE[n] >= _PRIORIDADE[pedidos[-1]]])
+        )
+    )).scalars():
+        linha = montar_estado(estado, agora)
+        vencidos.setdefault(linha["risk_level"], []).append(linha)
+
+    resultado: List[Dict[str, Any]] = []
+    for nivel in pedidos:
+        if len(resultado) >= limite:
+            break
+        estados = (await db.execute(
+            select(PatientRiskState)
+            .where(
+                PatientRiskState.risk_level == nivel,
+                or_(PatientRiskState.risk_expires_at.is_(None), PatientRiskState.risk_expires_at > agora)
+            )
+            .order_by(desc(PatientRiskState.updated_at))
+            .limit(limite - len(resultado))
+        )).scalars().all()
+        linhas = [montar_estado(e, agora) for e in estados] + vencidos.get(nivel, [])
+        linhas.sort(key=lambda linha: linha["updated_at"] or datetime.min, reverse=True)
+        resultado.extend(linhas[:limite - len(resultado)])
+    return resultado
+
+
+# =====================================================================
+# RECONSTRUÇÃO A PARTIR DOS DADOS BRUTOS
+# =====================================================================
+
+async def reconstruir_estado(db: AsyncSession, patient_id: int) -> PatientRiskState:
+    """Refaz a linha do paciente a partir dos eventos gravados (não faz commit)"""
+    agora = datetime.now()
+    await db.execute(delete(PatientRiskState).where(PatientRiskState.patient_id == patient_id))
+    estado = (await _travar(db, [patient_id]))[patient_id]
+
+    for escala in _ESCALAS:
+        avaliacao = (await db.execute(
+            select(MentalHealthAssessment)
+            .where(and_(MentalHealthAssessment.patient_id == patient_id,
+                        MentalHealthAssessment.scale_type == escala))
+            .order_by(desc(MentalHealthAssessment.assessed_at))
+            .limit(1)
+        )).scalar_one_or_none()
+        if avaliacao:
+            _incorporar_avaliacao(estado, avaliacao, agora)
+
+    predicao = (await db.execute(
+        select(MLPrediction)
+        .where(and_(MLPrediction.patient_id == patient_id, MLPrediction.prediction_type == "suicide_risk"))
+        .order_by(desc(MLPrediction.predicted_at))
+        .limit(1)
+    )).scalar_one_or_none()
+    if predicao:
+        _incorporar_predicao(estado, predicao, agora)
+
+    crises = (await db.execute(
+        select(
+            func.count().label("total"),
+            func.max(CrisisEvent.occurred_at).label("ultima"),
+            func.max(CrisisEvent.occurred_at).filter(CrisisEvent.crisis_type == "suicide_attempt").label("tentativa"),
+        ).where(CrisisEvent.patient_id == patient_id)
+    )).one()
+    estado.crisis_count = crises.total
+    estado.last_crisis_at = crises.ultima
+    estado.last_suicide_attempt_at = crises.tentativa
+
+    # Só a janela de 7 dias entra na média (as mais antigas a reiniciariam)
+    analises = (await db.execute(
+        select(NLPConversationAnalysis.sentiment_score, NLPConversationAnalysis.danger_flags,
+               NLPConversationAnalysis.analyzed_at)
+        .where(and_(NLPConversationAnalysis.patient_id == patient_id,
+                    NLPConversationAnalysis.analyzed_at >= agora - JANELA_SENTIMENTO))
+        .order_by(NLPConversationAnalysis.analyzed_at)
+    )).all()
+    for analise in analises:
+        _incorporar_analise(estado, analise, agora)
+
+    recalcular(estado, agora)
+    return estado
+
+
+async def reconstruir_estados(
+    session_factory,
+    apos_id: int = 0,
+    lote: int = RISCO_LOTE_PACIENTES,
+    ao_progredir: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Reconstrói o estado de todos os idosos, de `apos_id` em diante, um lote
+    por transação; `ultimo_id` do progresso serve para retomar
+    """
+    resultado = {"pacientes": 0, "em_risco": 0, "ultimo_id": apos_id}
+    while True:
+        async with session_factory() as db:
+            ids = (await db.execute(
+                select(Idoso.id).where(Idoso.id > resultado["ultimo_id"]).order_by(Idoso.id).limit(lote)
+            )).scalars().all()
+            if not ids:
+                return resultado
+            for patient_id in ids:
+                estado = await reconstruir_estado(db, patient_id)
+                resultado["em_risco"] += estado.risk_level in ("HIGH", "CRITICAL")
+            await db.commit()
+
+        resultado["pacientes"] += len(ids)
+        resultado["ultimo_id"] = ids[-1]
+        if ao_progredir:
+            ao_progredir(dict(resultado))
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, and_, or_
+from sqlalchemy import select, update, and_, or_, func
 from database.models import (
     PadraoComportamento,
     PredicaoEmergencia,
@@ -10,6 +10,7 @@ from database.models import (
 )
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict
+from utils.pagination import paginate_keyset, count_total
 import json
 
 class IAService:
@@ -31,10 +32,11 @@ class IAService:
         self, 
         idoso_id: int, 
         ativo: Optional[bool] = None,
-        offset: int = 0,
-        limit: int = 10
-    ) -> tuple[List, int]:
-        """Lista padrões de comportamento com paginação"""
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        with_total: bool = False
+    ) -> tuple[List, Optional[str], Optional[int], bool]:
+        """Lista padrões de comportamento com paginação por cursor (confiança, id)"""
         query = select(PadraoComportamento).where(
             PadraoComportamento.idoso_id == idoso_id
         )
@@ -42,19 +44,18 @@ class IAService:
         if ativo is not None:
             query = query.where(PadraoComportamento.ativo == ativo)
         
-        query = query.order_by(PadraoComportamento.confianca.desc())
+        total, total_is_estimate = None, False
+        if with_total:
+            total, total_is_estimate = await count_total(self.db, query)
         
-        # Contar total
-        from sqlalchemy import func
-        count_query = select(func.count()).select_from(query.subquery())
-        total = await self.db.scalar(count_query) or 0
-        
-        # Aplicar paginação
-        query = query.offset(offset).limit(limit)
-        result = await self.db.execute(query)
-        items = result.scalars().all()
+        items, next_cursor = await paginate_keyset(
+            self.db, query,
+            sort_columns=[PadraoComportamento.confianca, PadraoComportamento.id],
+            cursor=cursor,
+            limit=limit
+        )
         
-        return items, total
+        return items, next_cursor, total, total_is_estimate
     
     async def get_padrao_by_id(self, id: int):
         """Busca padrão por ID"""
@@ -77,45 +78,66 @@ class IAService:
         await self.db.commit()
         return True
     
+    async def contar_padroes_ativos(self, idoso_id: int) -> int:
+        """Contagem exata de padrões ativos (COUNT, sem estimativa)"""
+        return await self.db.scalar(
+            select(func.count()).select_from(PadraoComportamento).where(
+                PadraoComportamento.idoso_id == idoso_id,
+                PadraoComportamento.ativo == True
+            )
+        ) or 0
+    
     # ==================== PREDIÇÕES DE EMERGÊNCIA ====================
     
+    @staticmethod
+    def _predicao_ativa():
+        """Predições ativas: não expiradas e não confirmadas como falso positivo"""
+        return and_(
+            or_(
+                PredicaoEmergencia.validade_ate.is_(None),
+                PredicaoEmergencia.validade_ate > datetime.utcnow()
+            ),
+            PredicaoEmergencia.falso_positivo == False
+        )
+    
     async def get_predicoes(
         self, 
         idoso_id: int, 
         ativas: Optional[bool] = None,
-        offset: int = 0,
-        limit: int = 10
-    ) -> tuple[List, int]:
-        """Lista predições de emergência com paginação"""
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        with_total: bool = False
+    ) -> tuple[List, Optional[str], Optional[int], bool]:
+        """Lista predições de emergência com paginação por cursor (probabilidade, id)"""
         query = select(PredicaoEmergencia).where(
             PredicaoEmergencia.idoso_id == idoso_id
         )
         
         if ativas:
-            # Predições ativas: não expiradas e não confirmadas como falso positivo
-            query = query.where(
-                and_(
-                    or_(
-                        PredicaoEmergencia.validade_ate.is_(None),
-                        PredicaoEmergencia.validade_ate > datetime.utcnow()
-                    ),
-                    PredicaoEmergencia.falso_positivo == False
-                )
-            )
-        
-        query = query.order_by(PredicaoEmergencia.probabilidade.desc())
+            query = query.where(self._predicao_ativa())
         
-        # Contar total
-        from sqlalchemy import func
-        count_query = select(func.count()).select_from(query.subquery())
-        total = await self.db.scalar(count_query) or 0
+        total, total_is_estimate = None, False
+        if with_total:
+            total, total_is_estimate = await count_total(self.db, query)
         
-        # Aplicar paginação
-        query = query.offset(offset).limit(limit)
-        result = await self.db.execute(query)
-        items = result.scalars().all()
+        items, next_cursor = await paginate_keyset(
+            self.db, query,
+            sort_columns=[PredicaoEmergencia.probabilidade, PredicaoEmergencia.id],
+            cursor=cursor,
+            limit=limit
+        )
         
-        return items, total
+        return items, next_cursor, total, total_is_estimate
+    
+    async def contar_predicoes_ativas(self, idoso_id: int) -> Dict[str, int]:
+        """Contagem exata de predições ativas e das de alto risco, numa consulta"""
+        row = (await self.db.execute(
+            select(
+                func.count(),
+                func.count().filter(PredicaoEmergencia.nivel_risco.in_(["alto", "critico"]))
+            ).where(PredicaoEmergencia.idoso_id == idoso_id, self._predicao_ativa())
+        )).one()
+        return {"ativas": row[0], "alto_risco": row[1]}
     
     async def get_predicao_by_id(self, id: int):
         """Busca predição por ID"""
@@ -193,20 +215,36 @@ class IAService:
             }
         }
     
-    async def get_historico_emocoes(self, idoso_id: int, dias: int = 30) -> List:
-        """Retorna histórico de emoções das chamadas"""
+    async def get_historico_emocoes(
+        self,
+        idoso_id: int,
+        dias: int = 30,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> tuple[List, Optional[str]]:
+        """Retorna histórico de emoções das chamadas, paginado por cursor (início, id)"""
         data_limite = datetime.utcnow() - timedelta(days=dias)
         
-        query = select(HistoricoLigacao).where(
+        query = select(
+            HistoricoLigacao.id,
+            HistoricoLigacao.inicio_chamada,
+            HistoricoLigacao.transcricao_resumo,
+            HistoricoLigacao.sentimento_geral
+        ).where(
             and_(
                 HistoricoLigacao.idoso_id == idoso_id,
                 HistoricoLigacao.inicio_chamada >= data_limite,
                 HistoricoLigacao.sentimento_geral.isnot(None)
             )
-        ).order_by(HistoricoLigacao.inicio_chamada.desc())
+        )
         
-        result = await self.db.execute(query)
-        chamadas = result.scalars().all()
+        chamadas, next_cursor = await paginate_keyset(
+            self.db, query,
+            sort_columns=[HistoricoLigacao.inicio_chamada, HistoricoLigacao.id],
+            cursor=cursor,
+            limit=limit,
+            scalars=False
+        )
         
         # Converter para formato de emoção
         emocoes = []
@@ -223,7 +261,7 @@ class IAService:
                 "sentimento_original": chamada.sentimento_geral
             })
         
-        return emocoes
+        return emocoes, next_cursor
     
     def calcular_emocao_predominante(self, emocoes: List) -> str:
         """Calcula emoção predominante em uma lista"""
@@ -263,7 +301,7 @@ class IAService:
         insights = []
         
         # Buscar padrões ativos
-        padroes = await self.get_padroes(idoso_id, ativo=True)
+        padroes, _, _, _ = await self.get_padroes(idoso_id, ativo=True, limit=100)
         
         # Gerar insights baseados em padrões
         for padrao in padroes:
@@ -296,7 +334,7 @@ class IAService:
                 insights.append(insight)
         
         # Buscar predições de alto risco
-        predicoes = await self.get_predicoes(idoso_id, ativas=True)
+        predicoes, _, _, _ = await self.get_predicoes(idoso_id, ativas=True, limit=100)
         for predicao in predicoes:
             if predicao.nivel_risco in ["alto", "critico"]:
                 insight = PsicologiaInsight(
@@ -0,0 +1,379 @@
+"""
+Ingestão em lote das séries de saúde (sync offline dos wearables)
+
+Caminho rápido para /saude/*/bulk:
+- valida registro a registro (erros por índice, sem derrubar o lote)
+- deduplica por (cliente_id, timestamp_coleta) dentro do lote e contra o banco
+  (ON CONFLICT DO NOTHING sobre o índice único da migration 007)
+- lotes pequenos: INSERT multi-row ... RETURNING id, fatiado pelo limite de
+  parâmetros do driver
+- lotes grandes no PostgreSQL: COPY (asyncpg.copy_records_to_table) para uma
+  tabela temporária e um único INSERT ... SELECT ... ON CONFLICT DO NOTHING
+- atualiza o rollup diário (rollup_saude) na mesma transação
+- um único commit por requisição
+
+ingerir_ndjson() faz o mesmo a partir de um corpo NDJSON (opcionalmente
+gzip) lido em streaming: descompacta e parseia incrementalmente e grava a
+cada BULK_STREAM_LOTE registros, com memória constante. O gzip é aberto em
+fatias de no máximo BULK_STREAM_PEDACO bytes e o total descompactado para em
+BULK_STREAM_MAX_DESCOMPACTADO (gzip bomb: 413).
+"""
+import json
+import logging
+import os
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+BULK_MAX_REGISTROS = int(os.getenv("BULK_MAX_REGISTROS", "10000"))
+# A partir deste tamanho (e em PostgreSQL) usa COPY em vez de INSERT multi-row
+BULK_COPY_LIMIAR = int(os.getenv("BULK_COPY_LIMIAR", "2000"))
+# asyncpg/PostgreSQL aceitam no máximo 32767 parâmetros por statement
+_MAX_PARAMETROS = 32767
+
+CHAVE_DEDUPE = ("cliente_id", "timestamp_coleta")
+
+# Streaming NDJSON
+BULK_STREAM_LOTE = int(os.getenv("BULK_STREAM_LOTE", "5000"))
+BULK_STREAM_MAX_LINHA = 64 * 1024
+# Saída máxima de cada chamada ao descompressor e total descompactado por upload
+BULK_STREAM_PEDACO = 256 * 1024
+BULK_STREAM_MAX_DESCOMPACTADO = int(os.getenv("BULK_STREAM_MAX_DESCOMPACTADO", str(1024 ** 3)))
+# Limite de erros detalhados no resumo (os contadores continuam exatos)
+BULK_STREAM_MAX_ERROS = 1000
+
+
+@dataclass
+class ResultadoBulk:
+    recebidos: int = 0
+    inseridos: int = 0
+    duplicados: int = 0
+    invalidos: int = 0
+    ids: List[int] = field(default_factory=list)
+    erros: List[Dict[str, Any]] = field(default_factory=list)
+    metodo: str = "insert"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "recebidos": self.recebidos,
+            "inseridos": self.inseridos,
+            "duplicados": self.duplicados,
+            "invalidos": self.invalidos,
+            "ids": self.ids,
+            "erros": self.erros,
+            "metodo": self.metodo,
+        }
+
+
+def validar_registros(
+    schema: Type[BaseModel],
+    registros: Sequence[Any],
+    chave: Tuple[str, ...] = CHAVE_DEDUPE
+) -> Tuple[List[Dict[str, Any]], ResultadoBulk]:
+    """
+    Valida cada registro isoladamente e remove duplicatas internas do lote
+    (mantém a primeira ocorrência da chave).
+    """
+    resultado = ResultadoBulk(recebidos=len(registros))
+    validos: List[Dict[str, Any]] = []
+    vistos = set()
+    agora = datetime.utcnow()
+
+    for indice, bruto in enumerate(registros):
+        try:
+            item = bruto if isinstance(bruto, schema) else schema.model_validate(bruto)
+        except ValidationError as e:
+            resultado.invalidos += 1
+            resultado.erros.append({
+                "indice": indice,
+                "erros": [
+                    {"campo": ".".join(str(p) for p in err["loc"]), "mensagem": err["msg"]}
+                    for err in e.errors()
+                ],
+            })
+            continue
+
+        linha = item.model_dump()
+        valor_chave = tuple(linha[c] for c in chave)
+        if valor_chave in vistos:
+            resultado.duplicados += 1
+            continue
+        vistos.add(valor_chave)
+
+        linha["created_at"] = agora
+        validos.append(linha)
+
+    return validos, resultado
+
+
+def insert_do_dialeto(db: AsyncSession, modelo):
+    nome = db.get_bind().dialect.name
+    if nome == "sqlite":
+        return sqlite.insert(modelo), nome
+    return postgresql.insert(modelo), nome
+
+
+def upsert_indice_parcial(db, modelo, index_elements: Sequence[str], where_sql: str,
+                          colunas: Sequence[str], linhas: List[Dict[str, Any]],
+                          fixos: Optional[Dict[str, Any]] = None):
+    """
+    INSERT ... ON CONFLICT DO UPDATE sobre um índice único parcial.
+
+    where_sql é o predicado do índice como literal SQL: o PostgreSQL só infere
+    o índice parcial de um predicado constante. colunas vêm do EXCLUDED, fixos
+    são valores constantes. Devolve db.execute(...) (aguardar numa AsyncSession).
+    """
+    stmt, _ = insert_do_dialeto(db, modelo)
+    set_ = {c: getattr(stmt.excluded, c) for c in colunas}
+    set_.update(fixos or {})
+    return db.execute(stmt.on_conflict_do_update(
+        index_elements=list(index_elements),
+        index_where=text(where_sql),
+        set_=set_,
+    ), linhas)
+
+
+async def _inserir_multi_row(db: AsyncSession, modelo, linhas: List[Dict[str, Any]], chave) -> List[Dict[str, Any]]:
+    stmt_base, _ = insert_do_dialeto(db, modelo)
+    colunas = list(linhas[0].keys())
+    tamanho_fatia = max(1, _MAX_PARAMETROS // len(colunas))
+    inseridas: List[Dict[str, Any]] = []
+
+    for i in range(0, len(linhas), tamanho_fatia):
+        fatia = linhas[i:i + tamanho_fatia]
+        stmt = (
+            stmt_base.values(fatia)
+            .on_conflict_do_nothing(index_elements=list(chave))
+            .returning(*modelo.__table__.c)
+        )
+        result = await db.execute(stmt)
+        inseridas.extend(dict(r) for r in result.mappings())
+    return inseridas
+
+
+async def _inserir_via_copy(db: AsyncSession, modelo, linhas: List[Dict[str, Any]], chave) -> List[Dict[str, Any]]:
+    """COPY para tabela temporária + INSERT ... SELECT com dedupe (somente asyncpg)"""
+    tabela = modelo.__table__.name
+    colunas = list(linhas[0].keys())
+    staging = f"_bulk_{tabela}"
+
+    lista_colunas = ", ".join(colunas)
+
+    # Executado pela sessão para abrir a transação antes do COPY no driver:
+    # a temp table vive até o commit da requisição
+    await db.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {tabela} INCLUDING DEFAULTS) ON COMMIT DROP"
+    ))
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        staging,
+        records=[tuple(linha[c] for c in colunas) for linha in linhas],
+        columns=colunas,
+    )
+    result = await db.execute(text(
+        f"INSERT INTO {tabela} ({lista_colunas}) "
+        f"SELECT {lista_colunas} FROM {staging} "
+        f"ON CONFLICT ({', '.join(chave)}) DO NOTHING RETURNING *"
+    ))
+    inseridas = [dict(r) for r in result.mappings()]
+    await db.execute(text(f"TRUNCATE {staging}"))
+    return inseridas
+
+
+async def inserir_em_lote(
+    db: AsyncSession,
+    modelo,
+    schema: Type[BaseModel],
+    registros: Sequence[Any],
+    chave: Tuple[str, ...] = CHAVE_DEDUPE,
+    commit: bool = True
+) -> ResultadoBulk:
+    """
+    Valida, deduplica e insere `registros` em `modelo`.
+
+    Registros inválidos entram em `erros` com o índice original; duplicatas
+    (no lote ou já gravadas) entram em `duplicados`. Retorna os ids criados.
+    """
+    linhas, resultado = validar_registros(schema, registros, chave)
+    if not linhas:
+        return resultado
+
+    from database.rollup_saude import aplicar_rollup
+
+    _, dialeto = insert_do_dialeto(db, modelo)
+    if dialeto == "postgresql" and len(linhas) >= BULK_COPY_LIMIAR:
+        resultado.metodo = "copy"
+        inseridas = await _inserir_via_copy(db, modelo, linhas, chave)
+    else:
+        inseridas = await _inserir_multi_row(db, modelo, linhas, chave)
+
+    # Só o que foi de fato gravado (sem duplicatas) entra no rollup diário
+    await aplicar_rollup(db, modelo, inseridas)
+
+    if commit:
+        await db.commit()
+
+    resultado.ids = [r["id"] for r in inseridas]
+    resultado.inseridos = len(inseridas)
+    resultado.duplicados += len(linhas) - len(inseridas)
+
+    logger.info(
+        f"Bulk {modelo.__tablename__}: {resultado.inseridos} inseridos, "
+        f"{resultado.duplicados} duplicados, {resultado.invalidos} inválidos ({resultado.metodo})"
+    )
+    return resultado
+
+
+class CorpoInvalido(ValueError):
+    """Corpo do upload ilegível (gzip corrompido, linha acima do limite)"""
+
+
+class CorpoGrandeDemais(CorpoInvalido):
+    """gzip que descompacta além de BULK_STREAM_MAX_DESCOMPACTADO"""
+
+
+async def iterar_ndjson(
+    corpo: AsyncIterator[bytes],
+    gzip: bool = False,
+    max_linha: int = BULK_STREAM_MAX_LINHA,
+    max_descompactado: Optional[int] = None
+) -> AsyncIterator[Tuple[int, Optional[Any], Optional[str]]]:
+    """
+    Lê NDJSON em streaming. Produz (indice, objeto, erro) por linha não
+    vazia; linhas com JSON inválido vêm com objeto None e a mensagem.
+    Só o pedaço corrente e a linha incompleta ficam em memória.
+    """
+    descompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzip else None
+    pendente = b""
+    indice = 0
+    descompactados = 0
+    max_descompactado = max_descompactado or BULK_STREAM_MAX_DESCOMPACTADO
+
+    def _descompactar(dados: bytes):
+        # Nunca mais que BULK_STREAM_PEDACO por chamada: o resto da entrada
+        # fica em unconsumed_tail até a fatia anterior ser consumida
+        nonlocal descompactados
+        while True:
+            try:
+                saida = descompressor.decompress(dados, BULK_STREAM_PEDACO)
+            except zlib.error as e:
+                raise CorpoInvalido(f"gzip inválido: {e}")
+            descompactados += len(saida)
+            if descompactados > max_descompactado:
+                raise CorpoGrandeDemais(f"Corpo descompactado excede {max_descompactado} bytes")
+            yield saida
+            dados = descompressor.unconsumed_tail
+            if not dados and len(saida) < BULK_STREAM_PEDACO:
+                return
+
+    def _linhas(dados: bytes):
+        nonlocal pendente
+        pendente += dados
+        *completas, pendente = pendente.split(b"\n")
+        if len(pendente) > max_linha:
+            raise CorpoInvalido(f"Linha {indice + len(completas)} excede {max_linha} bytes")
+        return completas
+
+    def _parse(linha: bytes):
+        try:
+            return json.loads(linha), None
+        except ValueError as e:
+            return None, f"JSON inválido: {e}"
+
+    async for pedaco in corpo:
+        for dados in (_descompactar(pedaco) if descompressor is not None else (pedaco,)):
+            for linha in _linhas(dados):
+                if linha.strip():
+                    yield (indice, *_parse(linha))
+                    indice += 1
+
+    if descompressor is not None:
+        pendente += descompressor.flush()
+        if not descompressor.eof:
+            raise CorpoInvalido("gzip truncado")
+    for linha in pendente.split(b"\n"):
+        if linha.strip():
+            yield (indice, *_parse(linha))
+            indice += 1
+
+
+async def ingerir_ndjson(
+    db: AsyncSession,
+    modelo,
+    schema: Type[BaseModel],
+    corpo: AsyncIterator[bytes],
+    gzip: bool = False,
+    tamanho_lote: int = BULK_STREAM_LOTE
+) -> Dict[str, Any]:
+    """
+    Ingestão em streaming: cada lote de `tamanho_lote` linhas válidas é
+    gravado e commitado antes de ler o próximo. Retorna o resumo por lote
+    e o total (sem a lista de ids, para não crescer com o upload).
+    """
+    total = ResultadoBulk()
+    lotes: List[Dict[str, Any]] = []
+    registros: List[Any] = []
+    indices: List[int] = []
+
+    def _registrar_erro(erro: Dict[str, Any]):
+        if len(total.erros) < BULK_STREAM_MAX_ERROS:
+            total.erros.append(erro)
+
+    async def _gravar():
+        resultado = await inserir_em_lote(db, modelo, schema, registros)
+        for erro in resultado.erros:
+            _registrar_erro({**erro, "indice": indices[erro["indice"]]})
+        total.recebidos += resultado.recebidos
+        total.inseridos += resultado.inseridos
+        total.duplicados += resultado.duplicados
+        total.invalidos += resultado.invalidos
+        lotes.append({
+            "lote": len(lotes),
+            "linha_inicial": indices[0],
+            "linha_final": indices[-1],
+            "inseridos": resultado.inseridos,
+            "duplicados": resultado.duplicados,
+            "invalidos": resultado.invalidos,
+            "metodo": resultado.metodo,
+        })
+        registros.clear()
+        indices.clear()
+
+    erro_corpo, excedeu_limite = None, False
+    try:
+        async for indice, objeto, erro in iterar_ndjson(corpo, gzip):
+            if erro is not None:
+                total.recebidos += 1
+                total.invalidos += 1
+                _registrar_erro({"indice": indice, "erros": [{"campo": "", "mensagem": erro}]})
+                continue
+            registros.append(objeto)
+            indices.append(indice)
+            if len(registros) >= tamanho_lote:
+                await _gravar()
+    except CorpoInvalido as e:
+        # Lotes anteriores já foram commitados: o resumo diz até onde foi
+        erro_corpo = str(e)
+        excedeu_limite = isinstance(e, CorpoGrandeDemais)
+        registros.clear()
+
+    if registros:
+        await _gravar()
+
+    resumo = total.to_dict()
+    resumo["erro_corpo"] = erro_corpo
+    resumo["corpo_excedeu_limite"] = excedeu_limite
+    resumo.pop("ids")
+    resumo.pop("metodo")
+    resumo["erros_truncados"] = total.invalidos > len(total.erros)
+    resumo["lotes"] = lotes
+    return resumo
@@ -0,0 +1,96 @@
+-- =====================================================
+-- EVA-back: Índices das Consultas Frequentes Migration
+-- Descrição: Índices compostos e parciais alinhados aos
+--            predicados usados pelos repositórios e rotas
+-- =====================================================
+--
+-- IMPORTANTE: CREATE INDEX CONCURRENTLY não pode rodar dentro de
+-- transação. Execute com autocommit, por exemplo:
+--     psql "$DATABASE_URL" -f database/migrations/005_indices_consultas_frequentes.sql
+-- Se um índice falhar no meio do build ele fica INVALID; remova com
+-- DROP INDEX CONCURRENTLY e rode o arquivo novamente.
+--
+-- Os mesmos índices estão declarados em database/models.py.
+
+-- 1. Agendamentos
+-- Scheduler: status IN ('agendado','aguardando_retry') AND data_hora_agendada <= now()
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_agendamentos_pendentes
+    ON agendamentos (data_hora_agendada)
+    WHERE status IN ('agendado', 'aguardando_retry');
+
+-- Filtros administrativos por status + janela de datas
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_agendamentos_status_data
+    ON agendamentos (status, data_hora_agendada);
+
+-- Agenda do idoso (ORDER BY data_hora_agendada DESC)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_agendamentos_idoso_data
+    ON agendamentos (idoso_id, data_hora_agendada DESC);
+
+-- 2. Histórico de ligações
+-- Chamadas por idoso e paginação keyset (inicio_chamada, id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_historico_ligacoes_idoso_inicio
+    ON historico_ligacoes (idoso_id, inicio_chamada DESC, id DESC);
+
+-- Listagem geral paginada por (criado_em, id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_historico_ligacoes_criado_id
+    ON historico_ligacoes (criado_em DESC, id DESC);
+
+-- 3. Alertas
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_alertas_idoso_criado
+    ON alertas (idoso_id, criado_em DESC);
+
+-- Painel de alertas em aberto (fração pequena da tabela)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_alertas_nao_resolvidos
+    ON alertas (idoso_id, criado_em DESC)
+    WHERE resolvido = false;
+
+-- 4. Medicamentos e cuidadores (somente registros ativos)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_medicamentos_idoso_ativos
+    ON medicamentos (idoso_id, nome)
+    WHERE ativo = true;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_cuidadores_idoso_ativos
+    ON cuidadores (idoso_id, prioridade, id)
+    WHERE ativo = true;
+
+-- 5. Dados de wearables (cliente_id + janela de coleta)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sinais_vitais_health_cliente_coleta
+    ON sinais_vitais_health (cliente_id, timestamp_coleta DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_atividade_cliente_coleta
+    ON atividade (cliente_id, timestamp_coleta DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sono_cliente_inicio
+    ON sono (cliente_id, timestamp_inicio DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_medicao_corporal_cliente_coleta
+    ON medicao_corporal (cliente_id, timestamp_coleta DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_nutricao_cliente_coleta
+    ON nutricao (cliente_id, timestamp_coleta DESC);
+
+-- 6. Saúde mental
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_mood_diary_patient_date
+    ON mood_diary (patient_id, date DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_mh_assessments_patient_scale_data
+    ON mental_health_assessments (patient_id, scale_type, assessed_at DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_crisis_events_patient_occurred
+    ON crisis_events (patient_id, occurred_at DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_nlp_analysis_patient_analyzed
+    ON nlp_conversation_analysis (patient_id, analyzed_at);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ml_predictions_patient_tipo_data
+    ON ml_predictions (patient_id, prediction_type, predicted_at DESC);
+
+-- 7. Estatísticas atualizadas para o planner
+ANALYZE agendamentos;
+ANALYZE historico_ligacoes;
+ANALYZE alertas;
+ANALYZE medicamentos;
+ANALYZE cuidadores;
+ANALYZE sinais_vitais_health;
+ANALYZE mood_diary;
+ANALYZE mental_health_assessments;
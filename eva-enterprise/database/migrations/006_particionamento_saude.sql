@@ -0,0 +1,166 @@
+-- =====================================================
+-- EVA-back: Particionamento Mensal das Séries de Saúde Migration
+-- Descrição: Converte atividade, sinais_vitais_health, sono,
+--            nutricao e medicao_corporal em tabelas
+--            particionadas por mês (RANGE) + funções de
+--            manutenção (criar futuras / arquivar antigas)
+-- =====================================================
+--
+-- Requer PostgreSQL 13+. Rodar em janela de manutenção e com backup:
+-- cada tabela é renomeada para <tabela>_legado, recriada como
+-- particionada, recebe os dados e a tabela legado é removida.
+--
+-- Partições: <tabela>_pYYYYMM  [1º dia do mês, 1º dia do mês seguinte)
+-- Registros fora das partições existentes caem em <tabela>_default;
+-- eva_criar_particoes_mensais() os move ao criar o mês correspondente.
+-- Partições antigas são destacadas e movidas para o schema "arquivo".
+--
+-- A manutenção periódica é feita pela task Celery
+-- tasks.scheduled_tasks.manter_particoes_saude.
+
+CREATE SCHEMA IF NOT EXISTS arquivo;
+
+-- 1. Cria (se faltar) a partição de um mês, realocando linhas do default
+CREATE OR REPLACE FUNCTION eva_criar_particao_mes(p_tabela TEXT, p_coluna TEXT, p_mes DATE)
+RETURNS TEXT AS $$
+DECLARE
+    v_inicio DATE := date_trunc('month', p_mes)::date;
+    v_fim DATE := (date_trunc('month', p_mes) + INTERVAL '1 month')::date;
+    v_particao TEXT := p_tabela || '_p' || to_char(v_inicio, 'YYYYMM');
+    v_default TEXT := p_tabela || '_default';
+    v_pendentes BIGINT := 0;
+BEGIN
+    IF to_regclass(v_particao) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+
+    IF to_regclass(v_default) IS NOT NULL THEN
+        EXECUTE format('SELECT count(*) FROM %I WHERE %I >= %L AND %I < %L',
+                       v_default, p_coluna, v_inicio, p_coluna, v_fim)
+            INTO v_pendentes;
+    END IF;
+
+    IF v_pendentes > 0 THEN
+        EXECUTE format('CREATE TEMP TABLE _eva_mover (LIKE %I) ON COMMIT DROP', v_default);
+        EXECUTE format('INSERT INTO _eva_mover SELECT * FROM %I WHERE %I >= %L AND %I < %L',
+                       v_default, p_coluna, v_inicio, p_coluna, v_fim);
+        EXECUTE format('DELETE FROM %I WHERE %I >= %L AND %I < %L',
+                       v_default, p_coluna, v_inicio, p_coluna, v_fim);
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                   v_particao, p_tabela, v_inicio, v_fim);
+
+    IF v_pendentes > 0 THEN
+        EXECUTE format('INSERT INTO %I SELECT * FROM _eva_mover', p_tabela);
+        DROP TABLE _eva_mover;
+    END IF;
+
+    RETURN v_particao;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 2. Garante partições do mês corrente até p_meses_a_frente
+CREATE OR REPLACE FUNCTION eva_criar_particoes_mensais(p_tabela TEXT, p_coluna TEXT, p_meses_a_frente INTEGER DEFAULT 3)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    v_mes DATE;
+    v_criada TEXT;
+BEGIN
+    FOR v_mes IN
+        SELECT generate_series(date_trunc('month', now()),
+                               date_trunc('month', now()) + make_interval(months => p_meses_a_frente),
+                               INTERVAL '1 month')::date
+    LOOP
+        v_criada := eva_criar_particao_mes(p_tabela, p_coluna, v_mes);
+        IF v_criada IS NOT NULL THEN
+            RETURN NEXT v_criada;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 3. Destaca partições mais antigas que a retenção e move para "arquivo"
+CREATE OR REPLACE FUNCTION eva_arquivar_particoes(p_tabela TEXT, p_retencao_meses INTEGER)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    v_limite DATE := (date_trunc('month', now()) - make_interval(months => p_retencao_meses))::date;
+    v_particao TEXT;
+BEGIN
+    FOR v_particao IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = p_tabela
+          AND c.relname ~ ('^' || p_tabela || '_p[0-9]{6}$')
+          AND to_date(right(c.relname, 6), 'YYYYMM') < v_limite
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', p_tabela, v_particao);
+        EXECUTE format('ALTER TABLE %I SET SCHEMA arquivo', v_particao);
+        RETURN NEXT v_particao;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 4. Conversão de uma tabela existente em particionada
+CREATE OR REPLACE FUNCTION eva_particionar_tabela(p_tabela TEXT, p_coluna TEXT, p_indice TEXT)
+RETURNS VOID AS $$
+DECLARE
+    v_legado TEXT := p_tabela || '_legado';
+    v_sequencia TEXT;
+    v_primeiro DATE;
+    v_mes DATE;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid
+               WHERE c.relname = p_tabela) THEN
+        RAISE NOTICE '% já é particionada', p_tabela;
+        RETURN;
+    END IF;
+
+    v_sequencia := pg_get_serial_sequence(p_tabela, 'id');
+
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', p_tabela, v_legado);
+    EXECUTE format('DROP INDEX IF EXISTS %I', p_indice);
+
+    EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (%I)',
+                   p_tabela, v_legado, p_coluna);
+    EXECUTE format('ALTER TABLE %I ALTER COLUMN %I SET NOT NULL', p_tabela, p_coluna);
+    EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (id, %I)', p_tabela, p_coluna);
+    EXECUTE format('ALTER TABLE %I ADD FOREIGN KEY (cliente_id) REFERENCES usuarios(id) ON DELETE CASCADE', p_tabela);
+    EXECUTE format('CREATE INDEX %I ON %I (cliente_id, %I DESC)', p_indice, p_tabela, p_coluna);
+
+    IF v_sequencia IS NOT NULL THEN
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.id', v_sequencia, p_tabela);
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', p_tabela || '_default', p_tabela);
+
+    EXECUTE format('SELECT date_trunc(''month'', min(%I))::date FROM %I', p_coluna, v_legado) INTO v_primeiro;
+    FOR v_mes IN
+        SELECT generate_series(COALESCE(v_primeiro, date_trunc('month', now())::date),
+                               date_trunc('month', now()), INTERVAL '1 month')::date
+    LOOP
+        PERFORM eva_criar_particao_mes(p_tabela, p_coluna, v_mes);
+    END LOOP;
+    PERFORM eva_criar_particoes_mensais(p_tabela, p_coluna, 3);
+
+    EXECUTE format('INSERT INTO %I SELECT * FROM %I', p_tabela, v_legado);
+    EXECUTE format('DROP TABLE %I', v_legado);
+    EXECUTE format('ANALYZE %I', p_tabela);
+END;
+$$ LANGUAGE plpgsql;
+
+-- 5. Conversão
+-- sono não tem timestamp_coleta: particiona por timestamp_inicio.
+-- Sessões sem início registrado assumem created_at (chave de partição é NOT NULL).
+UPDATE sono SET timestamp_inicio = created_at WHERE timestamp_inicio IS NULL;
+
+BEGIN;
+SELECT eva_particionar_tabela('atividade', 'timestamp_coleta', 'ix_atividade_cliente_coleta');
+SELECT eva_particionar_tabela('sinais_vitais_health', 'timestamp_coleta', 'ix_sinais_vitais_health_cliente_coleta');
+SELECT eva_particionar_tabela('sono', 'timestamp_inicio', 'ix_sono_cliente_inicio');
+SELECT eva_particionar_tabela('nutricao', 'timestamp_coleta', 'ix_nutricao_cliente_coleta');
+SELECT eva_particionar_tabela('medicao_corporal', 'timestamp_coleta', 'ix_medicao_corporal_cliente_coleta');
+COMMIT;
@@ -0,0 +1,39 @@
+-- =====================================================
+-- EVA-back: Dedupe da Ingestão de Saúde Migration
+-- Descrição: Índices únicos (cliente_id, timestamp_coleta) em
+--            atividade e sinais_vitais_health para a ingestão
+--            idempotente (INSERT ... ON CONFLICT DO NOTHING)
+-- =====================================================
+--
+-- Rodar depois da 006. Em tabela particionada o índice único precisa
+-- conter a chave de partição (timestamp_coleta) e não pode ser criado
+-- CONCURRENTLY no pai; o CREATE INDEX propaga para cada partição.
+-- Os índices não-únicos da 005 ficam redundantes e são removidos.
+
+BEGIN;
+
+-- 1. Remove duplicatas existentes (mantém o menor id)
+DELETE FROM atividade a
+USING atividade b
+WHERE a.cliente_id = b.cliente_id
+  AND a.timestamp_coleta = b.timestamp_coleta
+  AND a.id > b.id;
+
+DELETE FROM sinais_vitais_health a
+USING sinais_vitais_health b
+WHERE a.cliente_id = b.cliente_id
+  AND a.timestamp_coleta = b.timestamp_coleta
+  AND a.id > b.id;
+
+-- 2. Índices únicos
+CREATE UNIQUE INDEX IF NOT EXISTS ux_atividade_cliente_coleta
+    ON atividade (cliente_id, timestamp_coleta);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_sinais_vitais_health_cliente_coleta
+    ON sinais_vitais_health (cliente_id, timestamp_coleta);
+
+-- 3. Índices substituídos
+DROP INDEX IF EXISTS ix_atividade_cliente_coleta;
+DROP INDEX IF EXISTS ix_sinais_vitais_health_cliente_coleta;
+
+COMMIT;
@@ -0,0 +1,29 @@
+-- =====================================================
+-- EVA-back: Rollup Diário de Saúde Migration
+-- Descrição: Tabela health_daily_rollup (cliente_id, data) que
+--            sustenta o /dashboard/resumo-diario
+-- =====================================================
+--
+-- Mantida por upsert incremental na ingestão (database/rollup_saude.py).
+-- Depois de aplicar, popular o histórico com:
+--     python scripts/backfill_rollup_saude.py
+
+CREATE TABLE IF NOT EXISTS health_daily_rollup (
+    cliente_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+    data DATE NOT NULL,
+    passos INTEGER NOT NULL DEFAULT 0,
+    total_atividades INTEGER NOT NULL DEFAULT 0,
+    calorias_consumidas INTEGER NOT NULL DEFAULT 0,
+    agua_ml INTEGER NOT NULL DEFAULT 0,
+    ultimo_sinal_em TIMESTAMP,
+    ultimo_bpm INTEGER,
+    ultima_pressao_sistolica INTEGER,
+    ultima_pressao_diastolica INTEGER,
+    sono_inicio TIMESTAMP,
+    sono_minutos INTEGER,
+    atualizado_em TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (cliente_id, data)
+);
+
+-- Linhas pequenas e muito atualizadas: espaço livre para HOT updates
+ALTER TABLE health_daily_rollup SET (fillfactor = 80);
@@ -0,0 +1,22 @@
+-- =====================================================
+-- EVA-back: Relatório Mensal Consolidado Migration
+-- Descrição: Tabela health_monthly_rollup com o relatório de
+--            meses fechados (/relatorios/mensal)
+-- =====================================================
+--
+-- Preenchida pela task tasks.scheduled_tasks.consolidar_relatorios_mensais.
+-- Meses sem linha aqui são calculados na hora (consulta única por CTE).
+
+CREATE TABLE IF NOT EXISTS health_monthly_rollup (
+    cliente_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+    ano INTEGER NOT NULL,
+    mes INTEGER NOT NULL CHECK (mes BETWEEN 1 AND 12),
+    total_passos INTEGER NOT NULL DEFAULT 0,
+    total_atividades INTEGER NOT NULL DEFAULT 0,
+    media_bpm NUMERIC(6, 2),
+    media_minutos_sono NUMERIC(8, 2),
+    peso_inicial NUMERIC(5, 2),
+    peso_final NUMERIC(5, 2),
+    calculado_em TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (cliente_id, ano, mes)
+);
@@ -0,0 +1,81 @@
+-- =====================================================
+-- EVA-back: Sync Delta dos Apps Migration
+-- Descrição: atualizado_em confiável em idosos, medicamentos,
+--            cuidadores e alertas + tombstones de DELETE
+--            para o endpoint /sync (token de mudanças)
+-- =====================================================
+--
+-- O token do /sync guarda, por entidade, o último (atualizado_em, id)
+-- entregue. Para isso atualizado_em precisa mudar em TODO update, inclusive
+-- os feitos por SQL cru (o onupdate do ORM só cobre a sessão SQLAlchemy):
+-- o trigger só preenche quando o UPDATE não definiu a coluna.
+--
+-- Linhas apagadas fisicamente viram tombstones em sync_tombstones;
+-- a task tasks.scheduled_tasks.expurgar_tombstones_sync remove as antigas.
+
+-- 1. alertas ainda não tinha atualizado_em
+ALTER TABLE alertas ADD COLUMN IF NOT EXISTS atualizado_em TIMESTAMP;
+UPDATE alertas
+SET atualizado_em = GREATEST(criado_em, data_envio, data_visualizacao, data_resolucao)
+WHERE atualizado_em IS NULL;
+ALTER TABLE alertas ALTER COLUMN atualizado_em SET DEFAULT LOCALTIMESTAMP;
+
+UPDATE idosos SET atualizado_em = COALESCE(criado_em, LOCALTIMESTAMP) WHERE atualizado_em IS NULL;
+UPDATE medicamentos SET atualizado_em = COALESCE(criado_em, LOCALTIMESTAMP) WHERE atualizado_em IS NULL;
+UPDATE cuidadores SET atualizado_em = COALESCE(criado_em, LOCALTIMESTAMP) WHERE atualizado_em IS NULL;
+
+-- 2. Tombstones
+CREATE TABLE IF NOT EXISTS sync_tombstones (
+    id BIGSERIAL PRIMARY KEY,
+    entidade VARCHAR(30) NOT NULL,
+    registro_id INTEGER NOT NULL,
+    idoso_id INTEGER,
+    removido_em TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_sync_tombstones_removido ON sync_tombstones (removido_em, id);
+
+-- 3. Triggers
+CREATE OR REPLACE FUNCTION eva_tocar_atualizado_em()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.atualizado_em IS NOT DISTINCT FROM OLD.atualizado_em THEN
+        NEW.atualizado_em := LOCALTIMESTAMP;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION eva_registrar_tombstone()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- idosos não tem idoso_id: o próprio id define o escopo
+    IF TG_TABLE_NAME = 'idosos' THEN
+        INSERT INTO sync_tombstones (entidade, registro_id, idoso_id) VALUES (TG_TABLE_NAME, OLD.id, OLD.id);
+    ELSE
+        INSERT INTO sync_tombstones (entidade, registro_id, idoso_id) VALUES (TG_TABLE_NAME, OLD.id, OLD.idoso_id);
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    v_tabela TEXT;
+BEGIN
+    FOREACH v_tabela IN ARRAY ARRAY['idosos', 'medicamentos', 'cuidadores', 'alertas']
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_atualizado_em ON %I', v_tabela, v_tabela);
+        EXECUTE format('CREATE TRIGGER trg_%s_atualizado_em BEFORE UPDATE ON %I
+                        FOR EACH ROW EXECUTE FUNCTION eva_tocar_atualizado_em()', v_tabela, v_tabela);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_tombstone ON %I', v_tabela, v_tabela);
+        EXECUTE format('CREATE TRIGGER trg_%s_tombstone AFTER DELETE ON %I
+                        FOR EACH ROW EXECUTE FUNCTION eva_registrar_tombstone()', v_tabela, v_tabela);
+    END LOOP;
+END $$;
+
+-- 4. Índices do cursor (atualizado_em, id) por idoso
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_idosos_atualizado ON idosos (atualizado_em, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_medicamentos_idoso_atualizado ON medicamentos (idoso_id, atualizado_em, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_cuidadores_idoso_atualizado ON cuidadores (idoso_id, atualizado_em, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_alertas_idoso_atualizado ON alertas (idoso_id, atualizado_em, id);
@@ -0,0 +1,18 @@
+-- =====================================================
+-- EVA-back: Análise NLP das Transcrições Migration
+-- Descrição: liga nlp_conversation_analysis à ligação analisada
+--            (historico_ligacoes) para o backfill em lote
+-- =====================================================
+--
+-- Uma análise por ligação: o índice único deixa o backfill idempotente
+-- (INSERT ... ON CONFLICT DO NOTHING). Análises de mensagens avulsas
+-- ficam com historico_ligacao_id NULL, que não conflita.
+-- Depois de aplicar, analisar o histórico com:
+--     python scripts/backfill_nlp_transcricoes.py
+
+ALTER TABLE nlp_conversation_analysis
+    ADD COLUMN IF NOT EXISTS historico_ligacao_id INTEGER
+    REFERENCES historico_ligacoes(id) ON DELETE CASCADE;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_nlp_analysis_historico_ligacao
+    ON nlp_conversation_analysis (historico_ligacao_id);
@@ -0,0 +1,19 @@
+-- =====================================================
+-- EVA-back: Resumo de Saúde Mental Migration
+-- Descrição: índice do plano de segurança ativo, a única parte do
+--            /mental-health/summary que ainda não tinha índice
+-- =====================================================
+--
+-- O resumo é uma única consulta (MentalHealthRepository._consulta_resumo);
+-- as demais partes já usam ix_mh_assessments_patient_scale_data,
+-- ix_mood_diary_patient_date, ix_crisis_events_patient_occurred e
+-- ix_nlp_analysis_patient_analyzed.
+--
+-- CREATE INDEX CONCURRENTLY não pode rodar dentro de transação:
+--     psql "$DATABASE_URL" -f database/migrations/012_resumo_saude_mental.sql
+--
+-- O mesmo índice está declarado em database/models.py.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_safety_plans_patient_ativo
+    ON safety_plans (patient_id)
+    WHERE active;
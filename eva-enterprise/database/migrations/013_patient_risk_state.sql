@@ -0,0 +1,52 @@
+-- =====================================================
+-- EVA-back: Estado de Risco por Paciente Migration
+-- Descrição: patient_risk_state, mantida na escrita de avaliações,
+--            crises, análises NLP e predições de ML
+-- =====================================================
+--
+-- Uma linha por paciente, atualizada na mesma transação de cada evento
+-- (database/estado_risco.py). O risco de um paciente vira um SELECT por PK
+-- e "quem está em risco agora" uma varredura de ix_patient_risk_state_nivel.
+-- risk_expires_at marca quando alguma parte do risco sai da janela; a task
+-- recalcular_riscos_vencidos regrava essas linhas.
+-- Depois de aplicar, preencher o estado a partir dos dados existentes com:
+--     python scripts/backfill_risco_pacientes.py
+--
+-- As mesmas tabela e índices estão declarados em database/models.py.
+
+CREATE TABLE IF NOT EXISTS patient_risk_state (
+    patient_id INTEGER PRIMARY KEY REFERENCES idosos(id) ON DELETE CASCADE,
+    phq9_score INTEGER,
+    phq9_severity VARCHAR(50),
+    phq9_at TIMESTAMP,
+    gad7_score INTEGER,
+    gad7_at TIMESTAMP,
+    cssrs_score INTEGER,
+    cssrs_severity VARCHAR(50),
+    cssrs_at TIMESTAMP,
+    ml_model_name VARCHAR(100),
+    ml_label VARCHAR(50),
+    ml_value NUMERIC(5, 4),
+    ml_confidence NUMERIC(5, 4),
+    ml_predicted_at TIMESTAMP,
+    ml_valid_until TIMESTAMP,
+    sentiment_ewma NUMERIC(6, 4),
+    sentiment_count INTEGER NOT NULL DEFAULT 0,
+    sentiment_at TIMESTAMP,
+    danger_flags JSONB,
+    danger_flag_at TIMESTAMP,
+    crisis_count INTEGER NOT NULL DEFAULT 0,
+    last_crisis_at TIMESTAMP,
+    last_suicide_attempt_at TIMESTAMP,
+    risk_level VARCHAR(20) NOT NULL DEFAULT 'LOW',
+    risk_reason VARCHAR(50),
+    risk_expires_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS ix_patient_risk_state_nivel
+    ON patient_risk_state (risk_level, updated_at DESC);
+
+CREATE INDEX IF NOT EXISTS ix_patient_risk_state_vencimento
+    ON patient_risk_state (risk_expires_at)
+    WHERE risk_expires_at IS NOT NULL;
@@ -0,0 +1,29 @@
+-- =====================================================
+-- EVA-back: Entregas do Protocolo de Emergência Migration
+-- Descrição: emergency_notifications, uma linha por entrega (contato,
+--            profissional, SMS) com status, tentativas e latência
+-- =====================================================
+--
+-- Preenchida em lote pelo AuditSink a partir de
+-- services/despacho_emergencia.py. triggered_at é o instante da detecção
+-- do risco: created_at - triggered_at da primeira entrega 'delivered' de um
+-- protocolo é o tempo até a primeira notificação (SLO).
+--
+-- A mesma tabela e índice estão declarados em database/models.py.
+
+CREATE TABLE IF NOT EXISTS emergency_notifications (
+    id SERIAL PRIMARY KEY,
+    patient_id INTEGER NOT NULL REFERENCES idosos(id) ON DELETE CASCADE,
+    crisis_event_id INTEGER REFERENCES crisis_events(id) ON DELETE SET NULL,
+    channel VARCHAR(30) NOT NULL,
+    recipient VARCHAR(200),
+    status VARCHAR(20) NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    latency_ms INTEGER,
+    error TEXT,
+    triggered_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS ix_emergency_notifications_patient_criado
+    ON emergency_notifications (patient_id, created_at DESC);
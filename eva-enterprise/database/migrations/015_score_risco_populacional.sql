@@ -0,0 +1,16 @@
+-- =====================================================
+-- EVA-back: Score de Risco Populacional Migration
+-- Descrição: índice único parcial em ml_predictions para o upsert do
+--            score em lote (model_name = 'risco_populacional')
+-- =====================================================
+--
+-- A task pontuar_risco_populacional (services/score_risco_lote.py) grava
+-- uma linha por paciente com INSERT ... ON CONFLICT DO UPDATE sobre este
+-- índice. As predições de outros modelos (POST /mental-health/ml-predictions)
+-- continuam com histórico: o índice só cobre o modelo em lote.
+--
+-- O mesmo índice está declarado em database/models.py.
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_ml_predictions_score_populacional
+    ON ml_predictions (patient_id, model_name, prediction_type)
+    WHERE model_name = 'risco_populacional';
@@ -0,0 +1,26 @@
+-- =====================================================
+-- EVA-back: Mineração de Padrões de Comportamento Migration
+-- Descrição: origem em padroes_comportamento, índice único parcial para o
+--            upsert da mineração em lote e índice de agendamentos alterados
+-- =====================================================
+--
+-- services/mineracao_padroes.py grava um padrão por (idoso_id, tipo_padrao)
+-- com origem = 'mineracao', via INSERT ... ON CONFLICT DO UPDATE sobre
+-- ux_padroes_comportamento_mineracao. Linhas de outras origens (worker Go)
+-- ficam com origem NULL e fora do índice.
+-- A execução incremental procura agendamentos com atualizado_em depois da
+-- marca d'água (configuracoes_sistema, chave mineracao_padroes.marca).
+-- Depois de aplicar, minerar a base inteira com:
+--     python scripts/backfill_padroes_comportamento.py
+--
+-- A mesma coluna e índices estão declarados em database/models.py.
+
+ALTER TABLE padroes_comportamento
+    ADD COLUMN IF NOT EXISTS origem VARCHAR(30);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_padroes_comportamento_mineracao
+    ON padroes_comportamento (idoso_id, tipo_padrao)
+    WHERE origem = 'mineracao';
+
+CREATE INDEX IF NOT EXISTS ix_agendamentos_atualizado
+    ON agendamentos (atualizado_em);
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON, Date, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON, Date, Numeric, Index, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 import datetime
@@ -247,6 +247,21 @@ class Alerta(Base):
     data_resolucao = Column(DateTime)
     resolucao_nota = Column(Text)
     criado_em = Column(DateTime, default=datetime.datetime.now)
+    atualizado_em = Column(DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now)
+
+
+class SyncTombstone(Base):
+    """
+    Registros removidos fisicamente, para o /sync delta dos apps.
+    Gravado pelos triggers da migration 010 (DELETE em idosos, medicamentos,
+    cuidadores e alertas) e expurgado após SYNC_TOMBSTONE_RETENCAO_DIAS.
+    """
+    __tablename__ = "sync_tombstones"
+    id = Column(Integer, primary_key=True)
+    entidade = Column(String(30), nullable=False)
+    registro_id = Column(Integer, nullable=False)
+    idoso_id = Column(Integer)
+    removido_em = Column(DateTime, nullable=False, default=datetime.datetime.now)
 
 
 class ProtocoloAlerta(Base):
@@ -444,6 +459,8 @@ class PadraoComportamento(Base):
     ocorrencias = Column(Integer, default=1)
     dados_estatisticos = Column(JSONB)
     ativo = Column(Boolean, default=True)
+    # 'mineracao': gravado por services/mineracao_padroes.py (um por idoso e tipo)
+    origem = Column(String(30))
     criado_em = Column(DateTime, default=datetime.datetime.utcnow)
     atualizado_em = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
@@ -818,6 +835,51 @@ class CicloMenstrual(Base):
     usuario = relationship("Usuario", back_populates="ciclo_menstrual")
 
 
+class HealthDailyRollup(Base):
+    """
+    Agregado diário por cliente para o dashboard (resumo-diário).
+    Mantido por upsert incremental na ingestão (database/rollup_saude.py);
+    reconstruível a partir dos dados brutos pelo backfill.
+    """
+    __tablename__ = "health_daily_rollup"
+
+    cliente_id = Column(Integer, ForeignKey('usuarios.id', ondelete='CASCADE'), primary_key=True)
+    data = Column(Date, primary_key=True)
+    passos = Column(Integer, nullable=False, default=0)
+    total_atividades = Column(Integer, nullable=False, default=0)
+    calorias_consumidas = Column(Integer, nullable=False, default=0)
+    agua_ml = Column(Integer, nullable=False, default=0)
+    # Última leitura de sinais vitais do dia
+    ultimo_sinal_em = Column(DateTime)
+    ultimo_bpm = Column(Integer)
+    ultima_pressao_sistolica = Column(Integer)
+    ultima_pressao_diastolica = Column(Integer)
+    # Última sessão de sono iniciada no dia
+    sono_inicio = Column(DateTime)
+    sono_minutos = Column(Integer)
+    atualizado_em = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+
+class HealthMonthlyRollup(Base):
+    """
+    Relatório mensal consolidado de meses fechados (relatorios/mensal).
+    Preenchido pela task consolidar_relatorios_mensais; removido quando
+    chega dado atrasado do mês (sync offline) e recalculado na próxima rodada.
+    """
+    __tablename__ = "health_monthly_rollup"
+
+    cliente_id = Column(Integer, ForeignKey('usuarios.id', ondelete='CASCADE'), primary_key=True)
+    ano = Column(Integer, primary_key=True)
+    mes = Column(Integer, primary_key=True)
+    total_passos = Column(Integer, nullable=False, default=0)
+    total_atividades = Column(Integer, nullable=False, default=0)
+    media_bpm = Column(Numeric(6, 2))
+    media_minutos_sono = Column(Numeric(8, 2))
+    peso_inicial = Column(Numeric(5, 2))
+    peso_final = Column(Numeric(5, 2))
+    calculado_em = Column(DateTime, default=datetime.datetime.utcnow)
+
+
 # =====================================================================
 # MODELOS DE SAÚDE MENTAL
 # =====================================================================
@@ -992,6 +1054,26 @@ class CrisisEvent(Base):
     patient = relationship("Idoso", backref="crisis_events")
 
 
+class EmergencyNotification(Base):
+    """
+    Uma entrega do protocolo de emergência (contato, profissional, SMS):
+    status, tentativas e latência. Gravada em lote pelo AuditSink.
+    """
+    __tablename__ = "emergency_notifications"
+
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, ForeignKey('idosos.id', ondelete='CASCADE'), nullable=False)
+    crisis_event_id = Column(Integer, ForeignKey('crisis_events.id', ondelete='SET NULL'))
+    channel = Column(String(30), nullable=False)  # emergency_contact, professional, sms
+    recipient = Column(String(200))
+    status = Column(String(20), nullable=False)  # delivered, not_sent, failed, timeout
+    attempts = Column(Integer, nullable=False, default=1)
+    latency_ms = Column(Integer)  # do início do despacho até a entrega (ou a desistência)
+    error = Column(Text)
+    triggered_at = Column(DateTime)  # detecção do risco que acionou o protocolo
+    created_at = Column(DateTime, default=datetime.datetime.now)
+
+
 class SafetyPlan(Base):
     """Planos de segurança para prevenção de crises"""
     __tablename__ = "safety_plans"
@@ -1044,6 +1126,8 @@ class NLPConversationAnalysis(Base):
     id = Column(Integer, primary_key=True)
     conversation_session_id = Column(Integer, ForeignKey('conversation_sessions.id', ondelete='CASCADE'))
     message_id = Column(Integer, ForeignKey('conversation_messages.id', ondelete='CASCADE'))
+    # Preenchido pelo backfill das transcrições (services/nlp_lote.py)
+    historico_ligacao_id = Column(Integer, ForeignKey('historico_ligacoes.id', ondelete='CASCADE'))
     patient_id = Column(Integer, ForeignKey('idosos.id', ondelete='CASCADE'), nullable=False)
     sentiment_score = Column(Numeric(5, 4))  # -1 to 1
     sentiment_label = Column(String(20))  # very_negative, negative, neutral, positive, very_positive
@@ -1079,6 +1163,48 @@ class MLPrediction(Base):
     patient = relationship("Idoso", backref="ml_predictions")
 
 
+class PatientRiskState(Base):
+    """
+    Estado de risco por paciente, mantido na escrita (database/estado_risco.py):
+    cada avaliação, crise, análise NLP ou predição de ML atualiza esta linha na
+    mesma transação do INSERT. Ler o risco de um paciente é um SELECT por PK.
+    """
+    __tablename__ = "patient_risk_state"
+
+    patient_id = Column(Integer, ForeignKey('idosos.id', ondelete='CASCADE'), primary_key=True)
+    # Últimos scores por escala
+    phq9_score = Column(Integer)
+    phq9_severity = Column(String(50))
+    phq9_at = Column(DateTime)
+    gad7_score = Column(Integer)
+    gad7_at = Column(DateTime)
+    cssrs_score = Column(Integer)
+    cssrs_severity = Column(String(50))
+    cssrs_at = Column(DateTime)
+    # Última predição suicide_risk
+    ml_model_name = Column(String(100))
+    ml_label = Column(String(50))
+    ml_value = Column(Numeric(5, 4))
+    ml_confidence = Column(Numeric(5, 4))
+    ml_predicted_at = Column(DateTime)
+    ml_valid_until = Column(DateTime)
+    # Sentimento das conversas (média móvel exponencial)
+    sentiment_ewma = Column(Numeric(6, 4))
+    sentiment_count = Column(Integer, nullable=False, default=0)
+    sentiment_at = Column(DateTime)
+    danger_flags = Column(JSONB)  # flags da última análise que teve alguma
+    danger_flag_at = Column(DateTime)
+    # Crises
+    crisis_count = Column(Integer, nullable=False, default=0)
+    last_crisis_at = Column(DateTime)
+    last_suicide_attempt_at = Column(DateTime)
+    # Risco calculado na última escrita; vale até risk_expires_at
+    risk_level = Column(String(20), nullable=False, default='LOW')
+    risk_reason = Column(String(50))
+    risk_expires_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now)
+
+
 class TreatmentGoal(Base):
     """Objetivos terapêuticos"""
     __tablename__ = "treatment_goals"
@@ -1113,3 +1239,75 @@ class AssessmentScaleReference(Base):
     scoring_rules = Column(JSONB, nullable=False)
     interpretation_guide = Column(JSONB, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.now)
+
+
+# =====================================================================
+# ÍNDICES DAS CONSULTAS FREQUENTES
+# Espelham database/migrations/005, 007 e 010 para
+# que create_all (testes, SQLite local) gere o mesmo desenho de índices.
+# =====================================================================
+
+_STATUS_PENDENTES = text("status IN ('agendado', 'aguardando_retry')")
+
+# Scheduler: status IN (...) AND data_hora_agendada <= now
+Index("ix_agendamentos_pendentes", Agendamento.data_hora_agendada,
+      postgresql_where=_STATUS_PENDENTES, sqlite_where=_STATUS_PENDENTES)
+Index("ix_agendamentos_status_data", Agendamento.status, Agendamento.data_hora_agendada)
+Index("ix_agendamentos_idoso_data", Agendamento.idoso_id, Agendamento.data_hora_agendada.desc())
+# Mineração de padrões incremental: agendamentos alterados desde a marca
+Index("ix_agendamentos_atualizado", Agendamento.atualizado_em)
+
+Index("ix_historico_ligacoes_idoso_inicio", HistoricoLigacao.idoso_id,
+      HistoricoLigacao.inicio_chamada.desc(), HistoricoLigacao.id.desc())
+Index("ix_historico_ligacoes_criado_id", HistoricoLigacao.criado_em.desc(), HistoricoLigacao.id.desc())
+
+Index("ix_alertas_idoso_criado", Alerta.idoso_id, Alerta.criado_em.desc())
+Index("ix_alertas_nao_resolvidos", Alerta.idoso_id, Alerta.criado_em.desc(),
+      postgresql_where=Alerta.resolvido == False, sqlite_where=Alerta.resolvido == False)  # noqa: E712
+
+# Sync delta (migration 010): (atualizado_em, id) é o cursor do token
+Index("ix_idosos_atualizado", Idoso.atualizado_em, Idoso.id)
+Index("ix_medicamentos_idoso_atualizado", Medicamento.idoso_id, Medicamento.atualizado_em, Medicamento.id)
+Index("ix_cuidadores_idoso_atualizado", Cuidador.idoso_id, Cuidador.atualizado_em, Cuidador.id)
+Index("ix_alertas_idoso_atualizado", Alerta.idoso_id, Alerta.atualizado_em, Alerta.id)
+Index("ix_sync_tombstones_removido", SyncTombstone.removido_em, SyncTombstone.id)
+
+Index("ix_medicamentos_idoso_ativos", Medicamento.idoso_id, Medicamento.nome,
+      postgresql_where=Medicamento.ativo == True, sqlite_where=Medicamento.ativo == True)  # noqa: E712
+Index("ix_cuidadores_idoso_ativos", Cuidador.idoso_id, Cuidador.prioridade, Cuidador.id,
+      postgresql_where=Cuidador.ativo == True, sqlite_where=Cuidador.ativo == True)  # noqa: E712
+
+# Únicos: dedupe da ingestão (migration 007, ON CONFLICT DO NOTHING)
+Index("ux_sinais_vitais_health_cliente_coleta", SinaisVitaisHealth.cliente_id,
+      SinaisVitaisHealth.timestamp_coleta, unique=True)
+Index("ux_atividade_cliente_coleta", Atividade.cliente_id, Atividade.timestamp_coleta, unique=True)
+Index("ix_sono_cliente_inicio", Sono.cliente_id, Sono.timestamp_inicio.desc())
+Index("ix_medicao_corporal_cliente_coleta", MedicaoCorporal.cliente_id, MedicaoCorporal.timestamp_coleta.desc())
+Index("ix_nutricao_cliente_coleta", Nutricao.cliente_id, Nutricao.timestamp_coleta.desc())
+
+Index("ix_mood_diary_patient_date", MoodDiary.patient_id, MoodDiary.date.desc())
+Index("ix_mh_assessments_patient_scale_data", MentalHealthAssessment.patient_id,
+      MentalHealthAssessment.scale_type, MentalHealthAssessment.assessed_at.desc())
+Index("ix_crisis_events_patient_occurred", CrisisEvent.patient_id, CrisisEvent.occurred_at.desc())
+Index("ix_emergency_notifications_patient_criado", EmergencyNotification.patient_id,
+      EmergencyNotification.created_at.desc())
+Index("ix_safety_plans_patient_ativo", SafetyPlan.patient_id,
+      postgresql_where=SafetyPlan.active == True, sqlite_where=SafetyPlan.active == True)  # noqa: E712
+Index("ix_nlp_analysis_patient_analyzed", NLPConversationAnalysis.patient_id, NLPConversationAnalysis.analyzed_at)
+Index("ux_nlp_analysis_historico_ligacao", NLPConversationAnalysis.historico_ligacao_id, unique=True)
+Index("ix_ml_predictions_patient_tipo_data", MLPrediction.patient_id,
+      MLPrediction.prediction_type, MLPrediction.predicted_at.desc())
+# Score populacional em lote (migration 015): uma linha por paciente, regravada no upsert
+Index("ux_ml_predictions_score_populacional", MLPrediction.patient_id, MLPrediction.model_name,
+      MLPrediction.prediction_type, unique=True,
+      postgresql_where=MLPrediction.model_name == 'risco_populacional',
+      sqlite_where=MLPrediction.model_name == 'risco_populacional')
+# Mineração de padrões (migration 016): um padrão por idoso e tipo, regravado no upsert
+Index("ux_padroes_comportamento_mineracao", PadraoComportamento.idoso_id, PadraoComportamento.tipo_padrao,
+      unique=True,
+      postgresql_where=PadraoComportamento.origem == 'mineracao',
+      sqlite_where=PadraoComportamento.origem == 'mineracao')
+Index("ix_patient_risk_state_nivel", PatientRiskState.risk_level, PatientRiskState.updated_at.desc())
+Index("ix_patient_risk_state_vencimento", PatientRiskState.risk_expires_at,
+      postgresql_where=PatientRiskState.risk_expires_at.isnot(None),
+      sqlite_where=PatientRiskState.risk_expires_at.isnot(None))
@@ -2,16 +2,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from ..models import Configuracao, PromptTemplate, FunctionDefinition, CircuitBreakerState, RateLimit
 from typing import List, Optional
+from utils.cache import cached, invalidar
 
 class ConfigRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
+    @cached(tags=("configuracoes",))
     async def get_all_configs(self) -> List[Configuracao]:
         query = select(Configuracao)
         result = await self.db.execute(query)
         return result.scalars().all()
 
+    @cached(tags=("configuracoes",))
     async def get_config_by_key(self, key: str) -> Optional[Configuracao]:
         query = select(Configuracao).filter(Configuracao.chave == key)
         result = await self.db.execute(query)
@@ -22,6 +25,7 @@ class ConfigRepository:
         self.db.add(config)
         await self.db.commit()
         await self.db.refresh(config)
+        await invalidar("configuracoes")
         return config
 
     async def update_config(self, id: int, updates: dict) -> Optional[Configuracao]:
@@ -34,6 +38,7 @@ class ConfigRepository:
                     setattr(config, k, v)
             await self.db.commit()
             await self.db.refresh(config)
+            await invalidar("configuracoes")
         return config
 
     async def delete_config(self, id: int) -> bool:
@@ -43,6 +48,7 @@ class ConfigRepository:
         if config:
             await self.db.delete(config)
             await self.db.commit()
+            await invalidar("configuracoes")
             return True
         return False
 
@@ -2,6 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 from database.models import Cuidador
 from typing import List, Optional
+from utils.cache import cached, invalidar
 
 
 class CuidadorRepository:
@@ -65,6 +66,7 @@ class CuidadorRepository:
         result = await self.db.execute(query)
         return result.scalars().all()
     
+    @cached(tags=("cuidadores:idoso:{idoso_id}",))
     async def get_emergencia_contacts(self, idoso_id: int) -> List[Cuidador]:
         """Retorna contatos de emergência ordenados por prioridade"""
         result = await self.db.execute(
@@ -97,6 +99,7 @@ class CuidadorRepository:
         self.db.add(cuidador)
         await self.db.commit()
         await self.db.refresh(cuidador)
+        await invalidar(f"cuidadores:idoso:{cuidador.idoso_id}")
         return cuidador
     
     async def update(self, id: int, data: dict) -> Optional[Cuidador]:
@@ -104,6 +107,7 @@ class CuidadorRepository:
         cuidador = await self.get_by_id(id)
         if not cuidador:
             return None
+        idoso_anterior = cuidador.idoso_id
         
         for key, value in data.items():
             if hasattr(cuidador, key):
@@ -111,6 +115,7 @@ class CuidadorRepository:
         
         await self.db.commit()
         await self.db.refresh(cuidador)
+        await invalidar(f"cuidadores:idoso:{idoso_anterior}", f"cuidadores:idoso:{cuidador.idoso_id}")
         return cuidador
     
     async def update_device_token(self, id: int, token: str) -> bool:
@@ -121,6 +126,7 @@ class CuidadorRepository:
         
         cuidador.device_token = token
         await self.db.commit()
+        await invalidar(f"cuidadores:idoso:{cuidador.idoso_id}")
         return True
     
     async def update_token_by_cpf(self, cpf: str, token: str) -> bool:
@@ -131,6 +137,7 @@ class CuidadorRepository:
         
         cuidador.device_token = token
         await self.db.commit()
+        await invalidar(f"cuidadores:idoso:{cuidador.idoso_id}")
         return True
     
     async def delete(self, id: int) -> bool:
@@ -141,4 +148,5 @@ class CuidadorRepository:
         
         cuidador.ativo = False
         await self.db.commit()
+        await invalidar(f"cuidadores:idoso:{cuidador.idoso_id}")
         return True
@@ -1,7 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from ..models import HistoricoLigacao, Idoso
-from typing import Optional, List
+from utils.pagination import paginate_keyset
+from typing import Optional, List, Tuple
 import datetime
 
 class HistoricoRepository:
@@ -61,6 +62,32 @@ class HistoricoRepository:
         ).offset(skip).limit(limit))
         return result.scalars().all()
 
+    async def list_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        idoso_id: Optional[int] = None,
+        agendamento_id: Optional[int] = None
+    ) -> Tuple[List[HistoricoLigacao], Optional[str]]:
+        """
+        Lista histórico paginado por cursor sobre (criado_em, id), mais recentes primeiro.
+        Retorna (itens, next_cursor).
+        """
+        query = select(HistoricoLigacao).join(Idoso)
+        
+        if idoso_id:
+            query = query.filter(HistoricoLigacao.idoso_id == idoso_id)
+        
+        if agendamento_id:
+            query = query.filter(HistoricoLigacao.agendamento_id == agendamento_id)
+        
+        return await paginate_keyset(
+            self.db, query,
+            sort_columns=[HistoricoLigacao.criado_em, HistoricoLigacao.id],
+            cursor=cursor,
+            limit=limit
+        )
+
     async def list_by_periodo(
         self,
         data_inicio: datetime.datetime,
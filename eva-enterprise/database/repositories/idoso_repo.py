@@ -2,6 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete, update
 from ..models import Idoso, MembroFamilia, LegadoDigital
 from typing import List, Optional
+from utils.cache import cached, invalidar
 
 class IdosoRepository:
     def __init__(self, db: AsyncSession):
@@ -19,7 +20,12 @@ class IdosoRepository:
         result = await self.db.execute(query.offset(skip).limit(limit))
         return result.scalars().all()
 
+    @cached(tags=("idosos", "idoso:{idoso_id}"))
     async def get_by_id(self, idoso_id: int) -> Optional[Idoso]:
+        # Cópia desanexada (cache): para alterar a linha use _carregar
+        return await self._carregar(idoso_id)
+
+    async def _carregar(self, idoso_id: int) -> Optional[Idoso]:
         query = select(Idoso).filter(Idoso.id == idoso_id)
         result = await self.db.execute(query)
         return result.scalar_one_or_none()
@@ -34,23 +40,27 @@ class IdosoRepository:
         self.db.add(idoso)
         await self.db.commit()
         await self.db.refresh(idoso)
+        # Uma consulta anterior pelo id pode ter guardado "não existe"
+        await invalidar(f"idoso:{idoso.id}")
         return idoso
 
     async def update(self, idoso_id: int, dados: dict) -> Optional[Idoso]:
-        idoso = await self.get_by_id(idoso_id)
+        idoso = await self._carregar(idoso_id)
         if idoso:
             for k, v in dados.items():
                 if v is not None:
                     setattr(idoso, k, v)
             await self.db.commit()
             await self.db.refresh(idoso)
+            await invalidar(f"idoso:{idoso_id}")
         return idoso
 
     async def delete(self, idoso_id: int) -> bool:
-        idoso = await self.get_by_id(idoso_id)
+        idoso = await self._carregar(idoso_id)
         if idoso:
             await self.db.delete(idoso)
             await self.db.commit()
+            await invalidar(f"idoso:{idoso_id}")
             return True
         return False
 
@@ -112,6 +122,7 @@ class IdosoRepository:
         try:
             await self.db.execute(query)
             await self.db.commit()
+            await invalidar(f"idoso:{idoso_id}")
             return True
         except Exception as e:
             print(f"Erro ao mapear/atualizar token: {e}")
@@ -134,7 +145,9 @@ class IdosoRepository:
             
             result = await self.db.execute(stmt)
             await self.db.commit()
-            
+            # O id não é conhecido aqui: invalida todos os idosos em cache
+            await invalidar("idosos")
+
             # Verifica se alguma linha foi afetada
             return result.rowcount > 0
             
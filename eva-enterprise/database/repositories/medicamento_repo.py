@@ -3,6 +3,7 @@ import unicodedata
 from sqlalchemy import func, select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..models import Medicamento, SinaisVitais
+from utils.cache import cached, invalidar
 import datetime
 
 # Tenta importar fuzzywuzzy para busca fuzzy
@@ -23,6 +24,7 @@ class MedicamentoRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
     
+    @cached(tags=("medicamentos",))
     async def get_by_name(self, nome: str, idoso_id: int = None) -> Optional[dict]:
         query = select(Medicamento).filter(
             func.lower(Medicamento.nome) == func.lower(nome),
@@ -46,6 +48,7 @@ class MedicamentoRepository:
             }
         return None
     
+    @cached(tags=("medicamentos",))
     async def search_by_name(
         self, 
         nome: str, 
@@ -113,6 +116,7 @@ class MedicamentoRepository:
             }
         return None
     
+    @cached(tags=("medicamentos",))
     async def get_by_idoso(self, idoso_id: int) -> List[dict]:
         query = select(Medicamento).filter(
             Medicamento.idoso_id == idoso_id,
@@ -132,6 +136,7 @@ class MedicamentoRepository:
             'observacoes': getattr(r, 'observacoes', None)
         } for r in results]
     
+    @cached(tags=("medicamentos",))
     async def get_all(self) -> List[dict]:
         query = select(Medicamento).filter(
             Medicamento.ativo == True
@@ -173,6 +178,7 @@ class MedicamentoRepository:
         self.db.add(med)
         await self.db.commit()
         await self.db.refresh(med)
+        await invalidar("medicamentos")
         return med
 
     async def get_by_id(self, id: int) -> Optional[Medicamento]:
@@ -188,6 +194,7 @@ class MedicamentoRepository:
                     setattr(med, k, v)
             await self.db.commit()
             await self.db.refresh(med)
+            await invalidar("medicamentos")
         return med
 
     async def delete(self, id: int) -> bool:
@@ -195,6 +202,7 @@ class MedicamentoRepository:
         if med:
             med.ativo = False
             await self.db.commit()
+            await invalidar("medicamentos")
             return True
         return False
         
@@ -2,12 +2,13 @@
 Repositório para operações de banco de dados relacionadas à saúde mental
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, desc
+from sqlalchemy import JSON, column, select, and_, or_, func, desc, insert, text, true
 from sqlalchemy.orm import selectinload
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date, timedelta
 import logging
 
+from ..estado_risco import aplicar_analises, aplicar_avaliacoes, aplicar_crises, aplicar_predicoes
 from ..models import (
     MentalHealthAssessment,
     MoodDiary,
@@ -27,6 +28,97 @@ from ..models import (
 
 logger = logging.getLogger(__name__)
 
+# Escalas do resumo: chave no resumo -> scale_type
+ESCALAS_RESUMO = {"phq9": "PHQ9", "gad7": "GAD7", "cssrs": "C-SSRS"}
+
+
+def _humor_agregado(patient_id: int, days: int):
+    """Uma linha: médias de humor/ansiedade/energia e total de entradas"""
+    start_date = date.today() - timedelta(days=days)
+    return (
+        select(
+            func.avg(MoodDiary.mood_score).label("avg_mood"),
+            func.avg(MoodDiary.anxiety_level).label("avg_anxiety"),
+            func.avg(MoodDiary.energy_level).label("avg_energy"),
+            func.count().label("entries_count"),
+        )
+        .where(MoodDiary.patient_id == patient_id, MoodDiary.date >= start_date)
+    )
+
+
+def _sentimento_agregado(patient_id: int, days: int):
+    """Uma linha: média de sentimento e total de análises"""
+    start_date = datetime.now() - timedelta(days=days)
+    return (
+        select(
+            func.avg(NLPConversationAnalysis.sentiment_score).label("avg_sentiment"),
+            func.count().label("analyses_count"),
+        )
+        .where(
+            NLPConversationAnalysis.patient_id == patient_id,
+            NLPConversationAnalysis.analyzed_at >= start_date
+        )
+    )
+
+
+def _flags_agregado(patient_id: int, days: int, dialeto: str):
+    """Uma linha: {flag: ocorrências} das análises do período, montado no banco"""
+    if dialeto == "postgresql":
+        sql = """
+            SELECT jsonb_object_agg(flag, n) AS danger_flags_count FROM (
+                SELECT f.value AS flag, count(*) AS n
+                FROM nlp_conversation_analysis a
+                CROSS JOIN LATERAL jsonb_array_elements_text(a.danger_flags) AS f(value)
+                WHERE a.patient_id = :flags_patient_id AND a.analyzed_at >= :flags_desde
+                  AND jsonb_typeof(a.danger_flags) = 'array'
+                GROUP BY f.value
+            ) contagem
+        """
+    else:
+        sql = """
+            SELECT json_group_object(flag, n) AS danger_flags_count FROM (
+                SELECT f.value AS flag, count(*) AS n
+                FROM nlp_conversation_analysis a, json_each(a.danger_flags) AS f
+                WHERE a.patient_id = :flags_patient_id AND a.analyzed_at >= :flags_desde
+                  AND json_type(a.danger_flags) = 'array'
+                GROUP BY f.value
+            ) contagem
+        """
+    return (
+        text(sql)
+        .bindparams(flags_patient_id=patient_id, flags_desde=datetime.now() - timedelta(days=days))
+        .columns(column("danger_flags_count", JSON))
+    )
+
+
+def _media(valor, casas: int) -> Optional[float]:
+    return round(float(valor), casas) if valor is not None else None
+
+
+def _montar_humor(linha, days: int) -> Dict[str, Any]:
+    if not linha.entries_count:
+        return {"error": "no_data"}
+    return {
+        "avg_mood": _media(linha.avg_mood, 2),
+        "avg_anxiety": _media(linha.avg_anxiety, 2),
+        "avg_energy": _media(linha.avg_energy, 2),
+        "entries_count": linha.entries_count,
+        "days_analyzed": days
+    }
+
+
+def _montar_sentimento(linha) -> Dict[str, Any]:
+    if not linha.analyses_count:
+        return {"error": "no_data"}
+    avg_sentiment = _media(linha.avg_sentiment, 4) or 0.0
+    return {
+        "avg_sentiment": avg_sentiment,
+        "analyses_count": linha.analyses_count,
+        "danger_flags_count": linha.danger_flags_count or {},
+        "trend": "negative" if avg_sentiment < -0.2 else ("positive" if avg_sentiment > 0.2 else "neutral")
+    }
+
+
 
 class MentalHealthRepository:
     """Repositório para gerenciamento de dados de saúde mental"""
@@ -59,6 +151,7 @@ class MentalHealthRepository:
             interpretation=interpretation
         )
         session.add(assessment)
+        await aplicar_avaliacoes(session, [assessment])
         await session.commit()
         await session.refresh(assessment)
         logger.info(f"Avaliação {scale_type} criada para paciente {patient_id} - Score: {score}")
@@ -227,23 +320,9 @@ class MentalHealthRepository:
         patient_id: int,
         days: int = 7
     ) -> Dict[str, Any]:
-        """Calcular estatísticas de humor"""
-        entries = await MentalHealthRepository.get_mood_history(session, patient_id, days)
-
-        if not entries:
-            return {"error": "no_data"}
-
-        mood_scores = [e.mood_score for e in entries if e.mood_score is not None]
-        anxiety_levels = [e.anxiety_level for e in entries if e.anxiety_level is not None]
-        energy_levels = [e.energy_level for e in entries if e.energy_level is not None]
-
-        return {
-            "avg_mood": round(sum(mood_scores) / len(mood_scores), 2) if mood_scores else None,
-            "avg_anxiety": round(sum(anxiety_levels) / len(anxiety_levels), 2) if anxiety_levels else None,
-            "avg_energy": round(sum(energy_levels) / len(energy_levels), 2) if energy_levels else None,
-            "entries_count": len(entries),
-            "days_analyzed": days
-        }
+        """Calcular estatísticas de humor (agregado no banco)"""
+        linha = (await session.execute(_humor_agregado(patient_id, days))).one()
+        return _montar_humor(linha, days)
 
     # ===============================================================
     # CRISIS EVENTS
@@ -267,6 +346,7 @@ class MentalHealthRepository:
             **kwargs
         )
         session.add(crisis)
+        await aplicar_crises(session, [crisis])
         await session.commit()
         await session.refresh(crisis)
         logger.warning(f"🚨 CRISE REGISTRADA: {crisis_type} - Paciente {patient_id} - Severidade: {severity}")
@@ -381,6 +461,7 @@ class MentalHealthRepository:
             **kwargs
         )
         session.add(analysis)
+        await aplicar_analises(session, [analysis])
         await session.commit()
         await session.refresh(analysis)
 
@@ -390,45 +471,41 @@ class MentalHealthRepository:
         return analysis
 
     @staticmethod
-    async def get_recent_sentiment_trend(
+    async def create_nlp_analyses_bulk(
         session: AsyncSession,
-        patient_id: int,
-        days: int = 7
-    ) -> Dict[str, Any]:
-        """Calcular tendência de sentimento nas conversas"""
-        start_date = datetime.now() - timedelta(days=days)
-
+        linhas: List[Dict[str, Any]]
+    ) -> List[int]:
+        """Criar várias análises NLP num único INSERT; devolve os ids na ordem de `linhas`"""
+        # Pela Table (Core): o INSERT em massa do ORM resolveria as FKs de
+        # conversation_sessions/messages, que não têm model
+        tabela = NLPConversationAnalysis.__table__
         result = await session.execute(
-            select(NLPConversationAnalysis)
-            .where(
-                and_(
-                    NLPConversationAnalysis.patient_id == patient_id,
-                    NLPConversationAnalysis.analyzed_at >= start_date
-                )
-            )
-            .order_by(NLPConversationAnalysis.analyzed_at)
+            insert(tabela).returning(tabela.c.id, sort_by_parameter_order=True),
+            linhas
         )
-        analyses = result.scalars().all()
-
-        if not analyses:
-            return {"error": "no_data"}
+        ids = list(result.scalars())
+        await aplicar_analises(session, linhas)
+        await session.commit()
 
-        scores = [a.sentiment_score for a in analyses if a.sentiment_score is not None]
-        avg_sentiment = sum(scores) / len(scores) if scores else 0
+        com_perigo = sum(1 for linha in linhas if linha.get("danger_flags"))
+        if com_perigo:
+            logger.warning(f"⚠️ Flags de perigo detectados em {com_perigo} de {len(linhas)} análises do lote")
 
-        # Contar flags de perigo
-        danger_flags_count = {}
-        for analysis in analyses:
-            if analysis.danger_flags:
-                for flag in analysis.danger_flags:
-                    danger_flags_count[flag] = danger_flags_count.get(flag, 0) + 1
+        return ids
 
-        return {
-            "avg_sentiment": round(avg_sentiment, 4),
-            "analyses_count": len(analyses),
-            "danger_flags_count": danger_flags_count,
-            "trend": "negative" if avg_sentiment < -0.2 else ("positive" if avg_sentiment > 0.2 else "neutral")
-        }
+    @staticmethod
+    async def get_recent_sentiment_trend(
+        session: AsyncSession,
+        patient_id: int,
+        days: int = 7
+    ) -> Dict[str, Any]:
+        """Calcular tendência de sentimento nas conversas (agregado no banco)"""
+        sentimento = _sentimento_agregado(patient_id, days).subquery("sentimento")
+        flags = _flags_agregado(patient_id, days, session.get_bind().dialect.name).subquery("flags")
+        linha = (await session.execute(
+            select(sentimento, flags.c.danger_flags_count).select_from(sentimento).join(flags, true())
+        )).one()
+        return _montar_sentimento(linha)
 
     # ===============================================================
     # ML PREDICTIONS
@@ -458,6 +535,7 @@ class MentalHealthRepository:
             valid_until=valid_until
         )
         session.add(prediction)
+        await aplicar_predicoes(session, [prediction])
         await session.commit()
         await session.refresh(prediction)
 
@@ -515,95 +593,124 @@ class MentalHealthRepository:
     # MENTAL HEALTH SUMMARY
     # ===============================================================
 
+    @staticmethod
+    def _consulta_resumo(patient_id: int, dialeto: str):
+        """
+        Resumo inteiro numa única consulta (uma linha)
+
+        Cada parte é uma subconsulta de uma linha só, filtrada pelo
+        paciente, e todas são unidas com ON true: a última avaliação de cada
+        escala (LIMIT 1 pelo índice patient/scale/assessed_at) e os agregados
+        de humor, crises (FILTER), sentimento, flags e plano de segurança.
+        """
+        partes = {
+            "humor": _humor_agregado(patient_id, 7).subquery("humor"),
+            "crises": select(
+                func.count().label("crisis_count"),
+                func.count().filter(CrisisEvent.crisis_type == 'suicide_attempt').label("suicide_attempts"),
+            ).where(
+                CrisisEvent.patient_id == patient_id,
+                CrisisEvent.occurred_at >= datetime.now() - timedelta(days=30)
+            ).subquery("crises"),
+            "sentimento": _sentimento_agregado(patient_id, 7).subquery("sentimento"),
+            "flags": _flags_agregado(patient_id, 7, dialeto).subquery("flags"),
+            "plano": select(
+                func.count().label("safety_plans")
+            ).where(SafetyPlan.patient_id == patient_id, SafetyPlan.active == True).subquery("plano"),
+        }
+        colunas = [
+            partes["humor"], partes["crises"], partes["sentimento"],
+            partes["flags"].c.danger_flags_count, partes["plano"].c.safety_plans,
+        ]
+        consulta = partes["humor"]
+        for nome in ("crises", "sentimento", "flags", "plano"):
+            consulta = consulta.join(partes[nome], true())
+
+        for chave, escala in ESCALAS_RESUMO.items():
+            ultima = (
+                select(
+                    MentalHealthAssessment.score, MentalHealthAssessment.severity_level,
+                    MentalHealthAssessment.interpretation, MentalHealthAssessment.assessed_at
+                )
+                .where(
+                    MentalHealthAssessment.patient_id == patient_id,
+                    MentalHealthAssessment.scale_type == escala
+                )
+                .order_by(desc(MentalHealthAssessment.assessed_at))
+                .limit(1)
+                .subquery(chave)
+            )
+            colunas += [
+                ultima.c.score.label(f"{chave}_score"),
+                ultima.c.severity_level.label(f"{chave}_severity"),
+                ultima.c.interpretation.label(f"{chave}_interpretation"),
+                ultima.c.assessed_at.label(f"{chave}_date"),
+            ]
+            consulta = consulta.outerjoin(ultima, true())
+
+        return select(*colunas).select_from(consulta)
+
     @staticmethod
     async def get_patient_mental_health_summary(
         session: AsyncSession,
         patient_id: int
     ) -> Dict[str, Any]:
-        """Obter resumo completo de saúde mental do paciente"""
-
-        # PHQ-9 (Depressão)
-        latest_phq9 = await MentalHealthRepository.get_latest_assessment_by_type(
-            session, patient_id, 'PHQ9'
-        )
-
-        # GAD-7 (Ansiedade)
-        latest_gad7 = await MentalHealthRepository.get_latest_assessment_by_type(
-            session, patient_id, 'GAD7'
-        )
-
-        # C-SSRS (Risco Suicida)
-        latest_cssrs = await MentalHealthRepository.get_latest_assessment_by_type(
-            session, patient_id, 'C-SSRS'
-        )
-
-        # Humor (7 dias)
-        mood_stats = await MentalHealthRepository.get_mood_statistics(session, patient_id, days=7)
-
-        # Crises (30 dias)
-        recent_crises = await MentalHealthRepository.get_recent_crises(session, patient_id, days=30)
-
-        # Sentimento (7 dias)
-        sentiment_trend = await MentalHealthRepository.get_recent_sentiment_trend(session, patient_id, days=7)
-
-        # Plano de segurança
-        safety_plan = await MentalHealthRepository.get_active_safety_plan(session, patient_id)
+        """Obter resumo completo de saúde mental do paciente (uma ida ao banco)"""
+        linha = (await session.execute(
+            MentalHealthRepository._consulta_resumo(patient_id, session.get_bind().dialect.name)
+        )).one()
+
+        assessments = {
+            chave: {
+                "score": getattr(linha, f"{chave}_score"),
+                "severity": getattr(linha, f"{chave}_severity"),
+                "date": getattr(linha, f"{chave}_date")
+            }
+            for chave in ESCALAS_RESUMO
+        }
+        assessments["cssrs"]["risk"] = linha.cssrs_interpretation
 
         return {
             "patient_id": patient_id,
-            "assessments": {
-                "phq9": {
-                    "score": latest_phq9.score if latest_phq9 else None,
-                    "severity": latest_phq9.severity_level if latest_phq9 else None,
-                    "date": latest_phq9.assessed_at if latest_phq9 else None
-                },
-                "gad7": {
-                    "score": latest_gad7.score if latest_gad7 else None,
-                    "severity": latest_gad7.severity_level if latest_gad7 else None,
-                    "date": latest_gad7.assessed_at if latest_gad7 else None
-                },
-                "cssrs": {
-                    "score": latest_cssrs.score if latest_cssrs else None,
-                    "risk": latest_cssrs.interpretation if latest_cssrs else None,
-                    "date": latest_cssrs.assessed_at if latest_cssrs else None
-                }
-            },
-            "mood_stats_7d": mood_stats,
-            "sentiment_trend_7d": sentiment_trend,
-            "crisis_count_30d": len(recent_crises),
-            "has_active_safety_plan": safety_plan is not None,
+            "assessments": assessments,
+            "mood_stats_7d": _montar_humor(linha, 7),
+            "sentiment_trend_7d": _montar_sentimento(linha),
+            "crisis_count_30d": linha.crisis_count,
+            "has_active_safety_plan": linha.safety_plans > 0,
             "risk_level": MentalHealthRepository._calculate_overall_risk(
-                latest_phq9, latest_gad7, latest_cssrs, recent_crises
+                linha.phq9_score, linha.gad7_score, linha.cssrs_score,
+                linha.crisis_count, linha.suicide_attempts
             )
         }
 
     @staticmethod
     def _calculate_overall_risk(
-        phq9: Optional[MentalHealthAssessment],
-        gad7: Optional[MentalHealthAssessment],
-        cssrs: Optional[MentalHealthAssessment],
-        recent_crises: List[CrisisEvent]
+        phq9: Optional[int],
+        gad7: Optional[int],
+        cssrs: Optional[int],
+        crisis_count: int,
+        suicide_attempts: int
     ) -> str:
-        """Calcular nível de risco geral"""
+        """Calcular nível de risco geral (a partir dos scores mais recentes)"""
 
         # Risco crítico
-        if cssrs and cssrs.score >= 4:
+        if cssrs is not None and cssrs >= 4:
             return "CRITICAL"
-        if len(recent_crises) > 0 and any(c.crisis_type == 'suicide_attempt' for c in recent_crises):
+        if crisis_count > 0 and suicide_attempts > 0:
             return "CRITICAL"
 
         # Risco alto
-        if cssrs and cssrs.score >= 2:
+        if cssrs is not None and cssrs >= 2:
             return "HIGH"
-        if phq9 and phq9.score >= 20:
+        if phq9 is not None and phq9 >= 20:
             return "HIGH"
-        if gad7 and gad7.score >= 15:
+        if gad7 is not None and gad7 >= 15:
             return "HIGH"
 
         # Risco moderado
-        if phq9 and phq9.score >= 10:
+        if phq9 is not None and phq9 >= 10:
             return "MODERATE"
-        if gad7 and gad7.score >= 10:
+        if gad7 is not None and gad7 >= 10:
             return "MODERATE"
 
         # Risco baixo
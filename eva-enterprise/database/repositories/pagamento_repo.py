@@ -1,8 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from ..models import Pagamento, AuditLog
+from services.audit_service import auditoria
 from typing import List, Optional
 import datetime
+import json
 
 class PagamentoRepository:
     def __init__(self, db: AsyncSession):
@@ -31,18 +33,18 @@ class AuditRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def log_action(self, acao: str, usuario: str, detalhes: dict) -> AuditLog:
-        log = AuditLog(acao=acao, usuario=usuario, detalhes=detalhes)
-        self.db.add(log)
-        await self.db.commit()
-        await self.db.refresh(log)
-        return log
+    async def log_action(self, acao: str, usuario: str, detalhes: dict, recurso: str = None) -> None:
+        """Enfileira no AuditSink; a gravação acontece em lote, fora da requisição"""
+        auditoria.registrar(
+            AuditLog, usuario_email=usuario, acao=acao, recurso=recurso,
+            detalhes=json.dumps(detalhes, default=str)
+        )
 
     async def get_logs(self, limit: int = 100, usuario: str = None) -> List[AuditLog]:
         query = select(AuditLog)
         if usuario:
-            query = query.filter(AuditLog.usuario == usuario)
-        result = await self.db.execute(query.order_by(AuditLog.data.desc()).limit(limit))
+            query = query.filter(AuditLog.usuario_email == usuario)
+        result = await self.db.execute(query.order_by(AuditLog.criado_em.desc()).limit(limit))
         return result.scalars().all()
 
     async def get_by_id(self, id: int) -> Optional[AuditLog]:
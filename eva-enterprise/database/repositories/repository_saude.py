@@ -2,15 +2,22 @@
 Repository para operações de banco de dados do sistema de saúde
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, extract
+from sqlalchemy import select, and_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
-from typing import List, Optional
-from datetime import datetime, date, timedelta
+from typing import Any, List, Optional, Tuple
+from datetime import datetime, date, timedelta, timezone
 from decimal import Decimal
 
+from database.ingestao_bulk import inserir_em_lote, ResultadoBulk
+from database.rollup_saude import (
+    aplicar_rollup, intervalo_mes, mes_fechado,
+    consulta_relatorio_mensal, montar_relatorio_mensal
+)
+from database.serie_temporal import obter_serie, SERIE_PONTOS_PADRAO
 from database.models import (
     Usuario, Atividade, SinaisVitaisHealth, Sono,
-    MedicaoCorporal, Nutricao, CicloMenstrual
+    MedicaoCorporal, Nutricao, CicloMenstrual, HealthDailyRollup, HealthMonthlyRollup
 )
 from schemas import (
     UsuarioCreate, UsuarioUpdate,
@@ -18,6 +25,67 @@ from schemas import (
     SonoCreate, MedicaoCorporalCreate,
     NutricaoCreate, CicloMenstrualCreate
 )
+from utils.security import invalidar_principal
+
+
+# =====================================================
+# JANELAS DE TEMPO (PARTITION PRUNING)
+# =====================================================
+# atividade, sinais_vitais_health, sono, nutricao e medicao_corporal são
+# particionadas por mês (migrations/006). Toda consulta deve trazer um
+# intervalo na coluna de particionamento, senão o planner visita todas
+# as partições do histórico.
+
+# Janelas progressivas (dias) para "últimos N registros" sem filtro de
+# data; None = sem limite inferior (último recurso, clientes inativos)
+JANELAS_RECENTES_DIAS = (31, 186, 731, None)
+
+
+def _intervalo_dia(data: date) -> Tuple[datetime, datetime]:
+    """Intervalo semiaberto [00:00 do dia, 00:00 do dia seguinte)"""
+    inicio = datetime.combine(data, datetime.min.time())
+    return inicio, inicio + timedelta(days=1)
+
+
+async def _listar_recentes(
+    db: AsyncSession,
+    modelo,
+    coluna,
+    cliente_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None
+) -> list:
+    """
+    Registros mais recentes do cliente, ordenados por `coluna` desc.
+
+    Sem `data_inicio`, busca primeiro na janela mais curta e só amplia se
+    ela não tiver `skip + limit` registros: cada janela é um prefixo da
+    próxima na mesma ordenação, então o resultado é idêntico ao da
+    consulta sem limite, mas normalmente toca só as partições recentes.
+    """
+    base = select(modelo).where(modelo.cliente_id == cliente_id)
+    if data_fim:
+        base = base.where(coluna <= data_fim)
+
+    if data_inicio:
+        janelas = (None,)
+        base = base.where(coluna >= data_inicio)
+    else:
+        janelas = JANELAS_RECENTES_DIAS
+
+    referencia = data_fim or datetime.utcnow()
+    for dias in janelas:
+        query = base
+        if dias is not None:
+            query = query.where(coluna >= referencia - timedelta(days=dias))
+        query = query.order_by(coluna.desc()).offset(skip).limit(limit)
+
+        registros = (await db.execute(query)).scalars().all()
+        if len(registros) >= limit or dias is None:
+            return registros
+    return registros
 
 
 # =====================================================
@@ -55,12 +123,14 @@ async def update_usuario(db: AsyncSession, usuario_id: int, usuario_update: Usua
     if not db_usuario:
         return None
     
+    email_anterior = db_usuario.email
     update_data = usuario_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_usuario, field, value)
     
     await db.commit()
     await db.refresh(db_usuario)
+    await invalidar_principal(email_anterior, db_usuario.email)
     return db_usuario
 
 
@@ -68,26 +138,44 @@ async def update_usuario(db: AsyncSession, usuario_id: int, usuario_update: Usua
 # ATIVIDADE FÍSICA
 # =====================================================
 
+async def _buscar_por_coleta(db: AsyncSession, modelo, cliente_id: int, timestamp_coleta: datetime):
+    result = await db.execute(
+        select(modelo).where(
+            and_(modelo.cliente_id == cliente_id, modelo.timestamp_coleta == timestamp_coleta)
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def _criar_idempotente(db: AsyncSession, modelo, dados: dict):
+    """
+    Insere um registro de série temporal; se (cliente_id, timestamp_coleta)
+    já existe (reenvio do dispositivo), devolve o registro gravado.
+    """
+    obj = modelo(**dados)
+    db.add(obj)
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        existente = await _buscar_por_coleta(db, modelo, dados["cliente_id"], dados["timestamp_coleta"])
+        if existente is None:
+            raise
+        return existente
+    await aplicar_rollup(db, modelo, [dados])
+    await db.commit()
+    await db.refresh(obj)
+    return obj
+
+
 async def create_atividade(db: AsyncSession, atividade: AtividadeCreate) -> Atividade:
     """Criar registro de atividade"""
-    db_atividade = Atividade(**atividade.dict())
-    db.add(db_atividade)
-    await db.commit()
-    await db.refresh(db_atividade)
-    return db_atividade
+    return await _criar_idempotente(db, Atividade, atividade.dict())
 
 
-async def create_atividades_bulk(db: AsyncSession, atividades: List[AtividadeCreate]) -> List[Atividade]:
-    """Criar múltiplos registros de atividade (sync offline)"""
-    db_atividades = [Atividade(**ativ.dict()) for ativ in atividades]
-    db.add_all(db_atividades)
-    await db.commit()
-    
-    # Refresh all objects
-    for ativ in db_atividades:
-        await db.refresh(ativ)
-    
-    return db_atividades
+async def create_atividades_bulk(db: AsyncSession, atividades: List[Any]) -> ResultadoBulk:
+    """Criar múltiplos registros de atividade (sync offline, idempotente)"""
+    return await inserir_em_lote(db, Atividade, AtividadeCreate, atividades)
 
 
 async def get_atividades_by_usuario(
@@ -99,17 +187,10 @@ async def get_atividades_by_usuario(
     data_fim: Optional[datetime] = None
 ) -> List[Atividade]:
     """Buscar histórico de atividades com paginação e filtros"""
-    query = select(Atividade).where(Atividade.cliente_id == cliente_id)
-    
-    if data_inicio:
-        query = query.where(Atividade.timestamp_coleta >= data_inicio)
-    if data_fim:
-        query = query.where(Atividade.timestamp_coleta <= data_fim)
-    
-    query = query.order_by(Atividade.timestamp_coleta.desc()).offset(skip).limit(limit)
-    
-    result = await db.execute(query)
-    return result.scalars().all()
+    return await _listar_recentes(
+        db, Atividade, Atividade.timestamp_coleta, cliente_id,
+        skip, limit, data_inicio, data_fim
+    )
 
 
 # =====================================================
@@ -118,23 +199,12 @@ async def get_atividades_by_usuario(
 
 async def create_sinais_vitais(db: AsyncSession, sinais: SinaisVitaisHealthCreate) -> SinaisVitaisHealth:
     """Criar registro de sinais vitais"""
-    db_sinais = SinaisVitaisHealth(**sinais.dict())
-    db.add(db_sinais)
-    await db.commit()
-    await db.refresh(db_sinais)
-    return db_sinais
+    return await _criar_idempotente(db, SinaisVitaisHealth, sinais.dict())
 
 
-async def create_sinais_vitais_bulk(db: AsyncSession, sinais_list: List[SinaisVitaisHealthCreate]) -> List[SinaisVitaisHealth]:
-    """Criar múltiplos registros de sinais vitais"""
-    db_sinais_list = [SinaisVitaisHealth(**sinais.dict()) for sinais in sinais_list]
-    db.add_all(db_sinais_list)
-    await db.commit()
-    
-    for sinais in db_sinais_list:
-        await db.refresh(sinais)
-    
-    return db_sinais_list
+async def create_sinais_vitais_bulk(db: AsyncSession, sinais_list: List[Any]) -> ResultadoBulk:
+    """Criar múltiplos registros de sinais vitais (sync offline, idempotente)"""
+    return await inserir_em_lote(db, SinaisVitaisHealth, SinaisVitaisHealthCreate, sinais_list)
 
 
 async def get_sinais_vitais_by_usuario(
@@ -146,17 +216,10 @@ async def get_sinais_vitais_by_usuario(
     data_fim: Optional[datetime] = None
 ) -> List[SinaisVitaisHealth]:
     """Buscar histórico de sinais vitais"""
-    query = select(SinaisVitaisHealth).where(SinaisVitaisHealth.cliente_id == cliente_id)
-    
-    if data_inicio:
-        query = query.where(SinaisVitaisHealth.timestamp_coleta >= data_inicio)
-    if data_fim:
-        query = query.where(SinaisVitaisHealth.timestamp_coleta <= data_fim)
-    
-    query = query.order_by(SinaisVitaisHealth.timestamp_coleta.desc()).offset(skip).limit(limit)
-    
-    result = await db.execute(query)
-    return result.scalars().all()
+    return await _listar_recentes(
+        db, SinaisVitaisHealth, SinaisVitaisHealth.timestamp_coleta, cliente_id,
+        skip, limit, data_inicio, data_fim
+    )
 
 
 # =====================================================
@@ -165,8 +228,13 @@ async def get_sinais_vitais_by_usuario(
 
 async def create_sono(db: AsyncSession, sono: SonoCreate) -> Sono:
     """Criar registro de sono"""
-    db_sono = Sono(**sono.dict())
+    dados = sono.dict()
+    # timestamp_inicio é a chave de partição (NOT NULL, migration 006): sem
+    # início registrado, assume o instante do registro, como no backfill
+    dados["timestamp_inicio"] = dados.get("timestamp_inicio") or datetime.utcnow()
+    db_sono = Sono(**dados)
     db.add(db_sono)
+    await aplicar_rollup(db, Sono, [dados])
     await db.commit()
     await db.refresh(db_sono)
     return db_sono
@@ -179,14 +247,7 @@ async def get_sono_by_usuario(
     limit: int = 10
 ) -> List[Sono]:
     """Buscar histórico de sono"""
-    result = await db.execute(
-        select(Sono)
-        .where(Sono.cliente_id == cliente_id)
-        .order_by(Sono.timestamp_inicio.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    return result.scalars().all()
+    return await _listar_recentes(db, Sono, Sono.timestamp_inicio, cliente_id, skip, limit)
 
 
 # =====================================================
@@ -195,8 +256,10 @@ async def get_sono_by_usuario(
 
 async def create_medicao_corporal(db: AsyncSession, medicao: MedicaoCorporalCreate) -> MedicaoCorporal:
     """Criar medição corporal"""
-    db_medicao = MedicaoCorporal(**medicao.dict())
+    dados = medicao.dict()
+    db_medicao = MedicaoCorporal(**dados)
     db.add(db_medicao)
+    await aplicar_rollup(db, MedicaoCorporal, [dados])
     await db.commit()
     await db.refresh(db_medicao)
     return db_medicao
@@ -209,14 +272,7 @@ async def get_medicoes_corporais_by_usuario(
     limit: int = 10
 ) -> List[MedicaoCorporal]:
     """Buscar histórico de medições corporais"""
-    result = await db.execute(
-        select(MedicaoCorporal)
-        .where(MedicaoCorporal.cliente_id == cliente_id)
-        .order_by(MedicaoCorporal.timestamp_coleta.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    return result.scalars().all()
+    return await _listar_recentes(db, MedicaoCorporal, MedicaoCorporal.timestamp_coleta, cliente_id, skip, limit)
 
 
 # =====================================================
@@ -225,8 +281,10 @@ async def get_medicoes_corporais_by_usuario(
 
 async def create_nutricao(db: AsyncSession, nutricao: NutricaoCreate) -> Nutricao:
     """Criar registro de nutrição"""
-    db_nutricao = Nutricao(**nutricao.dict())
+    dados = nutricao.dict()
+    db_nutricao = Nutricao(**dados)
     db.add(db_nutricao)
+    await aplicar_rollup(db, Nutricao, [dados])
     await db.commit()
     await db.refresh(db_nutricao)
     return db_nutricao
@@ -239,14 +297,7 @@ async def get_nutricao_by_usuario(
     limit: int = 10
 ) -> List[Nutricao]:
     """Buscar histórico de nutrição"""
-    result = await db.execute(
-        select(Nutricao)
-        .where(Nutricao.cliente_id == cliente_id)
-        .order_by(Nutricao.timestamp_coleta.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    return result.scalars().all()
+    return await _listar_recentes(db, Nutricao, Nutricao.timestamp_coleta, cliente_id, skip, limit)
 
 
 # =====================================================
@@ -284,167 +335,91 @@ async def get_ciclo_menstrual_by_usuario(
 # =====================================================
 
 async def get_dashboard_resumo(db: AsyncSession, cliente_id: int, data: date) -> dict:
-    """Resumo diário para dashboard"""
-    hoje_inicio = datetime.combine(data, datetime.min.time())
-    hoje_fim = datetime.combine(data, datetime.max.time())
-    ontem_inicio = hoje_inicio - timedelta(days=1)
-    ontem_fim = hoje_fim - timedelta(days=1)
-    
-    # Passos hoje
-    result_passos = await db.execute(
-        select(func.sum(Atividade.passos))
-        .where(
-            and_(
-                Atividade.cliente_id == cliente_id,
-                Atividade.timestamp_coleta >= hoje_inicio,
-                Atividade.timestamp_coleta <= hoje_fim
-            )
-        )
-    )
-    passos_hoje = result_passos.scalar() or 0
-    
-    # Último BPM e pressão
-    result_sinais = await db.execute(
-        select(SinaisVitaisHealth)
-        .where(SinaisVitaisHealth.cliente_id == cliente_id)
-        .order_by(SinaisVitaisHealth.timestamp_coleta.desc())
-        .limit(1)
-    )
-    ultimo_sinal = result_sinais.scalar_one_or_none()
-    
-    ultimo_bpm = ultimo_sinal.bpm if ultimo_sinal else None
-    ultima_pressao = None
-    if ultimo_sinal and ultimo_sinal.pressao_sistolica and ultimo_sinal.pressao_diastolica:
-        ultima_pressao = f"{ultimo_sinal.pressao_sistolica}/{ultimo_sinal.pressao_diastolica}"
-    
-    # Sono de ontem
-    result_sono = await db.execute(
-        select(Sono)
-        .where(
+    """
+    Resumo diário para dashboard.
+
+    Lê as linhas (cliente_id, data) e (cliente_id, data - 1) do
+    health_daily_rollup, mantido na ingestão: uma única leitura por PK.
+    """
+    ontem = data - timedelta(days=1)
+    result = await db.execute(
+        select(HealthDailyRollup).where(
             and_(
-                Sono.cliente_id == cliente_id,
-                Sono.timestamp_inicio >= ontem_inicio,
-                Sono.timestamp_inicio <= ontem_fim
+                HealthDailyRollup.cliente_id == cliente_id,
+                HealthDailyRollup.data.in_([ontem, data])
             )
         )
-        .order_by(Sono.timestamp_inicio.desc())
-        .limit(1)
     )
-    sono_ontem = result_sono.scalar_one_or_none()
-    horas_sono = (sono_ontem.duracao_total_minutos / 60) if sono_ontem and sono_ontem.duracao_total_minutos else None
-    
-    # Nutrição hoje
-    result_nutricao = await db.execute(
-        select(
-            func.sum(Nutricao.calorias_consumidas),
-            func.sum(Nutricao.ingestao_agua_ml)
-        )
-        .where(
-            and_(
-                Nutricao.cliente_id == cliente_id,
-                Nutricao.timestamp_coleta >= hoje_inicio,
-                Nutricao.timestamp_coleta <= hoje_fim
-            )
+    dias = {r.data: r for r in result.scalars().all()}
+    hoje, dia_anterior = dias.get(data), dias.get(ontem)
+
+    # Último sinal: do dia ou da véspera; sem leitura nos dois dias
+    # (dispositivo parado), cai para a série bruta
+    rollup_sinal = next((d for d in (hoje, dia_anterior) if d and d.ultimo_sinal_em), None)
+    if rollup_sinal:
+        ultimo_bpm = rollup_sinal.ultimo_bpm
+        sistolica, diastolica = rollup_sinal.ultima_pressao_sistolica, rollup_sinal.ultima_pressao_diastolica
+    else:
+        _, amanha_inicio = _intervalo_dia(data)
+        sinais = await _listar_recentes(
+            db, SinaisVitaisHealth, SinaisVitaisHealth.timestamp_coleta, cliente_id,
+            limit=1, data_fim=amanha_inicio
         )
-    )
-    nutricao_row = result_nutricao.one_or_none()
-    calorias_hoje = nutricao_row[0] if nutricao_row and nutricao_row[0] else 0
-    agua_hoje = nutricao_row[1] if nutricao_row and nutricao_row[1] else 0
-    
+        ultimo_sinal = sinais[0] if sinais else None
+        ultimo_bpm = ultimo_sinal.bpm if ultimo_sinal else None
+        sistolica = ultimo_sinal.pressao_sistolica if ultimo_sinal else None
+        diastolica = ultimo_sinal.pressao_diastolica if ultimo_sinal else None
+
+    ultima_pressao = f"{sistolica}/{diastolica}" if sistolica and diastolica else None
+    minutos_sono = dia_anterior.sono_minutos if dia_anterior else None
+
     return {
         "cliente_id": cliente_id,
         "data": data,
-        "passos_hoje": int(passos_hoje),
+        "passos_hoje": int(hoje.passos) if hoje else 0,
         "ultimo_bpm": ultimo_bpm,
         "ultima_pressao": ultima_pressao,
-        "horas_sono_ontem": float(horas_sono) if horas_sono else None,
-        "calorias_consumidas_hoje": int(calorias_hoje),
-        "agua_ml_hoje": int(agua_hoje)
+        "horas_sono_ontem": float(minutos_sono / 60) if minutos_sono else None,
+        "calorias_consumidas_hoje": int(hoje.calorias_consumidas) if hoje else 0,
+        "agua_ml_hoje": int(hoje.agua_ml) if hoje else 0
     }
 
 
 async def get_relatorio_mensal(db: AsyncSession, cliente_id: int, mes: int, ano: int) -> dict:
-    """Relatório mensal para análise de tendências"""
-    # Total de passos
-    result_passos = await db.execute(
-        select(func.sum(Atividade.passos))
-        .where(
-            and_(
-                Atividade.cliente_id == cliente_id,
-                extract('month', Atividade.timestamp_coleta) == mes,
-                extract('year', Atividade.timestamp_coleta) == ano
-            )
-        )
-    )
-    total_passos = result_passos.scalar() or 0
-    
-    # Média de BPM
-    result_bpm = await db.execute(
-        select(func.avg(SinaisVitaisHealth.bpm))
-        .where(
-            and_(
-                SinaisVitaisHealth.cliente_id == cliente_id,
-                SinaisVitaisHealth.bpm.isnot(None),
-                extract('month', SinaisVitaisHealth.timestamp_coleta) == mes,
-                extract('year', SinaisVitaisHealth.timestamp_coleta) == ano
-            )
-        )
-    )
-    media_bpm = result_bpm.scalar()
-    
-    # Média de horas de sono
-    result_sono = await db.execute(
-        select(func.avg(Sono.duracao_total_minutos))
-        .where(
-            and_(
-                Sono.cliente_id == cliente_id,
-                Sono.duracao_total_minutos.isnot(None),
-                extract('month', Sono.timestamp_inicio) == mes,
-                extract('year', Sono.timestamp_inicio) == ano
-            )
-        )
-    )
-    media_minutos_sono = result_sono.scalar()
-    media_horas_sono = (media_minutos_sono / 60) if media_minutos_sono else None
-    
-    # Peso inicial e final
-    result_peso = await db.execute(
-        select(MedicaoCorporal.peso_kg)
-        .where(
-            and_(
-                MedicaoCorporal.cliente_id == cliente_id,
-                MedicaoCorporal.peso_kg.isnot(None),
-                extract('month', MedicaoCorporal.timestamp_coleta) == mes,
-                extract('year', MedicaoCorporal.timestamp_coleta) == ano
-            )
-        )
-        .order_by(MedicaoCorporal.timestamp_coleta.asc())
-    )
-    pesos = result_peso.scalars().all()
-    peso_inicial = pesos[0] if pesos else None
-    peso_final = pesos[-1] if pesos else None
-    
-    # Total de atividades
-    result_count = await db.execute(
-        select(func.count(Atividade.id))
-        .where(
-            and_(
-                Atividade.cliente_id == cliente_id,
-                extract('month', Atividade.timestamp_coleta) == mes,
-                extract('year', Atividade.timestamp_coleta) == ano
-            )
-        )
-    )
-    total_atividades = result_count.scalar() or 0
-    
-    return {
-        "cliente_id": cliente_id,
-        "mes": mes,
-        "ano": ano,
-        "total_passos": int(total_passos),
-        "media_bpm": float(media_bpm) if media_bpm else None,
-        "media_horas_sono": float(media_horas_sono) if media_horas_sono else None,
-        "peso_inicial": peso_inicial,
-        "peso_final": peso_final,
-        "total_atividades": int(total_atividades)
-    }
+    """
+    Relatório mensal para análise de tendências.
+
+    Meses fechados vêm do health_monthly_rollup quando já consolidados;
+    os demais são calculados numa única consulta (CTEs por série, intervalo
+    semiaberto na coluna de particionamento).
+    """
+    if mes_fechado(mes, ano):
+        consolidado = await db.get(HealthMonthlyRollup, (cliente_id, ano, mes))
+        if consolidado:
+            return montar_relatorio_mensal(cliente_id, mes, ano, consolidado)
+
+    inicio, fim = intervalo_mes(mes, ano)
+    linha = (await db.execute(consulta_relatorio_mensal(cliente_id, inicio, fim))).one()
+    return montar_relatorio_mensal(cliente_id, mes, ano, linha)
+
+
+def _utc_ingenuo(valor: Optional[datetime]) -> Optional[datetime]:
+    """Datas com fuso viram UTC sem tzinfo, como as colunas timestamp_coleta"""
+    if valor is None or valor.tzinfo is None:
+        return valor
+    return valor.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+async def get_serie_temporal(
+    db: AsyncSession,
+    cliente_id: int,
+    metrica: str,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    pontos: int = SERIE_PONTOS_PADRAO,
+    metodo: str = "buckets"
+) -> dict:
+    """Série reduzida para gráficos; sem intervalo, os últimos 30 dias"""
+    fim = _utc_ingenuo(data_fim) or datetime.utcnow()
+    inicio = _utc_ingenuo(data_inicio) or fim - timedelta(days=30)
+    return await obter_serie(db, cliente_id, metrica, inicio, fim, pontos, metodo)
@@ -0,0 +1,218 @@
+"""
+Sync delta dos apps (/sync)
+
+O app guarda um token opaco por dispositivo e recebe apenas o que foi
+inserido, alterado ou removido desde então em idosos, medicamentos,
+cuidadores e alertas.
+
+Token: por entidade, o último (atualizado_em, id) entregue e se a entidade
+terminou (sem mais páginas), mais o instante da geração e um hash do
+conjunto de idosos visíveis. Quando uma entidade terminou, a consulta
+seguinte também reenvia o que mudou nos SYNC_MARGEM_SEGUNDOS anteriores à
+geração do token, cobrindo transações que commitaram depois com
+atualizado_em mais antigo; o app aplica tudo como upsert, então repetir
+uma linha é inofensivo.
+
+Registros desativados (ativo = false) e apagados (sync_tombstones) saem em
+"removidos". Mudou o escopo do usuário, o formato do token ou o token é
+mais velho que a retenção dos tombstones: resposta completa com reset=true.
+"""
+import datetime
+import os
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Alerta, Cuidador, Idoso, Medicamento, SyncTombstone
+from schemas import AlertaResponse, CuidadorResponse, IdosoResponse, MedicamentoResponse
+from utils.pagination import decode_cursor, encode_cursor
+
+SYNC_TOKEN_VERSAO = 1
+SYNC_MAX_POR_ENTIDADE = int(os.getenv("SYNC_MAX_POR_ENTIDADE", "500"))
+SYNC_MARGEM_SEGUNDOS = int(os.getenv("SYNC_MARGEM_SEGUNDOS", "30"))
+SYNC_TOMBSTONE_RETENCAO_DIAS = int(os.getenv("SYNC_TOMBSTONE_RETENCAO_DIAS", "90"))
+# Primeira sincronização: só alertas recentes (os antigos não aparecem no app)
+SYNC_ALERTAS_DIAS = int(os.getenv("SYNC_ALERTAS_DIAS", "30"))
+
+PAPEIS_ACESSO_TOTAL = ("admin", "profissional")
+
+
+@dataclass(frozen=True)
+class EntidadeSync:
+    nome: str
+    modelo: Any
+    schema: Any
+    # Coluna com o idoso dono do registro (None: o próprio id)
+    coluna_idoso: Optional[str]
+    # Coluna booleana de soft delete
+    coluna_ativo: Optional[str]
+
+
+ENTIDADES = (
+    EntidadeSync("idosos", Idoso, IdosoResponse, None, "ativo"),
+    EntidadeSync("medicamentos", Medicamento, MedicamentoResponse, "idoso_id", "ativo"),
+    EntidadeSync("cuidadores", Cuidador, CuidadorResponse, "idoso_id", "ativo"),
+    EntidadeSync("alertas", Alerta, AlertaResponse, "idoso_id", None),
+)
+
+# Cursor de cada fonte: [atualizado_em, id, terminou]
+Cursor = Tuple[Optional[datetime.datetime], int, bool]
+_FONTES = tuple(e.nome for e in ENTIDADES) + ("tombstones",)
+
+
+class SyncRepository:
+    """Consultas do sync delta; o token é montado e lido aqui"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def idosos_visiveis(self, user_id: int, role: str) -> Optional[List[int]]:
+        """Ids dos idosos do usuário; None para acesso total (admin/profissional)"""
+        if role in PAPEIS_ACESSO_TOTAL:
+            return None
+        result = await self.db.execute(
+            text("SELECT DISTINCT idoso_id FROM usuarios_idosos WHERE usuario_id = :user_id"),
+            {"user_id": user_id}
+        )
+        return sorted(r[0] for r in result)
+
+    @staticmethod
+    def hash_escopo(idosos: Optional[List[int]]) -> int:
+        if idosos is None:
+            return 0
+        return zlib.crc32(",".join(map(str, idosos)).encode())
+
+    @staticmethod
+    def codificar_token(gerado_em: datetime.datetime, escopo: int, cursores: Dict[str, Cursor]) -> str:
+        valores: List[Any] = [SYNC_TOKEN_VERSAO, gerado_em, escopo]
+        for fonte in _FONTES:
+            valores.extend(cursores[fonte])
+        return encode_cursor(valores)
+
+    @staticmethod
+    def decodificar_token(token: str) -> Optional[Tuple[datetime.datetime, int, Dict[str, Cursor]]]:
+        """None quando o token é de outra versão (o app faz sync completo)"""
+        valores = decode_cursor(token)
+        if len(valores) != 3 + 3 * len(_FONTES) or valores[0] != SYNC_TOKEN_VERSAO:
+            return None
+        cursores = {
+            fonte: tuple(valores[3 + 3 * i: 6 + 3 * i])
+            for i, fonte in enumerate(_FONTES)
+        }
+        return valores[1], valores[2], cursores
+
+    @staticmethod
+    def _depois_do_cursor(coluna_ts, coluna_id, cursor: Cursor, gerado_em: Optional[datetime.datetime]):
+        ts, ultimo_id, terminou = cursor
+        if ts is None:
+            return None
+        condicao = or_(coluna_ts > ts, and_(coluna_ts == ts, coluna_id > ultimo_id))
+        if terminou and gerado_em is not None:
+            condicao = or_(condicao, coluna_ts >= gerado_em - datetime.timedelta(seconds=SYNC_MARGEM_SEGUNDOS))
+        return condicao
+
+    async def _mudancas(
+        self,
+        entidade: EntidadeSync,
+        idosos: Optional[List[int]],
+        cursor: Cursor,
+        gerado_em: Optional[datetime.datetime],
+        agora: datetime.datetime
+    ) -> Tuple[Dict[str, List], Cursor]:
+        modelo = entidade.modelo
+        coluna_idoso = getattr(modelo, entidade.coluna_idoso or "id")
+        query = select(modelo)
+        if idosos is not None:
+            query = query.where(coluna_idoso.in_(idosos))
+
+        depois = self._depois_do_cursor(modelo.atualizado_em, modelo.id, cursor, gerado_em)
+        if depois is not None:
+            query = query.where(depois)
+        else:
+            if entidade.coluna_ativo:
+                # Primeira sincronização: inativos não interessam ao app
+                query = query.where(getattr(modelo, entidade.coluna_ativo) == True)  # noqa: E712
+            if modelo is Alerta:
+                query = query.where(Alerta.criado_em >= agora - datetime.timedelta(days=SYNC_ALERTAS_DIAS))
+
+        result = await self.db.execute(
+            query.order_by(modelo.atualizado_em, modelo.id).limit(SYNC_MAX_POR_ENTIDADE + 1)
+        )
+        linhas = result.scalars().all()
+        terminou = len(linhas) <= SYNC_MAX_POR_ENTIDADE
+        linhas = linhas[:SYNC_MAX_POR_ENTIDADE]
+
+        alterados, removidos = [], []
+        for linha in linhas:
+            if entidade.coluna_ativo and getattr(linha, entidade.coluna_ativo) is False:
+                removidos.append(linha.id)
+            else:
+                alterados.append(entidade.schema.model_validate(linha).model_dump(mode="json"))
+
+        if linhas:
+            novo_cursor = (linhas[-1].atualizado_em, linhas[-1].id, terminou)
+        else:
+            novo_cursor = (cursor[0] or agora, cursor[1], True)
+        return {"alterados": alterados, "removidos": removidos}, novo_cursor
+
+    async def _tombstones(
+        self,
+        idosos: Optional[List[int]],
+        cursor: Cursor,
+        gerado_em: Optional[datetime.datetime],
+        agora: datetime.datetime
+    ) -> Tuple[List[SyncTombstone], Cursor]:
+        if cursor[0] is None:
+            # Sem token não há o que apagar no app: só posiciona o cursor
+            return [], (agora, 0, True)
+
+        query = select(SyncTombstone).where(
+            self._depois_do_cursor(SyncTombstone.removido_em, SyncTombstone.id, cursor, gerado_em)
+        )
+        if idosos is not None:
+            query = query.where(SyncTombstone.idoso_id.in_(idosos))
+        result = await self.db.execute(
+            query.order_by(SyncTombstone.removido_em, SyncTombstone.id).limit(SYNC_MAX_POR_ENTIDADE + 1)
+        )
+        linhas = result.scalars().all()
+        terminou = len(linhas) <= SYNC_MAX_POR_ENTIDADE
+        linhas = linhas[:SYNC_MAX_POR_ENTIDADE]
+        if linhas:
+            return linhas, (linhas[-1].removido_em, linhas[-1].id, terminou)
+        return [], (cursor[0], cursor[1], True)
+
+    async def sincronizar(self, user_id: int, role: str, token: Optional[str] = None) -> Dict[str, Any]:
+        """Delta desde `token` (ou tudo, sem token) e o próximo token"""
+        agora = datetime.datetime.now()
+        idosos = await self.idosos_visiveis(user_id, role)
+        escopo = self.hash_escopo(idosos)
+
+        gerado_em: Optional[datetime.datetime] = None
+        cursores: Dict[str, Cursor] = {fonte: (None, 0, True) for fonte in _FONTES}
+        reset = False
+        if token:
+            lido = self.decodificar_token(token)
+            retencao = agora - datetime.timedelta(days=SYNC_TOMBSTONE_RETENCAO_DIAS)
+            if lido is None or lido[1] != escopo or lido[0] < retencao:
+                reset = True
+            else:
+                gerado_em, _, cursores = lido
+
+        resposta: Dict[str, Any] = {"reset": reset, "gerado_em": agora}
+        novos: Dict[str, Cursor] = {}
+        for entidade in ENTIDADES:
+            resposta[entidade.nome], novos[entidade.nome] = await self._mudancas(
+                entidade, idosos, cursores[entidade.nome], gerado_em, agora
+            )
+
+        tombstones, novos["tombstones"] = await self._tombstones(idosos, cursores["tombstones"], gerado_em, agora)
+        for tombstone in tombstones:
+            if tombstone.entidade in resposta:
+                resposta[tombstone.entidade]["removidos"].append(tombstone.registro_id)
+
+        resposta["tem_mais"] = not all(c[2] for c in novos.values())
+        resposta["token"] = self.codificar_token(agora, escopo, novos)
+        return resposta
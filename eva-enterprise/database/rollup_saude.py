@@ -0,0 +1,334 @@
+"""
+Rollup diário das séries de saúde (health_daily_rollup)
+
+- aplicar_rollup(): chamado pelos caminhos de ingestão, na mesma transação
+  do INSERT, com as linhas efetivamente gravadas. Soma contadores e mantém
+  "última leitura do dia" via INSERT ... ON CONFLICT DO UPDATE.
+- reconstruir_rollups() / backfill_rollups(): recalculam a partir dos dados
+  brutos, por faixas de clientes em paralelo (uma sessão por faixa).
+- consulta_relatorio_mensal(): relatório do mês numa única consulta; meses
+  fechados são consolidados em health_monthly_rollup (task Celery) e
+  invalidados aqui quando chega dado atrasado.
+"""
+import asyncio
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, func, or_, select, true, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.ingestao_bulk import insert_do_dialeto
+from database.models import (
+    Atividade, HealthDailyRollup, HealthMonthlyRollup, MedicaoCorporal,
+    Nutricao, SinaisVitaisHealth, Sono, Usuario
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_LOTE_CLIENTES = 500
+ROLLUP_PARALELISMO = 4
+
+_CONTADORES = ("passos", "total_atividades", "calorias_consumidas", "agua_ml")
+_ULTIMO_SINAL = ("ultimo_bpm", "ultima_pressao_sistolica", "ultima_pressao_diastolica")
+_ULTIMO_SONO = ("sono_minutos",)
+# Séries que entram no relatório mensal consolidado
+_SERIES_RELATORIO = (Atividade, SinaisVitaisHealth, Sono, MedicaoCorporal)
+
+Chave = Tuple[int, date]
+
+
+def _como_data(valor) -> date:
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, str):
+        return date.fromisoformat(valor[:10])
+    return valor
+
+
+def intervalo_mes(mes: int, ano: int) -> Tuple[datetime, datetime]:
+    """Intervalo semiaberto [1º dia do mês, 1º dia do mês seguinte)"""
+    inicio = datetime(ano, mes, 1)
+    fim = datetime(ano + 1, 1, 1) if mes == 12 else datetime(ano, mes + 1, 1)
+    return inicio, fim
+
+
+def mes_fechado(mes: int, ano: int, hoje: Optional[date] = None) -> bool:
+    hoje = hoje or date.today()
+    return (ano, mes) < (hoje.year, hoje.month)
+
+
+def _linha_vazia(cliente_id: int, data: date) -> Dict[str, Any]:
+    linha = {"cliente_id": cliente_id, "data": data}
+    linha.update({c: 0 for c in _CONTADORES})
+    linha.update({"ultimo_sinal_em": None, "sono_inicio": None})
+    linha.update({c: None for c in _ULTIMO_SINAL + _ULTIMO_SONO})
+    return linha
+
+
+def _somar(acc: Dict[Chave, Dict[str, Any]], cliente_id: int, data: date, **valores):
+    linha = acc.setdefault((cliente_id, data), _linha_vazia(cliente_id, data))
+    for campo, valor in valores.items():
+        linha[campo] += valor or 0
+
+
+def _ultimo(acc: Dict[Chave, Dict[str, Any]], cliente_id: int, data: date, campo_ts: str, ts, **valores):
+    linha = acc.setdefault((cliente_id, data), _linha_vazia(cliente_id, data))
+    if linha[campo_ts] is None or ts >= linha[campo_ts]:
+        linha[campo_ts] = ts
+        linha.update(valores)
+
+
+def calcular_deltas(modelo, linhas: Iterable[Dict[str, Any]]) -> Dict[Chave, Dict[str, Any]]:
+    """Contribuição de registros brutos recém-gravados para o rollup"""
+    acc: Dict[Chave, Dict[str, Any]] = {}
+    for r in linhas:
+        if modelo is Atividade:
+            _somar(acc, r["cliente_id"], _como_data(r["timestamp_coleta"]),
+                   passos=r.get("passos"), total_atividades=1)
+        elif modelo is Nutricao:
+            _somar(acc, r["cliente_id"], _como_data(r["timestamp_coleta"]),
+                   calorias_consumidas=r.get("calorias_consumidas"), agua_ml=r.get("ingestao_agua_ml"))
+        elif modelo is SinaisVitaisHealth:
+            _ultimo(acc, r["cliente_id"], _como_data(r["timestamp_coleta"]), "ultimo_sinal_em", r["timestamp_coleta"],
+                    ultimo_bpm=r.get("bpm"),
+                    ultima_pressao_sistolica=r.get("pressao_sistolica"),
+                    ultima_pressao_diastolica=r.get("pressao_diastolica"))
+        elif modelo is Sono and r.get("timestamp_inicio") is not None:
+            _ultimo(acc, r["cliente_id"], _como_data(r["timestamp_inicio"]), "sono_inicio", r["timestamp_inicio"],
+                    sono_minutos=r.get("duracao_total_minutos"))
+    return acc
+
+
+async def _upsert(db: AsyncSession, linhas: List[Dict[str, Any]]):
+    if not linhas:
+        return
+    stmt, _ = insert_do_dialeto(db, HealthDailyRollup)
+    stmt = stmt.values(linhas)
+    t, novo = HealthDailyRollup.__table__.c, stmt.excluded
+
+    def _mais_recente(campo_ts):
+        return and_(
+            getattr(novo, campo_ts).isnot(None),
+            or_(t[campo_ts].is_(None), getattr(novo, campo_ts) >= t[campo_ts])
+        )
+
+    sinal_novo = _mais_recente("ultimo_sinal_em")
+    sono_novo = _mais_recente("sono_inicio")
+
+    set_ = {c: t[c] + getattr(novo, c) for c in _CONTADORES}
+    for c in ("ultimo_sinal_em",) + _ULTIMO_SINAL:
+        set_[c] = case((sinal_novo, getattr(novo, c)), else_=t[c])
+    for c in ("sono_inicio",) + _ULTIMO_SONO:
+        set_[c] = case((sono_novo, getattr(novo, c)), else_=t[c])
+    set_["atualizado_em"] = datetime.utcnow()
+
+    await db.execute(stmt.on_conflict_do_update(index_elements=["cliente_id", "data"], set_=set_))
+
+
+async def aplicar_rollup(db: AsyncSession, modelo, linhas: Iterable[Dict[str, Any]]):
+    """
+    Atualiza o rollup com registros recém-gravados (sem commit: roda na
+    transação da ingestão, então um rollback desfaz os dois).
+    """
+    deltas = calcular_deltas(modelo, linhas)
+    if deltas:
+        await _upsert(db, sorted(deltas.values(), key=lambda l: (l["cliente_id"], l["data"])))
+    await invalidar_meses_consolidados(db, modelo, linhas)
+
+
+async def invalidar_meses_consolidados(db: AsyncSession, modelo, linhas: Iterable[Dict[str, Any]]):
+    """Dado atrasado em mês já consolidado: remove o relatório mensal pronto"""
+    if modelo not in _SERIES_RELATORIO:
+        return
+    campo = "timestamp_inicio" if modelo is Sono else "timestamp_coleta"
+    meses = {
+        (r["cliente_id"], ts.year, ts.month)
+        for r in linhas
+        if (ts := r.get(campo)) is not None and mes_fechado(ts.month, ts.year)
+    }
+    if meses:
+        await db.execute(
+            delete(HealthMonthlyRollup).where(
+                tuple_(HealthMonthlyRollup.cliente_id, HealthMonthlyRollup.ano, HealthMonthlyRollup.mes).in_(meses)
+            )
+        )
+
+
+# =====================================================
+# RELATÓRIO MENSAL
+# =====================================================
+
+def consulta_relatorio_mensal(cliente_id: int, inicio: datetime, fim: datetime):
+    """
+    Relatório do mês numa única ida ao banco: um CTE agregado por série,
+    todos com intervalo semiaberto na coluna de particionamento (sargável,
+    com pruning), e peso inicial/final por first_value sobre a janela.
+    Funciona igual em sessão síncrona (tasks) e assíncrona.
+    """
+    def _no_mes(modelo, coluna):
+        return and_(modelo.cliente_id == cliente_id, coluna >= inicio, coluna < fim)
+
+    atividade = select(
+        func.coalesce(func.sum(Atividade.passos), 0).label("total_passos"),
+        func.count(Atividade.id).label("total_atividades"),
+    ).where(_no_mes(Atividade, Atividade.timestamp_coleta)).cte("atividade_mes")
+
+    sinais = select(
+        func.avg(SinaisVitaisHealth.bpm).filter(SinaisVitaisHealth.bpm.isnot(None)).label("media_bpm"),
+    ).where(_no_mes(SinaisVitaisHealth, SinaisVitaisHealth.timestamp_coleta)).cte("sinais_mes")
+
+    sono = select(
+        func.avg(Sono.duracao_total_minutos).filter(Sono.duracao_total_minutos.isnot(None)).label("media_minutos_sono"),
+    ).where(_no_mes(Sono, Sono.timestamp_inicio)).cte("sono_mes")
+
+    peso = select(
+        func.first_value(MedicaoCorporal.peso_kg).over(
+            order_by=(MedicaoCorporal.timestamp_coleta.asc(), MedicaoCorporal.id.asc())
+        ).label("peso_inicial"),
+        func.first_value(MedicaoCorporal.peso_kg).over(
+            order_by=(MedicaoCorporal.timestamp_coleta.desc(), MedicaoCorporal.id.desc())
+        ).label("peso_final"),
+    ).where(
+        _no_mes(MedicaoCorporal, MedicaoCorporal.timestamp_coleta),
+        MedicaoCorporal.peso_kg.isnot(None)
+    ).limit(1).cte("peso_mes")
+
+    return (
+        select(
+            atividade.c.total_passos,
+            atividade.c.total_atividades,
+            sinais.c.media_bpm,
+            sono.c.media_minutos_sono,
+            select(peso.c.peso_inicial).scalar_subquery().label("peso_inicial"),
+            select(peso.c.peso_final).scalar_subquery().label("peso_final"),
+        )
+        .select_from(atividade.join(sinais, true()).join(sono, true()))
+    )
+
+
+def montar_relatorio_mensal(cliente_id: int, mes: int, ano: int, linha) -> dict:
+    """Formata a linha da consulta (ou do HealthMonthlyRollup) para a resposta"""
+    minutos_sono = linha.media_minutos_sono
+    return {
+        "cliente_id": cliente_id,
+        "mes": mes,
+        "ano": ano,
+        "total_passos": int(linha.total_passos or 0),
+        "media_bpm": float(linha.media_bpm) if linha.media_bpm else None,
+        "media_horas_sono": float(minutos_sono) / 60 if minutos_sono else None,
+        "peso_inicial": linha.peso_inicial,
+        "peso_final": linha.peso_final,
+        "total_atividades": int(linha.total_atividades or 0)
+    }
+
+
+def clientes_com_dados_no_mes(inicio: datetime, fim: datetime):
+    """Clientes a consolidar: presentes no rollup diário ou com medição no mês"""
+    return select(HealthDailyRollup.cliente_id).where(
+        HealthDailyRollup.data >= inicio.date(), HealthDailyRollup.data < fim.date()
+    ).union(
+        select(MedicaoCorporal.cliente_id).where(
+            MedicaoCorporal.timestamp_coleta >= inicio, MedicaoCorporal.timestamp_coleta < fim
+        )
+    )
+
+
+# =====================================================
+# BACKFILL
+# =====================================================
+
+def _ultimo_por_dia(modelo, coluna_ts, colunas, cliente_ids, desde):
+    dia = func.date(coluna_ts)
+    ordem = func.row_number().over(
+        partition_by=(modelo.cliente_id, dia),
+        order_by=coluna_ts.desc()
+    ).label("ordem")
+    filtros = [modelo.cliente_id.in_(cliente_ids), coluna_ts.isnot(None)]
+    if desde:
+        filtros.append(coluna_ts >= datetime.combine(desde, datetime.min.time()))
+    sub = select(modelo.cliente_id, coluna_ts.label("ts"), *colunas, ordem).where(*filtros).subquery()
+    return select(sub).where(sub.c.ordem == 1)
+
+
+async def reconstruir_rollups(db: AsyncSession, cliente_ids: List[int], desde: Optional[date] = None):
+    """Recalcula o rollup dos clientes informados a partir dos dados brutos (sem commit)"""
+    acc: Dict[Chave, Dict[str, Any]] = {}
+    inicio = datetime.combine(desde, datetime.min.time()) if desde else None
+
+    def _janela(coluna):
+        filtros = [coluna.isnot(None)]
+        if inicio:
+            filtros.append(coluna >= inicio)
+        return filtros
+
+    dia = func.date(Atividade.timestamp_coleta)
+    for cliente_id, d, passos, total in await db.execute(
+        select(Atividade.cliente_id, dia, func.sum(Atividade.passos), func.count(Atividade.id))
+        .where(Atividade.cliente_id.in_(cliente_ids), *_janela(Atividade.timestamp_coleta))
+        .group_by(Atividade.cliente_id, dia)
+    ):
+        _somar(acc, cliente_id, _como_data(d), passos=passos, total_atividades=total)
+
+    dia = func.date(Nutricao.timestamp_coleta)
+    for cliente_id, d, calorias, agua in await db.execute(
+        select(Nutricao.cliente_id, dia, func.sum(Nutricao.calorias_consumidas), func.sum(Nutricao.ingestao_agua_ml))
+        .where(Nutricao.cliente_id.in_(cliente_ids), *_janela(Nutricao.timestamp_coleta))
+        .group_by(Nutricao.cliente_id, dia)
+    ):
+        _somar(acc, cliente_id, _como_data(d), calorias_consumidas=calorias, agua_ml=agua)
+
+    sinais = _ultimo_por_dia(
+        SinaisVitaisHealth, SinaisVitaisHealth.timestamp_coleta,
+        [SinaisVitaisHealth.bpm, SinaisVitaisHealth.pressao_sistolica, SinaisVitaisHealth.pressao_diastolica],
+        cliente_ids, desde
+    )
+    for r in (await db.execute(sinais)).mappings():
+        _ultimo(acc, r["cliente_id"], _como_data(r["ts"]), "ultimo_sinal_em", r["ts"],
+                ultimo_bpm=r["bpm"],
+                ultima_pressao_sistolica=r["pressao_sistolica"],
+                ultima_pressao_diastolica=r["pressao_diastolica"])
+
+    sono = _ultimo_por_dia(Sono, Sono.timestamp_inicio, [Sono.duracao_total_minutos], cliente_ids, desde)
+    for r in (await db.execute(sono)).mappings():
+        _ultimo(acc, r["cliente_id"], _como_data(r["ts"]), "sono_inicio", r["ts"],
+                sono_minutos=r["duracao_total_minutos"])
+
+    remover = delete(HealthDailyRollup).where(HealthDailyRollup.cliente_id.in_(cliente_ids))
+    if desde:
+        remover = remover.where(HealthDailyRollup.data >= desde)
+    await db.execute(remover)
+
+    linhas = sorted(acc.values(), key=lambda l: (l["cliente_id"], l["data"]))
+    # Fatias para respeitar o limite de parâmetros por statement
+    for i in range(0, len(linhas), 1000):
+        await _upsert(db, linhas[i:i + 1000])
+    return len(linhas)
+
+
+async def backfill_rollups(
+    session_factory,
+    desde: Optional[date] = None,
+    lote_clientes: int = ROLLUP_LOTE_CLIENTES,
+    paralelismo: int = ROLLUP_PARALELISMO
+) -> Dict[str, Any]:
+    """
+    Reconstrói o rollup de todos os clientes em faixas de `lote_clientes`,
+    até `paralelismo` faixas simultâneas (cada uma na sua sessão/conexão).
+    """
+    async with session_factory() as db:
+        ids = (await db.execute(select(Usuario.id).order_by(Usuario.id))).scalars().all()
+
+    faixas = [ids[i:i + lote_clientes] for i in range(0, len(ids), lote_clientes)]
+    semaforo = asyncio.Semaphore(paralelismo)
+
+    async def _processar(faixa: List[int]) -> int:
+        async with semaforo:
+            async with session_factory() as db:
+                dias = await reconstruir_rollups(db, faixa, desde)
+                await db.commit()
+                logger.info(f"Rollup reconstruído: clientes {faixa[0]}..{faixa[-1]} ({dias} dias)")
+                return dias
+
+    dias = await asyncio.gather(*(_processar(f) for f in faixas))
+    return {"clientes": len(ids), "faixas": len(faixas), "dias": sum(dias)}
@@ -0,0 +1,225 @@
+"""
+Séries temporais de saúde reduzidas para gráficos
+
+Para qualquer intervalo devolve no máximo N pontos:
+- buckets: min/média/máx/soma/contagem por bucket de largura fixa, agregado
+  no banco (date_bin no PostgreSQL; índice do bucket calculado em segundos
+  no SQLite)
+- lttb: Largest-Triangle-Three-Buckets sobre os pontos brutos, preserva
+  picos e vales visualmente; vetorizado com NumPy por bucket. Acima de
+  SERIE_LTTB_MAX_BRUTOS pontos o LTTB roda sobre buckets intermediários
+  agregados no banco, para não trazer a série inteira para a memória.
+
+Sempre com intervalo semiaberto [inicio, fim) na coluna de particionamento.
+"""
+import math
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Integer, and_, cast, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Atividade, SinaisVitaisHealth
+
+SERIE_PONTOS_PADRAO = 500
+SERIE_MAX_PONTOS = int(os.getenv("SERIE_MAX_PONTOS", "2000"))
+SERIE_LTTB_MAX_BRUTOS = int(os.getenv("SERIE_LTTB_MAX_BRUTOS", "200000"))
+# Buckets intermediários por ponto final quando o LTTB parte de agregados
+_LTTB_FATOR_PRE_AGREGACAO = 8
+
+METODOS = ("buckets", "lttb")
+
+
+@dataclass(frozen=True)
+class Metrica:
+    modelo: Any
+    coluna: str
+
+
+METRICAS: Dict[str, Metrica] = {
+    "bpm": Metrica(SinaisVitaisHealth, "bpm"),
+    "bpm_repouso": Metrica(SinaisVitaisHealth, "bpm_repouso"),
+    "pressao_sistolica": Metrica(SinaisVitaisHealth, "pressao_sistolica"),
+    "pressao_diastolica": Metrica(SinaisVitaisHealth, "pressao_diastolica"),
+    "spo2": Metrica(SinaisVitaisHealth, "spo2"),
+    "glicose_sangue": Metrica(SinaisVitaisHealth, "glicose_sangue"),
+    "frequencia_respiratoria": Metrica(SinaisVitaisHealth, "frequencia_respiratoria"),
+    "passos": Metrica(Atividade, "passos"),
+    "calorias_queimadas": Metrica(Atividade, "calorias_queimadas"),
+    "distancia_km": Metrica(Atividade, "distancia_km"),
+}
+
+
+def largura_bucket(inicio: datetime, fim: datetime, pontos: int) -> timedelta:
+    """Menor largura em segundos inteiros que cobre [inicio, fim) com `pontos` buckets"""
+    segundos = (fim - inicio).total_seconds()
+    return timedelta(seconds=max(1, math.ceil(segundos / pontos)))
+
+
+def _expr_bucket(dialeto: str, coluna, inicio: datetime, largura: timedelta):
+    if dialeto == "postgresql":
+        return func.date_bin(literal(largura), coluna, literal(inicio))
+    segundos = cast(func.strftime("%s", coluna), Integer) - cast(func.strftime("%s", literal(inicio)), Integer)
+    return segundos // int(largura.total_seconds())
+
+
+def consulta_buckets(metrica: Metrica, cliente_id: int, inicio: datetime, fim: datetime,
+                     largura: timedelta, dialeto: str):
+    """min/avg/max/sum/count por bucket, ordenado pelo início do bucket"""
+    modelo = metrica.modelo
+    valor = getattr(modelo, metrica.coluna)
+    bucket = _expr_bucket(dialeto, modelo.timestamp_coleta, inicio, largura).label("bucket")
+    return (
+        select(
+            bucket,
+            func.min(valor).label("minimo"),
+            func.avg(valor).label("media"),
+            func.max(valor).label("maximo"),
+            func.sum(valor).label("soma"),
+            func.count(valor).label("contagem"),
+        )
+        .where(
+            and_(
+                modelo.cliente_id == cliente_id,
+                modelo.timestamp_coleta >= inicio,
+                modelo.timestamp_coleta < fim,
+                valor.isnot(None),
+            )
+        )
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+
+
+def _inicio_bucket(bucket, inicio: datetime, largura: timedelta) -> datetime:
+    # date_bin já devolve o timestamp; no SQLite vem o índice do bucket
+    if isinstance(bucket, datetime):
+        return bucket
+    return inicio + int(bucket) * largura
+
+
+def _numero(valor) -> Optional[float]:
+    return float(valor) if valor is not None else None
+
+
+def lttb(x: np.ndarray, y: np.ndarray, pontos: int) -> np.ndarray:
+    """
+    Índices escolhidos pelo Largest-Triangle-Three-Buckets.
+
+    Mantém o primeiro e o último ponto; em cada bucket intermediário escolhe o
+    ponto que forma o maior triângulo com o ponto já escolhido no bucket
+    anterior e a média do bucket seguinte. As médias saem de somas
+    acumuladas e a área é calculada para o bucket inteiro de uma vez.
+    """
+    n = len(x)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+
+    passo = (n - 2) / (pontos - 2)
+    limites = (np.floor(np.arange(pontos) * passo) + 1).astype(np.int64)
+    limites[-1] = n - 1
+    soma_x = np.concatenate(([0.0], np.cumsum(x)))
+    soma_y = np.concatenate(([0.0], np.cumsum(y)))
+
+    escolhidos = np.empty(pontos, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    a = 0
+    for i in range(pontos - 2):
+        ini, fim = limites[i], limites[i + 1]
+        # Média do próximo bucket (o último ponto fecha a série)
+        prox_ini = fim
+        prox_fim = limites[i + 2] if i + 2 < pontos - 1 else n
+        qtd = prox_fim - prox_ini
+        media_x = (soma_x[prox_fim] - soma_x[prox_ini]) / qtd
+        media_y = (soma_y[prox_fim] - soma_y[prox_ini]) / qtd
+
+        xs, ys = x[ini:fim], y[ini:fim]
+        areas = np.abs((x[a] - media_x) * (ys - y[a]) - (x[a] - xs) * (media_y - y[a]))
+        a = ini + int(np.argmax(areas))
+        escolhidos[i + 1] = a
+    return escolhidos
+
+
+async def _buckets(db: AsyncSession, metrica: Metrica, cliente_id: int, inicio: datetime,
+                   fim: datetime, largura: timedelta, dialeto: str) -> List[Dict[str, Any]]:
+    result = await db.execute(consulta_buckets(metrica, cliente_id, inicio, fim, largura, dialeto))
+    return [
+        {
+            "timestamp": _inicio_bucket(r.bucket, inicio, largura),
+            "valor": _numero(r.media),
+            "minimo": _numero(r.minimo),
+            "maximo": _numero(r.maximo),
+            "soma": _numero(r.soma),
+            "contagem": r.contagem,
+        }
+        for r in result
+    ]
+
+
+async def _pontos_brutos(db: AsyncSession, metrica: Metrica, cliente_id: int,
+                         inicio: datetime, fim: datetime) -> Optional[List[Tuple[datetime, Any]]]:
+    modelo = metrica.modelo
+    valor = getattr(modelo, metrica.coluna)
+    filtro = and_(
+        modelo.cliente_id == cliente_id,
+        modelo.timestamp_coleta >= inicio,
+        modelo.timestamp_coleta < fim,
+        valor.isnot(None),
+    )
+    # Acima do limite devolve None e o chamador pré-agrega no banco
+    total = (await db.execute(select(func.count()).select_from(modelo).where(filtro))).scalar()
+    if total > SERIE_LTTB_MAX_BRUTOS:
+        return None
+    result = await db.execute(
+        select(modelo.timestamp_coleta, valor).where(filtro).order_by(modelo.timestamp_coleta)
+    )
+    return result.all()
+
+
+async def obter_serie(
+    db: AsyncSession,
+    cliente_id: int,
+    metrica: str,
+    inicio: datetime,
+    fim: datetime,
+    pontos: int = SERIE_PONTOS_PADRAO,
+    metodo: str = "buckets"
+) -> Dict[str, Any]:
+    """Série de `metrica` em [inicio, fim) com no máximo `pontos` pontos"""
+    m = METRICAS[metrica]
+    pontos = max(3, min(pontos, SERIE_MAX_PONTOS))
+    dialeto = db.get_bind().dialect.name
+    largura = largura_bucket(inicio, fim, pontos)
+
+    if metodo == "buckets":
+        serie = await _buckets(db, m, cliente_id, inicio, fim, largura, dialeto)
+    else:
+        brutos = await _pontos_brutos(db, m, cliente_id, inicio, fim)
+        if brutos is None:
+            # Série longa demais: LTTB sobre médias de buckets mais finos
+            fina = largura_bucket(inicio, fim, pontos * _LTTB_FATOR_PRE_AGREGACAO)
+            brutos = [
+                (p["timestamp"], p["valor"])
+                for p in await _buckets(db, m, cliente_id, inicio, fim, fina, dialeto)
+            ]
+        serie = []
+        if brutos:
+            ts = [t for t, _ in brutos]
+            x = np.fromiter(((t - inicio).total_seconds() for t in ts), dtype=np.float64, count=len(ts))
+            y = np.fromiter((float(v) for _, v in brutos), dtype=np.float64, count=len(brutos))
+            for i in lttb(x, y, pontos):
+                serie.append({"timestamp": ts[i], "valor": float(y[i]),
+                              "minimo": None, "maximo": None, "soma": None, "contagem": None})
+
+    return {
+        "cliente_id": cliente_id,
+        "metrica": metrica,
+        "metodo": metodo,
+        "data_inicio": inicio,
+        "data_fim": fim,
+        "largura_bucket_segundos": int(largura.total_seconds()),
+        "pontos": serie,
+    }
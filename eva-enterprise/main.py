@@ -5,12 +5,22 @@ import subprocess
 from dotenv import load_dotenv
 
 # FastAPI Mod
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 # Banco de dados
 from sqlalchemy.ext.asyncio import AsyncSession
-from database.connection import get_db
+from database.connection import (
+    get_db, get_pool_status, get_read_pool_status, mark_recent_write, SAFE_METHODS
+)
+from utils.cache import cache
+from services.audit_service import auditoria
+from services.despacho_emergencia import metricas_emergencia
+from services.nlp_lote import encerrar_pool as encerrar_pool_nlp
+from utils.compressao import CompressaoMiddleware
+from utils.etag import aplicar_etag
+from utils.respostas import RespostaJSONRapida
+from utils.security import estado_pool_senhas
 
 # Import routers
 from api import (
@@ -46,6 +56,7 @@ from api import (
     routes_finops,  # ← NOVO
     # Mental Health Routes
     routes_mental_health,  # ← NOVO (Sistema de Saúde Mental)
+    routes_sync,
     # routes_medication  # ← DESABILITADO (modelos Medication* não existem ainda)
 )
 
@@ -65,7 +76,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="EVA Enterprise API",
     description="API assíncrona para gerenciamento de cuidados com idosos",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=RespostaJSONRapida
 )
 
 # ======================
@@ -82,6 +94,38 @@ app.add_middleware(
 )
 
 
+# ======================
+# READ-YOUR-WRITES (réplica de leitura)
+# ======================
+# Após uma escrita bem-sucedida, as leituras do mesmo cliente vão ao primário
+# por alguns segundos, para não ler da réplica um estado anterior à escrita.
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    response = await call_next(request)
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        mark_recent_write(request)
+    return response
+
+
+# ======================
+# GET CONDICIONAL (ETag / If-None-Match)
+# ======================
+# Clientes que fazem polling recebem 304 sem corpo quando nada mudou.
+# Rotas com coluna de versão usam utils.etag.exigir_modificado e nem carregam a linha.
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    response = await call_next(request)
+    return await aplicar_etag(request, response)
+
+
+# ======================
+# COMPRESSÃO (brotli/gzip)
+# ======================
+# Registrada por último para ficar por fora: o ETag é calculado sobre o corpo
+# sem compressão e respostas pequenas (< COMPRESSAO_MINIMO_BYTES) saem como estão.
+app.add_middleware(CompressaoMiddleware)
+
+
 # ======================
 # ROTAS (Todas com prefixo /api/v1/)
 # ======================
@@ -102,6 +146,7 @@ app.include_router(routes_historico.router, prefix="/api/v1/historico", tags=["H
 app.include_router(routes_finops.router, prefix="/api/v1/finops", tags=["FinOps"])
 app.include_router(routes_assinaturas.router, prefix="/api/v1/assinaturas", tags=["Assinaturas"])
 app.include_router(routes_ia.router, prefix="/api/v1/ia", tags=["IA Avançada"])
+app.include_router(routes_sync.router, prefix="/api/v1/sync", tags=["Sync"])
 
 # Sistema de Saúde e Bem-Estar
 app.include_router(routes_usuarios_saude.router, prefix="/api/v1/saude/usuarios", tags=["Saúde - Usuários"])
@@ -187,6 +232,16 @@ logging.getLogger().setLevel(logging.INFO)
 async def startup_event():
     logger.info("✅ Sistema de Logs em Memória INICIADO com sucesso!")
     logger.info(f"📍 Monitorando ambiente: Cloud Run / Docker")
+    await cache.iniciar()
+    await auditoria.iniciar()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await auditoria.encerrar()
+    await cache.encerrar()
+    encerrar_pool_nlp()
+
 
 @app.get("/sistema/logs")
 async def obter_logs(linhas: int = Query(50, ge=1, le=500)):
@@ -221,6 +276,24 @@ async def obter_logs(linhas: int = Query(50, ge=1, le=500)):
         return {"erro": f"Falha interna ao ler logs: {str(e)}"}
 
 
+@app.get("/sistema/metricas")
+async def obter_metricas():
+    """
+    Métricas técnicas do processo: estado do pool de conexões e tempo de
+    espera por conexão (checkout). Espera alta indica pool subdimensionado.
+    "emergencia" traz o SLO trigger -> primeira notificação do protocolo.
+    """
+    return {
+        "servico": "eva-backend",
+        "db_pool": get_pool_status(),
+        "db_read_pool": get_read_pool_status(),
+        "cache": cache.estatisticas(),
+        "senhas_pool": estado_pool_senhas(),
+        "auditoria": auditoria.estatisticas(),
+        "emergencia": metricas_emergencia.snapshot()
+    }
+
+
 # ==========================
 # INÍCIO
 # ==========================
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import List, Optional, Any, Dict
 from datetime import datetime, date
 from decimal import Decimal
@@ -340,6 +340,7 @@ class PadraoComportamentoResponse(BaseModel):
     ocorrencias: int
     dados_estatisticos: Optional[Dict[str, Any]]
     ativo: bool
+    origem: Optional[str] = None
     criado_em: datetime
     atualizado_em: datetime
     
@@ -428,10 +429,9 @@ class AtividadeResponse(AtividadeCreate):
     model_config = ConfigDict(from_attributes=True)
 
 class AtividadeBulkCreate(BaseModel):
-    registros: List[AtividadeCreate]
-    
-    class Config:
-        max_items = 100  # Limite para evitar timeout
+    # Validados registro a registro (AtividadeCreate) em database/ingestao_bulk.py,
+    # para que um item inválido não derrube o lote inteiro
+    registros: List[Dict[str, Any]]
 
 
 # --- Sinais Vitais ---
@@ -447,24 +447,28 @@ class SinaisVitaisHealthCreate(BaseModel):
     timestamp_coleta: datetime
     
     # Validações
+    @field_validator('spo2')
     @classmethod
     def validate_spo2(cls, v):
         if v is not None and (v < 0 or v > 100):
             raise ValueError('SpO2 deve estar entre 0 e 100')
         return v
     
+    @field_validator('bpm')
     @classmethod
     def validate_bpm(cls, v):
         if v is not None and (v < 30 or v > 250):
             raise ValueError('BPM deve estar entre 30 e 250')
         return v
     
+    @field_validator('pressao_sistolica')
     @classmethod
     def validate_pressao_sistolica(cls, v):
         if v is not None and (v < 50 or v > 250):
             raise ValueError('Pressão sistólica deve estar entre 50 e 250')
         return v
     
+    @field_validator('pressao_diastolica')
     @classmethod
     def validate_pressao_diastolica(cls, v):
         if v is not None and (v < 30 or v > 150):
@@ -477,10 +481,42 @@ class SinaisVitaisHealthResponse(SinaisVitaisHealthCreate):
     model_config = ConfigDict(from_attributes=True)
 
 class SinaisVitaisHealthBulkCreate(BaseModel):
-    registros: List[SinaisVitaisHealthCreate]
-    
-    class Config:
-        max_items = 100
+    # Validados registro a registro (SinaisVitaisHealthCreate)
+    registros: List[Dict[str, Any]]
+
+
+class BulkErroRegistro(BaseModel):
+    indice: int
+    erros: List[Dict[str, Any]]
+
+class BulkIngestaoResponse(BaseModel):
+    recebidos: int
+    inseridos: int
+    duplicados: int
+    invalidos: int
+    ids: List[int] = []
+    erros: List[BulkErroRegistro] = []
+    metodo: str
+
+class StreamLoteResumo(BaseModel):
+    lote: int
+    linha_inicial: int
+    linha_final: int
+    inseridos: int
+    duplicados: int
+    invalidos: int
+    metodo: str
+
+class StreamIngestaoResponse(BaseModel):
+    recebidos: int
+    inseridos: int
+    duplicados: int
+    invalidos: int
+    erros: List[BulkErroRegistro] = []
+    erros_truncados: bool = False
+    erro_corpo: Optional[str] = None
+    corpo_excedeu_limite: bool = False
+    lotes: List[StreamLoteResumo] = []
 
 
 # --- Sono ---
@@ -588,6 +624,25 @@ class RelatorioMensalResponse(BaseModel):
     peso_final: Optional[Decimal] = None
     total_atividades: int
 
+class SeriePonto(BaseModel):
+    """Ponto reduzido da série (agregados só no método buckets)"""
+    timestamp: datetime
+    valor: Optional[float] = None
+    minimo: Optional[float] = None
+    maximo: Optional[float] = None
+    soma: Optional[float] = None
+    contagem: Optional[int] = None
+
+class SerieTemporalResponse(BaseModel):
+    """Série temporal reduzida para gráficos (no máximo `pontos` pontos)"""
+    cliente_id: int
+    metrica: str
+    metodo: str
+    data_inicio: datetime
+    data_fim: datetime
+    largura_bucket_segundos: int
+    pontos: List[SeriePonto] = []
+
 
 # =====================================================
 # CUIDADORES SCHEMAS
@@ -634,3 +689,20 @@ class CuidadorResponse(CuidadorBase):
     criado_em: datetime
     atualizado_em: datetime
     model_config = ConfigDict(from_attributes=True)
+
+
+# --- Sync delta (/sync) ---
+class SyncEntidade(BaseModel):
+    alterados: List[Dict[str, Any]] = []
+    removidos: List[int] = []
+
+class SyncResponse(BaseModel):
+    """Mudanças desde o token anterior; `token` vai na próxima chamada"""
+    token: str
+    tem_mais: bool
+    reset: bool
+    gerado_em: datetime
+    idosos: SyncEntidade
+    medicamentos: SyncEntidade
+    cuidadores: SyncEntidade
+    alertas: SyncEntidade
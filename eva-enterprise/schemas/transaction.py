@@ -89,11 +89,13 @@ class TransactionStatusUpdate(BaseModel):
 
 
 class TransactionListResponse(BaseModel):
-    """Lista de transações com paginação"""
+    """Lista de transações com paginação (por página ou por cursor)"""
     transactions: list[TransactionResponse]
-    total: int
-    page: int
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+    page: Optional[int] = None
     page_size: int
+    next_cursor: Optional[str] = None
     
     class Config:
         schema_extra = {
@@ -101,7 +103,8 @@ class TransactionListResponse(BaseModel):
                 "transactions": [],
                 "total": 10,
                 "page": 1,
-                "page_size": 20
+                "page_size": 20,
+                "next_cursor": None
             }
         }
 
@@ -0,0 +1,57 @@
+"""
+Analisa (NLP) as transcrições de historico_ligacoes ainda sem análise.
+
+Lê em lotes pelo id, analisa cada lote no pool de processos e grava as
+linhas de nlp_conversation_analysis com INSERT de várias linhas. Pode ser
+interrompido e rodado de novo: ligações já analisadas são puladas, e
+--apos-id retoma direto do último id impresso.
+
+Uso:
+    python scripts/backfill_nlp_transcricoes.py
+    python scripts/backfill_nlp_transcricoes.py --desde 2025-01-01 --lote 2000 --processos 8
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.connection import AsyncSessionLocal, engine  # noqa: E402
+from services import nlp_lote  # noqa: E402
+
+
+async def main(apos_id, ate_id, desde, lote):
+    inicio = time.perf_counter()
+
+    def progresso(parcial):
+        decorrido = time.perf_counter() - inicio
+        print(f"  {parcial['ligacoes']:>9} ligações  {parcial['ligacoes'] / decorrido:8.1f}/s  "
+              f"riscos={parcial['riscos']}  ultimo_id={parcial['ultimo_id']}", flush=True)
+
+    try:
+        resultado = await nlp_lote.backfill_transcricoes(
+            AsyncSessionLocal, apos_id=apos_id, ate_id=ate_id, desde=desde, lote=lote, ao_progredir=progresso
+        )
+    finally:
+        nlp_lote.encerrar_pool()
+        await engine.dispose()
+
+    decorrido = time.perf_counter() - inicio
+    print(f"Transcrições analisadas: {resultado} em {decorrido:.1f}s "
+          f"({resultado['ligacoes'] / decorrido if decorrido else 0:.1f} ligações/s, "
+          f"{nlp_lote.NLP_PROCESSOS} processos)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill da análise NLP das transcrições")
+    parser.add_argument("--apos-id", type=int, default=0, help="começa depois deste historico_ligacoes.id")
+    parser.add_argument("--ate-id", type=int, default=None)
+    parser.add_argument("--desde", type=datetime.fromisoformat, default=None, help="só ligações a partir desta data")
+    parser.add_argument("--lote", type=int, default=nlp_lote.NLP_LOTE_DB, help="ligações lidas/gravadas por vez")
+    parser.add_argument("--processos", type=int, default=nlp_lote.NLP_PROCESSOS, help="processos no pool")
+    args = parser.parse_args()
+    nlp_lote.NLP_PROCESSOS = args.processos
+    asyncio.run(main(args.apos_id, args.ate_id, args.desde, args.lote))
@@ -0,0 +1,52 @@
+"""
+Minera padroes_comportamento (migration 016) para a base inteira.
+
+Mesma rotina da task minerar_padroes_comportamento, mas fora do worker do
+Celery: as fatias de idosos rodam em paralelo em --processos processos
+(no worker prefork a task roda numa fatia por vez). Ao final grava a marca
+d'água, e a task incremental segue a partir dela.
+
+Uso:
+    python scripts/backfill_padroes_comportamento.py
+    python scripts/backfill_padroes_comportamento.py --processos 8 --fatia 1000
+    python scripts/backfill_padroes_comportamento.py --incremental
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.connection_sync import SessionLocal, engine  # noqa: E402
+from services import mineracao_padroes  # noqa: E402
+
+
+def main(incremental, processos, fatia):
+    inicio = time.perf_counter()
+
+    def progresso(parcial):
+        decorrido = time.perf_counter() - inicio
+        print(f"  {parcial['pacientes']:>9} pacientes  {parcial['pacientes'] / decorrido:8.1f}/s  "
+              f"padroes={parcial['padroes']}  desativados={parcial['desativados']}", flush=True)
+
+    try:
+        with SessionLocal() as db:
+            resultado = mineracao_padroes.minerar_padroes(
+                db, incremental=incremental, processos=processos, fatia=fatia, ao_progredir=progresso
+            )
+    finally:
+        engine.dispose()
+
+    print(f"Padrões minerados: {resultado}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mineração de padroes_comportamento")
+    parser.add_argument("--incremental", action="store_true",
+                        help="só idosos com dado novo desde a última execução")
+    parser.add_argument("--processos", type=int, default=mineracao_padroes.MINERACAO_PROCESSOS)
+    parser.add_argument("--fatia", type=int, default=mineracao_padroes.MINERACAO_FATIA,
+                        help="idosos por fatia (uma transação cada)")
+    args = parser.parse_args()
+    main(args.incremental, args.processos, args.fatia)
@@ -0,0 +1,50 @@
+"""
+Preenche patient_risk_state (migration 013) a partir dos dados existentes.
+
+Para cada idoso, em lotes pelo id: últimas avaliações PHQ-9/GAD-7/C-SSRS,
+última predição suicide_risk, contadores de crise e a média móvel do
+sentimento dos últimos 7 dias. Cada lote é uma transação; pode ser
+interrompido e rodado de novo (a linha do paciente é refeita), e
+--apos-id retoma direto do último id impresso.
+
+Uso:
+    python scripts/backfill_risco_pacientes.py
+    python scripts/backfill_risco_pacientes.py --apos-id 12000 --lote 1000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import estado_risco  # noqa: E402
+from database.connection import AsyncSessionLocal, engine  # noqa: E402
+
+
+async def main(apos_id, lote):
+    inicio = time.perf_counter()
+
+    def progresso(parcial):
+        decorrido = time.perf_counter() - inicio
+        print(f"  {parcial['pacientes']:>9} pacientes  {parcial['pacientes'] / decorrido:8.1f}/s  "
+              f"em_risco={parcial['em_risco']}  ultimo_id={parcial['ultimo_id']}", flush=True)
+
+    try:
+        resultado = await estado_risco.reconstruir_estados(
+            AsyncSessionLocal, apos_id=apos_id, lote=lote, ao_progredir=progresso
+        )
+    finally:
+        await engine.dispose()
+
+    print(f"Estado de risco reconstruído: {resultado} em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill de patient_risk_state")
+    parser.add_argument("--apos-id", type=int, default=0, help="começa depois deste idosos.id")
+    parser.add_argument("--lote", type=int, default=estado_risco.RISCO_LOTE_PACIENTES,
+                        help="pacientes por transação")
+    args = parser.parse_args()
+    asyncio.run(main(args.apos_id, args.lote))
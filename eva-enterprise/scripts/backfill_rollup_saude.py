@@ -0,0 +1,37 @@
+"""
+Reconstrói o health_daily_rollup a partir dos dados brutos de saúde.
+
+Processa os clientes em faixas, várias faixas em paralelo (uma conexão
+por faixa). Idempotente: cada faixa apaga e recalcula seus dias.
+
+Uso:
+    python scripts/backfill_rollup_saude.py
+    python scripts/backfill_rollup_saude.py --desde 2025-01-01 --lote 200 --paralelismo 8
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.connection import AsyncSessionLocal, engine  # noqa: E402
+from database.rollup_saude import backfill_rollups, ROLLUP_LOTE_CLIENTES, ROLLUP_PARALELISMO  # noqa: E402
+
+
+async def main(desde, lote, paralelismo):
+    inicio = time.perf_counter()
+    resultado = await backfill_rollups(AsyncSessionLocal, desde=desde, lote_clientes=lote, paralelismo=paralelismo)
+    await engine.dispose()
+    print(f"Rollup reconstruído: {resultado} em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill do health_daily_rollup")
+    parser.add_argument("--desde", type=date.fromisoformat, default=None, help="recalcula só a partir desta data")
+    parser.add_argument("--lote", type=int, default=ROLLUP_LOTE_CLIENTES, help="clientes por faixa")
+    parser.add_argument("--paralelismo", type=int, default=ROLLUP_PARALELISMO, help="faixas simultâneas")
+    args = parser.parse_args()
+    asyncio.run(main(args.desde, args.lote, args.paralelismo))
@@ -0,0 +1,227 @@
+"""
+Benchmark dos índices de database/migrations/005_indices_consultas_frequentes.sql.
+
+Cria um schema isolado (bench_indices), popula as tabelas quentes com
+~1M linhas via generate_series, mede as consultas dos repositórios sem os
+índices, aplica a migration e mede de novo. Imprime o plano (EXPLAIN
+ANALYZE, BUFFERS) e as latências p50/p95 de cada consulta.
+
+Requer PostgreSQL (DATABASE_URL). Uso:
+    python scripts/bench_indices.py --rows 1000000 --runs 20
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+load_dotenv()
+
+SCHEMA = "bench_indices"
+MIGRATION = Path(__file__).resolve().parent.parent / "database" / "migrations" / "005_indices_consultas_frequentes.sql"
+
+# Apenas as colunas usadas pelos predicados; sem FKs para o seed ser rápido.
+DDL = [
+    """CREATE TABLE agendamentos (
+        id BIGSERIAL PRIMARY KEY, idoso_id INTEGER, status VARCHAR,
+        data_hora_agendada TIMESTAMP NOT NULL, tipo VARCHAR)""",
+    """CREATE TABLE historico_ligacoes (
+        id BIGSERIAL PRIMARY KEY, idoso_id INTEGER, agendamento_id INTEGER,
+        inicio_chamada TIMESTAMP, criado_em TIMESTAMP, duracao_segundos INTEGER)""",
+    """CREATE TABLE alertas (
+        id BIGSERIAL PRIMARY KEY, idoso_id INTEGER, tipo VARCHAR,
+        resolvido BOOLEAN DEFAULT false, criado_em TIMESTAMP)""",
+    """CREATE TABLE medicamentos (
+        id BIGSERIAL PRIMARY KEY, idoso_id INTEGER, nome VARCHAR, ativo BOOLEAN)""",
+    """CREATE TABLE cuidadores (
+        id BIGSERIAL PRIMARY KEY, idoso_id INTEGER, prioridade INTEGER,
+        ativo BOOLEAN, eh_contato_emergencia BOOLEAN)""",
+    """CREATE TABLE sinais_vitais_health (
+        id BIGSERIAL PRIMARY KEY, cliente_id INTEGER NOT NULL, bpm INTEGER,
+        spo2 NUMERIC(5, 2), timestamp_coleta TIMESTAMP NOT NULL)""",
+    """CREATE TABLE atividade (
+        id BIGSERIAL PRIMARY KEY, cliente_id INTEGER NOT NULL, passos INTEGER,
+        timestamp_coleta TIMESTAMP NOT NULL)""",
+    """CREATE TABLE sono (
+        id BIGSERIAL PRIMARY KEY, cliente_id INTEGER NOT NULL,
+        duracao_total_minutos INTEGER, timestamp_inicio TIMESTAMP)""",
+    """CREATE TABLE medicao_corporal (
+        id BIGSERIAL PRIMARY KEY, cliente_id INTEGER NOT NULL,
+        peso_kg NUMERIC(5, 2), timestamp_coleta TIMESTAMP NOT NULL)""",
+    """CREATE TABLE nutricao (
+        id BIGSERIAL PRIMARY KEY, cliente_id INTEGER NOT NULL,
+        ingestao_agua_ml INTEGER, timestamp_coleta TIMESTAMP NOT NULL)""",
+    """CREATE TABLE mood_diary (
+        id BIGSERIAL PRIMARY KEY, patient_id INTEGER NOT NULL, date DATE NOT NULL,
+        time_of_day VARCHAR(20), mood_score INTEGER)""",
+    """CREATE TABLE mental_health_assessments (
+        id BIGSERIAL PRIMARY KEY, patient_id INTEGER NOT NULL, scale_type VARCHAR(50),
+        score INTEGER, assessed_at TIMESTAMP)""",
+    """CREATE TABLE crisis_events (
+        id BIGSERIAL PRIMARY KEY, patient_id INTEGER NOT NULL, occurred_at TIMESTAMP NOT NULL)""",
+    """CREATE TABLE nlp_conversation_analysis (
+        id BIGSERIAL PRIMARY KEY, patient_id INTEGER NOT NULL, analyzed_at TIMESTAMP)""",
+    """CREATE TABLE ml_predictions (
+        id BIGSERIAL PRIMARY KEY, patient_id INTEGER NOT NULL,
+        prediction_type VARCHAR(50), predicted_at TIMESTAMP)""",
+]
+
+
+def seed_sql(rows: int) -> list:
+    """INSERTs server-side: N linhas distribuídas entre 5000 idosos/clientes
+    ao longo de ~2 anos. Tabelas de cadastro usam uma fração de N."""
+    small = max(rows // 20, 1000)
+    return [
+        f"""INSERT INTO agendamentos (idoso_id, status, data_hora_agendada, tipo)
+            SELECT (random() * 5000)::int,
+                   CASE WHEN random() < 0.02 THEN 'agendado'
+                        WHEN random() < 0.01 THEN 'aguardando_retry'
+                        ELSE 'concluido' END,
+                   now() - random() * interval '730 days' + interval '7 days', 'medicamento'
+            FROM generate_series(1, {rows})""",
+        f"""INSERT INTO historico_ligacoes (idoso_id, agendamento_id, inicio_chamada, criado_em, duracao_segundos)
+            SELECT (random() * 5000)::int, g, ts, ts, (random() * 600)::int
+            FROM generate_series(1, {rows}) g, LATERAL (SELECT now() - random() * interval '730 days' AS ts) t""",
+        f"""INSERT INTO alertas (idoso_id, tipo, resolvido, criado_em)
+            SELECT (random() * 5000)::int, 'queda', random() > 0.03, now() - random() * interval '730 days'
+            FROM generate_series(1, {rows})""",
+        f"""INSERT INTO medicamentos (idoso_id, nome, ativo)
+            SELECT (random() * 5000)::int, 'med_' || g, random() < 0.3
+            FROM generate_series(1, {small}) g""",
+        f"""INSERT INTO cuidadores (idoso_id, prioridade, ativo, eh_contato_emergencia)
+            SELECT (random() * 5000)::int, (random() * 5)::int, random() < 0.8, random() < 0.3
+            FROM generate_series(1, {small})""",
+        f"""INSERT INTO sinais_vitais_health (cliente_id, bpm, spo2, timestamp_coleta)
+            SELECT (random() * 5000)::int, 60 + (random() * 40)::int, 94 + random() * 5,
+                   now() - random() * interval '730 days'
+            FROM generate_series(1, {rows})""",
+        f"""INSERT INTO mood_diary (patient_id, date, time_of_day, mood_score)
+            SELECT (random() * 5000)::int, (now() - random() * interval '730 days')::date,
+                   (ARRAY['morning','afternoon','evening'])[1 + (random() * 2)::int], 1 + (random() * 9)::int
+            FROM generate_series(1, {rows})""",
+        f"""INSERT INTO mental_health_assessments (patient_id, scale_type, score, assessed_at)
+            SELECT (random() * 5000)::int, (ARRAY['PHQ9','GAD7','C-SSRS','PSS10'])[1 + (random() * 3)::int],
+                   (random() * 27)::int, now() - random() * interval '730 days'
+            FROM generate_series(1, {rows})""",
+    ]
+
+
+QUERIES = {
+    "agendamentos_pendentes": """
+        SELECT id, idoso_id FROM agendamentos
+        WHERE status IN ('agendado', 'aguardando_retry') AND data_hora_agendada <= now()
+        ORDER BY data_hora_agendada LIMIT 100""",
+    "historico_por_idoso": """
+        SELECT id, inicio_chamada FROM historico_ligacoes
+        WHERE idoso_id = 42 ORDER BY inicio_chamada DESC, id DESC LIMIT 50""",
+    "historico_keyset": """
+        SELECT id, criado_em FROM historico_ligacoes
+        WHERE (criado_em, id) < (now() - interval '30 days', 9223372036854775807)
+        ORDER BY criado_em DESC, id DESC LIMIT 50""",
+    "alertas_por_idoso": """
+        SELECT id, tipo FROM alertas WHERE idoso_id = 42 ORDER BY criado_em DESC LIMIT 50""",
+    "alertas_abertos": """
+        SELECT id FROM alertas WHERE idoso_id = 42 AND resolvido = false ORDER BY criado_em DESC""",
+    "medicamentos_ativos": """
+        SELECT id, nome FROM medicamentos WHERE idoso_id = 42 AND ativo = true ORDER BY nome""",
+    "cuidadores_ativos": """
+        SELECT id FROM cuidadores WHERE idoso_id = 42 AND ativo = true ORDER BY prioridade, id""",
+    "sinais_vitais_7d": """
+        SELECT bpm, spo2, timestamp_coleta FROM sinais_vitais_health
+        WHERE cliente_id = 42 AND timestamp_coleta >= now() - interval '7 days'
+        ORDER BY timestamp_coleta DESC""",
+    "mood_diary_30d": """
+        SELECT date, mood_score FROM mood_diary
+        WHERE patient_id = 42 AND date >= current_date - 30 ORDER BY date DESC""",
+    "ultima_phq9": """
+        SELECT score, assessed_at FROM mental_health_assessments
+        WHERE patient_id = 42 AND scale_type = 'PHQ9' ORDER BY assessed_at DESC LIMIT 1""",
+}
+
+
+def migration_statements() -> list:
+    sql = re.sub(r"--[^\n]*", "", MIGRATION.read_text(encoding="utf-8"))
+    return [s.strip() for s in sql.split(";") if s.strip()]
+
+
+async def medir(conn, runs: int) -> dict:
+    resultados = {}
+    for nome, sql in QUERIES.items():
+        plano = (await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))).scalars().all()
+        tempos = []
+        for _ in range(runs):
+            inicio = time.perf_counter()
+            (await conn.execute(text(sql))).fetchall()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        tempos.sort()
+        resultados[nome] = {
+            "plano": "\n".join(plano),
+            "p50": statistics.median(tempos),
+            "p95": tempos[max(int(len(tempos) * 0.95) - 1, 0)],
+        }
+    return resultados
+
+
+async def main(rows: int, runs: int, keep: bool):
+    url = os.getenv("DATABASE_URL", "")
+    if not url.startswith("postgresql"):
+        raise SystemExit("DATABASE_URL precisa apontar para PostgreSQL")
+    url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    engine = create_async_engine(url, isolation_level="AUTOCOMMIT")
+    async with engine.connect() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.execute(text(f"SET search_path TO {SCHEMA}"))
+
+        print(f"Populando {rows:,} linhas por tabela...")
+        inicio = time.perf_counter()
+        for ddl in DDL:
+            await conn.execute(text(ddl))
+        for sql in seed_sql(rows):
+            await conn.execute(text(sql))
+        await conn.execute(text("ANALYZE"))
+        print(f"Seed concluído em {time.perf_counter() - inicio:.1f}s")
+
+        antes = await medir(conn, runs)
+
+        inicio = time.perf_counter()
+        for stmt in migration_statements():
+            await conn.execute(text(stmt))
+        print(f"Migration 005 aplicada em {time.perf_counter() - inicio:.1f}s")
+
+        depois = await medir(conn, runs)
+
+        if not keep:
+            await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    await engine.dispose()
+
+    for nome in QUERIES:
+        print("=" * 78)
+        print(nome)
+        print("-- ANTES --")
+        print(antes[nome]["plano"])
+        print("-- DEPOIS --")
+        print(depois[nome]["plano"])
+
+    print("=" * 78)
+    print(f"{'consulta':<26}{'antes p50':>12}{'antes p95':>12}{'depois p50':>12}{'depois p95':>12}{'ganho':>8}")
+    for nome in QUERIES:
+        a, d = antes[nome], depois[nome]
+        ganho = a["p50"] / d["p50"] if d["p50"] else float("inf")
+        print(f"{nome:<26}{a['p50']:>10.2f}ms{a['p95']:>10.2f}ms{d['p50']:>10.2f}ms{d['p95']:>10.2f}ms{ganho:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos índices da migration 005")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="não remove o schema bench_indices ao final")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.runs, args.keep))
@@ -0,0 +1,106 @@
+"""
+Benchmark da ingestão em lote de sinais vitais (rows/s).
+
+Compara, para o mesmo volume:
+- legado: ORM add_all + refresh objeto a objeto (implementação anterior)
+- insert: INSERT multi-row ... ON CONFLICT DO NOTHING RETURNING id
+- copy:   COPY para temp table + INSERT ... SELECT (asyncpg)
+- dedupe: reenvio do mesmo lote (todos duplicados)
+
+Tudo roda numa transação desfeita ao final: nada fica gravado.
+Requer PostgreSQL (DATABASE_URL) com as migrations 006/007 aplicadas. Uso:
+    python scripts/bench_ingestao_bulk.py --rows 10000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+load_dotenv()
+
+from database import ingestao_bulk  # noqa: E402
+from database.models import SinaisVitaisHealth, Usuario  # noqa: E402
+from schemas import SinaisVitaisHealthCreate  # noqa: E402
+
+
+def gerar(cliente_id: int, n: int, inicio: datetime) -> list:
+    return [
+        {
+            "cliente_id": cliente_id,
+            "bpm": 60 + i % 40,
+            "spo2": 97,
+            "pressao_sistolica": 120,
+            "pressao_diastolica": 80,
+            "timestamp_coleta": (inicio + timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(n)
+    ]
+
+
+async def legado(db: AsyncSession, registros: list):
+    objetos = [SinaisVitaisHealth(**SinaisVitaisHealthCreate(**r).dict()) for r in registros]
+    db.add_all(objetos)
+    await db.flush()
+    for obj in objetos:
+        await db.refresh(obj)
+
+
+async def main(rows: int):
+    url = os.getenv("DATABASE_URL", "")
+    if not url.startswith("postgresql"):
+        raise SystemExit("DATABASE_URL precisa apontar para PostgreSQL")
+    url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    engine = create_async_engine(url)
+    resultados = []
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        usuario = Usuario(nome="bench-ingestao")
+        db.add(usuario)
+        await db.flush()
+        base = datetime(2000, 1, 1)
+
+        async def medir(nome, corrotina, n):
+            inicio = time.perf_counter()
+            retorno = await corrotina
+            dt = time.perf_counter() - inicio
+            resultados.append((nome, n, dt, n / dt if dt else float("inf")))
+            return retorno
+
+        lote = gerar(usuario.id, rows, base)
+        await medir("legado (ORM + refresh)", legado(db, lote), rows)
+
+        ingestao_bulk.BULK_COPY_LIMIAR = rows + 1
+        lote = gerar(usuario.id, rows, base + timedelta(days=1))
+        await medir("insert multi-row", ingestao_bulk.inserir_em_lote(
+            db, SinaisVitaisHealth, SinaisVitaisHealthCreate, lote, commit=False), rows)
+
+        ingestao_bulk.BULK_COPY_LIMIAR = 1
+        lote = gerar(usuario.id, rows, base + timedelta(days=2))
+        await medir("copy", ingestao_bulk.inserir_em_lote(
+            db, SinaisVitaisHealth, SinaisVitaisHealthCreate, lote, commit=False), rows)
+
+        r = await medir("reenvio (dedupe)", ingestao_bulk.inserir_em_lote(
+            db, SinaisVitaisHealth, SinaisVitaisHealthCreate, lote, commit=False), rows)
+        assert r.inseridos == 0 and r.duplicados == rows
+
+        await db.rollback()
+    await engine.dispose()
+
+    print(f"{'estratégia':<26}{'linhas':>10}{'tempo':>12}{'linhas/s':>14}")
+    for nome, n, dt, taxa in resultados:
+        print(f"{nome:<26}{n:>10}{dt:>10.2f}s{taxa:>14,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da ingestão em lote")
+    parser.add_argument("--rows", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows))
@@ -0,0 +1,85 @@
+"""
+Teste de carga do login (pool bcrypt + limite por IP).
+
+Dispara uma tempestade de logins contra /api/v1/auth/login enquanto uma
+sonda chama um endpoint sem relação (padrão /health) e mede:
+- logins/s e distribuição de status (200, 401, 429, 503)
+- latência p50/p99 da sonda antes e durante a tempestade; antes da
+  mudança a sonda ficava parada atrás de cada bcrypt
+
+Cada login usa um X-Forwarded-For diferente (--ips) para não cair no limite
+por IP; com --ips 1 dá para ver o 429 funcionando. Uso:
+    python scripts/bench_login.py --base-url http://localhost:8001 \\
+        --email teste@eva.com --senha segredo --concorrencia 50 --duracao 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+
+def _percentil(valores, p):
+    if not valores:
+        return float("nan")
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def sonda(cliente: httpx.AsyncClient, caminho: str, fim: float, latencias: list):
+    while time.perf_counter() < fim:
+        inicio = time.perf_counter()
+        await cliente.get(caminho)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        await asyncio.sleep(0.05)
+
+
+async def logins(cliente: httpx.AsyncClient, args, fim: float, status: Counter, indice: int):
+    n = 0
+    while time.perf_counter() < fim:
+        ip = f"198.51.{(indice * 97 + n) % args.ips // 256}.{(indice * 97 + n) % args.ips % 256}"
+        r = await cliente.post(
+            "/api/v1/auth/login",
+            data={"username": args.email, "password": args.senha},
+            headers={"X-Forwarded-For": ip},
+        )
+        status[r.status_code] += 1
+        n += 1
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", required=True)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--senha", required=True)
+    parser.add_argument("--concorrencia", type=int, default=50)
+    parser.add_argument("--duracao", type=float, default=20.0)
+    parser.add_argument("--ips", type=int, default=10000, help="IPs distintos simulados")
+    parser.add_argument("--sonda", default="/health")
+    args = parser.parse_args()
+
+    limites = httpx.Limits(max_connections=args.concorrencia + 5)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limites) as cliente:
+        repouso = []
+        await sonda(cliente, args.sonda, time.perf_counter() + 5, repouso)
+
+        durante, status = [], Counter()
+        fim = time.perf_counter() + args.duracao
+        inicio = time.perf_counter()
+        await asyncio.gather(
+            sonda(cliente, args.sonda, fim, durante),
+            *[logins(cliente, args, fim, status, i) for i in range(args.concorrencia)],
+        )
+        decorrido = time.perf_counter() - inicio
+
+    print(f"logins: {sum(status.values())} em {decorrido:.1f}s "
+          f"({status[200] / decorrido:.1f} logins ok/s) status={dict(status)}")
+    for nome, latencias in (("sonda em repouso", repouso), ("sonda na tempestade", durante)):
+        print(f"{nome:<22} n={len(latencias):>4}  p50={statistics.median(latencias):7.1f} ms"
+              f"  p99={_percentil(latencias, 0.99):7.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""
+Benchmark da detecção de keywords do NLPService.
+
+Compara, em textos do tamanho de uma mensagem até o de uma transcrição
+inteira de sessão:
+    legado:  as cinco varreduras antigas ("keyword in texto" por lista)
+    autômato: NLPService.analyze_message (uma passada com Aho–Corasick)
+e mostra quantas palavras por segundo cada um processa.
+
+O legado para cada "in" na primeira ocorrência, então em textos longos em
+que quase todas as keywords aparecem (densidade alta) ele ainda ganha; o
+autômato custa o mesmo por palavra em qualquer caso, e é o único que
+respeita acento e palavra inteira.
+
+Uso:
+    python scripts/bench_nlp.py --tamanhos 200 5000 50000 --densidade 0.002 0.05
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.nlp_service import NLPService  # noqa: E402
+
+# Palavras de enchimento para o texto não ser só keywords
+COMUNS = (
+    "eu ela ele hoje de manhã fui na casa da vizinha tomei café conversei sobre "
+    "o tempo a novela o neto ligou disse que vem no domingo almoço arroz feijão "
+    "depois dormi um pouco à tarde assisti televisão"
+).split()
+
+
+def _texto(palavras: int, densidade: float, semente: int) -> str:
+    aleatorio = random.Random(semente)
+    keywords = [
+        k for listas in NLPService._listas().values() for ks in listas.values() for k in ks
+    ]
+    partes = []
+    while len(partes) < palavras:
+        partes.append(aleatorio.choice(keywords) if aleatorio.random() < densidade else aleatorio.choice(COMUNS))
+    return " ".join(partes)
+
+
+def legado(text: str) -> None:
+    """As cinco varreduras por substring que analyze_message fazia antes"""
+    text_lower = text.lower()
+    for listas in (NLPService.POSITIVE_KEYWORDS, NLPService.DANGER_KEYWORDS):
+        for keywords in listas.values():
+            for keyword in keywords:
+                keyword in text_lower
+    for listas in (NLPService.COMMON_WORDS,):
+        for keywords in listas.values():
+            for word in keywords:
+                f' {word} ' in f' {text_lower} '
+    for listas in (NLPService.DANGER_KEYWORDS, NLPService.POSITIVE_KEYWORDS,
+                   NLPService.DANGER_KEYWORDS, NLPService.ENTITY_KEYWORDS, NLPService.TOPIC_KEYWORDS):
+        for keywords in listas.values():
+            for keyword in keywords:
+                keyword in text_lower
+
+
+def _medir(funcao, texto: str, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(texto)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[200, 5000, 50000], help="palavras por texto")
+    parser.add_argument("--densidade", type=float, nargs="+", default=[0.002, 0.05],
+                        help="fração das palavras que são keywords")
+    parser.add_argument("--repeticoes", type=int, default=30)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    NLPService.scan("aquecimento")
+    print(f"autômato montado em {(time.perf_counter() - inicio) * 1000:.1f} ms "
+          f"({len(NLPService._automato)} estados)")
+
+    for densidade in args.densidade:
+        for palavras in args.tamanhos:
+            texto = _texto(palavras, densidade, semente=palavras)
+            t_legado = _medir(legado, texto, args.repeticoes)
+            t_novo = _medir(NLPService.analyze_message, texto, args.repeticoes)
+            print(f"densidade {densidade:<5} {palavras:>7} palavras ({len(texto):>8} chars)  "
+                  f"legado={t_legado * 1000:8.2f} ms  autômato={t_novo * 1000:8.2f} ms  "
+                  f"({palavras / t_novo:,.0f} palavras/s, {t_legado / t_novo:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
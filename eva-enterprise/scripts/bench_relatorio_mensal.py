@@ -0,0 +1,150 @@
+"""
+Benchmark do relatório mensal (get_relatorio_mensal).
+
+Semeia um paciente com um ano de sinais vitais por minuto (~525 mil linhas)
+mais atividade horária, sono diário e pesagens semanais, e compara para
+cada mês:
+- legado:      5 consultas separadas (implementação anterior)
+- consulta única: CTEs por série com FILTER e first/last por janela
+- consolidado: leitura do health_monthly_rollup pela PK
+
+Tudo roda numa transação desfeita ao final: nada fica gravado.
+Requer PostgreSQL (DATABASE_URL) com as migrations 006 e 009 aplicadas. Uso:
+    python scripts/bench_relatorio_mensal.py --ano 2024 --repeticoes 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import select, func, and_, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+load_dotenv()
+
+from database.models import (  # noqa: E402
+    Usuario, Atividade, SinaisVitaisHealth, Sono, MedicaoCorporal, HealthMonthlyRollup
+)
+from database.rollup_saude import intervalo_mes, consulta_relatorio_mensal  # noqa: E402
+
+SEED = """
+INSERT INTO sinais_vitais_health (cliente_id, bpm, spo2, timestamp_coleta, created_at)
+SELECT :cliente_id, 55 + (random() * 50)::int, 95 + (random() * 4)::int, ts, now()
+FROM generate_series(make_timestamp(:ano, 1, 1, 0, 0, 0),
+                     make_timestamp(:ano, 12, 31, 23, 59, 0), INTERVAL '1 minute') ts;
+
+INSERT INTO atividade (cliente_id, passos, timestamp_coleta, created_at)
+SELECT :cliente_id, (random() * 800)::int, ts, now()
+FROM generate_series(make_timestamp(:ano, 1, 1, 0, 0, 0),
+                     make_timestamp(:ano, 12, 31, 23, 0, 0), INTERVAL '1 hour') ts;
+
+INSERT INTO sono (cliente_id, timestamp_inicio, timestamp_fim, duracao_total_minutos, created_at)
+SELECT :cliente_id, ts, ts + INTERVAL '7 hours', 360 + (random() * 120)::int, now()
+FROM generate_series(make_timestamp(:ano, 1, 1, 23, 0, 0),
+                     make_timestamp(:ano, 12, 31, 23, 0, 0), INTERVAL '1 day') ts;
+
+INSERT INTO medicao_corporal (cliente_id, peso_kg, timestamp_coleta, created_at)
+SELECT :cliente_id, 70 + random() * 5, ts, now()
+FROM generate_series(make_timestamp(:ano, 1, 1, 7, 0, 0),
+                     make_timestamp(:ano, 12, 31, 7, 0, 0), INTERVAL '1 week') ts;
+"""
+
+
+async def legado(db: AsyncSession, cliente_id: int, inicio, fim):
+    """As 5 consultas da implementação anterior"""
+    await db.execute(select(func.sum(Atividade.passos)).where(and_(
+        Atividade.cliente_id == cliente_id,
+        Atividade.timestamp_coleta >= inicio, Atividade.timestamp_coleta < fim)))
+    await db.execute(select(func.avg(SinaisVitaisHealth.bpm)).where(and_(
+        SinaisVitaisHealth.cliente_id == cliente_id, SinaisVitaisHealth.bpm.isnot(None),
+        SinaisVitaisHealth.timestamp_coleta >= inicio, SinaisVitaisHealth.timestamp_coleta < fim)))
+    await db.execute(select(func.avg(Sono.duracao_total_minutos)).where(and_(
+        Sono.cliente_id == cliente_id, Sono.duracao_total_minutos.isnot(None),
+        Sono.timestamp_inicio >= inicio, Sono.timestamp_inicio < fim)))
+    pesos = await db.execute(select(MedicaoCorporal.peso_kg).where(and_(
+        MedicaoCorporal.cliente_id == cliente_id, MedicaoCorporal.peso_kg.isnot(None),
+        MedicaoCorporal.timestamp_coleta >= inicio, MedicaoCorporal.timestamp_coleta < fim))
+        .order_by(MedicaoCorporal.timestamp_coleta.asc()))
+    pesos.scalars().all()
+    await db.execute(select(func.count(Atividade.id)).where(and_(
+        Atividade.cliente_id == cliente_id,
+        Atividade.timestamp_coleta >= inicio, Atividade.timestamp_coleta < fim)))
+
+
+async def consulta_unica(db: AsyncSession, cliente_id: int, inicio, fim):
+    (await db.execute(consulta_relatorio_mensal(cliente_id, inicio, fim))).one()
+
+
+async def consolidado(db: AsyncSession, cliente_id: int, ano: int, mes: int):
+    await db.execute(select(HealthMonthlyRollup).where(and_(
+        HealthMonthlyRollup.cliente_id == cliente_id,
+        HealthMonthlyRollup.ano == ano, HealthMonthlyRollup.mes == mes)))
+
+
+async def main(ano: int, repeticoes: int):
+    url = os.getenv("DATABASE_URL", "")
+    if not url.startswith("postgresql"):
+        raise SystemExit("DATABASE_URL precisa apontar para PostgreSQL")
+    url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    engine = create_async_engine(url)
+    tempos = {"legado (5 consultas)": [], "consulta única": [], "consolidado": []}
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        usuario = Usuario(nome="bench-relatorio")
+        db.add(usuario)
+        await db.flush()
+        cid = usuario.id
+
+        print(f"Semeando {ano} para o cliente {cid}...")
+        for comando in filter(str.strip, SEED.split(";")):
+            await db.execute(text(comando), {"cliente_id": cid, "ano": ano})
+        for tabela in ("sinais_vitais_health", "atividade", "sono", "medicao_corporal"):
+            await db.execute(text(f"ANALYZE {tabela}"))
+
+        for mes in range(1, 13):
+            inicio, fim = intervalo_mes(mes, ano)
+            linha = (await db.execute(consulta_relatorio_mensal(cid, inicio, fim))).one()
+            db.add(HealthMonthlyRollup(
+                cliente_id=cid, ano=ano, mes=mes,
+                total_passos=linha.total_passos, total_atividades=linha.total_atividades,
+                media_bpm=linha.media_bpm, media_minutos_sono=linha.media_minutos_sono,
+                peso_inicial=linha.peso_inicial, peso_final=linha.peso_final,
+            ))
+        await db.flush()
+
+        for _ in range(repeticoes):
+            for mes in range(1, 13):
+                inicio, fim = intervalo_mes(mes, ano)
+                for nome, corrotina in (
+                    ("legado (5 consultas)", legado(db, cid, inicio, fim)),
+                    ("consulta única", consulta_unica(db, cid, inicio, fim)),
+                    ("consolidado", consolidado(db, cid, ano, mes)),
+                ):
+                    t0 = time.perf_counter()
+                    await corrotina
+                    tempos[nome].append((time.perf_counter() - t0) * 1000)
+
+        await db.rollback()
+    await engine.dispose()
+
+    base = statistics.median(tempos["legado (5 consultas)"])
+    print(f"{'estratégia':<24}{'p50 ms':>10}{'p95 ms':>10}{'speedup':>10}")
+    for nome, amostras in tempos.items():
+        amostras.sort()
+        p50 = statistics.median(amostras)
+        p95 = amostras[int(len(amostras) * 0.95) - 1]
+        print(f"{nome:<24}{p50:>10.2f}{p95:>10.2f}{base / p50:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do relatório mensal")
+    parser.add_argument("--ano", type=int, default=2024)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.ano, args.repeticoes))
@@ -0,0 +1,159 @@
+"""
+Benchmark da serialização e compressão das respostas.
+
+Dois modos:
+- offline (padrão): gera linhas sintéticas no formato das maiores listagens de
+  saúde e compara, por schema e tamanho de página:
+    legado:    model_validate + jsonable_encoder + json.dumps (caminho do FastAPI)
+    orjson:    model_validate + jsonable_encoder + orjson (RespostaJSONRapida)
+    confiável: resposta_orm (model_construct + dump_json do pydantic-core)
+  e o tamanho do corpo com gzip e brotli (se instalado).
+- http (--base-url): chama os 10 maiores endpoints de uma API rodando, com
+  Accept-Encoding identity/gzip/br, e mede bytes transferidos e latência p50/p95.
+
+Uso:
+    python scripts/bench_respostas.py --linhas 100 1000 --repeticoes 50
+    python scripts/bench_respostas.py --base-url http://localhost:8001 --token $JWT --cliente 1
+"""
+import argparse
+import gzip
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from schemas import (  # noqa: E402
+    AtividadeResponse, SinaisVitaisHealthResponse, MedicaoCorporalResponse, NutricaoResponse
+)
+from utils.compressao import BROTLI_AVAILABLE, BROTLI_QUALIDADE, GZIP_NIVEL  # noqa: E402
+from utils.respostas import dumps, resposta_orm  # noqa: E402
+
+if BROTLI_AVAILABLE:
+    import brotli
+
+# Os 10 maiores endpoints de leitura (por tamanho típico de resposta)
+ENDPOINTS = [
+    "/api/v1/sync/",
+    "/api/v1/idosos/?limit=100",
+    "/api/v1/alertas/?limit=100",
+    "/api/v1/medicamentos/",
+    "/api/v1/historico/?limit=100",
+    "/api/v1/agendamentos/?limit=100",
+    "/api/v1/saude/sinais-vitais/{cliente}?limit=100",
+    "/api/v1/saude/atividades/{cliente}?limit=100",
+    "/api/v1/saude/series/{cliente}?metrica=bpm&pontos=2000",
+    "/api/v1/saude/relatorios/mensal/{cliente}",
+]
+
+
+def _linhas(schema, n: int):
+    base = datetime(2025, 1, 1)
+    valores = {
+        int: 72, Decimal: Decimal("97.50"), str: "caminhada", datetime: base,
+    }
+    linhas = []
+    for i in range(n):
+        atributos = {}
+        for campo, info in schema.model_fields.items():
+            tipo = info.annotation
+            tipo = next((t for t in getattr(tipo, "__args__", ()) if t is not type(None)), tipo)
+            atributos[campo] = valores.get(tipo)
+        atributos.update(id=i, cliente_id=1, created_at=base + timedelta(minutes=i))
+        if "timestamp_coleta" in atributos:
+            atributos["timestamp_coleta"] = base + timedelta(minutes=i)
+        linhas.append(SimpleNamespace(**atributos))
+    return linhas
+
+
+def _legado(schema, linhas) -> bytes:
+    adaptador = TypeAdapter(List[schema])
+    validado = adaptador.dump_python(adaptador.validate_python(linhas, from_attributes=True), mode="json")
+    return json.dumps(jsonable_encoder(validado), ensure_ascii=False).encode()
+
+
+def _orjson(schema, linhas) -> bytes:
+    adaptador = TypeAdapter(List[schema])
+    validado = adaptador.dump_python(adaptador.validate_python(linhas, from_attributes=True), mode="json")
+    return dumps(jsonable_encoder(validado))
+
+
+def _confiavel(schema, linhas) -> bytes:
+    return resposta_orm(schema, linhas).body
+
+
+def _medir(funcao, repeticoes: int):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        corpo = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return corpo, statistics.median(tempos)
+
+
+def offline(tamanhos: List[int], repeticoes: int):
+    schemas = (SinaisVitaisHealthResponse, AtividadeResponse, MedicaoCorporalResponse, NutricaoResponse)
+    print(f"{'schema':<28}{'linhas':>8}{'legado ms':>11}{'orjson ms':>11}{'confiável ms':>14}"
+          f"{'speedup':>9}{'bytes':>10}{'gzip':>9}{'br':>9}")
+    for schema in schemas:
+        for n in tamanhos:
+            linhas = _linhas(schema, n)
+            corpo_legado, t_legado = _medir(lambda: _legado(schema, linhas), repeticoes)
+            corpo_orjson, t_orjson = _medir(lambda: _orjson(schema, linhas), repeticoes)
+            corpo, t_confiavel = _medir(lambda: _confiavel(schema, linhas), repeticoes)
+            assert json.loads(corpo) == json.loads(corpo_legado) == json.loads(corpo_orjson)
+            tam_gzip = len(gzip.compress(corpo, compresslevel=GZIP_NIVEL))
+            tam_br = len(brotli.compress(corpo, quality=BROTLI_QUALIDADE)) if BROTLI_AVAILABLE else "-"
+            print(f"{schema.__name__:<28}{n:>8}{t_legado:>11.2f}{t_orjson:>11.2f}{t_confiavel:>14.2f}"
+                  f"{t_legado / t_confiavel:>8.1f}x{len(corpo):>10}{tam_gzip:>9}{tam_br:>9}")
+
+
+def http(base_url: str, token: str, cliente: int, repeticoes: int):
+    import httpx
+
+    codificacoes = ["identity", "gzip"] + (["br"] if BROTLI_AVAILABLE else [])
+    print(f"{'endpoint':<58}{'codificação':>12}{'bytes':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    with httpx.Client(base_url=base_url, headers={"Authorization": f"Bearer {token}"}, timeout=60) as c:
+        for caminho in ENDPOINTS:
+            url = caminho.format(cliente=cliente)
+            for codificacao in codificacoes:
+                tempos, tamanho = [], 0
+                for _ in range(repeticoes):
+                    inicio = time.perf_counter()
+                    with c.stream("GET", url, headers={"Accept-Encoding": codificacao}) as r:
+                        tamanho = sum(len(p) for p in r.iter_raw())
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                if r.status_code != 200:
+                    print(f"{url:<58}{codificacao:>12}  HTTP {r.status_code}")
+                    break
+                tempos.sort()
+                p95 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))]
+                print(f"{url:<58}{codificacao:>12}{tamanho:>10}{statistics.median(tempos):>9.1f}{p95:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--base-url", help="API rodando; sem isso roda só o modo offline")
+    parser.add_argument("--token", default="", help="JWT de um usuário admin")
+    parser.add_argument("--cliente", type=int, default=1, help="cliente_id dos endpoints de saúde")
+    args = parser.parse_args()
+
+    if args.base_url:
+        http(args.base_url, args.token, args.cliente, args.repeticoes)
+    else:
+        offline(args.linhas, args.repeticoes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark do resumo de saúde mental (get_patient_mental_health_summary).
+
+Semeia um paciente existente com um histórico realista (2 anos de
+avaliações semanais, 3 entradas de humor por dia, análises NLP diárias,
+crises e planos de segurança) e compara:
+- legado:      as 7 consultas sequenciais da implementação anterior, com
+               linhas ORM inteiras agregadas em Python
+- consulta única: MentalHealthRepository._consulta_resumo
+
+Tudo roda numa transação desfeita ao final: nada fica gravado.
+Requer PostgreSQL (DATABASE_URL) com as migrations 005, 011 e 012. Uso:
+    python scripts/bench_resumo_saude_mental.py --paciente 1 --repeticoes 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, desc, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+load_dotenv()
+
+from database.models import (  # noqa: E402
+    CrisisEvent, MentalHealthAssessment, MoodDiary, NLPConversationAnalysis, SafetyPlan
+)
+from database.repositories.mental_health_repository import MentalHealthRepository  # noqa: E402
+
+SEED = """
+INSERT INTO mental_health_assessments (patient_id, scale_type, score, severity_level, assessed_at)
+SELECT :paciente, escala, (random() * 27)::int, 'moderate', ts
+FROM unnest(ARRAY['PHQ9', 'GAD7', 'C-SSRS', 'PSS10']) escala,
+     generate_series(now() - INTERVAL '2 years', now(), INTERVAL '1 week') ts;
+
+INSERT INTO mood_diary (patient_id, date, time_of_day, mood_score, anxiety_level, energy_level)
+SELECT :paciente, d::date, periodo, 1 + (random() * 9)::int, 1 + (random() * 9)::int, 1 + (random() * 9)::int
+FROM generate_series(now() - INTERVAL '2 years', now(), INTERVAL '1 day') d,
+     unnest(ARRAY['morning', 'afternoon', 'evening']) periodo;
+
+INSERT INTO nlp_conversation_analysis (patient_id, sentiment_score, sentiment_label, danger_flags, analyzed_at)
+SELECT :paciente, random() * 2 - 1, 'neutral',
+       CASE WHEN random() < 0.2 THEN '["isolation", "hopelessness"]'::jsonb ELSE '[]'::jsonb END, ts
+FROM generate_series(now() - INTERVAL '2 years', now(), INTERVAL '6 hours') ts;
+
+INSERT INTO crisis_events (patient_id, crisis_type, severity, occurred_at)
+SELECT :paciente, 'panic_attack', 'moderate', ts
+FROM generate_series(now() - INTERVAL '2 years', now(), INTERVAL '10 days') ts;
+
+INSERT INTO safety_plans (patient_id, active, created_at)
+SELECT :paciente, n = 5, now() - n * INTERVAL '30 days' FROM generate_series(1, 5) n;
+"""
+
+
+async def legado(db: AsyncSession, paciente: int):
+    """As 7 consultas da implementação anterior"""
+    for escala in ("PHQ9", "GAD7", "C-SSRS"):
+        (await db.execute(
+            select(MentalHealthAssessment)
+            .where(and_(MentalHealthAssessment.patient_id == paciente, MentalHealthAssessment.scale_type == escala))
+            .order_by(desc(MentalHealthAssessment.assessed_at)).limit(1)
+        )).scalar_one_or_none()
+    humor = (await db.execute(select(MoodDiary).where(and_(
+        MoodDiary.patient_id == paciente, MoodDiary.date >= date.today() - timedelta(days=7))))).scalars().all()
+    [e.mood_score for e in humor]
+    (await db.execute(select(CrisisEvent).where(and_(
+        CrisisEvent.patient_id == paciente,
+        CrisisEvent.occurred_at >= datetime.now() - timedelta(days=30))))).scalars().all()
+    analises = (await db.execute(select(NLPConversationAnalysis).where(and_(
+        NLPConversationAnalysis.patient_id == paciente,
+        NLPConversationAnalysis.analyzed_at >= datetime.now() - timedelta(days=7))))).scalars().all()
+    [flag for a in analises for flag in (a.danger_flags or [])]
+    (await db.execute(select(SafetyPlan).where(and_(
+        SafetyPlan.patient_id == paciente, SafetyPlan.active == True))  # noqa: E712
+        .order_by(desc(SafetyPlan.created_at)).limit(1))).scalar_one_or_none()
+
+
+async def consulta_unica(db: AsyncSession, paciente: int):
+    await MentalHealthRepository.get_patient_mental_health_summary(db, paciente)
+
+
+async def main(paciente: int, repeticoes: int):
+    url = os.getenv("DATABASE_URL", "")
+    if not url.startswith("postgresql"):
+        raise SystemExit("DATABASE_URL precisa apontar para PostgreSQL")
+    url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    engine = create_async_engine(url)
+    tempos = {"legado (7 consultas)": [], "consulta única": []}
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        print(f"Semeando o paciente {paciente}...")
+        for comando in filter(str.strip, SEED.split(";")):
+            await db.execute(text(comando), {"paciente": paciente})
+        for tabela in ("mental_health_assessments", "mood_diary", "nlp_conversation_analysis",
+                       "crisis_events", "safety_plans"):
+            await db.execute(text(f"ANALYZE {tabela}"))
+
+        for _ in range(repeticoes):
+            for nome, corrotina in (
+                ("legado (7 consultas)", legado(db, paciente)),
+                ("consulta única", consulta_unica(db, paciente)),
+            ):
+                t0 = time.perf_counter()
+                await corrotina
+                tempos[nome].append((time.perf_counter() - t0) * 1000)
+
+        await db.rollback()
+    await engine.dispose()
+
+    base = statistics.median(tempos["legado (7 consultas)"])
+    print(f"{'estratégia':<24}{'p50 ms':>10}{'p99 ms':>10}{'speedup':>10}")
+    for nome, amostras in tempos.items():
+        amostras.sort()
+        p50 = statistics.median(amostras)
+        p99 = amostras[max(0, int(len(amostras) * 0.99) - 1)]
+        print(f"{nome:<24}{p50:>10.2f}{p99:>10.2f}{base / p50:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do resumo de saúde mental")
+    parser.add_argument("--paciente", type=int, required=True, help="id de um idoso existente")
+    parser.add_argument("--repeticoes", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.paciente, args.repeticoes))
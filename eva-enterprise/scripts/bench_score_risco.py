@@ -0,0 +1,98 @@
+"""
+Benchmark do score de risco populacional (services/score_risco_lote.py).
+
+Semeia --pacientes idosos com estado de risco, 14 dias de diário de humor
+e 30 dias de agendamentos (lembretes de medicamento e ligações), e pontua
+a base inteira com cada tamanho de lote pedido: tempo total, pacientes/s
+e pico de memória Python (tracemalloc) do processo de pontuação.
+
+Tudo roda numa transação desfeita ao final: nada fica gravado.
+Requer PostgreSQL (DATABASE_URL_SYNC ou DATABASE_URL) com as migrations
+005, 013 e 015. Uso:
+    python scripts/bench_score_risco.py --pacientes 100000 --lotes 1000 5000 20000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+load_dotenv()
+
+from services.score_risco_lote import pontuar_lote  # noqa: E402
+
+SEED = """
+CREATE TEMP TABLE bench_ids (id INTEGER) ON COMMIT DROP;
+
+WITH novos AS (
+    INSERT INTO idosos (nome, data_nascimento, telefone, ativo)
+    SELECT 'bench ' || n, DATE '1940-01-01', '0', true FROM generate_series(1, :pacientes) n
+    RETURNING id
+) INSERT INTO bench_ids SELECT id FROM novos;
+
+INSERT INTO patient_risk_state (patient_id, phq9_score, gad7_score, cssrs_score, sentiment_ewma,
+                                sentiment_count, sentiment_at, crisis_count, last_crisis_at, risk_level)
+SELECT id, (random() * 27)::int, (random() * 21)::int, (random() * 5)::int, random() * 2 - 1,
+       1, now() - random() * INTERVAL '10 days', (random() * 3)::int,
+       now() - random() * INTERVAL '90 days', 'LOW'
+FROM bench_ids;
+
+INSERT INTO mood_diary (patient_id, date, time_of_day, mood_score, anxiety_level)
+SELECT id, (now() - d * INTERVAL '1 day')::date, 'morning', 1 + (random() * 9)::int, 1 + (random() * 9)::int
+FROM bench_ids, generate_series(0, 13) d;
+
+INSERT INTO agendamentos (idoso_id, tipo, status, data_hora_agendada)
+SELECT id, 'ligacao',
+       (ARRAY['concluido', 'nao_atendido', 'falhou', 'concluido'])[1 + (random() * 3)::int],
+       now() - d * INTERVAL '1 day'
+FROM bench_ids, generate_series(1, 30, 3) d;
+"""
+
+
+def main(pacientes: int, lotes):
+    url = os.getenv("DATABASE_URL_SYNC") or os.getenv("DATABASE_URL", "")
+    if not url.startswith("postgresql"):
+        raise SystemExit("DATABASE_URL_SYNC precisa apontar para PostgreSQL")
+    url = url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    engine = create_engine(url)
+    with Session(engine) as db:
+        print(f"Semeando {pacientes} pacientes...")
+        for comando in filter(str.strip, SEED.split(";")):
+            db.execute(text(comando), {"pacientes": pacientes})
+        for tabela in ("idosos", "patient_risk_state", "mood_diary", "agendamentos"):
+            db.execute(text(f"ANALYZE {tabela}"))
+        inicio_ids = db.execute(text("SELECT min(id) - 1 FROM bench_ids")).scalar()
+
+        print(f"{'lote':>8}{'segundos':>10}{'pacientes/s':>14}{'pico MB':>10}")
+        for lote in lotes:
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            apos, total = inicio_ids, 0
+            while True:
+                parcial = pontuar_lote(db, apos, lote)
+                if parcial is None:
+                    break
+                apos, total = parcial["ultimo_id"], total + parcial["pacientes"]
+            decorrido = time.perf_counter() - t0
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{lote:>8}{decorrido:>10.2f}{total / decorrido:>14.0f}{pico / 2 ** 20:>10.1f}")
+
+        db.rollback()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do score de risco populacional")
+    parser.add_argument("--pacientes", type=int, default=100000)
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1000, 5000, 20000])
+    args = parser.parse_args()
+    main(args.pacientes, args.lotes)
@@ -0,0 +1,281 @@
+"""
+Gravação assíncrona e em lote dos logs de auditoria
+
+Quem audita só enfileira (registrar, síncrono e sem I/O de banco); uma task
+em segundo plano grava em INSERTs de várias linhas quando o buffer chega a
+AUDIT_LOTE registros ou a cada AUDIT_INTERVALO_SEGUNDOS.
+
+Nada se perde se o banco estiver fora ou o buffer encher:
+- buffer cheio (AUDIT_BUFFER_MAX): o registro vai para o spool em disco
+- lote que falhou ao gravar: vai inteiro para o spool
+- o spool (NDJSON em AUDIT_SPOOL_DIR) é regravado no banco quando o buffer
+  esvazia, e no startup seguinte se o processo morreu antes
+- lote do spool recusado pelo banco (dado inválido, não banco fora): é
+  regravado um registro por vez; os recusados vão para rejeitados-<pid>.ndjson
+  no mesmo diretório, com o erro, e não travam os demais
+- shutdown: grava o que está no buffer; o que não der vai para o spool
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import DateTime, insert
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, StatementError
+
+from database.models import AuditLog, EmergencyNotification
+from database.payment_models import PaymentAuditLog
+
+logger = logging.getLogger(__name__)
+
+AUDIT_LOTE = int(os.getenv("AUDIT_LOTE", "500"))
+AUDIT_INTERVALO_SEGUNDOS = float(os.getenv("AUDIT_INTERVALO_SEGUNDOS", "1.0"))
+AUDIT_BUFFER_MAX = int(os.getenv("AUDIT_BUFFER_MAX", "10000"))
+AUDIT_SPOOL_DIR = Path(os.getenv("AUDIT_SPOOL_DIR", "/tmp/eva-audit-spool"))
+
+# Tabelas aceitas e a coluna com o instante do evento
+MODELOS = {
+    AuditLog.__tablename__: (AuditLog, "criado_em"),
+    PaymentAuditLog.__tablename__: (PaymentAuditLog, "created_at"),
+    EmergencyNotification.__tablename__: (EmergencyNotification, "created_at"),
+}
+
+Registro = Tuple[str, Dict[str, Any]]
+
+
+def _para_json(valor: Any) -> Any:
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável no spool: {type(valor).__name__}")
+
+
+def _de_json(tabela: str, campos: Dict[str, Any]) -> Dict[str, Any]:
+    modelo = MODELOS[tabela][0]
+    for coluna in modelo.__table__.columns:
+        valor = campos.get(coluna.key)
+        if isinstance(coluna.type, DateTime) and isinstance(valor, str):
+            campos[coluna.key] = datetime.fromisoformat(valor)
+    return campos
+
+
+def _erro_do_registro(erro: Exception) -> bool:
+    """Erro causado pelo conteúdo do registro (repetir não resolve), não pelo banco"""
+    if isinstance(erro, DBAPIError):
+        return isinstance(erro, (IntegrityError, DataError))
+    return isinstance(erro, (StatementError, KeyError, TypeError, ValueError))
+
+
+class AuditSink:
+    def __init__(self, session_factory=None, lote: int = AUDIT_LOTE,
+                 intervalo: float = AUDIT_INTERVALO_SEGUNDOS, buffer_max: int = AUDIT_BUFFER_MAX,
+                 spool_dir: Path = AUDIT_SPOOL_DIR):
+        self._session_factory = session_factory
+        self.lote = lote
+        self.intervalo = intervalo
+        self.buffer_max = buffer_max
+        self.spool_dir = Path(spool_dir)
+        self._buffer: Deque[Registro] = deque()
+        self._acordar: Optional[asyncio.Event] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        self._parando = False
+        self.gravados = 0
+        self.enviados_spool = 0
+        self.rejeitados = 0
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from database.connection import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    @property
+    def _arquivo_spool(self) -> Path:
+        return self.spool_dir / f"audit-{os.getpid()}.ndjson"
+
+    # ---------- produtores ----------
+
+    def registrar(self, modelo, **campos) -> None:
+        """Enfileira um registro de `modelo` (um dos MODELOS)"""
+        tabela = modelo.__tablename__
+        coluna_instante = MODELOS[tabela][1]
+        campos.setdefault(coluna_instante, datetime.now() if modelo is AuditLog else datetime.utcnow())
+
+        if len(self._buffer) >= self.buffer_max:
+            self._para_spool([(tabela, campos)])
+            return
+        self._buffer.append((tabela, campos))
+        if len(self._buffer) >= self.lote and self._acordar is not None:
+            self._acordar.set()
+
+    # ---------- spool em disco ----------
+
+    def _para_spool(self, registros: List[Registro]) -> None:
+        try:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            with open(self._arquivo_spool, "a", encoding="utf-8") as f:
+                for tabela, campos in registros:
+                    f.write(json.dumps({"tabela": tabela, "campos": campos}, default=_para_json) + "\n")
+            self.enviados_spool += len(registros)
+        except OSError as e:
+            logger.error(f"Auditoria: {len(registros)} registros perdidos, spool indisponível: {e}")
+
+    def _rejeitar(self, item: Dict[str, Any], erro: Exception) -> None:
+        """Registro que o banco recusa: sai do spool para não travar o lote"""
+        self.rejeitados += 1
+        logger.error(f"Auditoria: registro de {item.get('tabela')} rejeitado: {erro}")
+        try:
+            with open(self.spool_dir / f"rejeitados-{os.getpid()}.ndjson", "a", encoding="utf-8") as f:
+                f.write(json.dumps({**item, "erro": str(erro)}, default=_para_json) + "\n")
+        except OSError as e:
+            logger.error(f"Auditoria: registro rejeitado perdido, spool indisponível: {e}")
+
+    @staticmethod
+    def _pid_vivo(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _do_processo_ou_orfao(self, arquivo: Path) -> bool:
+        # Cada worker só mexe no próprio spool e no de processos que já morreram
+        try:
+            pid = int(arquivo.name.split(".")[0].split("-")[1])
+        except (IndexError, ValueError):
+            return False
+        return pid == os.getpid() or not self._pid_vivo(pid)
+
+    async def _regravar_spool(self) -> None:
+        """Grava no banco o spool deste processo e o de processos que morreram"""
+        if not self.spool_dir.exists():
+            return
+        for arquivo in sorted(self.spool_dir.glob("audit-*")):
+            if not self._do_processo_ou_orfao(arquivo):
+                continue
+            if arquivo.suffix == ".ndjson":
+                # Renomeia antes de ler: novos registros vão para um arquivo novo
+                processando = arquivo.with_name(f"audit-{os.getpid()}.{time.time_ns()}.processando")
+                try:
+                    arquivo.rename(processando)
+                except OSError:
+                    continue
+                arquivo = processando
+            await self._regravar_arquivo(arquivo)
+
+    async def _regravar_arquivo(self, arquivo: Path) -> None:
+        registros = []
+        with open(arquivo, encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    item = json.loads(linha)
+                except ValueError:
+                    # Linha truncada (processo morto no meio da escrita)
+                    continue
+                try:
+                    registros.append((item["tabela"], _de_json(item["tabela"], item["campos"])))
+                except (KeyError, TypeError, ValueError, AttributeError) as e:
+                    self._rejeitar(item if isinstance(item, dict) else {"linha": linha}, e)
+
+        gravados = 0
+        try:
+            for inicio in range(0, len(registros), self.lote):
+                lote = registros[inicio:inicio + self.lote]
+                try:
+                    await self._gravar(lote)
+                except Exception as e:
+                    if not _erro_do_registro(e):
+                        raise
+                    # Um registro inválido derruba o INSERT inteiro: um por vez
+                    for i, (tabela, campos) in enumerate(lote):
+                        try:
+                            await self._gravar([(tabela, campos)])
+                        except Exception as e:
+                            if not _erro_do_registro(e):
+                                gravados = inicio + i
+                                raise
+                            self._rejeitar({"tabela": tabela, "campos": campos}, e)
+                gravados = inicio + len(lote)
+        except Exception:
+            # Devolve ao spool só o que ainda não foi gravado nem rejeitado
+            self._para_spool(registros[gravados:])
+            arquivo.unlink()
+            self.enviados_spool -= len(registros) - gravados
+            raise
+        arquivo.unlink()
+
+    # ---------- gravação ----------
+
+    async def _gravar(self, registros: List[Registro]) -> None:
+        por_tabela: Dict[str, List[Dict[str, Any]]] = {}
+        for tabela, campos in registros:
+            por_tabela.setdefault(tabela, []).append(campos)
+        async with self.session_factory() as db:
+            for tabela, linhas in por_tabela.items():
+                await db.execute(insert(MODELOS[tabela][0].__table__), linhas)
+            await db.commit()
+        self.gravados += len(registros)
+
+    async def descarregar(self) -> None:
+        """Grava o buffer inteiro em lotes; lote com erro vai para o spool"""
+        while self._buffer:
+            lote = [self._buffer.popleft() for _ in range(min(self.lote, len(self._buffer)))]
+            try:
+                await self._gravar(lote)
+            except Exception as e:
+                logger.error(f"Auditoria: falha ao gravar {len(lote)} registros, enviando ao spool: {e}")
+                self._para_spool(lote)
+                return
+
+    async def _loop(self) -> None:
+        while not self._parando:
+            try:
+                await asyncio.wait_for(self._acordar.wait(), timeout=self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._acordar.clear()
+            await self.descarregar()
+            if not self._buffer:
+                try:
+                    await self._regravar_spool()
+                except Exception as e:
+                    logger.warning(f"Auditoria: spool não regravado, nova tentativa depois: {e}")
+
+    # ---------- ciclo de vida ----------
+
+    async def iniciar(self) -> None:
+        if self._tarefa is None:
+            self._parando = False
+            self._acordar = asyncio.Event()
+            self._tarefa = asyncio.create_task(self._loop())
+
+    async def encerrar(self) -> None:
+        if self._tarefa is not None:
+            # Sem cancelar: um lote em gravação termina antes de sair
+            self._parando = True
+            self._acordar.set()
+            await self._tarefa
+            self._tarefa = None
+            self._acordar = None
+        await self.descarregar()
+        if self._buffer:
+            self._para_spool(list(self._buffer))
+            self._buffer.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "pendentes": len(self._buffer),
+            "gravados": self.gravados,
+            "enviados_spool": self.enviados_spool,
+            "rejeitados": self.rejeitados,
+        }
+
+
+auditoria = AuditSink()
@@ -0,0 +1,259 @@
+"""
+Despacho das notificações do protocolo de emergência
+
+Cada entrega (contato de emergência, profissional, SMS do contato cadastrado
+no paciente) roda em paralelo, com timeout e novas tentativas próprios: um
+provedor lento ou fora do ar não atrasa as outras. Uma tentativa que estourou
+o timeout ainda pode chegar; em alerta de emergência, duplicar é melhor que
+faltar.
+
+Canal sem provedor configurado (SMS sem credenciais do Twilio, destinatário
+sem app e sem telefone) fica com status "not_sent": o alerta vai só para o
+log e não conta como entrega, nem no SLO nem em contacts_notified.
+
+Registra, sem esperar o banco:
+- cada entrega em emergency_notifications (via AuditSink): canal, status,
+  tentativas e latência
+- o SLO: tempo do trigger (detected_at) até a primeira entrega bem-sucedida,
+  em metricas_emergencia (exposto em /sistema/metricas)
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from database.models import EmergencyNotification
+from services.audit_service import AuditSink, auditoria
+
+logger = logging.getLogger(__name__)
+
+EMERGENCIA_TIMEOUT_S = float(os.getenv("EMERGENCIA_TIMEOUT_S", "5"))
+# Quanto o push pode demorar antes de cair para o SMS dentro da mesma tentativa
+EMERGENCIA_PUSH_TIMEOUT_S = float(os.getenv("EMERGENCIA_PUSH_TIMEOUT_S", str(EMERGENCIA_TIMEOUT_S / 2)))
+EMERGENCIA_TENTATIVAS = int(os.getenv("EMERGENCIA_TENTATIVAS", "3"))
+# Espera antes da 2ª tentativa; dobra a cada nova tentativa
+EMERGENCIA_BACKOFF_S = float(os.getenv("EMERGENCIA_BACKOFF_S", "0.5"))
+# Meta: trigger -> primeira notificação entregue
+EMERGENCIA_SLO_MS = float(os.getenv("EMERGENCIA_SLO_MS", "10000"))
+
+# SMS via API REST do Twilio; sem as três variáveis o canal fica "not_sent"
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_FROM_NUMBER = os.getenv("TWILIO_FROM_NUMBER")
+TWILIO_URL = "https://api.twilio.com/2010-04-01/Accounts/{sid}/Messages.json"
+
+
+class CanalIndisponivel(Exception):
+    """Não há provedor para o canal: nada foi enviado (não adianta repetir)"""
+
+
+@dataclass
+class Entrega:
+    canal: str                       # emergency_contact, professional, sms
+    destinatario: Dict[str, Any]     # como aparece em contacts_notified
+    enviar: Callable[[], Awaitable[Any]]  # levanta exceção se não entregou (CanalIndisponivel: sem provedor)
+
+
+class MetricasEmergencia:
+    """Latência trigger -> primeira notificação (SLO) e entregas por canal"""
+
+    BUCKETS_MS = (500, 1000, 2000, 5000, 10000, 30000)
+
+    def __init__(self, slo_ms: float = EMERGENCIA_SLO_MS):
+        self.slo_ms = slo_ms
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.protocolos = 0
+            self.sem_entrega = 0
+            self.violacoes_slo = 0
+            self.total_primeira_ms = 0.0
+            self.max_primeira_ms = 0.0
+            self.histogram = {b: 0 for b in self.BUCKETS_MS}
+            self.histogram["+Inf"] = 0
+            self.canais: Dict[str, Dict[str, float]] = {}
+
+    def registrar_entrega(self, canal: str, status: str, latencia_ms: float):
+        with self._lock:
+            c = self.canais.setdefault(
+                canal, {"delivered": 0, "not_sent": 0, "failed": 0, "timeout": 0, "total_ms": 0.0}
+            )
+            c[status] += 1
+            if status == "delivered":
+                c["total_ms"] += latencia_ms
+
+    def registrar_protocolo(self, primeira_ms: Optional[float]):
+        with self._lock:
+            self.protocolos += 1
+            if primeira_ms is None:
+                self.sem_entrega += 1
+                self.violacoes_slo += 1
+                return
+            if primeira_ms > self.slo_ms:
+                self.violacoes_slo += 1
+            self.total_primeira_ms += primeira_ms
+            self.max_primeira_ms = max(self.max_primeira_ms, primeira_ms)
+            for bucket in self.BUCKETS_MS:
+                if primeira_ms <= bucket:
+                    self.histogram[bucket] += 1
+                    break
+            else:
+                self.histogram["+Inf"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            entregues = self.protocolos - self.sem_entrega
+            return {
+                "slo_ms": self.slo_ms,
+                "protocolos": self.protocolos,
+                "sem_entrega": self.sem_entrega,
+                "violacoes_slo": self.violacoes_slo,
+                "avg_primeira_ms": round(self.total_primeira_ms / entregues, 3) if entregues else 0.0,
+                "max_primeira_ms": round(self.max_primeira_ms, 3),
+                "primeira_histogram_ms": {str(k): v for k, v in self.histogram.items()},
+                "canais": {
+                    canal: {
+                        "delivered": int(c["delivered"]),
+                        "not_sent": int(c["not_sent"]),
+                        "failed": int(c["failed"]),
+                        "timeout": int(c["timeout"]),
+                        "avg_ms": round(c["total_ms"] / c["delivered"], 3) if c["delivered"] else 0.0,
+                    }
+                    for canal, c in self.canais.items()
+                },
+            }
+
+
+metricas_emergencia = MetricasEmergencia()
+
+
+# =====================================================================
+# CANAIS
+# =====================================================================
+
+async def enviar_push(token: str, titulo: str, corpo: str, dados: Dict[str, str]) -> None:
+    import firebase_admin
+    from services.notification_service import NotificationService
+    servico = NotificationService()
+    if not firebase_admin._apps:
+        raise CanalIndisponivel("Firebase não inicializado")
+    # firebase_admin é síncrono: roda fora do event loop
+    ok = await asyncio.to_thread(servico.send_push_notification, token, titulo, corpo, dados)
+    if not ok:
+        raise RuntimeError("push não entregue")
+
+
+async def enviar_sms(telefone: str, mensagem: str) -> None:
+    if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_FROM_NUMBER):
+        logger.critical(f"📱 SMS de emergência NÃO enviado para {telefone}: provedor de SMS não configurado")
+        raise CanalIndisponivel("provedor de SMS não configurado")
+    async with httpx.AsyncClient(timeout=EMERGENCIA_TIMEOUT_S) as client:
+        resposta = await client.post(
+            TWILIO_URL.format(sid=TWILIO_ACCOUNT_SID),
+            data={"To": telefone, "From": TWILIO_FROM_NUMBER, "Body": mensagem},
+            auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
+        )
+        resposta.raise_for_status()
+    logger.critical(f"📱 SMS de emergência enviado para {telefone}")
+
+
+async def registrar_contato(descricao: str) -> None:
+    # Destinatário sem app e sem telefone: fica só o log
+    logger.critical(descricao)
+    raise CanalIndisponivel("destinatário sem device_token e sem telefone")
+
+
+# =====================================================================
+# DESPACHO
+# =====================================================================
+
+async def _entregar(entrega: Entrega, timeout: float, tentativas: int, backoff: float) -> Dict[str, Any]:
+    inicio = time.perf_counter()
+    erro = None
+    status = "failed"
+    tentativa = 0
+    for tentativa in range(1, tentativas + 1):
+        try:
+            await asyncio.wait_for(entrega.enviar(), timeout)
+            status, erro = "delivered", None
+            break
+        except CanalIndisponivel as e:
+            status, erro = "not_sent", str(e)
+            break
+        except asyncio.TimeoutError:
+            status, erro = "timeout", f"sem resposta em {timeout}s"
+        except Exception as e:
+            status, erro = "failed", str(e) or type(e).__name__
+        if tentativa < tentativas:
+            await asyncio.sleep(backoff * 2 ** (tentativa - 1))
+
+    return {
+        "channel": entrega.canal,
+        "recipient": entrega.destinatario,
+        "status": status,
+        "attempts": tentativa,
+        "latency_ms": round((time.perf_counter() - inicio) * 1000, 3),
+        "delivered_at": datetime.now() if status == "delivered" else None,
+        "error": erro,
+    }
+
+
+async def despachar(
+    entregas: List[Entrega],
+    patient_id: int,
+    disparado_em: datetime,
+    crisis_event_id: Optional[int] = None,
+    timeout: float = EMERGENCIA_TIMEOUT_S,
+    tentativas: int = EMERGENCIA_TENTATIVAS,
+    backoff: float = EMERGENCIA_BACKOFF_S,
+    sink: Optional[AuditSink] = None,
+    metricas: Optional[MetricasEmergencia] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Executa todas as entregas em paralelo; devolve o resultado de cada uma,
+    na ordem de `entregas`
+    """
+    sink = sink or auditoria
+    metricas = metricas or metricas_emergencia
+    resultados = list(await asyncio.gather(*[
+        _entregar(entrega, timeout, tentativas, backoff) for entrega in entregas
+    ]))
+
+    for r in resultados:
+        metricas.registrar_entrega(r["channel"], r["status"], r["latency_ms"])
+        sink.registrar(
+            EmergencyNotification,
+            patient_id=patient_id,
+            crisis_event_id=crisis_event_id,
+            channel=r["channel"],
+            recipient=str(r["recipient"].get("name") or r["recipient"].get("phone") or ""),
+            status=r["status"],
+            attempts=r["attempts"],
+            latency_ms=int(r["latency_ms"]),
+            error=r["error"],
+            triggered_at=disparado_em,
+            created_at=r["delivered_at"] or datetime.now(),
+        )
+
+    if not entregas:
+        return resultados
+    entregues = [r["delivered_at"] for r in resultados if r["delivered_at"] is not None]
+    primeira_ms = (min(entregues) - disparado_em).total_seconds() * 1000 if entregues else None
+    metricas.registrar_protocolo(primeira_ms)
+
+    if primeira_ms is None:
+        logger.error(f"🚨 Nenhuma notificação de emergência entregue - Paciente {patient_id}")
+    elif primeira_ms > metricas.slo_ms:
+        logger.error(
+            f"SLO de emergência violado: primeira notificação em {primeira_ms:.0f}ms "
+            f"(meta {metricas.slo_ms:.0f}ms) - Paciente {patient_id}"
+        )
+    return resultados
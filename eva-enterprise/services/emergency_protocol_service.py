@@ -1,14 +1,19 @@
 """
 Serviço de Protocolo de Emergência para Risco Suicida e Crises
 """
+import asyncio
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database.repositories.mental_health_repository import MentalHealthRepository
-from ..database.models import Idoso, Cuidador, SafetyPlan
-from .nlp_service import NLPService
+from database.estado_risco import motivo_emergencia, obter_estado
+from database.repositories.mental_health_repository import MentalHealthRepository
+from database.models import Idoso, Cuidador, SafetyPlan
+from services.despacho_emergencia import (
+    EMERGENCIA_PUSH_TIMEOUT_S, CanalIndisponivel, Entrega, despachar, enviar_push, enviar_sms, registrar_contato
+)
+from services.nlp_service import NLPService
 
 logger = logging.getLogger(__name__)
 
@@ -145,50 +150,32 @@ class EmergencyProtocolService:
             logger.error(f"Paciente {patient_id} não encontrado")
             return {'error': 'patient_not_found'}
 
-        # Buscar plano de segurança
+        # Buscar plano de segurança e destinatários (uma consulta para os dois tipos)
         safety_plan = await MentalHealthRepository.get_active_safety_plan(session, patient_id)
+        actions = risk_config.get('actions', [])
+        contacts, professionals = await EmergencyProtocolService._get_recipients(session, patient_id)
 
-        # Executar ações
+        # Ações sem I/O
         actions_taken = []
-        contacts_notified = []
 
         # 1. CRITICAL: Bloquear app até confirmação de segurança
-        if 'block_app_until_confirmation' in risk_config.get('actions', []):
+        if 'block_app_until_confirmation' in actions:
             actions_taken.append('app_blocked')
             # TODO: Implementar bloqueio de app via Firebase ou flag no banco
 
-        # 2. Notificar contatos de emergência
-        if 'call_emergency_contacts' in risk_config.get('actions', []):
-            emergency_contacts = await EmergencyProtocolService._notify_emergency_contacts(
-                session, patient, risk_level, trigger_reason
-            )
-            contacts_notified.extend(emergency_contacts)
-            actions_taken.append('emergency_contacts_notified')
-
-        # 3. Notificar profissionais
-        if 'notify_professionals' in risk_config.get('actions', []):
-            professionals = await EmergencyProtocolService._notify_professionals(
-                session, patient_id, risk_level, trigger_reason
-            )
-            contacts_notified.extend(professionals)
-            actions_taken.append('professionals_notified')
-
-        # 4. Exibir hotlines de crise
-        if 'display_crisis_hotlines' in risk_config.get('actions', []):
+        # 2. Exibir hotlines de crise
+        if 'display_crisis_hotlines' in actions:
             actions_taken.append('crisis_hotlines_displayed')
 
-        # 5. Ativar plano de segurança
-        if 'activate_safety_plan' in risk_config.get('actions', []) and safety_plan:
+        # 3. Ativar plano de segurança
+        if 'activate_safety_plan' in actions and safety_plan:
             actions_taken.append('safety_plan_activated')
 
-        # 6. Enviar SMS de emergência
-        if 'send_emergency_sms' in risk_config.get('actions', []):
-            await EmergencyProtocolService._send_emergency_sms(patient, risk_level)
-            actions_taken.append('emergency_sms_sent')
-
-        # 7. Registrar evento de crise
-        if 'log_critical_event' in risk_config.get('actions', []):
-            await MentalHealthRepository.create_crisis_event(
+        # 4. Registrar evento de crise antes de notificar: fica gravado
+        #    mesmo que algum provedor trave ou o processo caia no meio
+        crisis = None
+        if 'log_critical_event' in actions:
+            crisis = await MentalHealthRepository.create_crisis_event(
                 session=session,
                 patient_id=patient_id,
                 crisis_type='suicidal_ideation',  # ou extrair do trigger_details
@@ -196,12 +183,38 @@ class EmergencyProtocolService:
                 occurred_at=detected_at,
                 precipitating_factors=trigger_details.get('precipitating_factors', []),
                 warning_signs=trigger_details.get('warning_signs', []),
-                intervention_taken=actions_taken,
-                emergency_contacts_notified=[c['name'] for c in contacts_notified],
+                intervention_taken=list(actions_taken),
+                emergency_contacts_notified=[],
                 notes=f"Acionado por: {trigger_reason}"
             )
             actions_taken.append('crisis_event_logged')
 
+        # 5. Notificações: todos os canais em paralelo, cada um com timeout e retry
+        entregas = []
+        if 'call_emergency_contacts' in actions:
+            entregas += EmergencyProtocolService._contact_deliveries(patient, contacts, risk_level)
+        if 'notify_professionals' in actions:
+            entregas += EmergencyProtocolService._professional_deliveries(patient, professionals, risk_level)
+        if 'send_emergency_sms' in actions:
+            entregas += EmergencyProtocolService._sms_deliveries(patient, risk_level)
+
+        deliveries = await despachar(
+            entregas, patient_id, detected_at, crisis_event_id=crisis.id if crisis else None
+        )
+        delivered = [d for d in deliveries if d['status'] == 'delivered']
+        contacts_notified = [d['recipient'] for d in delivered if d['channel'] != 'sms']
+
+        for channel, action in (('emergency_contact', 'emergency_contacts_notified'),
+                                ('professional', 'professionals_notified'),
+                                ('sms', 'emergency_sms_sent')):
+            if any(d['channel'] == channel for d in delivered):
+                actions_taken.append(action)
+
+        if crisis is not None:
+            crisis.intervention_taken = [a for a in actions_taken if a != 'crisis_event_logged']
+            crisis.emergency_contacts_notified = [c['name'] for c in contacts_notified]
+            await session.commit()
+
         # Resultado
         result = {
             'protocol_activated': True,
@@ -211,6 +224,9 @@ class EmergencyProtocolService:
             'detected_at': detected_at.isoformat(),
             'actions_taken': actions_taken,
             'contacts_notified': contacts_notified,
+            'deliveries': [
+                {k: v for k, v in d.items() if k != 'delivered_at'} for d in deliveries
+            ],
             'safety_plan_available': safety_plan is not None,
             'message': risk_config.get('message', ''),
             'crisis_hotlines': EmergencyProtocolService.CRISIS_HOTLINES,
@@ -233,84 +249,28 @@ class EmergencyProtocolService:
         """
         Verificar todos os triggers de emergência para um paciente
 
+        Lê só patient_risk_state (mantida a cada avaliação, predição e
+        análise NLP), na ordem: C-SSRS >= 4, PHQ-9 >= 20, predição de ML
+        HIGH/CRITICAL válida, sentimento médio < -0.7 com flags de perigo
+        nos últimos 7 dias.
+
         Returns:
             Dict com protocolo ativado se houver risco, ou None
         """
-        # 1. Verificar C-SSRS score
-        latest_cssrs = await MentalHealthRepository.get_latest_assessment_by_type(
-            session, patient_id, 'C-SSRS'
-        )
-
-        if latest_cssrs and latest_cssrs.score >= 4:
-            return await EmergencyProtocolService.activate_emergency_protocol(
-                session=session,
-                patient_id=patient_id,
-                risk_level='CRITICAL',
-                trigger_reason='c_ssrs_critical',
-                trigger_details={
-                    'cssrs_score': latest_cssrs.score,
-                    'severity': latest_cssrs.severity_level
-                }
-            )
-
-        # 2. Verificar PHQ-9 score (depressão severa)
-        latest_phq9 = await MentalHealthRepository.get_latest_assessment_by_type(
-            session, patient_id, 'PHQ9'
+        estado = await obter_estado(session, patient_id)
+        motivo = motivo_emergencia(estado) if estado else None
+        if motivo is None:
+            return None  # Sem triggers acionados
+
+        risk_level, trigger_reason, trigger_details = motivo
+        return await EmergencyProtocolService.activate_emergency_protocol(
+            session=session,
+            patient_id=patient_id,
+            risk_level=risk_level,
+            trigger_reason=trigger_reason,
+            trigger_details=trigger_details
         )
 
-        if latest_phq9 and latest_phq9.score >= 20:
-            return await EmergencyProtocolService.activate_emergency_protocol(
-                session=session,
-                patient_id=patient_id,
-                risk_level='HIGH',
-                trigger_reason='severe_depression',
-                trigger_details={
-                    'phq9_score': latest_phq9.score,
-                    'severity': latest_phq9.severity_level
-                }
-            )
-
-        # 3. Verificar predições de ML
-        ml_prediction = await MentalHealthRepository.get_latest_prediction(
-            session, patient_id, 'suicide_risk'
-        )
-
-        if ml_prediction and ml_prediction.prediction_label in ['HIGH', 'CRITICAL']:
-            return await EmergencyProtocolService.activate_emergency_protocol(
-                session=session,
-                patient_id=patient_id,
-                risk_level=ml_prediction.prediction_label,
-                trigger_reason='ml_prediction',
-                trigger_details={
-                    'model': ml_prediction.model_name,
-                    'confidence': ml_prediction.confidence_score,
-                    'prediction_value': ml_prediction.prediction_value
-                }
-            )
-
-        # 4. Verificar tendência de sentimento (últimos 7 dias)
-        sentiment_trend = await MentalHealthRepository.get_recent_sentiment_trend(
-            session, patient_id, days=7
-        )
-
-        if (
-            sentiment_trend.get('avg_sentiment') and
-            sentiment_trend['avg_sentiment'] < -0.7 and
-            len(sentiment_trend.get('danger_flags_count', {})) > 0
-        ):
-            return await EmergencyProtocolService.activate_emergency_protocol(
-                session=session,
-                patient_id=patient_id,
-                risk_level='MODERATE',
-                trigger_reason='persistent_negative_sentiment',
-                trigger_details={
-                    'avg_sentiment': sentiment_trend['avg_sentiment'],
-                    'danger_flags': sentiment_trend.get('danger_flags_count', {})
-                }
-            )
-
-        return None  # Sem triggers acionados
-
     # =====================================================================
     # MÉTODOS AUXILIARES
     # =====================================================================
@@ -324,106 +284,126 @@ class EmergencyProtocolService:
         )
         return result.scalar_one_or_none()
 
+    PROFESSIONAL_TYPES = ('psicologo', 'psiquiatra', 'medico')
+
     @staticmethod
-    async def _notify_emergency_contacts(
-        session: AsyncSession,
-        patient: Idoso,
-        risk_level: str,
-        trigger_reason: str
-    ) -> List[Dict]:
-        """Notificar contatos de emergência"""
-        from sqlalchemy import select
+    async def _get_recipients(session: AsyncSession, patient_id: int) -> Tuple[List[Cuidador], List[Cuidador]]:
+        """Cuidadores ativos que são contato de emergência e os que são profissionais"""
+        from sqlalchemy import or_, select
 
-        # Buscar cuidadores marcados como contato de emergência
         result = await session.execute(
             select(Cuidador).where(
-                Cuidador.idoso_id == patient.id,
-                Cuidador.eh_contato_emergencia == True,
-                Cuidador.ativo == True
+                Cuidador.idoso_id == patient_id,
+                Cuidador.ativo == True,
+                or_(
+                    Cuidador.eh_contato_emergencia == True,
+                    Cuidador.tipo_cuidador.in_(EmergencyProtocolService.PROFESSIONAL_TYPES)
+                )
             )
         )
-        emergency_cuidadores = result.scalars().all()
+        cuidadores = result.scalars().all()
+        contacts = [c for c in cuidadores if c.eh_contato_emergencia]
+        professionals = [c for c in cuidadores if c.tipo_cuidador in EmergencyProtocolService.PROFESSIONAL_TYPES]
+        return contacts, professionals
 
-        notified = []
+    @staticmethod
+    def _push_or_sms(cuidador: Cuidador, title: str, body: str, data: Dict[str, str], log_message: str):
+        """Push para quem tem o app (SMS se o push falhar); SMS para quem só tem telefone; senão fica o log (not_sent)"""
+        if cuidador.device_token:
+            return lambda: EmergencyProtocolService._push_with_sms_fallback(cuidador, title, body, data)
+        if cuidador.telefone:
+            return lambda: enviar_sms(cuidador.telefone, f"{title}: {body}")
+        return lambda: registrar_contato(log_message)
 
-        for cuidador in emergency_cuidadores:
-            logger.critical(
-                f"📞 NOTIFICANDO CONTATO DE EMERGÊNCIA: {cuidador.nome} ({cuidador.telefone}) - "
-                f"Paciente: {patient.nome} - Risco: {risk_level}"
+    @staticmethod
+    async def _push_with_sms_fallback(cuidador: Cuidador, title: str, body: str, data: Dict[str, str]) -> None:
+        """Tenta o push; se falhar ou não houver Firebase, manda SMS para o telefone do cuidador"""
+        try:
+            await asyncio.wait_for(
+                enviar_push(cuidador.device_token, title, body, data), EMERGENCIA_PUSH_TIMEOUT_S
             )
-
-            # TODO: Implementar notificação real (Push, SMS, Call)
-            # await notification_service.send_emergency_alert(...)
-
-            notified.append({
-                'name': cuidador.nome,
-                'phone': cuidador.telefone,
-                'relationship': cuidador.parentesco,
-                'method': cuidador.metodo_preferido or 'push'
-            })
-
-        return notified
+            return
+        except Exception as erro_push:
+            if not cuidador.telefone:
+                raise
+            logger.warning(f"Push para {cuidador.nome} não entregue ({erro_push!r}); tentando SMS")
+            try:
+                await enviar_sms(cuidador.telefone, f"{title}: {body}")
+            except CanalIndisponivel:
+                # Sem SMS configurado vale o resultado do push (falha de verdade é repetida)
+                raise erro_push
 
     @staticmethod
-    async def _notify_professionals(
-        session: AsyncSession,
-        patient_id: int,
-        risk_level: str,
-        trigger_reason: str
-    ) -> List[Dict]:
-        """Notificar profissionais de saúde"""
-        from sqlalchemy import select
-
-        # Buscar cuidadores que são profissionais
-        result = await session.execute(
-            select(Cuidador).where(
-                Cuidador.idoso_id == patient_id,
-                Cuidador.tipo_cuidador.in_(['psicologo', 'psiquiatra', 'medico']),
-                Cuidador.ativo == True
+    def _contact_deliveries(patient: Idoso, contacts: List[Cuidador], risk_level: str) -> List[Entrega]:
+        """Uma entrega por contato de emergência"""
+        data = {'type': 'emergency_protocol', 'idoso_id': str(patient.id),
+                'risk_level': risk_level, 'priority': 'high'}
+        return [
+            Entrega(
+                canal='emergency_contact',
+                destinatario={
+                    'name': cuidador.nome,
+                    'phone': cuidador.telefone,
+                    'relationship': cuidador.parentesco,
+                    'method': cuidador.metodo_preferido or 'push'
+                },
+                enviar=EmergencyProtocolService._push_or_sms(
+                    cuidador,
+                    f"🚨 EMERGÊNCIA - {patient.nome}",
+                    f"{patient.nome} pode estar em risco ({risk_level}). Entre em contato agora.",
+                    data,
+                    f"📞 NOTIFICANDO CONTATO DE EMERGÊNCIA: {cuidador.nome} ({cuidador.telefone}) - "
+                    f"Paciente: {patient.nome} - Risco: {risk_level}"
+                )
             )
-        )
-        professionals = result.scalars().all()
-
-        notified = []
+            for cuidador in contacts
+        ]
 
-        for prof in professionals:
-            logger.warning(
-                f"📧 NOTIFICANDO PROFISSIONAL: {prof.nome} ({prof.tipo_cuidador}) - "
-                f"Paciente ID: {patient_id} - Risco: {risk_level}"
+    @staticmethod
+    def _professional_deliveries(patient: Idoso, professionals: List[Cuidador], risk_level: str) -> List[Entrega]:
+        """Uma entrega por profissional de saúde"""
+        data = {'type': 'emergency_protocol', 'idoso_id': str(patient.id),
+                'risk_level': risk_level, 'priority': 'high'}
+        return [
+            Entrega(
+                canal='professional',
+                destinatario={
+                    'name': prof.nome,
+                    'type': prof.tipo_cuidador,
+                    'phone': prof.telefone,
+                    'email': prof.email
+                },
+                enviar=EmergencyProtocolService._push_or_sms(
+                    prof,
+                    f"⚠️ Paciente em risco ({risk_level})",
+                    f"Protocolo de emergência acionado para o paciente {patient.id}.",
+                    data,
+                    f"📧 NOTIFICANDO PROFISSIONAL: {prof.nome} ({prof.tipo_cuidador}) - "
+                    f"Paciente ID: {patient.id} - Risco: {risk_level}"
+                )
             )
-
-            # TODO: Implementar notificação
-            # await notification_service.send_professional_alert(...)
-
-            notified.append({
-                'name': prof.nome,
-                'type': prof.tipo_cuidador,
-                'phone': prof.telefone,
-                'email': prof.email
-            })
-
-        return notified
+            for prof in professionals
+        ]
 
     @staticmethod
-    async def _send_emergency_sms(patient: Idoso, risk_level: str):
-        """Enviar SMS de emergência"""
-        # Extrair telefone do contato de emergência
+    def _sms_deliveries(patient: Idoso, risk_level: str) -> List[Entrega]:
+        """SMS para o telefone de emergência cadastrado no paciente"""
         emergency_contact = patient.contato_emergencia or {}
         phone = emergency_contact.get('telefone')
 
         if not phone:
             logger.warning(f"Paciente {patient.id} sem telefone de emergência cadastrado")
-            return
+            return []
 
         message = (
             f"🚨 ALERTA EVA - {patient.nome} pode estar em situação de risco ({risk_level}). "
             f"Entre em contato imediatamente. Em caso de emergência, ligue 188 (CVV) ou 192 (SAMU)."
         )
-
-        logger.critical(f"📱 SMS de emergência enviado para {phone}")
-
-        # TODO: Implementar envio real via Twilio ou similar
-        # await sms_service.send_sms(phone, message)
+        return [Entrega(
+            canal='sms',
+            destinatario={'name': emergency_contact.get('nome'), 'phone': phone},
+            enviar=lambda: enviar_sms(phone, message)
+        )]
 
     # =====================================================================
     # SAFETY PLAN ACTIVATION
@@ -0,0 +1,488 @@
+"""
+Mineração de padrões de comportamento em lote (padroes_comportamento)
+
+Detecta, por idoso, sobre os últimos MINERACAO_JANELA_DIAS dias:
+- horario_atendimento: período do dia em que mais atende as ligações
+  (historico_ligacoes atendidas x agendamentos sem resposta)
+- humor_negativo / humor_positivo: dia da semana com humor bem abaixo /
+  acima da própria média (mood_diary)
+- doses_perdidas_sequencia: lembretes de medicamento seguidos sem resposta
+  (agendamentos com medicamento_id)
+- pressao_elevada_periodo: período do dia com pressão sistólica alta
+  (sinais_vitais_health; o usuário do app é ligado ao idoso pelo CPF)
+
+Os idosos são divididos em fatias de MINERACAO_FATIA; cada fatia roda num
+processo de um ProcessPoolExecutor (MINERACAO_PROCESSOS), com conexão
+própria. As fontes são lidas com cursor no servidor (stream_results) e
+acumuladas em contadores por idoso: memória proporcional à fatia, não ao
+histórico. Cada fatia é uma transação: upsert dos padrões encontrados no
+índice único parcial (idoso_id, tipo_padrao) WHERE origem = 'mineracao'
+(migration 016) e desativação dos que deixaram de valer.
+
+Incremental: só idosos com dado novo desde a marca d'água gravada em
+configuracoes_sistema (MINERACAO_CHAVE_MARCA). A marca é o início da
+execução e só avança quando todas as fatias terminam. Padrões que saem da
+janela sem dado novo são revistos pela execução completa.
+
+A marca está na hora local do servidor, como historico_ligacoes.criado_em,
+agendamentos.atualizado_em e mood_diary.created_at; para
+sinais_vitais_health.created_at, gravado em UTC, ela é convertida antes da
+comparação.
+
+"Dado novo" é dado inserido: ligações, humor e sinais vitais são filtrados
+pela data de criação, pois essas tabelas não têm coluna de atualização.
+Uma linha corrigida depois de inserida (ex.: mood_score editado) só entra
+na execução completa semanal. Agendamentos usam atualizado_em e pegam
+também as mudanças de status.
+"""
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import and_, create_engine, select, union, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from database.ingestao_bulk import insert_do_dialeto, upsert_indice_parcial
+from database.models import (
+    Agendamento, Configuracao, HistoricoLigacao, Idoso, MoodDiary, PadraoComportamento,
+    SinaisVitaisHealth, Usuario
+)
+from services.score_risco_lote import STATUS_FINAIS, STATUS_SEM_RESPOSTA
+
+logger = logging.getLogger(__name__)
+
+MINERACAO_PROCESSOS = int(os.getenv("MINERACAO_PROCESSOS", str(os.cpu_count() or 2)))
+MINERACAO_FATIA = int(os.getenv("MINERACAO_FATIA", "500"))
+# Linhas trazidas do cursor do servidor por vez
+MINERACAO_YIELD = int(os.getenv("MINERACAO_YIELD", "5000"))
+MINERACAO_JANELA = timedelta(days=int(os.getenv("MINERACAO_JANELA_DIAS", "90")))
+# A próxima execução relê um pouco antes da marca: transações longas que
+# gravaram com timestamp anterior ao início não ficam de fora (reprocessar é idempotente)
+MINERACAO_MARGEM = timedelta(minutes=5)
+MINERACAO_CHAVE_MARCA = "mineracao_padroes.marca"
+
+ORIGEM = "mineracao"
+
+PERIODOS = ("madrugada", "manha", "tarde", "noite")  # hora // 6
+_PERIODO_TEXTO = ("de madrugada", "de manhã", "à tarde", "à noite")
+DIAS = ("segunda-feira", "terça-feira", "quarta-feira", "quinta-feira", "sexta-feira", "sábado", "domingo")
+_DIAS_TEXTO = ("às segundas-feiras", "às terças-feiras", "às quartas-feiras", "às quintas-feiras",
+               "às sextas-feiras", "aos sábados", "aos domingos")
+
+# Mínimos de evidência por padrão
+MIN_TENTATIVAS = 10          # ligações na janela
+MIN_TENTATIVAS_PERIODO = 5
+MIN_HUMOR = 14               # registros de humor na janela
+MIN_HUMOR_DIA = 3
+DIFERENCA_HUMOR = 1.0        # pontos (escala 1-10) da média do próprio idoso
+MIN_SEQUENCIA_DOSES = 3
+MIN_MEDICOES_PERIODO = 5
+PRESSAO_ELEVADA = 140        # mmHg
+DIFERENCA_PRESSAO = 10
+
+
+# =====================================================================
+# ACUMULADORES E DETECÇÃO (sem I/O)
+# =====================================================================
+
+@dataclass
+class Acumulador:
+    """Contadores de um idoso, alimentados linha a linha pelas fontes"""
+    atendidas: List[int] = field(default_factory=lambda: [0] * len(PERIODOS))
+    nao_atendidas: List[int] = field(default_factory=lambda: [0] * len(PERIODOS))
+    humor_n: List[int] = field(default_factory=lambda: [0] * len(DIAS))
+    humor_soma: List[float] = field(default_factory=lambda: [0.0] * len(DIAS))
+    humor_quadrados: float = 0.0
+    doses: int = 0
+    doses_perdidas: int = 0
+    sequencia: int = 0
+    maior_sequencia: int = 0
+    inicio_sequencia: Optional[datetime] = None
+    inicio_maior_sequencia: Optional[datetime] = None
+    pressao_n: List[int] = field(default_factory=lambda: [0] * len(PERIODOS))
+    pressao_soma: List[float] = field(default_factory=lambda: [0.0] * len(PERIODOS))
+    pressao_quadrados: float = 0.0
+
+    def ligacao(self, quando: datetime, atendida: bool) -> None:
+        (self.atendidas if atendida else self.nao_atendidas)[quando.hour // 6] += 1
+
+    def humor(self, dia, score: float) -> None:
+        self.humor_n[dia.weekday()] += 1
+        self.humor_soma[dia.weekday()] += score
+        self.humor_quadrados += score * score
+
+    def dose(self, quando: datetime, perdida: bool) -> None:
+        # Em ordem cronológica (a consulta ordena por idoso e horário)
+        self.doses += 1
+        if not perdida:
+            self.sequencia = 0
+            return
+        self.doses_perdidas += 1
+        if self.sequencia == 0:
+            self.inicio_sequencia = quando
+        self.sequencia += 1
+        if self.sequencia > self.maior_sequencia:
+            self.maior_sequencia = self.sequencia
+            self.inicio_maior_sequencia = self.inicio_sequencia
+
+    def pressao(self, quando: datetime, sistolica: float) -> None:
+        self.pressao_n[quando.hour // 6] += 1
+        self.pressao_soma[quando.hour // 6] += sistolica
+        self.pressao_quadrados += sistolica * sistolica
+
+
+def _wilson(sucessos: int, total: int, z: float = 1.96) -> float:
+    """Limite inferior do intervalo de Wilson: proporção conservadora para poucas amostras"""
+    if total == 0:
+        return 0.0
+    p = sucessos / total
+    centro = p + z * z / (2 * total)
+    margem = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total))
+    return (centro - margem) / (1 + z * z / total)
+
+
+def _confianca_media(media: float, geral: float, desvio: float, n: int) -> float:
+    """Quão improvável é a média do grupo diferir tanto da geral por acaso (0-1)"""
+    if desvio <= 0 or n == 0:
+        return 0.0
+    return math.erf(abs(media - geral) / (desvio / math.sqrt(n)) / math.sqrt(2))
+
+
+def _media_desvio(soma: float, quadrados: float, n: int):
+    media = soma / n
+    return media, math.sqrt(max(quadrados / n - media * media, 0.0))
+
+
+def _padrao(tipo: str, descricao: str, frequencia: str, confianca: float, ocorrencias: int,
+            dados: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "tipo_padrao": tipo,
+        "descricao": descricao,
+        "frequencia": frequencia,
+        # Numeric(3, 2)
+        "confianca": round(min(max(confianca, 0.0), 0.99), 2),
+        "ocorrencias": ocorrencias,
+        "dados_estatisticos": dados,
+    }
+
+
+def padrao_atendimento(acc: Acumulador) -> Optional[Dict[str, Any]]:
+    tentativas = [a + n for a, n in zip(acc.atendidas, acc.nao_atendidas)]
+    total = sum(tentativas)
+    if total < MIN_TENTATIVAS or not sum(acc.atendidas):
+        return None
+    taxas = [a / t if t else 0.0 for a, t in zip(acc.atendidas, tentativas)]
+    candidatos = [i for i, t in enumerate(tentativas) if t >= MIN_TENTATIVAS_PERIODO]
+    if not candidatos:
+        return None
+    melhor = max(candidatos, key=lambda i: (taxas[i], tentativas[i]))
+    return _padrao(
+        "horario_atendimento",
+        f"Atende mais as ligações {_PERIODO_TEXTO[melhor]} "
+        f"({taxas[melhor]:.0%} de {tentativas[melhor]} tentativas)",
+        "diaria",
+        _wilson(acc.atendidas[melhor], tentativas[melhor]),
+        acc.atendidas[melhor],
+        {
+            "periodo": PERIODOS[melhor],
+            "taxa_geral": round(sum(acc.atendidas) / total, 3),
+            "por_periodo": {
+                PERIODOS[i]: {"tentativas": tentativas[i], "atendidas": acc.atendidas[i], "taxa": round(taxas[i], 3)}
+                for i in range(len(PERIODOS)) if tentativas[i]
+            },
+        },
+    )
+
+
+def padroes_humor(acc: Acumulador) -> List[Dict[str, Any]]:
+    n = sum(acc.humor_n)
+    if n < MIN_HUMOR:
+        return []
+    geral, desvio = _media_desvio(sum(acc.humor_soma), acc.humor_quadrados, n)
+    medias = {d: acc.humor_soma[d] / acc.humor_n[d] for d in range(len(DIAS)) if acc.humor_n[d] >= MIN_HUMOR_DIA}
+    if not medias:
+        return []
+    dados = {
+        "media_geral": round(geral, 2),
+        "por_dia": {DIAS[d]: {"registros": acc.humor_n[d], "media": round(m, 2)} for d, m in medias.items()},
+    }
+
+    padroes = []
+    pior, melhor = min(medias, key=medias.get), max(medias, key=medias.get)
+    for tipo, dia, texto in (("humor_negativo", pior, "baixo"), ("humor_positivo", melhor, "alto")):
+        diferenca = medias[dia] - geral
+        if (diferenca if tipo == "humor_positivo" else -diferenca) < DIFERENCA_HUMOR:
+            continue
+        padroes.append(_padrao(
+            tipo,
+            f"Humor mais {texto} {_DIAS_TEXTO[dia]} (média {medias[dia]:.1f} contra {geral:.1f} no geral)",
+            "semanal",
+            _confianca_media(medias[dia], geral, desvio, acc.humor_n[dia]),
+            acc.humor_n[dia],
+            {**dados, "dia_semana": DIAS[dia]},
+        ))
+    return padroes
+
+
+def padrao_doses(acc: Acumulador) -> Optional[Dict[str, Any]]:
+    if acc.maior_sequencia < MIN_SEQUENCIA_DOSES:
+        return None
+    descricao = f"Perdeu {acc.maior_sequencia} doses seguidas"
+    if acc.sequencia:
+        descricao += f" (sequência atual: {acc.sequencia})"
+    return _padrao(
+        "doses_perdidas_sequencia",
+        descricao,
+        "recorrente",
+        _wilson(acc.doses_perdidas, acc.doses),
+        acc.doses_perdidas,
+        {
+            "doses": acc.doses,
+            "doses_perdidas": acc.doses_perdidas,
+            "maior_sequencia": acc.maior_sequencia,
+            "sequencia_atual": acc.sequencia,
+            "inicio_maior_sequencia": acc.inicio_maior_sequencia.isoformat() if acc.inicio_maior_sequencia else None,
+        },
+    )
+
+
+def padrao_pressao(acc: Acumulador) -> Optional[Dict[str, Any]]:
+    n = sum(acc.pressao_n)
+    candidatos = [i for i in range(len(PERIODOS)) if acc.pressao_n[i] >= MIN_MEDICOES_PERIODO]
+    if not candidatos:
+        return None
+    geral, desvio = _media_desvio(sum(acc.pressao_soma), acc.pressao_quadrados, n)
+    medias = {i: acc.pressao_soma[i] / acc.pressao_n[i] for i in candidatos}
+    pico = max(medias, key=medias.get)
+    if medias[pico] < PRESSAO_ELEVADA or medias[pico] - geral < DIFERENCA_PRESSAO:
+        return None
+    return _padrao(
+        "pressao_elevada_periodo",
+        f"Pressão sistólica mais alta {_PERIODO_TEXTO[pico]} (média {medias[pico]:.0f} mmHg "
+        f"contra {geral:.0f} no geral)",
+        "diaria",
+        _confianca_media(medias[pico], geral, desvio, acc.pressao_n[pico]),
+        acc.pressao_n[pico],
+        {
+            "periodo": PERIODOS[pico],
+            "media_geral": round(geral, 1),
+            "por_periodo": {PERIODOS[i]: {"medicoes": acc.pressao_n[i], "media": round(m, 1)} for i, m in medias.items()},
+        },
+    )
+
+
+def detectar(acc: Acumulador) -> List[Dict[str, Any]]:
+    padroes = [padrao_atendimento(acc), padrao_doses(acc), padrao_pressao(acc)] + padroes_humor(acc)
+    return [p for p in padroes if p is not None]
+
+
+# =====================================================================
+# LEITURA (cursor no servidor) E GRAVAÇÃO DE UMA FATIA
+# =====================================================================
+
+def _ler(db: Session, consulta) -> Iterator[Any]:
+    resultado = db.execute(consulta, execution_options={"stream_results": True, "yield_per": MINERACAO_YIELD})
+    try:
+        yield from resultado
+    finally:
+        resultado.close()
+
+
+def _consultas(ids: Sequence[int], agora: datetime):
+    """(consulta, alimentar(acumulador, linha)) de cada fonte, para os idosos da fatia"""
+    desde = agora - MINERACAO_JANELA
+    h, a = HistoricoLigacao, Agendamento
+    return [
+        (
+            select(h.idoso_id, h.inicio_chamada)
+            .where(and_(h.idoso_id.in_(ids), h.inicio_chamada >= desde, h.duracao_segundos > 0)),
+            lambda acc, linha: acc.ligacao(linha[1], True),
+        ),
+        (
+            select(a.idoso_id, a.data_hora_agendada)
+            .where(and_(a.idoso_id.in_(ids), a.status.in_(STATUS_SEM_RESPOSTA),
+                        a.data_hora_agendada >= desde, a.data_hora_agendada < agora)),
+            lambda acc, linha: acc.ligacao(linha[1], False),
+        ),
+        (
+            select(a.idoso_id, a.data_hora_agendada, a.status)
+            .where(and_(a.idoso_id.in_(ids), a.medicamento_id.isnot(None), a.status.in_(STATUS_FINAIS),
+                        a.data_hora_agendada >= desde, a.data_hora_agendada < agora))
+            .order_by(a.idoso_id, a.data_hora_agendada),
+            lambda acc, linha: acc.dose(linha[1], linha[2] in STATUS_SEM_RESPOSTA),
+        ),
+        (
+            select(MoodDiary.patient_id, MoodDiary.date, MoodDiary.mood_score)
+            .where(and_(MoodDiary.patient_id.in_(ids), MoodDiary.date >= desde.date(),
+                        MoodDiary.mood_score.isnot(None))),
+            lambda acc, linha: acc.humor(linha[1], float(linha[2])),
+        ),
+        (
+            select(Idoso.id, SinaisVitaisHealth.timestamp_coleta, SinaisVitaisHealth.pressao_sistolica)
+            .join(Usuario, Usuario.cpf == Idoso.cpf)
+            .join(SinaisVitaisHealth, SinaisVitaisHealth.cliente_id == Usuario.id)
+            .where(and_(Idoso.id.in_(ids), SinaisVitaisHealth.timestamp_coleta >= desde,
+                        SinaisVitaisHealth.pressao_sistolica.isnot(None))),
+            lambda acc, linha: acc.pressao(linha[1], float(linha[2])),
+        ),
+    ]
+
+
+def _upsert(db: Session, linhas: List[Dict[str, Any]]) -> None:
+    upsert_indice_parcial(
+        db, PadraoComportamento, ["idoso_id", "tipo_padrao"], f"origem = '{ORIGEM}'",
+        ["descricao", "frequencia", "confianca", "ocorrencias", "dados_estatisticos",
+         "ativo", "ultima_confirmacao", "atualizado_em"],
+        linhas,
+    )
+
+
+def minerar_fatia(db: Session, ids: Sequence[int], agora: datetime) -> Dict[str, int]:
+    """Minera e grava os padrões de uma fatia de idosos (sem commit)"""
+    acumuladores: Dict[int, Acumulador] = {i: Acumulador() for i in ids}
+    for consulta, alimentar in _consultas(ids, agora):
+        for linha in _ler(db, consulta):
+            alimentar(acumuladores[linha[0]], linha)
+
+    linhas = [
+        {
+            **padrao,
+            "idoso_id": idoso_id,
+            "origem": ORIGEM,
+            "ativo": True,
+            "primeira_deteccao": agora,
+            "ultima_confirmacao": agora,
+            "criado_em": agora,
+            "atualizado_em": agora,
+        }
+        for idoso_id, acc in acumuladores.items()
+        for padrao in detectar(acc)
+    ]
+    if linhas:
+        _upsert(db, linhas)
+
+    # Padrão minerado antes e não confirmado agora deixou de valer
+    desativados = db.execute(
+        update(PadraoComportamento)
+        .where(and_(
+            PadraoComportamento.origem == ORIGEM,
+            PadraoComportamento.idoso_id.in_(ids),
+            PadraoComportamento.ativo == True,  # noqa: E712
+            PadraoComportamento.ultima_confirmacao < agora,
+        ))
+        .values(ativo=False, atualizado_em=agora)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return {"pacientes": len(ids), "padroes": len(linhas), "desativados": desativados}
+
+
+# =====================================================================
+# PROCESSOS
+# =====================================================================
+
+# Engine por processo filho, criado na primeira fatia que ele recebe
+_engines: Dict[str, Engine] = {}
+
+
+def _minerar_fatia_processo(url: str, ids: Sequence[int], agora: datetime) -> Dict[str, int]:
+    if url not in _engines:
+        _engines[url] = create_engine(url, pool_pre_ping=True)
+    with Session(_engines[url]) as db:
+        resultado = minerar_fatia(db, ids, agora)
+        db.commit()
+    return resultado
+
+
+def _pacientes(db: Session, desde: Optional[datetime], agora: datetime) -> List[int]:
+    """Idosos ativos; com `desde`, só os que têm dado novo depois dele"""
+    consulta = select(Idoso.id).where(Idoso.ativo == True).order_by(Idoso.id)  # noqa: E712
+    if desde is not None:
+        desde_utc = desde - desde.astimezone().utcoffset()
+        alterados = union(
+            select(HistoricoLigacao.idoso_id).where(HistoricoLigacao.criado_em > desde),
+            select(Agendamento.idoso_id).where(Agendamento.atualizado_em > desde),
+            select(MoodDiary.patient_id).where(MoodDiary.created_at > desde),
+            select(Idoso.id)
+            .join(Usuario, Usuario.cpf == Idoso.cpf)
+            .join(SinaisVitaisHealth, SinaisVitaisHealth.cliente_id == Usuario.id)
+            # timestamp_coleta restringe às partições da janela
+            .where(and_(SinaisVitaisHealth.timestamp_coleta >= agora - MINERACAO_JANELA,
+                        SinaisVitaisHealth.created_at > desde_utc)),
+        ).subquery()
+        consulta = consulta.where(Idoso.id.in_(select(alterados.c[0])))
+    return [linha[0] for linha in _ler(db, consulta)]
+
+
+def ler_marca(db: Session) -> Optional[datetime]:
+    valor = db.execute(
+        select(Configuracao.valor).where(Configuracao.chave == MINERACAO_CHAVE_MARCA)
+    ).scalar_one_or_none()
+    return datetime.fromisoformat(valor) if valor else None
+
+
+def _gravar_marca(db: Session, marca: datetime) -> None:
+    stmt, _ = insert_do_dialeto(db, Configuracao)
+    stmt = stmt.values(
+        chave=MINERACAO_CHAVE_MARCA, valor=marca.isoformat(), tipo="datetime", categoria="ia",
+        descricao="Início da última mineração de padrões concluída (services/mineracao_padroes.py)",
+        atualizado_em=datetime.now(),
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["chave"], set_={"valor": stmt.excluded.valor, "atualizado_em": stmt.excluded.atualizado_em}
+    ))
+
+
+def minerar_padroes(
+    db: Session,
+    incremental: bool = True,
+    processos: int = MINERACAO_PROCESSOS,
+    fatia: int = MINERACAO_FATIA,
+    ao_progredir: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Minera os padrões de todos os idosos ativos (ou, incremental, dos que
+    têm dado novo desde a última execução) e avança a marca d'água
+    """
+    inicio = time.perf_counter()
+    agora = datetime.now()
+    marca = ler_marca(db) if incremental else None
+    ids = _pacientes(db, marca - MINERACAO_MARGEM if marca else None, agora)
+    db.commit()
+    fatias = [ids[i:i + fatia] for i in range(0, len(ids), fatia)]
+
+    resultado: Dict[str, Any] = {
+        "incremental": marca is not None, "desde": marca.isoformat() if marca else None,
+        "fatias": len(fatias), "pacientes": 0, "padroes": 0, "desativados": 0,
+    }
+
+    def _somar(parcial: Dict[str, int]):
+        for chave in ("pacientes", "padroes", "desativados"):
+            resultado[chave] += parcial[chave]
+        if ao_progredir:
+            ao_progredir(dict(resultado))
+
+    # Worker do Celery (prefork) é processo daemon e não pode ter filhos
+    if processos > 1 and len(fatias) > 1 and not multiprocessing.current_process().daemon:
+        url = db.get_bind().url.render_as_string(hide_password=False)
+        with ProcessPoolExecutor(max_workers=min(processos, len(fatias))) as pool:
+            for parcial in pool.map(_minerar_fatia_processo, repeat(url), fatias, repeat(agora)):
+                _somar(parcial)
+    else:
+        for ids_fatia in fatias:
+            parcial = minerar_fatia(db, ids_fatia, agora)
+            db.commit()
+            _somar(parcial)
+
+    _gravar_marca(db, agora)
+    db.commit()
+
+    resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resultado
@@ -0,0 +1,186 @@
+"""
+Análise NLP em lote (muitos textos de uma vez, em vários núcleos)
+
+- analisar_lote(): lista de textos -> lista de análises, na mesma ordem.
+  Lotes pequenos rodam no próprio processo; os grandes são fatiados e
+  distribuídos num ProcessPoolExecutor (NLP_PROCESSOS), fora do event loop.
+- colunas(): as análises como vetores (scores, labels, riscos...), para
+  quem consome o lote inteiro.
+- backfill_transcricoes(): analisa historico_ligacoes.transcricao_completa
+  em lotes de NLP_LOTE_DB linhas (leitura por keyset no id, INSERT de
+  várias linhas em nlp_conversation_analysis). A leitura do lote seguinte
+  roda enquanto o atual está no pool. Idempotente: ligação já analisada
+  é pulada (índice único em historico_ligacao_id). As análises gravadas
+  atualizam patient_risk_state na mesma transação.
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.estado_risco import aplicar_analises
+from database.ingestao_bulk import insert_do_dialeto
+from database.models import HistoricoLigacao, NLPConversationAnalysis
+from services.nlp_service import NLPService
+
+logger = logging.getLogger(__name__)
+
+NLP_PROCESSOS = int(os.getenv("NLP_PROCESSOS", str(os.cpu_count() or 2)))
+# Textos por tarefa enviada ao pool
+NLP_FATIA = int(os.getenv("NLP_FATIA", "200"))
+# Abaixo disso não compensa serializar para outro processo
+NLP_MINIMO_POOL = int(os.getenv("NLP_MINIMO_POOL", "64"))
+# Ligações lidas/gravadas por vez no backfill
+NLP_LOTE_DB = int(os.getenv("NLP_LOTE_DB", "1000"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _analisar(textos: List[str]) -> List[Dict[str, Any]]:
+    # Roda no processo filho (precisa ser função de módulo para o pickle)
+    return [NLPService.analyze_message(texto or "") for texto in textos]
+
+
+def _pool_nlp() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=NLP_PROCESSOS)
+    return _pool
+
+
+def encerrar_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+async def analisar_lote(textos: List[str], usar_pool: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """Análise de cada texto (formato de NLPService.analyze_message), na ordem de entrada"""
+    if usar_pool is None:
+        usar_pool = len(textos) >= NLP_MINIMO_POOL and NLP_PROCESSOS > 1
+    if not usar_pool:
+        return _analisar(textos)
+
+    loop = asyncio.get_running_loop()
+    pool = _pool_nlp()
+    fatias = await asyncio.gather(*[
+        loop.run_in_executor(pool, _analisar, textos[i:i + NLP_FATIA])
+        for i in range(0, len(textos), NLP_FATIA)
+    ])
+    return [analise for fatia in fatias for analise in fatia]
+
+
+def colunas(analises: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Análises como vetores paralelos (uma posição por texto)"""
+    return {
+        "sentiment_scores": [a["sentiment_score"] for a in analises],
+        "sentiment_labels": [a["sentiment_label"] for a in analises],
+        "risk_levels": [a["risk_level"] for a in analises],
+        "danger_flags": [a["danger_flags"] for a in analises],
+        "topics": [a["topics"] for a in analises],
+    }
+
+
+def linha_analise(analise: Dict[str, Any], patient_id: int, **extra) -> Dict[str, Any]:
+    """Linha de nlp_conversation_analysis a partir de uma análise"""
+    return {
+        "patient_id": patient_id,
+        "sentiment_score": analise["sentiment_score"],
+        "sentiment_label": analise["sentiment_label"],
+        "detected_keywords": analise["detected_keywords"],
+        "danger_flags": analise["danger_flags"],
+        "extracted_entities": analise["entities"],
+        "topic_classification": analise["topics"],
+        "analyzed_at": datetime.fromisoformat(analise["analyzed_at"]),
+        **extra,
+    }
+
+
+async def _ler_ligacoes(session_factory, apos_id: int, ate_id: Optional[int],
+                        desde: Optional[datetime], lote: int) -> List[Any]:
+    ja_analisada = (
+        select(NLPConversationAnalysis.id)
+        .where(NLPConversationAnalysis.historico_ligacao_id == HistoricoLigacao.id)
+        .exists()
+    )
+    query = (
+        select(HistoricoLigacao.id, HistoricoLigacao.idoso_id, HistoricoLigacao.transcricao_completa)
+        .where(
+            HistoricoLigacao.id > apos_id,
+            HistoricoLigacao.transcricao_completa.isnot(None),
+            HistoricoLigacao.idoso_id.isnot(None),
+            ~ja_analisada,
+        )
+        .order_by(HistoricoLigacao.id)
+        .limit(lote)
+    )
+    if ate_id is not None:
+        query = query.where(HistoricoLigacao.id <= ate_id)
+    if desde is not None:
+        query = query.where(HistoricoLigacao.inicio_chamada >= desde)
+    async with session_factory() as db:
+        return (await db.execute(query)).all()
+
+
+async def _gravar_analises(db: AsyncSession, linhas: List[Dict[str, Any]]) -> None:
+    # INSERT do Core (pela Table): o caminho em massa do ORM resolve todas as
+    # FKs do model, e conversation_sessions/messages não têm model.
+    # executemany: o SQLAlchemy agrupa em INSERTs de várias linhas
+    tabela = NLPConversationAnalysis.__table__
+    stmt, _ = insert_do_dialeto(db, tabela)
+    result = await db.execute(
+        stmt.on_conflict_do_nothing(index_elements=["historico_ligacao_id"])
+        .returning(tabela.c.historico_ligacao_id),
+        linhas
+    )
+    # Só as efetivamente gravadas entram no estado de risco
+    gravadas = set(result.scalars())
+    await aplicar_analises(db, (l for l in linhas if l["historico_ligacao_id"] in gravadas))
+    await db.commit()
+
+
+async def backfill_transcricoes(
+    session_factory,
+    apos_id: int = 0,
+    ate_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    lote: int = NLP_LOTE_DB,
+    ao_progredir: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Analisa as transcrições ainda sem análise, de `apos_id` em diante
+
+    `ao_progredir` recebe o resultado parcial após cada lote gravado; o
+    `ultimo_id` dele serve de `apos_id` para retomar um backfill interrompido.
+    """
+    resultado = {"ligacoes": 0, "riscos": 0, "ultimo_id": apos_id}
+    ligacoes = await _ler_ligacoes(session_factory, apos_id, ate_id, desde, lote)
+
+    while ligacoes:
+        analisando = asyncio.ensure_future(analisar_lote([l.transcricao_completa for l in ligacoes]))
+        # Próximo lote é lido enquanto o pool analisa este
+        proximas = await _ler_ligacoes(session_factory, ligacoes[-1].id, ate_id, desde, lote) \
+            if len(ligacoes) == lote else []
+        analises = await analisando
+
+        linhas = [
+            linha_analise(analise, ligacao.idoso_id, historico_ligacao_id=ligacao.id)
+            for ligacao, analise in zip(ligacoes, analises)
+        ]
+        async with session_factory() as db:
+            await _gravar_analises(db, linhas)
+
+        resultado["ligacoes"] += len(ligacoes)
+        resultado["riscos"] += sum(1 for a in analises if a["risk_level"] in ("HIGH", "CRITICAL"))
+        resultado["ultimo_id"] = ligacoes[-1].id
+        if ao_progredir:
+            ao_progredir(dict(resultado))
+        ligacoes = proximas
+
+    return resultado
@@ -3,9 +3,12 @@ Serviço de NLP para análise de conversas e detecção de risco
 """
 import re
 import logging
-from typing import List, Dict, Tuple, Optional
+from itertools import islice
+from typing import List, Dict, FrozenSet, Tuple, Optional
 from datetime import datetime
 
+from utils.aho_corasick import AhoCorasick
+
 logger = logging.getLogger(__name__)
 
 
@@ -77,6 +80,84 @@ class NLPService:
         ]
     }
 
+    # =====================================================================
+    # ENTIDADES, TÓPICOS E PALAVRAS COMUNS
+    # =====================================================================
+
+    ENTITY_KEYWORDS = {
+        'emotions': [
+            'tristeza', 'alegria', 'raiva', 'medo', 'ansiedade', 'pânico',
+            'felicidade', 'amor', 'ódio', 'frustração', 'alívio', 'esperança'
+        ],
+        'health_terms': [
+            'medicamento', 'terapia', 'médico', 'psicólogo', 'psiquiatra',
+            'hospital', 'consulta', 'tratamento', 'remédio'
+        ],
+        'time_references': ['hoje', 'ontem', 'amanhã', 'semana', 'mês', 'ano']
+    }
+
+    TOPIC_KEYWORDS = {
+        'family': ['família', 'pai', 'mãe', 'filho', 'filha', 'irmão', 'irmã', 'neto', 'neta', 'esposa', 'marido'],
+        'work': ['trabalho', 'emprego', 'chefe', 'colega', 'carreira', 'demissão', 'desemprego'],
+        'health': ['saúde', 'doença', 'dor', 'sintoma', 'médico', 'hospital', 'medicamento'],
+        'death': ['morte', 'morrer', 'funeral', 'cemitério', 'falecimento'],
+        'relationships': ['relacionamento', 'namoro', 'casamento', 'amor', 'término', 'divórcio'],
+        'finances': ['dinheiro', 'dívida', 'conta', 'desemprego', 'salário', 'financeiro'],
+        'loneliness': ['solidão', 'sozinho', 'isolado', 'sem amigos'],
+        'mental_health': ['depressão', 'ansiedade', 'pânico', 'estresse', 'terapia', 'psicólogo']
+    }
+
+    COMMON_WORDS = {
+        'negative': ['não', 'nunca', 'nada', 'triste', 'ruim', 'mal', 'difícil', 'problema'],
+        'positive': ['sim', 'bom', 'bem', 'feliz', 'alegre', 'ótimo', 'legal', 'gosto']
+    }
+
+    NAME_PATTERN = re.compile(r'\b[A-Z][a-zá-ú]+\b')
+
+    # Autômato com todas as listas acima; montado no primeiro uso
+    _automato: Optional[AhoCorasick] = None
+
+    @staticmethod
+    def _listas() -> Dict[str, Dict[str, List[str]]]:
+        return {
+            'danger': NLPService.DANGER_KEYWORDS,
+            'positive': NLPService.POSITIVE_KEYWORDS,
+            'entity': NLPService.ENTITY_KEYWORDS,
+            'topic': NLPService.TOPIC_KEYWORDS,
+            'common': NLPService.COMMON_WORDS,
+        }
+
+    @staticmethod
+    def scan(text: str) -> FrozenSet[Tuple[str, str, str]]:
+        """
+        Uma única passada pelo texto com todas as listas de keywords
+
+        Retorna o conjunto de (lista, categoria, keyword) presentes. Casa só
+        palavras inteiras e ignora acento, caixa e espaçamento.
+        """
+        if NLPService._automato is None:
+            NLPService._automato = AhoCorasick(
+                (keyword, (lista, categoria, keyword))
+                for lista, categorias in NLPService._listas().items()
+                for categoria, keywords in categorias.items()
+                for keyword in keywords
+            )
+        return frozenset(NLPService._automato.encontrar(text))
+
+    @staticmethod
+    def _presentes(found: FrozenSet[Tuple[str, str, str]], lista: str, categoria: str) -> List[str]:
+        """Keywords da categoria presentes no texto, na ordem da lista"""
+        return [
+            keyword for keyword in NLPService._listas()[lista][categoria]
+            if (lista, categoria, keyword) in found
+        ]
+
+    @staticmethod
+    def _categorias(found: FrozenSet[Tuple[str, str, str]], lista: str) -> List[str]:
+        """Categorias com alguma keyword presente, na ordem do dicionário"""
+        presentes = {categoria for nome, categoria, _ in found if nome == lista}
+        return [categoria for categoria in NLPService._listas()[lista] if categoria in presentes]
+
     # =====================================================================
     # MÉTODOS PRINCIPAIS
     # =====================================================================
@@ -97,23 +178,26 @@ class NLPService:
             'topics': List[str]
         }
         """
+        # Uma passada pelo texto alimenta todas as etapas
+        found = NLPService.scan(text)
+
         # 1. Análise de sentimento
-        sentiment_score, sentiment_label = NLPService.analyze_sentiment_simple(text)
+        sentiment_score, sentiment_label = NLPService.analyze_sentiment_simple(text, found)
 
         # 2. Detecção de keywords perigosas
-        danger_flags = NLPService.detect_danger_keywords(text)
+        danger_flags = NLPService.detect_danger_keywords(text, found)
 
         # 3. Detecção de keywords gerais
-        all_keywords = NLPService.extract_keywords(text)
+        all_keywords = NLPService.extract_keywords(text, found)
 
         # 4. Calcular nível de risco
         risk_level = NLPService.calculate_risk_level(danger_flags, sentiment_score)
 
         # 5. Extração de entidades básicas
-        entities = NLPService.extract_entities_simple(text)
+        entities = NLPService.extract_entities_simple(text, found)
 
         # 6. Classificação de tópicos
-        topics = NLPService.classify_topics(text)
+        topics = NLPService.classify_topics(text, found)
 
         return {
             'sentiment_score': sentiment_score,
@@ -127,42 +211,27 @@ class NLPService:
         }
 
     @staticmethod
-    def analyze_sentiment_simple(text: str) -> Tuple[float, str]:
+    def analyze_sentiment_simple(text: str, found: Optional[FrozenSet] = None) -> Tuple[float, str]:
         """
         Análise de sentimento simples baseada em keywords
         (Para produção, usar modelo de ML)
 
         Returns: (score: float, label: str)
         """
-        text_lower = text.lower()
+        if found is None:
+            found = NLPService.scan(text)
 
-        # Contar keywords positivas e negativas
         positive_count = 0
         negative_count = 0
+        for lista, _, _ in found:
+            if lista == 'positive':
+                positive_count += 1
+            elif lista == 'danger':
+                negative_count += 2  # Peso maior para keywords perigosas
 
-        # Contar positivas
-        for category, keywords in NLPService.POSITIVE_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    positive_count += 1
-
-        # Contar negativas
-        for category, keywords in NLPService.DANGER_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    negative_count += 2  # Peso maior para keywords perigosas
-
-        # Palavras negativas comuns
-        common_negative = ['não', 'nunca', 'nada', 'triste', 'ruim', 'mal', 'difícil', 'problema']
-        for word in common_negative:
-            if f' {word} ' in f' {text_lower} ':
-                negative_count += 0.5
-
-        # Palavras positivas comuns
-        common_positive = ['sim', 'bom', 'bem', 'feliz', 'alegre', 'ótimo', 'legal', 'gosto']
-        for word in common_positive:
-            if f' {word} ' in f' {text_lower} ':
-                positive_count += 0.5
+        # Palavras comuns
+        negative_count += 0.5 * len(NLPService._presentes(found, 'common', 'negative'))
+        positive_count += 0.5 * len(NLPService._presentes(found, 'common', 'positive'))
 
         # Calcular score normalizado (-1 a 1)
         total = positive_count + negative_count
@@ -187,41 +256,22 @@ class NLPService:
         return round(score, 4), label
 
     @staticmethod
-    def detect_danger_keywords(text: str) -> List[str]:
+    def detect_danger_keywords(text: str, found: Optional[FrozenSet] = None) -> List[str]:
         """
         Detectar keywords perigosas no texto
 
         Retorna lista de categorias de perigo detectadas
         """
-        text_lower = text.lower()
-        flags = []
-
-        for category, keywords in NLPService.DANGER_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    if category not in flags:
-                        flags.append(category)
-                    break  # Já detectou esta categoria
-
-        return flags
+        if found is None:
+            found = NLPService.scan(text)
+        return NLPService._categorias(found, 'danger')
 
     @staticmethod
-    def extract_keywords(text: str) -> List[str]:
-        """Extrair todas as keywords relevantes"""
-        text_lower = text.lower()
-        found_keywords = []
-
-        # Verificar todas as keywords (positivas e negativas)
-        all_keywords = {}
-        all_keywords.update(NLPService.POSITIVE_KEYWORDS)
-        all_keywords.update(NLPService.DANGER_KEYWORDS)
-
-        for category, keywords in all_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    found_keywords.append(keyword)
-
-        return list(set(found_keywords))  # Remover duplicatas
+    def extract_keywords(text: str, found: Optional[FrozenSet] = None) -> List[str]:
+        """Extrair todas as keywords relevantes (positivas e negativas)"""
+        if found is None:
+            found = NLPService.scan(text)
+        return list({keyword for lista, _, keyword in found if lista in ('positive', 'danger')})
 
     @staticmethod
     def calculate_risk_level(danger_flags: List[str], sentiment_score: float) -> str:
@@ -256,79 +306,33 @@ class NLPService:
         return 'NONE'
 
     @staticmethod
-    def extract_entities_simple(text: str) -> Dict[str, List[str]]:
+    def extract_entities_simple(text: str, found: Optional[FrozenSet] = None) -> Dict[str, List[str]]:
         """
         Extração simples de entidades
         (Para produção, usar spaCy ou similar)
         """
-        entities = {
-            'people': [],
-            'emotions': [],
-            'health_terms': [],
-            'time_references': []
-        }
+        if found is None:
+            found = NLPService.scan(text)
 
-        text_lower = text.lower()
-
-        # Emoções
-        emotion_keywords = [
-            'tristeza', 'alegria', 'raiva', 'medo', 'ansiedade', 'pânico',
-            'felicidade', 'amor', 'ódio', 'frustração', 'alívio', 'esperança'
-        ]
-        for emotion in emotion_keywords:
-            if emotion in text_lower:
-                entities['emotions'].append(emotion)
-
-        # Termos de saúde
-        health_keywords = [
-            'medicamento', 'terapia', 'médico', 'psicólogo', 'psiquiatra',
-            'hospital', 'consulta', 'tratamento', 'remédio'
-        ]
-        for health_term in health_keywords:
-            if health_term in text_lower:
-                entities['health_terms'].append(health_term)
-
-        # Referências temporais
-        time_keywords = ['hoje', 'ontem', 'amanhã', 'semana', 'mês', 'ano']
-        for time_ref in time_keywords:
-            if time_ref in text_lower:
-                entities['time_references'].append(time_ref)
+        entities = {'people': []}
+        for categoria in NLPService.ENTITY_KEYWORDS:
+            entities[categoria] = NLPService._presentes(found, 'entity', categoria)
 
         # Pessoas (regex simples para nomes próprios - básico)
-        # Padrão: palavra começando com maiúscula
-        name_pattern = r'\b[A-Z][a-zá-ú]+\b'
-        potential_names = re.findall(name_pattern, text)
-        entities['people'] = potential_names[:5]  # Limitar a 5
+        # Padrão: palavra começando com maiúscula; para no 5º (limite)
+        potential_names = NLPService.NAME_PATTERN.finditer(text)
+        entities['people'] = [m.group() for m in islice(potential_names, 5)]
 
         return entities
 
     @staticmethod
-    def classify_topics(text: str) -> List[str]:
+    def classify_topics(text: str, found: Optional[FrozenSet] = None) -> List[str]:
         """
         Classificação de tópicos (simples, baseado em keywords)
         """
-        topics = []
-        text_lower = text.lower()
-
-        topic_keywords = {
-            'family': ['família', 'pai', 'mãe', 'filho', 'filha', 'irmão', 'irmã', 'neto', 'neta', 'esposa', 'marido'],
-            'work': ['trabalho', 'emprego', 'chefe', 'colega', 'carreira', 'demissão', 'desemprego'],
-            'health': ['saúde', 'doença', 'dor', 'sintoma', 'médico', 'hospital', 'medicamento'],
-            'death': ['morte', 'morrer', 'funeral', 'cemitério', 'falecimento'],
-            'relationships': ['relacionamento', 'namoro', 'casamento', 'amor', 'término', 'divórcio'],
-            'finances': ['dinheiro', 'dívida', 'conta', 'desemprego', 'salário', 'financeiro'],
-            'loneliness': ['solidão', 'sozinho', 'isolado', 'sem amigos'],
-            'mental_health': ['depressão', 'ansiedade', 'pânico', 'estresse', 'terapia', 'psicólogo']
-        }
-
-        for topic, keywords in topic_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    if topic not in topics:
-                        topics.append(topic)
-                    break
-
-        return topics
+        if found is None:
+            found = NLPService.scan(text)
+        return NLPService._categorias(found, 'topic')
 
     # =====================================================================
     # ANÁLISE DE CONVERSAÇÃO COMPLETA
@@ -0,0 +1,278 @@
+"""
+Score de risco populacional em lote (ml_predictions)
+
+Pontua todos os idosos ativos de uma vez, sem uma consulta por paciente:
+- lê os idosos por keyset no id, SCORE_LOTE por vez (memória constante)
+- para cada lote, quatro consultas agregadas sobre a faixa de ids
+  (patient_id > apos AND patient_id <= ultimo, sem IN com milhares de
+  parâmetros): patient_risk_state (últimos PHQ-9/GAD-7/C-SSRS, média
+  móvel do sentimento, crises), mood_diary (humor e ansiedade dos últimos
+  14 dias) e agendamentos dos últimos 30 dias (adesão aos lembretes de
+  medicamento e taxa de ligações não atendidas)
+- monta a matriz de features (pacientes x features) em NumPy, calcula o
+  score logístico, o rótulo e a confiança vetorizados
+- grava com um único INSERT ... ON CONFLICT DO UPDATE por lote sobre o
+  índice único ux_ml_predictions_score_populacional (migration 015): uma
+  linha por paciente para este modelo, regravada a cada execução
+
+Não existe registro de tomadas de medicamento: a adesão é a fração dos
+lembretes de medicamento (agendamentos com medicamento_id) concluídos.
+
+O tipo gravado é crisis_30d, não suicide_risk: o score é uma triagem e não
+entra em patient_risk_state nem dispara o protocolo de emergência.
+Os pesos são a calibração inicial, a partir dos limiares clínicos já usados
+em estado_risco; um modelo treinado entra trocando PESOS/INTERCEPTO e
+SCORE_MODELO_VERSAO.
+"""
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.orm import Session
+
+from database.estado_risco import JANELA_SENTIMENTO, JANELA_TENTATIVA, NIVEIS
+from database.ingestao_bulk import upsert_indice_parcial
+from database.models import Agendamento, Idoso, MLPrediction, MoodDiary, PatientRiskState
+
+logger = logging.getLogger(__name__)
+
+SCORE_LOTE = int(os.getenv("SCORE_LOTE", "5000"))
+# Uma execução a cada 6h; a predição vale por um dia para uma execução perdida não apagá-la
+SCORE_VALIDADE = timedelta(hours=int(os.getenv("SCORE_VALIDADE_HORAS", "24")))
+
+SCORE_MODELO = "risco_populacional"
+SCORE_MODELO_VERSAO = "v1"
+SCORE_TIPO = "crisis_30d"
+
+JANELA_HUMOR = timedelta(days=14)
+JANELA_CRISE = timedelta(days=30)
+JANELA_AGENDAMENTOS = timedelta(days=30)
+
+# Agendamentos já encerrados; os sem resposta contam como ligação não atendida / dose perdida
+STATUS_FINAIS = ("concluido", "falhou", "nao_atendido", "falhou_definitivamente")
+STATUS_SEM_RESPOSTA = ("nao_atendido", "falhou_definitivamente")
+
+# Todas as features normalizadas em [0, 1]; ausência de dado vale 0
+FEATURES = (
+    "phq9", "gad7", "cssrs", "sentimento_negativo", "crise_30d", "tentativa_30d", "crises",
+    "humor_baixo", "ansiedade", "nao_adesao", "sem_resposta",
+)
+PESOS = np.array([3.0, 1.5, 4.0, 1.5, 1.0, 5.0, 0.8, 1.5, 0.8, 1.0, 1.0])
+INTERCEPTO = -3.5
+
+# value >= limiar -> rótulo (MODERATE, HIGH, CRITICAL); abaixo do primeiro, LOW
+LIMIARES = np.array([0.25, 0.5, 0.75])
+ROTULOS = np.array(NIVEIS[::-1])
+
+# Grupos de dados: a confiança cresce com quantos deles o paciente tem
+_GRUPOS = ("avaliacoes", "sentimento", "humor", "adesao", "ligacoes")
+
+
+# =====================================================================
+# SCORE (sem I/O)
+# =====================================================================
+
+def pontuar(x: np.ndarray, cobertura: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Matriz de features (n x len(FEATURES)) e fração de grupos com dado
+    (n,) -> (valor, rótulo, confiança), um por paciente
+    """
+    valor = 1.0 / (1.0 + np.exp(-(x @ PESOS + INTERCEPTO)))
+    rotulo = ROTULOS[np.digitize(valor, LIMIARES)]
+    confianca = 0.3 + 0.7 * cobertura
+    return valor, rotulo, confianca
+
+
+def _matriz(ids: np.ndarray, linhas: Sequence[Sequence[Any]], colunas: int) -> np.ndarray:
+    """
+    Linhas (patient_id, v1, v2, ...) de uma consulta agregada -> matriz
+    (len(ids) x colunas) alinhada a `ids`, NaN para quem não apareceu
+    """
+    saida = np.full((len(ids), colunas), np.nan)
+    if not linhas:
+        return saida
+    bruto = np.array(linhas, dtype=object)
+    bruto[np.equal(bruto, None)] = np.nan
+    bruto = bruto.astype(float)
+    posicoes = np.searchsorted(ids, bruto[:, 0])
+    # A faixa de ids inclui inativos, que não estão em `ids`
+    dentro = posicoes < len(ids)
+    dentro[dentro] = ids[posicoes[dentro]] == bruto[dentro, 0]
+    saida[posicoes[dentro]] = bruto[dentro, 1:]
+    return saida
+
+
+def _razao(parte: np.ndarray, total: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total > 0, parte / total, np.nan)
+
+
+def montar_features(
+    estado: np.ndarray, humor: np.ndarray, agenda: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Matrizes alinhadas das consultas -> (features normalizadas, cobertura)"""
+    phq9, gad7, cssrs, sentimento, crise_30d, tentativa_30d, crises = estado.T
+    humor_medio, ansiedade_media = humor.T
+    lembretes, lembretes_concluidos, ligacoes, sem_resposta = agenda.T
+
+    adesao = _razao(lembretes_concluidos, lembretes)
+    taxa_sem_resposta = _razao(sem_resposta, ligacoes)
+
+    colunas = np.column_stack([
+        phq9 / 27,
+        gad7 / 21,
+        cssrs / 5,
+        np.clip(-sentimento, 0, 1),
+        crise_30d,
+        tentativa_30d,
+        np.minimum(crises, 5) / 5,
+        (10 - humor_medio) / 9,
+        (ansiedade_media - 1) / 9,
+        1 - adesao,
+        taxa_sem_resposta,
+    ])
+    presentes = np.column_stack([
+        ~(np.isnan(phq9) & np.isnan(gad7) & np.isnan(cssrs)),
+        ~np.isnan(sentimento),
+        ~np.isnan(humor_medio),
+        ~np.isnan(adesao),
+        ~np.isnan(taxa_sem_resposta),
+    ])
+    x = np.clip(np.nan_to_num(colunas, nan=0.0), 0, 1)
+    return x, presentes.sum(axis=1) / len(_GRUPOS)
+
+
+# =====================================================================
+# CONSULTAS (uma por fonte, sobre a faixa de ids do lote)
+# =====================================================================
+
+def _consulta_estado(apos: int, ultimo: int, agora: datetime):
+    e = PatientRiskState
+    return select(
+        e.patient_id, e.phq9_score, e.gad7_score, e.cssrs_score,
+        case((e.sentiment_at >= agora - JANELA_SENTIMENTO, e.sentiment_ewma)),
+        case((e.last_crisis_at >= agora - JANELA_CRISE, 1), else_=0),
+        case((e.last_suicide_attempt_at >= agora - JANELA_TENTATIVA, 1), else_=0),
+        e.crisis_count,
+    ).where(and_(e.patient_id > apos, e.patient_id <= ultimo))
+
+
+def _consulta_humor(apos: int, ultimo: int, hoje: date):
+    return select(
+        MoodDiary.patient_id, func.avg(MoodDiary.mood_score), func.avg(MoodDiary.anxiety_level),
+    ).where(and_(
+        MoodDiary.patient_id > apos, MoodDiary.patient_id <= ultimo,
+        MoodDiary.date >= hoje - JANELA_HUMOR,
+    )).group_by(MoodDiary.patient_id)
+
+
+def _consulta_agenda(apos: int, ultimo: int, agora: datetime):
+    a = Agendamento
+    lembrete = a.medicamento_id.isnot(None)
+    return select(
+        a.idoso_id,
+        func.count().filter(lembrete),
+        func.count().filter(and_(lembrete, a.status == "concluido")),
+        func.count().filter(~lembrete),
+        func.count().filter(and_(~lembrete, a.status.in_(STATUS_SEM_RESPOSTA))),
+    ).where(and_(
+        a.idoso_id > apos, a.idoso_id <= ultimo,
+        a.data_hora_agendada >= agora - JANELA_AGENDAMENTOS, a.data_hora_agendada < agora,
+        a.status.in_(STATUS_FINAIS),
+    )).group_by(a.idoso_id)
+
+
+# =====================================================================
+# GRAVAÇÃO
+# =====================================================================
+
+def _upsert(db: Session, linhas: List[Dict[str, Any]]) -> None:
+    upsert_indice_parcial(
+        db, MLPrediction, ["patient_id", "model_name", "prediction_type"], f"model_name = '{SCORE_MODELO}'",
+        ["model_version", "prediction_value", "prediction_label", "confidence_score",
+         "features_used", "predicted_at", "valid_until"],
+        linhas,
+        # Nova predição: o desfecho registrado era da anterior
+        fixos={"actual_outcome": None, "outcome_recorded_at": None},
+    )
+
+
+def pontuar_lote(
+    db: Session, apos_id: int, lote: int = SCORE_LOTE, agora: Optional[datetime] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Pontua os próximos `lote` idosos ativos depois de `apos_id` e grava as
+    predições (sem commit). None quando não há mais idosos.
+    """
+    agora = agora or datetime.now()
+    ids = np.array(db.execute(
+        select(Idoso.id)
+        .where(and_(Idoso.id > apos_id, Idoso.ativo == True))  # noqa: E712
+        .order_by(Idoso.id)
+        .limit(lote)
+    ).scalars().all(), dtype=float)
+    if not len(ids):
+        return None
+    ultimo = int(ids[-1])
+
+    estado = _matriz(ids, db.execute(_consulta_estado(apos_id, ultimo, agora)).all(), 7)
+    humor = _matriz(ids, db.execute(_consulta_humor(apos_id, ultimo, agora.date())).all(), 2)
+    agenda = _matriz(ids, db.execute(_consulta_agenda(apos_id, ultimo, agora)).all(), 4)
+
+    x, cobertura = montar_features(estado, humor, agenda)
+    valor, rotulo, confianca = pontuar(x, cobertura)
+
+    x, valor, confianca = np.round(x, 4), np.round(valor, 4), np.round(confianca, 4)
+    validade = agora + SCORE_VALIDADE
+    _upsert(db, [
+        {
+            "patient_id": int(ids[i]),
+            "model_name": SCORE_MODELO,
+            "model_version": SCORE_MODELO_VERSAO,
+            "prediction_type": SCORE_TIPO,
+            "prediction_value": float(valor[i]),
+            "prediction_label": str(rotulo[i]),
+            "confidence_score": float(confianca[i]),
+            "features_used": dict(zip(FEATURES, x[i].tolist())),
+            "predicted_at": agora,
+            "valid_until": validade,
+        }
+        for i in range(len(ids))
+    ])
+
+    niveis, contagens = np.unique(rotulo, return_counts=True)
+    return {
+        "pacientes": len(ids),
+        "ultimo_id": ultimo,
+        "niveis": {str(n): int(c) for n, c in zip(niveis, contagens)},
+    }
+
+
+def pontuar_populacao(
+    db: Session,
+    lote: int = SCORE_LOTE,
+    apos_id: int = 0,
+    ao_progredir: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Pontua todos os idosos ativos, um commit por lote"""
+    inicio = time.perf_counter()
+    agora = datetime.now()
+    resultado: Dict[str, Any] = {"pacientes": 0, "ultimo_id": apos_id, "niveis": {n: 0 for n in NIVEIS}}
+    while True:
+        parcial = pontuar_lote(db, resultado["ultimo_id"], lote, agora)
+        if parcial is None:
+            break
+        db.commit()
+        resultado["pacientes"] += parcial["pacientes"]
+        resultado["ultimo_id"] = parcial["ultimo_id"]
+        for nivel, total in parcial["niveis"].items():
+            resultado["niveis"][nivel] += total
+        if ao_progredir:
+            ao_progredir(dict(resultado))
+
+    resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resultado
@@ -39,6 +39,12 @@ from tasks.scheduled_tasks import (
     cleanup_pending_transactions,
     check_expiring_subscriptions,
     payment_health_check,
+    manter_particoes_saude,
+    consolidar_relatorios_mensais,
+    expurgar_tombstones_sync,
+    recalcular_riscos_vencidos,
+    pontuar_risco_populacional,
+    minerar_padroes_comportamento,
 )
 
 __all__ = [
@@ -59,4 +65,10 @@ __all__ = [
     "cleanup_pending_transactions",
     "check_expiring_subscriptions",
     "payment_health_check",
+    "manter_particoes_saude",
+    "consolidar_relatorios_mensais",
+    "expurgar_tombstones_sync",
+    "recalcular_riscos_vencidos",
+    "pontuar_risco_populacional",
+    "minerar_padroes_comportamento",
 ]
@@ -6,17 +6,30 @@ Tasks Celery agendadas (cron jobs) para manutencao do sistema.
 Agendamento configurado em celery_app.py via beat_schedule.
 """
 import logging
+import os
 from datetime import datetime, timedelta
 from typing import Dict, List
 
 from celery import shared_task
-from sqlalchemy import select, and_, delete
+from sqlalchemy import select, and_, delete, text
 
 from database.connection_sync import get_sync_db
 from database.payment_models import Transaction, Subscription, WebhookLog
 
 logger = logging.getLogger(__name__)
 
+# Tabelas particionadas por mes (migration 006) -> coluna de particionamento
+TABELAS_PARTICIONADAS_SAUDE = {
+    "atividade": "timestamp_coleta",
+    "sinais_vitais_health": "timestamp_coleta",
+    "sono": "timestamp_inicio",
+    "nutricao": "timestamp_coleta",
+    "medicao_corporal": "timestamp_coleta",
+}
+PARTICOES_MESES_A_FRENTE = int(os.getenv("SAUDE_PARTICOES_MESES_A_FRENTE", "3"))
+# 0 desliga o arquivamento
+PARTICOES_RETENCAO_MESES = int(os.getenv("SAUDE_PARTICOES_RETENCAO_MESES", "24"))
+
 
 @shared_task(
     bind=True,
@@ -366,3 +379,281 @@ def sync_subscription_tiers(self) -> Dict:
     except Exception as e:
         logger.error(f"Tier sync error: {e}")
         raise
+
+
+@shared_task(
+    bind=True,
+    name="tasks.scheduled_tasks.manter_particoes_saude"
+)
+def manter_particoes_saude(self) -> Dict:
+    """
+    Manutencao das particoes mensais das series de saude.
+
+    - Cria as particoes do mes corrente ate PARTICOES_MESES_A_FRENTE
+    - Destaca particoes mais antigas que PARTICOES_RETENCAO_MESES e
+      move para o schema "arquivo" (continuam consultaveis, fora do
+      caminho das consultas da aplicacao)
+    """
+    logger.info("Maintaining health table partitions")
+
+    criadas: Dict[str, List[str]] = {}
+    arquivadas: Dict[str, List[str]] = {}
+
+    try:
+        with get_sync_db() as db:
+            for tabela, coluna in TABELAS_PARTICIONADAS_SAUDE.items():
+                result = db.execute(
+                    text("SELECT eva_criar_particoes_mensais(:tabela, :coluna, :meses)"),
+                    {"tabela": tabela, "coluna": coluna, "meses": PARTICOES_MESES_A_FRENTE}
+                )
+                criadas[tabela] = result.scalars().all()
+
+                if PARTICOES_RETENCAO_MESES > 0:
+                    result = db.execute(
+                        text("SELECT eva_arquivar_particoes(:tabela, :retencao)"),
+                        {"tabela": tabela, "retencao": PARTICOES_RETENCAO_MESES}
+                    )
+                    arquivadas[tabela] = result.scalars().all()
+
+                # Uma transacao por tabela: o lock do DETACH nao segura as demais
+                db.commit()
+
+            logger.info(f"Partition maintenance completed: created={criadas} archived={arquivadas}")
+
+            return {
+                "status": "completed",
+                "created": criadas,
+                "archived": arquivadas,
+                "timestamp": str(datetime.utcnow())
+            }
+
+    except Exception as e:
+        logger.error(f"Partition maintenance error: {e}")
+        raise
+
+
+@shared_task(
+    bind=True,
+    name="tasks.scheduled_tasks.consolidar_relatorios_mensais"
+)
+def consolidar_relatorios_mensais(self, meses: int = 2) -> Dict:
+    """
+    Consolida o relatorio mensal dos ultimos `meses` meses fechados em
+    health_monthly_rollup, apenas para os pares (cliente, mes) ainda sem
+    linha (novos ou invalidados por dado atrasado da sync offline).
+    """
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+    from database.models import HealthMonthlyRollup
+    from database.rollup_saude import (
+        intervalo_mes, consulta_relatorio_mensal, clientes_com_dados_no_mes
+    )
+
+    logger.info("Consolidating monthly health reports")
+
+    hoje = datetime.utcnow()
+    ano, mes = hoje.year, hoje.month
+    consolidados = 0
+
+    try:
+        with get_sync_db() as db:
+            for _ in range(meses):
+                ano, mes = (ano - 1, 12) if mes == 1 else (ano, mes - 1)
+                inicio, fim = intervalo_mes(mes, ano)
+
+                clientes = set(db.execute(clientes_com_dados_no_mes(inicio, fim)).scalars().all())
+                prontos = set(db.execute(
+                    select(HealthMonthlyRollup.cliente_id).where(
+                        and_(HealthMonthlyRollup.ano == ano, HealthMonthlyRollup.mes == mes)
+                    )
+                ).scalars().all())
+
+                for cliente_id in sorted(clientes - prontos):
+                    linha = db.execute(consulta_relatorio_mensal(cliente_id, inicio, fim)).one()
+                    valores = {
+                        "cliente_id": cliente_id, "ano": ano, "mes": mes,
+                        "total_passos": int(linha.total_passos or 0),
+                        "total_atividades": int(linha.total_atividades or 0),
+                        "media_bpm": linha.media_bpm,
+                        "media_minutos_sono": linha.media_minutos_sono,
+                        "peso_inicial": linha.peso_inicial,
+                        "peso_final": linha.peso_final,
+                        "calculado_em": datetime.utcnow(),
+                    }
+                    stmt = pg_insert(HealthMonthlyRollup).values(valores)
+                    db.execute(stmt.on_conflict_do_update(
+                        index_elements=["cliente_id", "ano", "mes"],
+                        set_={k: stmt.excluded[k] for k in valores if k not in ("cliente_id", "ano", "mes")}
+                    ))
+                    consolidados += 1
+
+                db.commit()
+
+            logger.info(f"Monthly reports consolidated: {consolidados}")
+
+            return {
+                "status": "completed",
+                "consolidated": consolidados,
+                "timestamp": str(hoje)
+            }
+
+    except Exception as e:
+        logger.error(f"Monthly report consolidation error: {e}")
+        raise
+
+
+@shared_task(
+    bind=True,
+    name="tasks.scheduled_tasks.expurgar_tombstones_sync"
+)
+def expurgar_tombstones_sync(self) -> Dict:
+    """
+    Remove tombstones do /sync mais antigos que SYNC_TOMBSTONE_RETENCAO_DIAS.
+    Tokens mais velhos que a retencao recebem reset (sync completo), entao
+    nenhum app depende dos tombstones expurgados.
+    """
+    from database.models import SyncTombstone
+    from database.repositories.sync_repo import SYNC_TOMBSTONE_RETENCAO_DIAS
+
+    logger.info("Purging old sync tombstones")
+
+    limite = datetime.now() - timedelta(days=SYNC_TOMBSTONE_RETENCAO_DIAS)
+
+    try:
+        with get_sync_db() as db:
+            result = db.execute(delete(SyncTombstone).where(SyncTombstone.removido_em < limite))
+            db.commit()
+
+            logger.info(f"Sync tombstones purged: {result.rowcount}")
+
+            return {
+                "status": "completed",
+                "purged": result.rowcount,
+                "timestamp": str(datetime.utcnow())
+            }
+
+    except Exception as e:
+        logger.error(f"Sync tombstone purge error: {e}")
+        raise
+
+
+@shared_task(
+    bind=True,
+    name="tasks.scheduled_tasks.recalcular_riscos_vencidos"
+)
+def recalcular_riscos_vencidos(self, lote: int = 1000) -> Dict:
+    """
+    Regrava o risco das linhas de patient_risk_state cujo risk_expires_at
+    passou (tentativa de suicidio fora dos 30 dias, sentimento fora dos 7
+    dias, predicao vencida), para que o indice de risk_level reflita o agora.
+    """
+    from database.estado_risco import recalcular
+    from database.models import PatientRiskState
+
+    logger.info("Recalculating expired patient risk states")
+
+    recalculados = 0
+
+    try:
+        with get_sync_db() as db:
+            while True:
+                agora = datetime.now()
+                estados = db.execute(
+                    select(PatientRiskState)
+                    .where(PatientRiskState.risk_expires_at <= agora)
+                    .order_by(PatientRiskState.patient_id)
+                    .limit(lote)
+                    .with_for_update(skip_locked=True)
+                ).scalars().all()
+                for estado in estados:
+                    recalcular(estado, agora)
+                db.commit()
+                recalculados += len(estados)
+                if len(estados) < lote:
+                    break
+
+            logger.info(f"Patient risk states recalculated: {recalculados}")
+
+            return {
+                "status": "completed",
+                "recalculated": recalculados,
+                "timestamp": str(datetime.utcnow())
+            }
+
+    except Exception as e:
+        logger.error(f"Patient risk recalculation error: {e}")
+        raise
+
+
+@shared_task(
+    bind=True,
+    name="tasks.scheduled_tasks.pontuar_risco_populacional"
+)
+def pontuar_risco_populacional(self, lote: int = 5000) -> Dict:
+    """
+    Score de risco de todos os idosos ativos em ml_predictions
+    (model_name risco_populacional, uma linha por paciente), em lotes de
+    `lote` pacientes com features vetorizadas.
+    """
+    from services.score_risco_lote import pontuar_populacao
+
+    logger.info("Scoring population risk")
+
+    try:
+        with get_sync_db() as db:
+            resultado = pontuar_populacao(db, lote=lote)
+
+            logger.info(
+                f"Population risk scored: {resultado['pacientes']} patients "
+                f"in {resultado['segundos']}s {resultado['niveis']}"
+            )
+
+            return {
+                "status": "completed",
+                "scored": resultado["pacientes"],
+                "levels": resultado["niveis"],
+                "seconds": resultado["segundos"],
+                "timestamp": str(datetime.utcnow())
+            }
+
+    except Exception as e:
+        logger.error(f"Population risk scoring error: {e}")
+        raise
+
+
+@shared_task(
+    bind=True,
+    name="tasks.scheduled_tasks.minerar_padroes_comportamento"
+)
+def minerar_padroes_comportamento(self, completo: bool = False) -> Dict:
+    """
+    Minera padroes de comportamento (horario de atendimento, humor por dia
+    da semana, doses perdidas em sequencia, pressao por periodo) em
+    padroes_comportamento. Incremental por padrao: so idosos com dado novo
+    desde a ultima execucao; completo=True reve todos.
+    """
+    from services.mineracao_padroes import minerar_padroes
+
+    logger.info(f"Mining behavioral patterns ({'full' if completo else 'incremental'})")
+
+    try:
+        with get_sync_db() as db:
+            resultado = minerar_padroes(db, incremental=not completo)
+
+            logger.info(
+                f"Behavioral patterns mined: {resultado['pacientes']} patients, "
+                f"{resultado['padroes']} patterns, {resultado['desativados']} deactivated "
+                f"in {resultado['segundos']}s"
+            )
+
+            return {
+                "status": "completed",
+                "incremental": resultado["incremental"],
+                "patients": resultado["pacientes"],
+                "patterns": resultado["padroes"],
+                "deactivated": resultado["desativados"],
+                "timestamp": str(datetime.utcnow())
+            }
+
+    except Exception as e:
+        logger.error(f"Behavioral pattern mining error: {e}")
+        raise
@@ -1,14 +1,45 @@
 import asyncio
 import pytest
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex, CreateTable
 from database.connection import Base, get_db
+from database.models import NLPConversationAnalysis
 from main import app
+from utils.cache import cache
+from utils.limite_login import limitador_login
 
 # Database URL for testing (SQLite in memory)
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
+# conversation_sessions/messages não têm model: estas tabelas são criadas sem as FKs
+TABELAS_SEM_FK = (NLPConversationAnalysis.__table__,)
+
+@compiles(JSONB, "sqlite")
+def _jsonb_sqlite(tipo, compiler, **kw):
+    return "JSON"
+
+def _criar_tabelas(conn, models):
+    tabelas = [m.__table__ for m in models]
+    Base.metadata.create_all(conn, tables=[t for t in tabelas if t not in TABELAS_SEM_FK])
+    for tabela in tabelas:
+        if tabela in TABELAS_SEM_FK:
+            conn.execute(CreateTable(tabela, include_foreign_key_constraints=[]))
+            for indice in tabela.indexes:
+                conn.execute(CreateIndex(indice))
+
+def _contar_consultas(engine, consultas):
+    if consultas is None:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def contar(conn, cursor, statement, *args):
+        consultas.append(statement)
+
 @pytest.fixture(scope="session")
 def event_loop():
     try:
@@ -18,6 +49,15 @@ def event_loop():
     yield loop
     loop.close()
 
+@pytest.fixture(autouse=True)
+def _cache_limpo():
+    # Cada teste desfaz suas escritas: o cache não pode atravessar testes.
+    # Os logins dos testes vêm todos do mesmo IP: zera o limite por IP.
+    cache.limpar()
+    limitador_login.limpar()
+    yield
+    cache.limpar()
+
 @pytest.fixture(scope="session")
 async def test_engine():
     engine = create_async_engine(TEST_DATABASE_URL, echo=False)
@@ -33,6 +73,40 @@ async def db_session(test_engine):
         yield session
         await session.rollback()
 
+@pytest.fixture
+async def sqlite_async():
+    """Fábrica de sessões async num sqlite em memória só com as tabelas dos models pedidos"""
+    engines = []
+
+    async def criar(*models, consultas=None):
+        engine = create_async_engine(TEST_DATABASE_URL)
+        engines.append(engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(_criar_tabelas, models)
+        _contar_consultas(engine.sync_engine, consultas)
+        return sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    yield criar
+    for engine in engines:
+        await engine.dispose()
+
+@pytest.fixture
+def sqlite_sync():
+    """Como sqlite_async, para os jobs síncronos; url aponta para arquivo quando há outros processos"""
+    engines = []
+
+    def criar(*models, url="sqlite://", consultas=None):
+        engine = create_engine(url)
+        engines.append(engine)
+        with engine.begin() as conn:
+            _criar_tabelas(conn, models)
+        _contar_consultas(engine, consultas)
+        return sessionmaker(engine)
+
+    yield criar
+    for engine in engines:
+        engine.dispose()
+
 @pytest.fixture
 async def client(db_session):
     async def _get_test_db():
@@ -0,0 +1,107 @@
+import json
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from database.connection import Base
+from database.models import AuditLog
+from database.payment_models import PaymentAuditLog
+from services.audit_service import AuditSink
+
+@pytest.fixture
+async def banco():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(
+            c, tables=[AuditLog.__table__, PaymentAuditLog.__table__]))
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    yield Session
+    await engine.dispose()
+
+async def _contar(Session, modelo):
+    async with Session() as s:
+        return (await s.execute(select(func.count()).select_from(modelo))).scalar()
+
+@pytest.mark.asyncio
+async def test_registrar_nao_grava_ate_descarregar(banco, tmp_path):
+    sink = AuditSink(session_factory=banco, lote=2, spool_dir=tmp_path)
+    for i in range(5):
+        sink.registrar(AuditLog, usuario_email=f"u{i}@eva.com", acao="LOGIN", ip_address="10.0.0.1")
+    sink.registrar(PaymentAuditLog, action="create", entity_type="transaction", entity_id=1,
+                   new_value={"valor": 10})
+    assert await _contar(banco, AuditLog) == 0
+
+    await sink.descarregar()
+    assert await _contar(banco, AuditLog) == 5
+    assert await _contar(banco, PaymentAuditLog) == 1
+    assert sink.estatisticas()["gravados"] == 6
+
+@pytest.mark.asyncio
+async def test_buffer_cheio_vai_para_o_spool_e_volta(banco, tmp_path):
+    sink = AuditSink(session_factory=banco, lote=10, buffer_max=2, spool_dir=tmp_path)
+    for i in range(5):
+        sink.registrar(AuditLog, usuario_email=f"u{i}@eva.com", acao="LOGIN")
+    assert sink.estatisticas() == {"pendentes": 2, "gravados": 0, "enviados_spool": 3, "rejeitados": 0}
+    assert list(tmp_path.glob("audit-*.ndjson"))
+
+    await sink.descarregar()
+    await sink._regravar_spool()
+    assert await _contar(banco, AuditLog) == 5
+    assert not list(tmp_path.iterdir())
+
+@pytest.mark.asyncio
+async def test_falha_no_banco_nao_perde_registros(banco, tmp_path):
+    async def fora_do_ar():
+        raise ConnectionError("banco fora")
+
+    class SessaoQuebrada:
+        async def __aenter__(self):
+            return await fora_do_ar()
+
+        async def __aexit__(self, *args):
+            return False
+
+    sink = AuditSink(session_factory=SessaoQuebrada, spool_dir=tmp_path)
+    sink.registrar(AuditLog, usuario_email="a@eva.com", acao="LOGIN")
+    await sink.encerrar()
+    assert sink.estatisticas()["enviados_spool"] == 1
+
+    # Próximo processo (ou o banco de volta) regrava o spool
+    recuperado = AuditSink(session_factory=banco, spool_dir=tmp_path)
+    await recuperado._regravar_spool()
+    async with banco() as s:
+        log = (await s.execute(select(AuditLog))).scalar_one()
+    assert log.usuario_email == "a@eva.com"
+    assert log.criado_em is not None
+
+@pytest.mark.asyncio
+async def test_encerrar_grava_o_buffer(banco, tmp_path):
+    sink = AuditSink(session_factory=banco, lote=100, intervalo=60, spool_dir=tmp_path)
+    await sink.iniciar()
+    sink.registrar(AuditLog, usuario_email="a@eva.com", acao="LOGIN")
+    await sink.encerrar()
+    assert await _contar(banco, AuditLog) == 1
+
+@pytest.mark.asyncio
+async def test_registro_invalido_no_spool_vai_para_rejeitados(banco, tmp_path):
+    sink = AuditSink(session_factory=banco, lote=10, buffer_max=0, spool_dir=tmp_path)
+    sink.registrar(AuditLog, usuario_email="a@eva.com", acao="LOGIN")
+    # acao é NOT NULL: o banco recusa este e, com ele, o INSERT do lote inteiro
+    sink.registrar(AuditLog, usuario_email="b@eva.com", acao=None)
+    sink.registrar(AuditLog, usuario_email="c@eva.com", acao="LOGOUT")
+
+    await sink._regravar_spool()
+    async with banco() as s:
+        emails = (await s.execute(select(AuditLog.usuario_email).order_by(AuditLog.usuario_email))).scalars().all()
+    assert emails == ["a@eva.com", "c@eva.com"]
+    assert sink.estatisticas()["rejeitados"] == 1
+    assert not list(tmp_path.glob("audit-*"))
+
+    rejeitados = [json.loads(linha) for arquivo in tmp_path.glob("rejeitados-*.ndjson")
+                  for linha in arquivo.read_text().splitlines()]
+    assert [r["campos"]["usuario_email"] for r in rejeitados] == ["b@eva.com"]
+    assert "NOT NULL" in rejeitados[0]["erro"]
+
+    # Próxima passada não tenta de novo
+    await sink._regravar_spool()
+    assert await _contar(banco, AuditLog) == 2
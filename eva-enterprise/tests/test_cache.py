@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from database.connection import Base
+from database.models import Configuracao
+from database.repositories.config_repo import ConfigRepository
+from utils.cache import CacheDuasCamadas, cache, cached, invalidar
+
+@pytest.fixture
+async def Session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[Configuracao.__table__]))
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+class Contador:
+    def __init__(self):
+        self.consultas = 0
+
+    @cached(tags=("item:{item_id}",), ttl=60)
+    async def buscar(self, item_id: int):
+        self.consultas += 1
+        await asyncio.sleep(0.01)
+        return {"id": item_id, "consulta": self.consultas}
+
+@pytest.mark.asyncio
+async def test_single_flight_uma_consulta_para_50_falhas():
+    repo = Contador()
+    resultados = await asyncio.gather(*[repo.buscar(7) for _ in range(50)])
+    assert repo.consultas == 1
+    assert all(r == {"id": 7, "consulta": 1} for r in resultados)
+
+@pytest.mark.asyncio
+async def test_invalidacao_por_tag():
+    repo = Contador()
+    await repo.buscar(1)
+    await repo.buscar(2)
+    await invalidar("item:1")
+    assert (await repo.buscar(1))["consulta"] == 3
+    assert (await repo.buscar(2))["consulta"] == 2
+
+@pytest.mark.asyncio
+async def test_lru_descarta_o_mais_antigo():
+    local = CacheDuasCamadas(max_itens=2, redis_url=None)
+    chamadas = []
+
+    async def carregar(chave):
+        chamadas.append(chave)
+        return chave
+
+    for chave in ("a", "b", "a", "c", "a", "b"):
+        await local.obter_ou_carregar(chave, lambda: carregar(chave))
+    assert chamadas == ["a", "b", "c", "b"]
+
+@pytest.mark.asyncio
+async def test_repositorio_devolve_copia_desanexada_e_invalida_na_escrita(Session):
+    async with Session() as s:
+        repo = ConfigRepository(s)
+        config = await repo.create_config("voz", "amigavel", "string", "ia")
+
+    async with Session() as s:
+        primeira = await ConfigRepository(s).get_config_by_key("voz")
+    primeira.valor = "alterado fora da sessão"
+
+    async with Session() as s:
+        segunda = await ConfigRepository(s).get_config_by_key("voz")
+        assert segunda.valor == "amigavel"
+        assert cache.acertos_local >= 1
+        await ConfigRepository(s).update_config(config.id, {"valor": "formal"})
+
+    async with Session() as s:
+        assert (await ConfigRepository(s).get_config_by_key("voz")).valor == "formal"
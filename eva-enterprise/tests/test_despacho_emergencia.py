@@ -0,0 +1,168 @@
+import asyncio
+import time
+import pytest
+from datetime import date, datetime
+from sqlalchemy import select
+from database.models import (
+    Cuidador, CrisisEvent, EmergencyNotification, Idoso, PatientRiskState, SafetyPlan
+)
+from services import despacho_emergencia, emergency_protocol_service
+from services.audit_service import AuditSink
+from services.despacho_emergencia import CanalIndisponivel, Entrega, MetricasEmergencia, despachar
+from services.emergency_protocol_service import EmergencyProtocolService
+
+def _entrega(canal, nome, *respostas):
+    """Entrega que, a cada tentativa, dorme e então levanta ou entrega"""
+    tentativas = iter(respostas)
+
+    async def enviar():
+        espera, erro = next(tentativas)
+        await asyncio.sleep(espera)
+        if erro:
+            raise erro
+    return Entrega(canal=canal, destinatario={"name": nome}, enviar=enviar)
+
+@pytest.mark.asyncio
+async def test_canais_em_paralelo_com_timeout_e_retry(tmp_path):
+    sink = AuditSink(spool_dir=tmp_path)
+    metricas = MetricasEmergencia(slo_ms=1000)
+    entregas = [
+        _entrega("emergency_contact", "rapido", (0.1, None)),
+        _entrega("professional", "instavel", (0.0, RuntimeError("503")), (0.1, None)),
+        _entrega("sms", "travado", (5, None), (5, None)),
+    ]
+    inicio = time.perf_counter()
+    resultados = await despachar(entregas, 7, datetime.now(), crisis_event_id=3, timeout=0.2,
+                                 tentativas=2, backoff=0.05, sink=sink, metricas=metricas)
+    # Sequencial seria ~0.1 + 0.15 + 0.45; em paralelo vale o canal mais lento
+    assert time.perf_counter() - inicio < 0.6
+
+    assert [(r["status"], r["attempts"]) for r in resultados] == [
+        ("delivered", 1), ("delivered", 2), ("timeout", 2)
+    ]
+    assert resultados[2]["error"] == "sem resposta em 0.2s"
+
+    gravados = [campos for _, campos in sink._buffer]
+    assert [(g["channel"], g["status"], g["crisis_event_id"]) for g in gravados] == [
+        ("emergency_contact", "delivered", 3), ("professional", "delivered", 3), ("sms", "timeout", 3)
+    ]
+    snapshot = metricas.snapshot()
+    assert snapshot["protocolos"] == 1 and snapshot["violacoes_slo"] == 0
+    assert snapshot["primeira_histogram_ms"]["500"] == 1
+    assert snapshot["canais"]["sms"] == {"delivered": 0, "not_sent": 0, "failed": 0, "timeout": 1, "avg_ms": 0.0}
+
+@pytest.mark.asyncio
+async def test_nenhuma_entrega_conta_como_violacao(monkeypatch, tmp_path):
+    monkeypatch.setattr(despacho_emergencia, "TWILIO_ACCOUNT_SID", None)
+    with pytest.raises(CanalIndisponivel):
+        await despacho_emergencia.enviar_sms("11988887777", "alerta")
+
+    metricas = MetricasEmergencia()
+    await despachar([_entrega("sms", "fora", (0, RuntimeError("x")))], 7, datetime.now(),
+                    tentativas=1, sink=AuditSink(spool_dir=tmp_path), metricas=metricas)
+    await despachar([], 7, datetime.now(), sink=AuditSink(spool_dir=tmp_path), metricas=metricas)
+    # Sem provedor: não repete, não conta como entrega e aparece à parte por canal
+    resultados = await despachar([_entrega("sms", "sem twilio", (0, CanalIndisponivel("sem provedor")))],
+                                 7, datetime.now(), tentativas=3, sink=AuditSink(spool_dir=tmp_path),
+                                 metricas=metricas)
+    assert [(r["status"], r["attempts"], r["delivered_at"]) for r in resultados] == [("not_sent", 1, None)]
+    snapshot = metricas.snapshot()
+    assert (snapshot["protocolos"], snapshot["sem_entrega"], snapshot["violacoes_slo"]) == (2, 2, 2)
+    assert snapshot["canais"]["sms"]["not_sent"] == 1 and snapshot["canais"]["sms"]["delivered"] == 0
+
+@pytest.mark.asyncio
+async def test_push_que_falha_cai_para_sms(monkeypatch, tmp_path):
+    monkeypatch.setattr("firebase_admin._apps", {})
+    with pytest.raises(CanalIndisponivel):
+        await despacho_emergencia.enviar_push("tok", "t", "c", {})
+
+    sms_enviados = []
+
+    async def sms_falso(telefone, mensagem):
+        sms_enviados.append((telefone, mensagem))
+
+    async def push_quebrado(token, titulo, corpo, dados):
+        raise RuntimeError("FCM 500")
+
+    monkeypatch.setattr(emergency_protocol_service, "enviar_sms", sms_falso)
+    monkeypatch.setattr(emergency_protocol_service, "enviar_push", push_quebrado)
+    ana = Cuidador(nome="Ana", telefone="11988887777", device_token="tok-ana")
+    entrega = Entrega(canal="emergency_contact", destinatario={"name": "Ana"},
+                      enviar=EmergencyProtocolService._push_or_sms(ana, "🚨", "risco", {}, "log"))
+    resultados = await despachar([entrega], 7, datetime.now(), tentativas=1, sink=AuditSink(spool_dir=tmp_path),
+                                 metricas=MetricasEmergencia())
+    assert [(r["status"], r["attempts"]) for r in resultados] == [("delivered", 1)]
+    assert sms_enviados == [("11988887777", "🚨: risco")]
+
+    # Sem telefone não há reserva: a falha do push é o resultado
+    sem_telefone = Cuidador(nome="Sem", device_token="tok-sem")
+    entrega = Entrega(canal="emergency_contact", destinatario={"name": "Sem"},
+                      enviar=EmergencyProtocolService._push_or_sms(sem_telefone, "🚨", "risco", {}, "log"))
+    resultados = await despachar([entrega], 7, datetime.now(), tentativas=1, sink=AuditSink(spool_dir=tmp_path),
+                                 metricas=MetricasEmergencia())
+    assert [(r["status"], r["error"]) for r in resultados] == [("failed", "FCM 500")]
+
+@pytest.mark.asyncio
+async def test_protocolo_grava_a_crise_antes_de_notificar(sqlite_async, monkeypatch, tmp_path):
+    Session = await sqlite_async(Idoso, Cuidador, SafetyPlan, CrisisEvent, PatientRiskState, EmergencyNotification)
+    async with Session() as s:
+        s.add(Idoso(id=1, nome="Dona Maria", telefone="11999990001", data_nascimento=date(1940, 1, 1),
+                    contato_emergencia={"nome": "Ana", "telefone": "11988887777", "parentesco": "filha"}))
+        s.add_all([
+            Cuidador(idoso_id=1, nome="Ana", telefone="11988887777", eh_contato_emergencia=True,
+                     device_token="tok-ana"),
+            Cuidador(idoso_id=1, nome="Dr. Paulo", telefone="1133334444", tipo_cuidador="psiquiatra",
+                     device_token="tok-paulo"),
+            Cuidador(idoso_id=1, nome="Bia", telefone="11977776666", eh_contato_emergencia=True),
+            Cuidador(idoso_id=1, nome="Inativo", telefone="0", eh_contato_emergencia=True, ativo=False),
+        ])
+        await s.commit()
+
+    crises_no_envio = []
+
+    sms_enviados = []
+
+    async def sms_falso(telefone, mensagem):
+        # Só o telefone de Bia (contato sem app) tem provedor
+        if telefone != "11977776666":
+            raise CanalIndisponivel("provedor de SMS não configurado")
+        sms_enviados.append(telefone)
+
+    async def push_lento(token, titulo, corpo, dados):
+        async with Session() as outra:
+            crises_no_envio.append(len((await outra.execute(select(CrisisEvent))).scalars().all()))
+        if token == "tok-paulo":
+            raise RuntimeError("FCM indisponível")
+        await asyncio.sleep(0.05)
+
+    sink = AuditSink(session_factory=Session, spool_dir=tmp_path)
+    monkeypatch.setattr(emergency_protocol_service, "enviar_push", push_lento)
+    monkeypatch.setattr(despacho_emergencia, "auditoria", sink)
+    monkeypatch.setattr(emergency_protocol_service, "enviar_sms", sms_falso)
+
+    async with Session() as s:
+        resultado = await EmergencyProtocolService.activate_emergency_protocol(
+            s, 1, "CRITICAL", "c_ssrs_critical", {"cssrs_score": 5})
+    await sink.descarregar()
+
+    assert crises_no_envio and all(n == 1 for n in crises_no_envio)
+    assert sorted((d["channel"], d["recipient"]["name"], d["status"]) for d in resultado["deliveries"]) == [
+        ("emergency_contact", "Ana", "delivered"), ("emergency_contact", "Bia", "delivered"),
+        ("professional", "Dr. Paulo", "failed"), ("sms", "Ana", "not_sent")
+    ]
+    assert sms_enviados == ["11977776666"]
+    assert sorted(c["name"] for c in resultado["contacts_notified"]) == ["Ana", "Bia"]
+    assert "emergency_contacts_notified" in resultado["actions_taken"]
+    assert "professionals_notified" not in resultado["actions_taken"]
+    assert "emergency_sms_sent" not in resultado["actions_taken"]
+
+    async with Session() as s:
+        crise = (await s.execute(select(CrisisEvent))).scalar_one()
+        entregas = (await s.execute(select(EmergencyNotification))).scalars().all()
+    assert sorted(crise.emergency_contacts_notified) == ["Ana", "Bia"]
+    assert "emergency_sms_sent" not in crise.intervention_taken
+    assert sorted((e.channel, e.status, e.attempts) for e in entregas) == [
+        ("emergency_contact", "delivered", 1), ("emergency_contact", "delivered", 1),
+        ("professional", "failed", 3), ("sms", "not_sent", 1)
+    ]
+    assert all(e.crisis_event_id == crise.id for e in entregas)
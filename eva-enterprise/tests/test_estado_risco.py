@@ -0,0 +1,131 @@
+import pytest
+from datetime import datetime, timedelta
+from database import estado_risco
+from database.models import (
+    CrisisEvent, MentalHealthAssessment, MLPrediction, NLPConversationAnalysis, PatientRiskState
+)
+from database.repositories.mental_health_repository import MentalHealthRepository
+from services.emergency_protocol_service import EmergencyProtocolService
+
+@pytest.fixture
+async def fabrica(sqlite_async):
+    consultas = []
+    Session = await sqlite_async(MentalHealthAssessment, CrisisEvent, MLPrediction, PatientRiskState,
+                                 NLPConversationAnalysis, consultas=consultas)
+    return Session, consultas
+
+async def _avaliar(s, patient_id, escala, score, severidade="moderate"):
+    await MentalHealthRepository.create_assessment(s, patient_id, escala, score, severidade, [])
+
+@pytest.mark.asyncio
+async def test_estado_acompanha_cada_escrita(fabrica):
+    Session, consultas = fabrica
+    agora = datetime.now()
+    async with Session() as s:
+        await _avaliar(s, 1, "PHQ9", 12)
+        assert (await estado_risco.obter_estado(s, 1)).risk_level == "MODERATE"
+
+        await _avaliar(s, 1, "GAD7", 16, "severe")
+        await _avaliar(s, 1, "PSS10", 30)  # escala fora do estado: não mexe no risco
+        estado = await estado_risco.obter_estado(s, 1)
+        assert (estado.risk_level, estado.risk_reason) == ("HIGH", "severe_anxiety")
+        assert estado_risco.motivo_emergencia(estado) is None
+
+        # Avaliação retroativa não substitui a mais nova
+        await estado_risco.aplicar_avaliacoes(s, [MentalHealthAssessment(
+            patient_id=1, scale_type="PHQ9", score=25, assessed_at=agora - timedelta(days=90))])
+        await s.commit()
+        assert (await estado_risco.obter_estado(s, 1)).phq9_score == 12
+
+        await MentalHealthRepository.create_ml_prediction(
+            s, 1, "xgb", "suicide_risk", 0.91, "CRITICAL", 0.8, {}, agora + timedelta(days=1))
+        await MentalHealthRepository.create_crisis_event(s, 1, "panic_attack", "moderate", agora)
+        await MentalHealthRepository.create_nlp_analyses_bulk(s, [
+            {"patient_id": 1, "sentiment_score": -0.9, "sentiment_label": "very_negative",
+             "danger_flags": ["hopelessness"], "analyzed_at": agora - timedelta(hours=h)}
+            for h in (3, 2, 1)
+        ])
+
+    consultas.clear()
+    async with Session() as s:
+        estado = await estado_risco.obter_estado(s, 1)
+    assert len(consultas) == 1
+    assert estado.crisis_count == 1 and estado.sentiment_count == 3
+    assert float(estado.sentiment_ewma) == pytest.approx(-0.9)
+    assert (estado.risk_level, estado.risk_reason) == ("CRITICAL", "ml_prediction")
+    nivel, motivo, detalhes = estado_risco.motivo_emergencia(estado)
+    assert (nivel, motivo, detalhes["model"]) == ("CRITICAL", "ml_prediction", "xgb")
+
+    # Vencida a predição, o próximo trigger é o sentimento negativo com flags
+    depois = agora + timedelta(days=2)
+    assert estado_risco.motivo_emergencia(estado, depois)[:2] == ("MODERATE", "persistent_negative_sentiment")
+    assert estado_risco.risco_atual(estado, depois) == ("HIGH", "severe_anxiety")
+
+@pytest.mark.asyncio
+async def test_janelas_vencem_e_saem_da_lista_de_risco(fabrica):
+    Session, consultas = fabrica
+    agora = datetime.now()
+    async with Session() as s:
+        await MentalHealthRepository.create_crisis_event(
+            s, 1, "suicide_attempt", "severe", agora - timedelta(days=29))
+        await MentalHealthRepository.create_crisis_event(
+            s, 2, "suicide_attempt", "severe", agora - timedelta(days=40))
+        await _avaliar(s, 3, "C-SSRS", 5, "extremely_severe")
+        await _avaliar(s, 4, "C-SSRS", 3, "severe")
+        await _avaliar(s, 5, "GAD7", 11)
+
+        estado = await estado_risco.obter_estado(s, 1)
+        assert (estado.risk_level, estado.risk_reason) == ("CRITICAL", "suicide_attempt_30d")
+        assert estado.risk_expires_at == estado.last_suicide_attempt_at + timedelta(days=30)
+        assert (await estado_risco.obter_estado(s, 2)).risk_level == "LOW"
+
+        # A janela da linha 1 passa antes de a task regravá-la
+        estado.last_suicide_attempt_at -= timedelta(days=2)
+        estado.risk_expires_at -= timedelta(days=2)
+        await s.commit()
+
+    consultas.clear()
+    async with Session() as s:
+        em_risco = await estado_risco.pacientes_em_risco(s, ["HIGH", "CRITICAL"])
+    assert len(consultas) == 3  # os vencidos e uma varredura do índice por nível
+    assert [(e["patient_id"], e["risk_level"]) for e in em_risco] == [(3, "CRITICAL"), (4, "HIGH")]
+
+    # O vencido (1) é o CRITICAL mais recente: não pode ocupar a única vaga do LIMIT
+    async with Session() as s:
+        assert [e["patient_id"] for e in await estado_risco.pacientes_em_risco(s, ["CRITICAL"], limite=1)] == [3]
+
+    async with Session() as s:
+        todos = await estado_risco.pacientes_em_risco(s, ["MODERATE", "LOW"], limite=2)
+    assert [e["risk_level"] for e in todos] == ["MODERATE", "LOW"]
+
+@pytest.mark.asyncio
+async def test_reconstrucao_igual_ao_incremental(fabrica):
+    Session, _ = fabrica
+    agora = datetime.now()
+    async with Session() as s:
+        await _avaliar(s, 1, "PHQ9", 21, "severe")
+        await _avaliar(s, 1, "C-SSRS", 2)
+        await MentalHealthRepository.create_crisis_event(s, 1, "panic_attack", "moderate", agora)
+        for i, score in enumerate((-0.2, -0.8, 0.4)):
+            await MentalHealthRepository.create_nlp_analyses_bulk(s, [
+                {"patient_id": 1, "sentiment_score": score, "sentiment_label": "neutral",
+                 "danger_flags": ["isolation"] if score < 0 else [],
+                 "analyzed_at": agora - timedelta(hours=3 - i)}
+            ])
+        incremental = estado_risco.montar_estado(await estado_risco.obter_estado(s, 1))
+
+        reconstruido = estado_risco.montar_estado(await estado_risco.reconstruir_estado(s, 1))
+        await s.commit()
+    incremental.pop("updated_at"), reconstruido.pop("updated_at")
+    assert reconstruido == incremental
+    assert reconstruido["risk_level"] == "HIGH" and reconstruido["danger_flags"] == ["isolation"]
+
+@pytest.mark.asyncio
+async def test_triggers_de_emergencia_leem_so_o_estado(fabrica):
+    Session, consultas = fabrica
+    async with Session() as s:
+        await _avaliar(s, 1, "GAD7", 20, "severe")
+        consultas.clear()
+        assert await EmergencyProtocolService.check_triggers_for_patient(s, 1) is None
+        assert await EmergencyProtocolService.check_triggers_for_patient(s, 99) is None
+    assert len(consultas) == 2
@@ -0,0 +1,81 @@
+import pytest
+from fastapi import Depends, FastAPI, Request, Response
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from database.connection import Base
+from database.models import Configuracao
+from utils.etag import aplicar_etag, corresponde, etag_fraco, exigir_modificado
+
+@pytest.fixture
+async def cliente():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[Configuracao.__table__]))
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as s:
+        s.add(Configuracao(chave="voz", valor="amigavel", tipo="string", categoria="ia"))
+        await s.commit()
+
+    app = FastAPI()
+    carregamentos = []
+
+    @app.middleware("http")
+    async def conditional_get(request: Request, call_next):
+        return await aplicar_etag(request, await call_next(request))
+
+    async def get_db():
+        async with Session() as s:
+            yield s
+
+    @app.get("/config/{chave}")
+    async def por_versao(chave: str, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+        await exigir_modificado(request, response, db, Configuracao.atualizado_em, Configuracao.chave == chave)
+        carregamentos.append(chave)
+        return {"chave": chave}
+
+    @app.get("/escalas")
+    async def por_hash():
+        return {"itens": list(range(10))}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac, Session, carregamentos
+    await engine.dispose()
+
+def test_comparacao_fraca():
+    etag = etag_fraco("idosos", 1, "2025-01-01")
+    assert corresponde(etag.removeprefix("W/"), etag)
+    assert corresponde(f'"outro", {etag}', etag)
+    assert corresponde("*", etag)
+    assert not corresponde(None, etag)
+
+@pytest.mark.asyncio
+async def test_hash_da_resposta_responde_304(cliente):
+    ac, _, _ = cliente
+    primeira = await ac.get("/escalas")
+    etag = primeira.headers["etag"]
+    assert etag.startswith('W/"')
+
+    segunda = await ac.get("/escalas", headers={"If-None-Match": etag})
+    assert segunda.status_code == 304
+    assert segunda.content == b""
+    assert segunda.headers["etag"] == etag
+
+@pytest.mark.asyncio
+async def test_caminho_por_versao_nao_carrega_a_linha(cliente):
+    ac, Session, carregamentos = cliente
+    primeira = await ac.get("/config/voz")
+    etag = primeira.headers["etag"]
+
+    segunda = await ac.get("/config/voz", headers={"If-None-Match": etag})
+    assert segunda.status_code == 304
+    assert carregamentos == ["voz"]
+
+    async with Session() as s:
+        config = await s.get(Configuracao, 1)
+        config.valor = "formal"
+        await s.commit()
+
+    terceira = await ac.get("/config/voz", headers={"If-None-Match": etag})
+    assert terceira.status_code == 200
+    assert terceira.headers["etag"] != etag
@@ -0,0 +1,24 @@
+import re
+from pathlib import Path
+from database.connection import Base
+import database.models  # noqa: F401
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "database" / "migrations"
+
+def _indices_das_migrations():
+    criados, removidos = set(), set()
+    for arquivo in sorted(MIGRATIONS.glob("*.sql")):
+        sql = arquivo.read_text(encoding="utf-8")
+        criados |= set(re.findall(r"INDEX (?:CONCURRENTLY )?IF NOT EXISTS ((?:ix|ux)_\w+)", sql))
+        removidos |= set(re.findall(r"DROP INDEX IF EXISTS ((?:ix|ux)_\w+)", sql))
+    return criados - removidos
+
+def test_migrations_and_models_declare_same_indexes():
+    na_migration = _indices_das_migrations()
+    nos_modelos = {idx.name for table in Base.metadata.tables.values() for idx in table.indexes}
+    assert na_migration
+    assert na_migration <= nos_modelos
+
+def test_scheduler_index_is_partial():
+    idx = next(i for i in Base.metadata.tables["agendamentos"].indexes if i.name == "ix_agendamentos_pendentes")
+    assert "aguardando_retry" in str(idx.dialect_options["postgresql"]["where"])
@@ -0,0 +1,108 @@
+import gzip
+import json
+import pytest
+from datetime import datetime, timedelta
+from typing import Optional
+from pydantic import BaseModel
+from sqlalchemy import Column, Integer, DateTime, Index, select, func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import declarative_base, sessionmaker
+from database import ingestao_bulk
+from database.ingestao_bulk import inserir_em_lote, validar_registros, iterar_ndjson, ingerir_ndjson
+
+LocalBase = declarative_base()
+
+class Leitura(LocalBase):
+    __tablename__ = "leituras_bulk"
+    id = Column(Integer, primary_key=True)
+    cliente_id = Column(Integer, nullable=False)
+    bpm = Column(Integer)
+    timestamp_coleta = Column(DateTime, nullable=False)
+    created_at = Column(DateTime)
+
+Index("ux_leituras_bulk", Leitura.cliente_id, Leitura.timestamp_coleta, unique=True)
+
+class LeituraCreate(BaseModel):
+    cliente_id: int
+    bpm: Optional[int] = None
+    timestamp_coleta: datetime
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(LocalBase.metadata.create_all)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as s:
+        yield s
+    await engine.dispose()
+
+def _registros(n, inicio=datetime(2025, 1, 1)):
+    return [{"cliente_id": 1, "bpm": 70, "timestamp_coleta": (inicio + timedelta(seconds=i)).isoformat()} for i in range(n)]
+
+def test_validacao_reporta_indice_e_remove_duplicata_do_lote():
+    registros = _registros(3) + [{"cliente_id": "x", "timestamp_coleta": "nao-e-data"}, _registros(1)[0]]
+    linhas, resultado = validar_registros(LeituraCreate, registros)
+    assert len(linhas) == 3
+    assert resultado.invalidos == 1 and resultado.erros[0]["indice"] == 3
+    assert resultado.duplicados == 1
+
+@pytest.mark.asyncio
+async def test_insercao_em_lote_e_idempotente(session, monkeypatch):
+    # Fatias pequenas para exercitar o particionamento em vários INSERTs
+    monkeypatch.setattr(ingestao_bulk, "_MAX_PARAMETROS", 40)
+
+    primeiro = await inserir_em_lote(session, Leitura, LeituraCreate, _registros(25))
+    assert (primeiro.inseridos, primeiro.duplicados, len(set(primeiro.ids))) == (25, 0, 25)
+
+    segundo = await inserir_em_lote(session, Leitura, LeituraCreate, _registros(30))
+    assert (segundo.inseridos, segundo.duplicados) == (5, 25)
+
+    total = (await session.execute(select(func.count()).select_from(Leitura))).scalar()
+    assert total == 30
+
+async def _pedacos(dados: bytes, tamanho: int = 7):
+    for i in range(0, len(dados), tamanho):
+        yield dados[i:i + tamanho]
+
+def _ndjson(registros, extra=b""):
+    return b"\n".join(json.dumps(r).encode() for r in registros) + b"\n" + extra
+
+@pytest.mark.asyncio
+async def test_iterar_ndjson_gzip_em_pedacos():
+    corpo = gzip.compress(_ndjson(_registros(3), extra=b"{quebrado\n\n"))
+    linhas = [item async for item in iterar_ndjson(_pedacos(corpo), gzip=True)]
+    assert [i for i, _, _ in linhas] == [0, 1, 2, 3]
+    assert linhas[0][1]["cliente_id"] == 1
+    assert linhas[3][1] is None and "JSON" in linhas[3][2]
+
+@pytest.mark.asyncio
+async def test_gzip_bomb_para_no_limite(session, monkeypatch):
+    monkeypatch.setattr(ingestao_bulk, "BULK_STREAM_PEDACO", 1024)
+    # 10 MB de linhas vazias em ~10 KB: cada chamada ao descompressor devolve no máximo 1 KB
+    bomba = gzip.compress(_ndjson(_registros(2)) + b"\n" * 10 * 1024 * 1024)
+    assert len(bomba) < 20 * 1024
+    resumo = await ingerir_ndjson(session, Leitura, LeituraCreate, _pedacos(bomba, 4096), gzip=True)
+    assert (resumo["inseridos"], resumo["erro_corpo"], resumo["corpo_excedeu_limite"]) == (2, None, False)
+
+    monkeypatch.setattr(ingestao_bulk, "BULK_STREAM_MAX_DESCOMPACTADO", 1024 * 1024)
+    resumo = await ingerir_ndjson(session, Leitura, LeituraCreate, _pedacos(bomba, 4096), gzip=True)
+    assert resumo["corpo_excedeu_limite"] is True and "excede" in resumo["erro_corpo"]
+
+@pytest.mark.asyncio
+async def test_ingerir_ndjson_grava_por_lote(session):
+    corpo = _ndjson(_registros(7) + [{"cliente_id": 1}], extra=b"nao-json")
+    resumo = await ingerir_ndjson(session, Leitura, LeituraCreate, _pedacos(corpo), tamanho_lote=3)
+
+    assert (resumo["recebidos"], resumo["inseridos"], resumo["invalidos"]) == (9, 7, 2)
+    assert [lote["inseridos"] for lote in resumo["lotes"]] == [3, 3, 1]
+    assert sorted(e["indice"] for e in resumo["erros"]) == [7, 8]
+    assert resumo["erro_corpo"] is None
+
+@pytest.mark.asyncio
+async def test_ingerir_ndjson_gzip_truncado_preserva_lotes_gravados(session):
+    corpo = gzip.compress(_ndjson(_registros(6)))[:-12]
+    resumo = await ingerir_ndjson(session, Leitura, LeituraCreate, _pedacos(corpo, 4096), gzip=True, tamanho_lote=2)
+    assert resumo["erro_corpo"]
+    total = (await session.execute(select(func.count()).select_from(Leitura))).scalar()
+    assert total == resumo["inseridos"]
@@ -0,0 +1,129 @@
+import time
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import select
+from database.models import (
+    Agendamento, Configuracao, HistoricoLigacao, Idoso, MoodDiary, PadraoComportamento,
+    SinaisVitaisHealth, Usuario
+)
+from services import mineracao_padroes
+from services.mineracao_padroes import minerar_padroes
+
+@pytest.fixture
+def fabrica(sqlite_sync, tmp_path, monkeypatch):
+    monkeypatch.setattr(mineracao_padroes, "MINERACAO_MARGEM", timedelta(0))
+    # Arquivo, não :memory:: os processos do pool abrem a própria conexão
+    return sqlite_sync(Idoso, Usuario, Agendamento, HistoricoLigacao, MoodDiary, SinaisVitaisHealth,
+                       PadraoComportamento, Configuracao, url=f"sqlite:///{tmp_path / 'padroes.db'}")
+
+def _idoso(i, **campos):
+    return Idoso(id=i, nome=f"Idoso {i}", telefone=str(i), data_nascimento=date(1940, 1, 1), **campos)
+
+def _humor(patient_id, hoje, pior_dia=0, dias=42):
+    return [MoodDiary(patient_id=patient_id, date=hoje - timedelta(days=d), time_of_day="morning",
+                      mood_score=2 if (hoje - timedelta(days=d)).weekday() == pior_dia else 7)
+            for d in range(1, dias + 1)]
+
+def _padroes(s, idoso_id):
+    return {p.tipo_padrao: p for p in s.execute(
+        select(PadraoComportamento).where(PadraoComportamento.idoso_id == idoso_id,
+                                          PadraoComportamento.origem == "mineracao")).scalars()}
+
+def test_minera_e_atualiza_incrementalmente(fabrica):
+    Session = fabrica
+    agora = datetime.now()
+    dia = lambda d, hora: (agora - timedelta(days=d)).replace(hour=hora, minute=0, second=0, microsecond=0)
+    with Session() as s:
+        s.add_all([_idoso(1, cpf="111"), _idoso(2), _idoso(3, ativo=False)])
+        s.add(Usuario(id=10, nome="App", cpf="111"))
+        s.add_all([HistoricoLigacao(idoso_id=1, inicio_chamada=dia(d, 9), duracao_segundos=120) for d in range(1, 13)])
+        s.add_all([Agendamento(idoso_id=1, tipo="ligacao", status="nao_atendido", data_hora_agendada=dia(d, 19))
+                   for d in range(1, 9)])
+        s.add_all([
+            Agendamento(idoso_id=1, tipo="lembrete_medicamento", medicamento_id=5, status=status,
+                        data_hora_agendada=dia(d, 8))
+            for d, status in ((20, "concluido"), (19, "nao_atendido"), (18, "nao_atendido"),
+                              (17, "falhou_definitivamente"), (16, "nao_atendido"), (15, "concluido"),
+                              (14, "nao_atendido"), (200, "nao_atendido"))
+        ])
+        s.add_all(_humor(1, agora.date()) + _humor(3, agora.date()))
+        s.add_all([SinaisVitaisHealth(cliente_id=10, timestamp_coleta=dia(d, hora), pressao_sistolica=pressao)
+                   for d in range(1, 7) for hora, pressao in ((8, 120), (20, 155))])
+        # Padrão de outra origem: fora do upsert e da desativação
+        s.add(PadraoComportamento(idoso_id=1, tipo_padrao="horario_atendimento", descricao="worker", confianca=0.5))
+        s.commit()
+
+    with Session() as s:
+        resultado = minerar_padroes(s, processos=1)
+    assert (resultado["incremental"], resultado["pacientes"], resultado["padroes"]) == (False, 2, 4)
+
+    with Session() as s:
+        padroes = _padroes(s, 1)
+        assert _padroes(s, 2) == {} and _padroes(s, 3) == {}
+        assert s.execute(select(PadraoComportamento).where(PadraoComportamento.origem.is_(None))).scalar_one().descricao == "worker"
+    assert sorted(padroes) == ["doses_perdidas_sequencia", "horario_atendimento", "humor_negativo",
+                               "pressao_elevada_periodo"]
+    atendimento = padroes["horario_atendimento"]
+    assert atendimento.dados_estatisticos["periodo"] == "manha"
+    # As 5 doses perdidas às 8h também são ligações da manhã sem resposta
+    assert atendimento.dados_estatisticos["por_periodo"]["manha"] == {"tentativas": 17, "atendidas": 12, "taxa": 0.706}
+    assert atendimento.dados_estatisticos["por_periodo"]["noite"]["taxa"] == 0.0
+    doses = padroes["doses_perdidas_sequencia"].dados_estatisticos
+    assert (doses["doses"], doses["doses_perdidas"], doses["maior_sequencia"], doses["sequencia_atual"]) == (7, 5, 4, 1)
+    assert padroes["humor_negativo"].dados_estatisticos["dia_semana"] == "segunda-feira"
+    assert "às segundas-feiras" in padroes["humor_negativo"].descricao
+    assert float(padroes["humor_negativo"].confianca) > 0.9
+    assert padroes["pressao_elevada_periodo"].dados_estatisticos["periodo"] == "noite"
+
+    with Session() as s:
+        assert mineracao_padroes.ler_marca(s) is not None
+        assert minerar_padroes(s, processos=1)["pacientes"] == 0
+
+        # Doses tomadas e humor novo do idoso 2: só os dois são revistos
+        for agendamento in s.execute(select(Agendamento).where(Agendamento.medicamento_id == 5)).scalars():
+            agendamento.status = "concluido"
+        s.add_all(_humor(2, agora.date(), pior_dia=4))
+        s.commit()
+        resultado = minerar_padroes(s, processos=1)
+    assert (resultado["incremental"], resultado["pacientes"], resultado["desativados"]) == (True, 2, 1)
+
+    with Session() as s:
+        novos = _padroes(s, 1)
+        assert not novos["doses_perdidas_sequencia"].ativo
+        assert novos["horario_atendimento"].id == atendimento.id
+        assert novos["horario_atendimento"].primeira_deteccao == atendimento.primeira_deteccao
+        assert novos["horario_atendimento"].ultima_confirmacao > atendimento.ultima_confirmacao
+        assert _padroes(s, 2)["humor_negativo"].dados_estatisticos["dia_semana"] == "sexta-feira"
+
+def test_marca_compara_sinais_vitais_em_utc(fabrica, monkeypatch):
+    # Servidor adiantado em relação ao UTC: created_at (utcnow) fica horas antes da marca local
+    monkeypatch.setenv("TZ", "Asia/Tokyo")
+    time.tzset()
+    try:
+        Session = fabrica
+        with Session() as s:
+            s.add_all([_idoso(1, cpf="111"), Usuario(id=10, nome="App", cpf="111")])
+            s.commit()
+            assert minerar_padroes(s, processos=1)["pacientes"] == 1
+            s.add(SinaisVitaisHealth(cliente_id=10, timestamp_coleta=datetime.now(), pressao_sistolica=150))
+            s.commit()
+            assert minerar_padroes(s, processos=1)["pacientes"] == 1
+    finally:
+        monkeypatch.delenv("TZ")
+        time.tzset()
+
+def test_fatias_em_processos(fabrica):
+    Session = fabrica
+    hoje = date.today()
+    with Session() as s:
+        s.add_all([_idoso(i) for i in range(1, 5)])
+        for i in range(1, 5):
+            s.add_all(_humor(i, hoje, pior_dia=i))
+        s.commit()
+
+        resultado = minerar_padroes(s, incremental=False, processos=2, fatia=1)
+    assert (resultado["fatias"], resultado["pacientes"], resultado["padroes"]) == (4, 4, 4)
+    with Session() as s:
+        dias = {p.idoso_id: p.dados_estatisticos["dia_semana"]
+                for p in s.execute(select(PadraoComportamento)).scalars()}
+    assert dias == {1: "terça-feira", 2: "quarta-feira", 3: "quinta-feira", 4: "sexta-feira"}
@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import func, select
+from database.models import HistoricoLigacao, NLPConversationAnalysis, PatientRiskState
+from database.repositories.mental_health_repository import MentalHealthRepository
+from services import nlp_lote
+from services.nlp_service import NLPService
+
+TEXTOS = ["Não aguento mais, quero morrer", "Hoje fui caminhar com meus amigos, estou grato", "", "sinto dor"]
+
+@pytest.fixture
+async def fabrica(sqlite_async):
+    Session = await sqlite_async(HistoricoLigacao, PatientRiskState, NLPConversationAnalysis)
+    async with Session() as s:
+        for i in range(10):
+            s.add(HistoricoLigacao(id=i + 1, idoso_id=7, transcricao_completa=TEXTOS[i % len(TEXTOS)]))
+        s.add(HistoricoLigacao(id=11, idoso_id=7, transcricao_completa=None))
+        await s.commit()
+    return Session
+
+@pytest.mark.asyncio
+async def test_lote_no_pool_igual_a_analise_individual():
+    textos = TEXTOS * 3
+    analises = await nlp_lote.analisar_lote(textos, usar_pool=True)
+    esperado = [NLPService.analyze_message(t) for t in textos]
+    for analise, individual in zip(analises, esperado):
+        analise.pop("analyzed_at"), individual.pop("analyzed_at")
+        assert analise == individual
+
+    vetores = nlp_lote.colunas(analises)
+    assert vetores["risk_levels"][:2] == ["CRITICAL", "NONE"]
+    assert len(vetores["sentiment_scores"]) == len(textos)
+    nlp_lote.encerrar_pool()
+
+@pytest.mark.asyncio
+async def test_backfill_em_lotes_e_idempotente(fabrica):
+    progresso = []
+    resultado = await nlp_lote.backfill_transcricoes(fabrica, lote=3, ao_progredir=progresso.append)
+    assert resultado == {"ligacoes": 10, "riscos": 3, "ultimo_id": 10}
+    assert [p["ultimo_id"] for p in progresso] == [3, 6, 9, 10]
+
+    async with fabrica() as s:
+        linhas = (await s.execute(
+            select(NLPConversationAnalysis).order_by(NLPConversationAnalysis.historico_ligacao_id)
+        )).scalars().all()
+    assert [l.historico_ligacao_id for l in linhas] == list(range(1, 11))
+    assert linhas[0].danger_flags == ["suicidal_ideation"]
+    assert linhas[0].patient_id == 7
+
+    # Segunda rodada não encontra nada novo
+    assert (await nlp_lote.backfill_transcricoes(fabrica, lote=3))["ligacoes"] == 0
+    async with fabrica() as s:
+        assert (await s.execute(select(func.count()).select_from(NLPConversationAnalysis))).scalar() == 10
+
+@pytest.mark.asyncio
+async def test_gravacao_do_lote_devolve_ids_em_ordem(fabrica):
+    analises = await nlp_lote.analisar_lote(TEXTOS, usar_pool=False)
+    linhas = [nlp_lote.linha_analise(a, patient_id=7, message_id=i) for i, a in enumerate(analises)]
+    async with fabrica() as s:
+        ids = await MentalHealthRepository.create_nlp_analyses_bulk(s, linhas)
+        gravadas = {l.id: l.message_id for l in (await s.execute(select(NLPConversationAnalysis))).scalars()}
+    assert [gravadas[i] for i in ids] == [0, 1, 2, 3]
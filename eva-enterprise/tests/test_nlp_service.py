@@ -0,0 +1,44 @@
+import random
+from services.nlp_service import NLPService
+from utils.aho_corasick import AhoCorasick, tokenizar
+
+def test_automato_encontra_frases_sobrepostas():
+    automato = AhoCorasick([("vou morrer", "a"), ("morrer", "b"), ("não quero mais viver", "c"),
+                            ("quero morrer", "d"), ("mais", "e")])
+    assert automato.encontrar("eu nao quero mais viver, acho que vou morrer") == {"a", "b", "c", "e"}
+    assert automato.encontrar("quero quero morrer") == {"b", "d"}
+    assert automato.encontrar("") == set()
+
+def test_automato_igual_a_busca_ingenua():
+    vocabulario = ["a", "b", "c", "d"]
+    aleatorio = random.Random(7)
+    frases = {" ".join(aleatorio.choices(vocabulario, k=aleatorio.randint(1, 4))) for _ in range(30)}
+    automato = AhoCorasick((frase, frase) for frase in frases)
+    for _ in range(200):
+        texto = " ".join(aleatorio.choices(vocabulario, k=aleatorio.randint(0, 20)))
+        palavras = f" {texto} "
+        assert automato.encontrar(texto) == {f for f in frases if f" {f} " in palavras}
+
+def test_acento_caixa_e_espacamento():
+    assert tokenizar("NÃO  aguento,mais!") == [b"nao", b"aguento", b"mais"]
+    assert NLPService.detect_danger_keywords("Nao aguento    MAIS") == ["suicidal_ideation"]
+    assert NLPService.extract_entities_simple("sinto panico")["emotions"] == ["pânico"]
+
+def test_so_casa_palavra_inteira():
+    # "dor" em "dormir" e "ano" em "humano" não contam mais
+    assert NLPService.classify_topics("vou dormir cedo") == []
+    assert NLPService.extract_entities_simple("ser humano")["time_references"] == []
+    assert NLPService.classify_topics("sinto dor no joelho") == ["health"]
+
+def test_analise_completa_numa_passada():
+    analise = NLPService.analyze_message(
+        "Não aguento mais, estou sozinho. Minha família não liga e hoje fui ao médico."
+    )
+    assert analise["danger_flags"] == ["suicidal_ideation", "isolation"]
+    assert analise["risk_level"] == "CRITICAL"
+    assert set(analise["detected_keywords"]) == {"não aguento mais", "sozinho", "minha família"}
+    assert analise["topics"] == ["family", "health", "loneliness"]
+    assert analise["entities"]["health_terms"] == ["médico"]
+    assert analise["entities"]["time_references"] == ["hoje"]
+    assert analise["entities"]["people"] == ["Não", "Minha"]
+    assert analise["sentiment_label"] == "very_negative"
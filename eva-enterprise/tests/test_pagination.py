@@ -0,0 +1,67 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from fastapi import HTTPException
+from sqlalchemy import Column, Integer, DateTime, Numeric, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import declarative_base, sessionmaker
+from utils.pagination import encode_cursor, decode_cursor, paginate_keyset, count_total, PaginatedResponse
+
+LocalBase = declarative_base()
+
+class Registro(LocalBase):
+    __tablename__ = "registros_paginacao"
+    id = Column(Integer, primary_key=True)
+    criado_em = Column(DateTime)
+    score = Column(Numeric(3, 2))
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(LocalBase.metadata.create_all)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as s:
+        base = datetime(2025, 1, 1)
+        for i in range(1, 24):
+            score = None if i % 5 == 0 else Decimal(i % 3) / 2
+            s.add(Registro(id=i, criado_em=base + timedelta(hours=i // 2), score=score))
+        await s.commit()
+        yield s
+    await engine.dispose()
+
+def test_cursor_roundtrip():
+    values = [datetime(2025, 1, 2, 3, 4, 5), Decimal("0.75"), None, 42]
+    assert decode_cursor(encode_cursor(values)) == values
+
+def test_invalid_cursor_is_400():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("nao-e-um-cursor")
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException):
+        decode_cursor(encode_cursor([1, 2]), size=3)
+
+@pytest.mark.asyncio
+async def test_keyset_walks_all_rows_without_duplicates(session):
+    for cols in ([Registro.criado_em, Registro.id], [Registro.score, Registro.id]):
+        seen, cursor = [], None
+        while True:
+            items, cursor = await paginate_keyset(session, select(Registro), cols, cursor=cursor, limit=4)
+            seen.extend(r.id for r in items)
+            if cursor is None:
+                break
+        assert sorted(seen) == list(range(1, 24))
+        assert len(seen) == len(set(seen))
+
+@pytest.mark.asyncio
+async def test_keyset_order_and_count(session):
+    items, cursor = await paginate_keyset(session, select(Registro), [Registro.criado_em, Registro.id], limit=3)
+    assert [r.id for r in items] == [23, 22, 21]
+    assert cursor is not None
+
+    total, estimated = await count_total(session, select(Registro))
+    assert (total, estimated) == (23, False)
+
+    page = PaginatedResponse.create_from_cursor(items=[], limit=3, next_cursor=None, total=total)
+    assert page.pagination.has_next is False
+    assert page.pagination.total == 23
@@ -0,0 +1,29 @@
+from database.connection import PoolMetrics, InstrumentedQueuePool, create_engine_from_env, POOL_SIZE
+
+def test_pool_metrics_histogram():
+    metrics = PoolMetrics()
+    metrics.record(0.5)
+    metrics.record(42)
+    metrics.record(9000)
+    metrics.record(0, timed_out=True)
+
+    snap = metrics.snapshot()
+    assert snap["checkouts"] == 3
+    assert snap["timeouts"] == 1
+    assert snap["max_wait_ms"] == 9000
+    assert snap["wait_histogram_ms"]["1"] == 1
+    assert snap["wait_histogram_ms"]["50"] == 1
+    assert snap["wait_histogram_ms"]["+Inf"] == 1
+
+def test_postgres_engine_uses_instrumented_pool():
+    metrics = PoolMetrics()
+    engine = create_engine_from_env("postgresql+asyncpg://u:p@localhost:5432/eva", metrics=metrics)
+    pool = engine.sync_engine.pool
+    assert isinstance(pool, InstrumentedQueuePool)
+    assert pool.metrics is metrics
+    assert pool.size() == POOL_SIZE
+    assert pool._pre_ping is True
+
+def test_sqlite_engine_keeps_defaults():
+    engine = create_engine_from_env("sqlite+aiosqlite:///:memory:")
+    assert not isinstance(engine.sync_engine.pool, InstrumentedQueuePool)
@@ -0,0 +1,73 @@
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from database.connection import Base, get_db
+from database.models import Usuario
+from utils.security import check_role, create_access_token, get_current_user, invalidar_principal
+
+@pytest.fixture
+async def cliente():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[Usuario.__table__]))
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as s:
+        s.add(Usuario(nome="Ana", email="ana@eva.com", tipo="admin", ativo=True))
+        await s.commit()
+
+    consultas = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def contar(conn, cursor, statement, *args):
+        if "FROM usuarios" in statement:
+            consultas.append(statement)
+
+    app = FastAPI()
+
+    async def _get_test_db():
+        async with Session() as s:
+            yield s
+
+    app.dependency_overrides[get_db] = _get_test_db
+
+    @app.get("/eu")
+    async def eu(user: dict = Depends(get_current_user)):
+        return user
+
+    @app.get("/admin")
+    async def admin(user: dict = Depends(check_role(["admin"]))):
+        return {"ok": True}
+
+    token = create_access_token({"sub": "ana@eva.com", "role": "admin", "user_id": 1, "subscription_tier": "gold"})
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test",
+                           headers={"Authorization": f"Bearer {token}"}) as ac:
+        yield ac, Session, consultas
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_principal_consultado_uma_vez(cliente):
+    ac, _, consultas = cliente
+    primeira = await ac.get("/eu")
+    assert primeira.status_code == 200
+    assert primeira.json()["user_id"] == 1
+    assert primeira.json()["subscription_tier"] == "gold"
+
+    for _ in range(5):
+        assert (await ac.get("/admin")).status_code == 200
+    assert len(consultas) == 1
+
+@pytest.mark.asyncio
+async def test_desativacao_invalida_o_principal(cliente):
+    ac, Session, consultas = cliente
+    assert (await ac.get("/eu")).status_code == 200
+
+    async with Session() as s:
+        await s.execute(update(Usuario).where(Usuario.id == 1).values(ativo=False))
+        await s.commit()
+    await invalidar_principal("ana@eva.com")
+
+    assert (await ac.get("/eu")).status_code == 403
+    assert len(consultas) == 2
@@ -0,0 +1,31 @@
+from starlette.requests import Request
+from database import connection
+from database.connection import mark_recent_write, _must_read_from_primary
+
+def _request(method="GET", token="Bearer abc"):
+    headers = [(b"authorization", token.encode())] if token else []
+    return Request({
+        "type": "http",
+        "method": method,
+        "path": "/",
+        "headers": headers,
+        "client": ("10.0.0.1", 1234),
+    })
+
+def test_unsafe_method_reads_from_primary():
+    assert _must_read_from_primary(_request("POST")) is True
+    assert _must_read_from_primary(_request("GET", token="Bearer leitor")) is False
+
+def test_recent_writer_is_pinned_to_primary(monkeypatch):
+    monkeypatch.setattr(connection, "_recent_writers", {})
+    mark_recent_write(_request("PUT", token="Bearer escritor"))
+
+    assert _must_read_from_primary(_request("GET", token="Bearer escritor")) is True
+    assert _must_read_from_primary(_request("GET", token="Bearer outro")) is False
+
+def test_pin_expires(monkeypatch):
+    monkeypatch.setattr(connection, "_recent_writers", {})
+    monkeypatch.setattr(connection, "READ_YOUR_WRITES_S", -1)
+    mark_recent_write(_request("POST", token=None))
+
+    assert _must_read_from_primary(_request("GET", token=None)) is False
@@ -0,0 +1,83 @@
+import gzip
+import json
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response
+from httpx import AsyncClient, ASGITransport
+from schemas import MedicaoCorporalResponse
+from utils.compressao import CompressaoMiddleware, escolher_codificacao
+from utils.respostas import RespostaJSONRapida, resposta_orm
+
+def _linhas(n):
+    return [
+        SimpleNamespace(
+            id=i, cliente_id=7, peso_kg=Decimal("71.50"), altura_cm=Decimal("170"),
+            perc_gordura_corporal=None, massa_ossea_kg=None, massa_magra_kg=Decimal("55.2"),
+            circunferencia_cintura_cm=None, circunferencia_quadril_cm=None,
+            timestamp_coleta=datetime(2025, 3, 1, 8, i % 60), created_at=datetime(2025, 3, 1, 9, 0),
+        )
+        for i in range(n)
+    ]
+
+@pytest.fixture
+async def cliente():
+    app = FastAPI(default_response_class=RespostaJSONRapida)
+    app.add_middleware(CompressaoMiddleware)
+
+    @app.get("/validado", response_model=List[MedicaoCorporalResponse])
+    async def validado(n: int = 50):
+        return _linhas(n)
+
+    @app.get("/confiavel", response_model=List[MedicaoCorporalResponse])
+    async def confiavel(n: int = 50):
+        return resposta_orm(MedicaoCorporalResponse, _linhas(n))
+
+    @app.get("/bruto")
+    async def bruto():
+        return RespostaJSONRapida({"valor": Decimal("2.5"), "inteiro": Decimal("3"), "em": datetime(2025, 1, 2, 3, 4)})
+
+    @app.get("/ja-comprimido")
+    async def ja_comprimido():
+        return Response(gzip.compress(b"x" * 5000), media_type="text/plain", headers={"Content-Encoding": "gzip"})
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+def test_escolher_codificacao():
+    assert escolher_codificacao("gzip, deflate") == "gzip"
+    assert escolher_codificacao("gzip;q=0, deflate") is None
+    assert escolher_codificacao("") is None
+
+@pytest.mark.asyncio
+async def test_caminho_confiavel_igual_ao_validado(cliente):
+    validado = await cliente.get("/validado", headers={"Accept-Encoding": "identity"})
+    confiavel = await cliente.get("/confiavel", headers={"Accept-Encoding": "identity"})
+    assert confiavel.status_code == 200
+    assert confiavel.json() == validado.json()
+    assert confiavel.json()[0]["peso_kg"] == "71.50"
+
+@pytest.mark.asyncio
+async def test_decimal_e_datetime_sem_response_model(cliente):
+    r = await cliente.get("/bruto")
+    assert r.json() == {"valor": 2.5, "inteiro": 3, "em": "2025-01-02T03:04:00"}
+
+@pytest.mark.asyncio
+async def test_compressao_acima_do_limite(cliente):
+    pequena = await cliente.get("/confiavel?n=1", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in pequena.headers
+
+    grande = await cliente.get("/confiavel?n=200", headers={"Accept-Encoding": "gzip"})
+    assert grande.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in grande.headers["vary"]
+    assert int(grande.headers["content-length"]) < len(json.dumps(grande.json()))
+    assert len(grande.json()) == 200
+
+@pytest.mark.asyncio
+async def test_resposta_ja_codificada_passa_intacta(cliente):
+    r = await cliente.get("/ja-comprimido", headers={"Accept-Encoding": "gzip"})
+    assert r.text == "x" * 5000
@@ -0,0 +1,77 @@
+import pytest
+from datetime import date, datetime, timedelta
+from database.models import (
+    CrisisEvent, MentalHealthAssessment, MoodDiary, NLPConversationAnalysis, PatientRiskState, SafetyPlan
+)
+from database.repositories.mental_health_repository import MentalHealthRepository
+
+@pytest.fixture
+async def fabrica(sqlite_async):
+    consultas = []
+    Session = await sqlite_async(MentalHealthAssessment, MoodDiary, CrisisEvent, SafetyPlan, PatientRiskState,
+                                 NLPConversationAnalysis, consultas=consultas)
+
+    agora = datetime.now()
+    async with Session() as s:
+        s.add_all([
+            MentalHealthAssessment(patient_id=1, scale_type="PHQ9", score=8, severity_level="mild",
+                                   assessed_at=agora - timedelta(days=40)),
+            MentalHealthAssessment(patient_id=1, scale_type="PHQ9", score=21, severity_level="severe",
+                                   assessed_at=agora - timedelta(days=2)),
+            MentalHealthAssessment(patient_id=1, scale_type="C-SSRS", score=1, severity_level="low",
+                                   interpretation="baixo risco", assessed_at=agora - timedelta(days=1)),
+            MentalHealthAssessment(patient_id=2, scale_type="GAD7", score=20, assessed_at=agora),
+            MoodDiary(patient_id=1, date=date.today(), time_of_day="morning", mood_score=4, anxiety_level=7),
+            MoodDiary(patient_id=1, date=date.today(), time_of_day="evening", mood_score=5, energy_level=3),
+            MoodDiary(patient_id=1, date=date.today() - timedelta(days=20), time_of_day="morning", mood_score=9),
+            CrisisEvent(patient_id=1, crisis_type="panic_attack", occurred_at=agora - timedelta(days=3)),
+            CrisisEvent(patient_id=1, crisis_type="suicide_attempt", occurred_at=agora - timedelta(days=60)),
+            SafetyPlan(patient_id=1, active=True),
+        ])
+        await s.commit()
+        await MentalHealthRepository.create_nlp_analyses_bulk(s, [
+            {"patient_id": 1, "sentiment_score": -0.5, "sentiment_label": "negative",
+             "danger_flags": ["isolation", "hopelessness"], "analyzed_at": agora - timedelta(days=1)},
+            {"patient_id": 1, "sentiment_score": -0.3, "sentiment_label": "negative",
+             "danger_flags": ["isolation"], "analyzed_at": agora},
+            {"patient_id": 1, "sentiment_score": 0.9, "sentiment_label": "very_positive",
+             "danger_flags": [], "analyzed_at": agora - timedelta(days=30)},
+        ])
+
+    # Só contam as consultas do teste, não as da carga
+    consultas.clear()
+    return Session, consultas
+
+@pytest.mark.asyncio
+async def test_resumo_em_uma_consulta(fabrica):
+    Session, consultas = fabrica
+    async with Session() as s:
+        resumo = await MentalHealthRepository.get_patient_mental_health_summary(s, 1)
+    assert len(consultas) == 1
+
+    assert resumo["assessments"]["phq9"]["score"] == 21
+    assert resumo["assessments"]["phq9"]["severity"] == "severe"
+    assert resumo["assessments"]["gad7"] == {"score": None, "severity": None, "date": None}
+    assert resumo["assessments"]["cssrs"]["risk"] == "baixo risco"
+    assert resumo["mood_stats_7d"] == {"avg_mood": 4.5, "avg_anxiety": 7.0, "avg_energy": 3.0,
+                                       "entries_count": 2, "days_analyzed": 7}
+    assert resumo["sentiment_trend_7d"] == {"avg_sentiment": -0.4, "analyses_count": 2,
+                                            "danger_flags_count": {"isolation": 2, "hopelessness": 1},
+                                            "trend": "negative"}
+    assert resumo["crisis_count_30d"] == 1
+    assert resumo["has_active_safety_plan"] is True
+    # PHQ-9 >= 20; a tentativa de suicídio ficou fora da janela de 30 dias
+    assert resumo["risk_level"] == "HIGH"
+
+@pytest.mark.asyncio
+async def test_paciente_sem_dados(fabrica):
+    Session, _ = fabrica
+    async with Session() as s:
+        resumo = await MentalHealthRepository.get_patient_mental_health_summary(s, 99)
+        humor = await MentalHealthRepository.get_mood_statistics(s, 99)
+        sentimento = await MentalHealthRepository.get_recent_sentiment_trend(s, 99)
+    assert resumo["mood_stats_7d"] == humor == {"error": "no_data"}
+    assert resumo["sentiment_trend_7d"] == sentimento == {"error": "no_data"}
+    assert resumo["crisis_count_30d"] == 0
+    assert resumo["has_active_safety_plan"] is False
+    assert resumo["risk_level"] == "LOW"
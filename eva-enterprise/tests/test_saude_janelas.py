@@ -0,0 +1,54 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import declarative_base, sessionmaker
+from database.repositories.repository_saude import _listar_recentes
+from database.rollup_saude import intervalo_mes
+
+LocalBase = declarative_base()
+
+class Leitura(LocalBase):
+    __tablename__ = "leituras_janela"
+    id = Column(Integer, primary_key=True)
+    cliente_id = Column(Integer)
+    timestamp_coleta = Column(DateTime)
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(LocalBase.metadata.create_all)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as s:
+        agora = datetime.utcnow()
+        # 3 leituras recentes e 4 antigas (fora da primeira janela)
+        for i, dias in enumerate([1, 2, 3, 100, 400, 900, 1200], start=1):
+            s.add(Leitura(id=i, cliente_id=7, timestamp_coleta=agora - timedelta(days=dias)))
+        s.add(Leitura(id=99, cliente_id=8, timestamp_coleta=agora))
+        await s.commit()
+        yield s
+    await engine.dispose()
+
+def test_intervalo_mes_semiaberto():
+    assert intervalo_mes(2, 2024) == (datetime(2024, 2, 1), datetime(2024, 3, 1))
+    assert intervalo_mes(12, 2024) == (datetime(2024, 12, 1), datetime(2025, 1, 1))
+
+@pytest.mark.asyncio
+async def test_listar_recentes_amplia_janela_ate_completar(session):
+    col = Leitura.timestamp_coleta
+    primeiros = await _listar_recentes(session, Leitura, col, 7, limit=2)
+    assert [r.id for r in primeiros] == [1, 2]
+
+    todos = await _listar_recentes(session, Leitura, col, 7, limit=10)
+    assert [r.id for r in todos] == [1, 2, 3, 4, 5, 6, 7]
+
+    pagina = await _listar_recentes(session, Leitura, col, 7, skip=3, limit=2)
+    assert [r.id for r in pagina] == [4, 5]
+
+@pytest.mark.asyncio
+async def test_listar_recentes_respeita_intervalo_explicito(session):
+    inicio = datetime.utcnow() - timedelta(days=150)
+    fim = datetime.utcnow() - timedelta(days=2)
+    itens = await _listar_recentes(session, Leitura, Leitura.timestamp_coleta, 7, limit=10, data_inicio=inicio, data_fim=fim)
+    assert [r.id for r in itens] == [2, 3, 4]
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import select
+from database.models import Agendamento, Idoso, MLPrediction, MoodDiary, PatientRiskState
+from services import score_risco_lote
+from services.score_risco_lote import FEATURES, pontuar, pontuar_populacao
+
+@pytest.fixture
+def fabrica(sqlite_sync):
+    consultas = []
+    return sqlite_sync(Idoso, PatientRiskState, MoodDiary, Agendamento, MLPrediction, consultas=consultas), consultas
+
+def test_score_vetorizado_ordena_e_rotula():
+    x = np.zeros((4, len(FEATURES)))
+    x[1, FEATURES.index("phq9")] = 1.0
+    x[2, FEATURES.index("cssrs")] = 1.0
+    x[3, [FEATURES.index("cssrs"), FEATURES.index("tentativa_30d")]] = 1.0
+    valor, rotulo, confianca = pontuar(x, np.array([0.0, 0.2, 0.2, 1.0]))
+    assert list(np.argsort(valor)) == [0, 1, 2, 3]
+    assert list(rotulo) == ["LOW", "MODERATE", "HIGH", "CRITICAL"]
+    assert confianca[0] == pytest.approx(0.3) and confianca[3] == pytest.approx(1.0)
+
+def test_populacao_em_lotes_com_upsert(fabrica, monkeypatch):
+    Session, consultas = fabrica
+    agora = datetime.now()
+    with Session() as s:
+        for i in range(1, 6):
+            s.add(Idoso(id=i, nome=f"Idoso {i}", telefone=str(i), data_nascimento=date(1940, 1, 1),
+                        ativo=i != 4))
+        s.add_all([
+            PatientRiskState(patient_id=1, phq9_score=22, cssrs_score=4, sentiment_ewma=-0.8,
+                             sentiment_at=agora - timedelta(days=1), crisis_count=2,
+                             last_crisis_at=agora - timedelta(days=3),
+                             last_suicide_attempt_at=agora - timedelta(days=3)),
+            # Sentimento fora da janela de 7 dias não conta
+            PatientRiskState(patient_id=2, gad7_score=5, sentiment_ewma=-0.9,
+                             sentiment_at=agora - timedelta(days=10)),
+            PatientRiskState(patient_id=4, cssrs_score=5),
+        ])
+        s.add_all([MoodDiary(patient_id=2, date=agora.date() - timedelta(days=d), time_of_day="morning",
+                             mood_score=score, anxiety_level=3) for d, score in ((1, 4), (2, 6), (30, 1))])
+        s.add_all([
+            Agendamento(idoso_id=3, tipo="lembrete_medicamento", medicamento_id=9, status=status,
+                        data_hora_agendada=agora - timedelta(days=d))
+            for d, status in ((1, "concluido"), (2, "nao_atendido"), (3, "concluido"), (4, "falhou"),
+                              (60, "nao_atendido"))
+        ] + [
+            Agendamento(idoso_id=3, tipo="ligacao", status=status, data_hora_agendada=agora - timedelta(hours=h))
+            for h, status in ((5, "nao_atendido"), (6, "concluido"), (7, "agendado"))
+        ] + [
+            # Ligação ainda no futuro não entra
+            Agendamento(idoso_id=3, tipo="ligacao", status="nao_atendido", data_hora_agendada=agora + timedelta(hours=1))
+        ])
+        # Predição de outro modelo: fica intacta, com seu histórico
+        s.add(MLPrediction(patient_id=1, model_name="xgb", prediction_type="crisis_30d",
+                           prediction_value=0.1, predicted_at=agora - timedelta(days=1)))
+        s.commit()
+
+    consultas.clear()
+    with Session() as s:
+        resultado = pontuar_populacao(s, lote=2)
+    # Por lote: ids, 3 consultas de features e o upsert; e a consulta que acha o fim
+    assert len(consultas) == 2 * 5 + 1
+    assert (resultado["pacientes"], resultado["ultimo_id"]) == (4, 5)
+    assert sum(resultado["niveis"].values()) == 4
+
+    with Session() as s:
+        predicoes = {p.patient_id: p for p in s.execute(
+            select(MLPrediction).where(MLPrediction.model_name == "risco_populacional")).scalars()}
+    assert sorted(predicoes) == [1, 2, 3, 5]
+
+    p1, p2, p3, p5 = (predicoes[i] for i in (1, 2, 3, 5))
+    assert p1.prediction_label == "CRITICAL" and p1.prediction_type == "crisis_30d"
+    assert p1.features_used["tentativa_30d"] == 1.0 and p1.features_used["crise_30d"] == 1.0
+    assert p1.features_used["sentimento_negativo"] == pytest.approx(0.8)
+
+    assert p2.features_used["sentimento_negativo"] == 0.0
+    assert p2.features_used["humor_baixo"] == pytest.approx(round(5 / 9, 4))
+    assert float(p2.confidence_score) == pytest.approx(0.3 + 0.7 * 2 / 5)
+
+    assert p3.features_used["nao_adesao"] == pytest.approx(round(2 / 4, 4))
+    assert p3.features_used["sem_resposta"] == pytest.approx(0.5)
+
+    assert p5.prediction_label == "LOW" and float(p5.confidence_score) == pytest.approx(0.3)
+    assert float(p1.prediction_value) > float(p3.prediction_value) > float(p5.prediction_value)
+
+    # Nova execução regrava a mesma linha
+    with Session() as s:
+        s.execute(select(MLPrediction).where(MLPrediction.patient_id == 5)).scalars().first().actual_outcome = "none"
+        s.commit()
+    monkeypatch.setattr(score_risco_lote, "SCORE_MODELO_VERSAO", "v2")
+    with Session() as s:
+        pontuar_populacao(s, lote=10)
+        linhas = s.execute(select(MLPrediction)).scalars().all()
+    assert len(linhas) == 5
+    assert {p.model_version for p in linhas if p.model_name == "risco_populacional"} == {"v2"}
+    assert all(p.actual_outcome is None for p in linhas)
@@ -0,0 +1,86 @@
+import asyncio
+import ipaddress
+import time
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+from utils import security
+from utils import limite_login
+from utils.limite_login import LimitadorLogin, ip_cliente, limitar_login
+from utils.security import gerar_hash_senha, verificar_senha
+
+def _request(ip="10.0.0.1", encaminhado=None):
+    headers = [(b"x-forwarded-for", encaminhado.encode())] if encaminhado else []
+    return Request({"type": "http", "headers": headers, "client": (ip, 1234)})
+
+def test_ip_do_cliente_atras_do_proxy(monkeypatch):
+    # Sem proxy configurado o cabeçalho é ignorado (o cliente pode forjá-lo)
+    assert ip_cliente(_request(encaminhado="200.1.2.3")) == "10.0.0.1"
+
+    monkeypatch.setattr(limite_login, "LOGIN_PROXIES_CONFIAVEIS",
+                        [ipaddress.ip_network("10.0.0.0/24"), ipaddress.ip_network("127.0.0.1")])
+    assert ip_cliente(_request()) == "10.0.0.1"
+    assert ip_cliente(_request(encaminhado="1.1.1.1, 200.1.2.3")) == "200.1.2.3"
+    assert ip_cliente(_request(encaminhado="1.1.1.1, 200.1.2.3, 127.0.0.1")) == "200.1.2.3"
+    assert ip_cliente(_request(ip="200.9.9.9", encaminhado="1.1.1.1")) == "200.9.9.9"
+
+def test_limitador_bloqueia_acima_do_limite():
+    limitador = LimitadorLogin(max_tentativas=3, janela=60)
+    for _ in range(3):
+        limitador.registrar("200.1.2.3")
+    with pytest.raises(HTTPException) as erro:
+        limitador.registrar("200.1.2.3")
+    assert erro.value.status_code == 429
+    assert int(erro.value.headers["Retry-After"]) > 0
+    limitador.registrar("200.1.2.4")
+
+def test_so_falhas_de_credencial_contam(monkeypatch):
+    monkeypatch.setattr(limite_login, "limitador_login", LimitadorLogin(max_tentativas=2, janela=60))
+    app = FastAPI()
+
+    @app.post("/login", dependencies=[Depends(limitar_login)])
+    async def login(senha: str):
+        if senha != "certa":
+            raise HTTPException(status_code=401)
+        return {}
+
+    cliente = TestClient(app)
+    for _ in range(5):
+        assert cliente.post("/login", params={"senha": "certa"}).status_code == 200
+    assert [cliente.post("/login", params={"senha": "errada"}).status_code for _ in range(3)] == [401, 401, 429]
+    # Bloqueado até a janela passar, mesmo com a senha certa
+    assert cliente.post("/login", params={"senha": "certa"}).status_code == 429
+
+@pytest.mark.asyncio
+async def test_bcrypt_nao_bloqueia_o_event_loop():
+    hash_ = await gerar_hash_senha("segredo")
+    maior_intervalo = 0.0
+    rodando = True
+
+    async def relogio():
+        nonlocal maior_intervalo
+        anterior = time.perf_counter()
+        while rodando:
+            await asyncio.sleep(0.005)
+            agora = time.perf_counter()
+            maior_intervalo = max(maior_intervalo, agora - anterior)
+            anterior = agora
+
+    tarefa = asyncio.create_task(relogio())
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*[verificar_senha("segredo", hash_) for _ in range(4)])
+    duracao = time.perf_counter() - inicio
+    rodando = False
+    await tarefa
+
+    assert all(resultados)
+    # Cada checkpw leva centenas de ms; o loop nunca fica parado tanto tempo
+    assert maior_intervalo < duracao / 2
+
+@pytest.mark.asyncio
+async def test_fila_cheia_responde_503(monkeypatch):
+    monkeypatch.setattr(security, "SENHA_FILA_MAX", 0)
+    with pytest.raises(HTTPException) as erro:
+        await verificar_senha("segredo", "$2b$12$" + "a" * 53)
+    assert erro.value.status_code == 503
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from database import serie_temporal
+from database.connection import Base
+from database.models import Usuario, Atividade, SinaisVitaisHealth
+from database.repositories.repository_saude import get_serie_temporal
+from database.serie_temporal import lttb, largura_bucket, obter_serie
+
+INICIO = datetime(2025, 3, 1)
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    tabelas = [m.__table__ for m in (Usuario, Atividade, SinaisVitaisHealth)]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=tabelas))
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as s:
+        s.add(Usuario(id=1, nome="Ana"))
+        # Um dia de BPM por minuto com um pico isolado às 12:00
+        s.add_all(
+            SinaisVitaisHealth(cliente_id=1, bpm=180 if i == 720 else 60 + i % 10,
+                               timestamp_coleta=INICIO + timedelta(minutes=i))
+            for i in range(1440)
+        )
+        await s.commit()
+        yield s
+    await engine.dispose()
+
+def test_lttb_mantem_extremos_e_limite_de_pontos():
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.sin(x / 300.0)
+    y[5_000] = 10.0
+    indices = lttb(x, y, 100)
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 9_999
+    assert 5_000 in indices
+    assert np.all(np.diff(indices) > 0)
+
+def test_lttb_serie_menor_que_o_limite_volta_inteira():
+    x = np.arange(5, dtype=np.float64)
+    assert list(lttb(x, x, 100)) == [0, 1, 2, 3, 4]
+
+def test_largura_bucket_cobre_o_intervalo():
+    largura = largura_bucket(INICIO, INICIO + timedelta(days=30), 500)
+    assert largura * 500 >= timedelta(days=30)
+    assert largura_bucket(INICIO, INICIO + timedelta(seconds=10), 500) == timedelta(seconds=1)
+
+@pytest.mark.asyncio
+async def test_buckets_agregam_min_media_max(db):
+    serie = await obter_serie(db, 1, "bpm", INICIO, INICIO + timedelta(days=1), pontos=24)
+
+    assert serie["largura_bucket_segundos"] == 3600
+    assert len(serie["pontos"]) == 24
+    primeiro = serie["pontos"][0]
+    assert primeiro["timestamp"] == INICIO
+    assert (primeiro["minimo"], primeiro["maximo"], primeiro["contagem"]) == (60, 69, 60)
+    meio_dia = serie["pontos"][12]
+    assert meio_dia["timestamp"] == INICIO + timedelta(hours=12)
+    assert meio_dia["maximo"] == 180
+
+@pytest.mark.asyncio
+async def test_lttb_preserva_pico(db):
+    serie = await obter_serie(db, 1, "bpm", INICIO, INICIO + timedelta(days=1), pontos=50, metodo="lttb")
+
+    assert len(serie["pontos"]) == 50
+    assert max(p["valor"] for p in serie["pontos"]) == 180
+    assert serie["pontos"][0]["timestamp"] == INICIO
+
+@pytest.mark.asyncio
+async def test_lttb_pre_agrega_series_longas(db, monkeypatch):
+    monkeypatch.setattr(serie_temporal, "SERIE_LTTB_MAX_BRUTOS", 100)
+    serie = await obter_serie(db, 1, "bpm", INICIO, INICIO + timedelta(days=1), pontos=10, metodo="lttb")
+
+    assert len(serie["pontos"]) == 10
+    assert serie["pontos"][-1]["timestamp"] < INICIO + timedelta(days=1)
+
+@pytest.mark.asyncio
+async def test_intervalo_com_fuso_vira_utc(db):
+    # 09:00-03:00 = 12:00 UTC; sem data_fim, o fim padrão (utcnow) não pode quebrar a comparação
+    inicio = datetime(2025, 3, 1, 9, 0, tzinfo=timezone(timedelta(hours=-3)))
+    serie = await get_serie_temporal(db, 1, "bpm", data_inicio=inicio,
+                                     data_fim=datetime(2025, 3, 1, 13, 0, tzinfo=timezone.utc), pontos=1)
+    assert serie["pontos"][0]["maximo"] == 180
+    assert await get_serie_temporal(db, 1, "bpm", data_inicio=inicio, pontos=10)
@@ -0,0 +1,94 @@
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from database.connection import Base
+from database.models import Idoso, Medicamento, Cuidador, Alerta, SyncTombstone
+from database.repositories import sync_repo
+from database.repositories.sync_repo import SyncRepository
+
+ANTES = datetime.now() - timedelta(hours=1)
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    tabelas = [m.__table__ for m in (Idoso, Medicamento, Cuidador, Alerta, SyncTombstone)]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=tabelas))
+        await conn.execute(text("CREATE TABLE usuarios_idosos (usuario_id INTEGER, idoso_id INTEGER)"))
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as s:
+        for i in (1, 2):
+            s.add(Idoso(id=i, nome=f"Idoso {i}", telefone=f"1199999000{i}", data_nascimento=date(1940, 1, i),
+                        criado_em=ANTES, atualizado_em=ANTES))
+            s.add(Medicamento(id=i, idoso_id=i, nome=f"Remédio {i}", horarios=[], criado_em=ANTES, atualizado_em=ANTES))
+        s.add(Alerta(id=1, idoso_id=1, tipo="queda", severidade="alta", mensagem="Queda", destinatarios=[],
+                     criado_em=ANTES, atualizado_em=ANTES))
+        await s.execute(text("INSERT INTO usuarios_idosos VALUES (7, 1)"))
+        await s.commit()
+        yield s
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_sync_completo_e_delta(db):
+    repo = SyncRepository(db)
+    completo = await repo.sincronizar(7, "cuidador")
+
+    assert [i["id"] for i in completo["idosos"]["alterados"]] == [1]
+    assert [m["id"] for m in completo["medicamentos"]["alterados"]] == [1]
+    assert completo["alertas"]["alterados"][0]["tipo"] == "queda"
+    assert not completo["tem_mais"] and not completo["reset"]
+
+    vazio = await repo.sincronizar(7, "cuidador", completo["token"])
+    assert vazio["medicamentos"] == {"alterados": [], "removidos": []}
+
+    (await db.get(Medicamento, 1)).dosagem = "10mg"
+    await db.commit()
+    delta = await repo.sincronizar(7, "cuidador", vazio["token"])
+    assert [m["dosagem"] for m in delta["medicamentos"]["alterados"]] == ["10mg"]
+    assert delta["idosos"]["alterados"] == []
+
+@pytest.mark.asyncio
+async def test_desativados_e_tombstones_saem_em_removidos(db):
+    repo = SyncRepository(db)
+    token = (await repo.sincronizar(7, "cuidador"))["token"]
+
+    (await db.get(Medicamento, 1)).ativo = False
+    db.add_all([
+        SyncTombstone(entidade="alertas", registro_id=1, idoso_id=1),
+        SyncTombstone(entidade="alertas", registro_id=99, idoso_id=2),  # fora do escopo
+    ])
+    await db.commit()
+
+    delta = await repo.sincronizar(7, "cuidador", token)
+    assert delta["medicamentos"] == {"alterados": [], "removidos": [1]}
+    assert delta["alertas"]["removidos"] == [1]
+
+@pytest.mark.asyncio
+async def test_paginacao_por_entidade(db, monkeypatch):
+    monkeypatch.setattr(sync_repo, "SYNC_MAX_POR_ENTIDADE", 1)
+    repo = SyncRepository(db)
+
+    primeira = await repo.sincronizar(1, "admin")
+    assert primeira["tem_mais"]
+    segunda = await repo.sincronizar(1, "admin", primeira["token"])
+
+    ids = [i["id"] for r in (primeira, segunda) for i in r["idosos"]["alterados"]]
+    assert ids == [1, 2]
+    assert not segunda["tem_mais"]
+
+@pytest.mark.asyncio
+async def test_mudanca_de_escopo_ou_token_antigo_forcam_reset(db):
+    repo = SyncRepository(db)
+    token = (await repo.sincronizar(7, "cuidador"))["token"]
+
+    await db.execute(text("INSERT INTO usuarios_idosos VALUES (7, 2)"))
+    await db.commit()
+    resposta = await repo.sincronizar(7, "cuidador", token)
+    assert resposta["reset"]
+    assert [i["id"] for i in resposta["idosos"]["alterados"]] == [1, 2]
+
+    _, escopo, cursores = repo.decodificar_token(resposta["token"])
+    velho = repo.codificar_token(datetime.now() - timedelta(days=365), escopo, cursores)
+    assert (await repo.sincronizar(7, "cuidador", velho))["reset"]
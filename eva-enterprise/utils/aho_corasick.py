@@ -0,0 +1,88 @@
+"""
+Busca de várias frases ao mesmo tempo (Aho–Corasick sobre palavras)
+
+O autômato é montado uma vez com todas as frases e encontra todas elas
+(inclusive sobrepostas: "vou morrer" e "morrer") numa única passada pelo
+texto, em O(tamanho do texto + ocorrências), independente de quantas
+frases existem.
+
+O alfabeto são palavras, não caracteres: texto e frases passam por
+normalizar() (minúsculas, sem acento) e tokenizar(). Com isso:
+- só casa palavra inteira ("dor" não casa em "dormir")
+- acento, caixa e espaçamento não importam ("nao  aguento, mais" casa
+  "não aguento mais")
+"""
+import unicodedata
+from collections import deque
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+# a-z e 0-9 ficam (A-Z vira minúscula); o resto dos bytes vira espaço
+_SEPARAR = bytes(
+    c + 32 if 65 <= c <= 90 else c if 48 <= c <= 57 or 97 <= c <= 122 else 32
+    for c in range(256)
+)
+
+
+def normalizar(texto: str) -> bytes:
+    """ASCII minúsculo e sem acento ("Pânico!" -> b"panico ")"""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return decomposto.encode("ascii", "ignore").translate(_SEPARAR)
+
+
+def tokenizar(texto: str) -> List[bytes]:
+    return normalizar(texto).split()
+
+
+class AhoCorasick:
+    def __init__(self, frases: Iterable[Tuple[str, Any]]):
+        """`frases`: pares (frase, valor); encontrar() devolve os valores"""
+        self._transicoes: List[Dict[bytes, int]] = [{}]
+        self._falha: List[int] = [0]
+        self._saidas: List[Tuple[Any, ...]] = [()]
+        for frase, valor in frases:
+            self._adicionar(tokenizar(frase), valor)
+        self._ligar_falhas()
+
+    def _adicionar(self, palavras: List[bytes], valor: Any) -> None:
+        if not palavras:
+            return
+        estado = 0
+        for palavra in palavras:
+            proximo = self._transicoes[estado].get(palavra)
+            if proximo is None:
+                proximo = len(self._transicoes)
+                self._transicoes[estado][palavra] = proximo
+                self._transicoes.append({})
+                self._falha.append(0)
+                self._saidas.append(())
+            estado = proximo
+        self._saidas[estado] += (valor,)
+
+    def _ligar_falhas(self) -> None:
+        # BFS: a falha de um nó é sempre mais rasa, então já tem as saídas
+        # acumuladas e a tabela completa quando o nó é visitado
+        self._proximo: List[Dict[bytes, int]] = [dict(self._transicoes[0])] + [{}] * (len(self._transicoes) - 1)
+        fila = deque(self._transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            # Tabela completa (falhas já resolvidas): na busca cada palavra
+            # custa um único lookup, sem seguir a cadeia de falhas
+            self._proximo[estado] = {**self._proximo[self._falha[estado]], **self._transicoes[estado]}
+            for palavra, filho in self._transicoes[estado].items():
+                self._falha[filho] = self._proximo[self._falha[estado]].get(palavra, 0)
+                self._saidas[filho] += self._saidas[self._falha[filho]]
+                fila.append(filho)
+
+    def __len__(self) -> int:
+        return len(self._transicoes)
+
+    def encontrar(self, texto: str) -> Set[Any]:
+        """Valores de todas as frases presentes no texto (sem repetição)"""
+        proximo = self._proximo
+        visitados = set()
+        estado = 0
+        for palavra in tokenizar(texto):
+            estado = proximo[estado].get(palavra, 0)
+            if estado:
+                visitados.add(estado)
+        return {valor for estado in visitados for valor in self._saidas[estado]}
@@ -0,0 +1,322 @@
+"""
+Cache de leituras quentes em duas camadas, com invalidação por tags
+
+- local: LRU com TTL no processo (CACHE_LOCAL_MAX_ITENS, CACHE_LOCAL_TTL)
+- Redis (opcional, CACHE_REDIS_URL): compartilhado entre workers. Cada tag
+  guarda o conjunto das chaves marcadas; invalidar apaga as chaves e publica
+  a tag para os outros processos limparem a camada local.
+
+Uso nos repositórios:
+
+    @cached(tags=("idosos", "idoso:{idoso_id}"), ttl=300)
+    async def get_by_id(self, idoso_id: int): ...
+
+    await invalidar("idoso:42")   # depois do commit de uma escrita
+
+As tags são formatadas com os argumentos da chamada. Falhas seguidas para a
+mesma chave viram uma única consulta (single-flight): quem chega durante o
+carregamento espera o resultado do primeiro.
+
+Linhas do ORM não são guardadas vivas (estão presas à sessão que as
+carregou): o cache guarda as colunas e devolve uma instância nova e
+desanexada a cada acerto, suficiente para response_model e leitura de
+atributos. Escritas devem carregar a linha pela sessão, sem cache.
+Escritas feitas fora dos repositórios só aparecem depois do TTL.
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import pickle
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import inspect as sa_inspect
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CACHE_ATIVO = os.getenv("CACHE_ATIVO", "true").lower() == "true"
+CACHE_LOCAL_MAX_ITENS = int(os.getenv("CACHE_LOCAL_MAX_ITENS", "10000"))
+# TTL da camada local limita a defasagem quando a invalidação entre processos falha
+CACHE_LOCAL_TTL = int(os.getenv("CACHE_LOCAL_TTL", "60"))
+CACHE_TTL_PADRAO = int(os.getenv("CACHE_TTL_PADRAO", "300"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+_PREFIXO = "eva:cache:"
+_CANAL = "eva:cache:invalidacao"
+
+
+class _Linha:
+    """Colunas de uma linha do ORM, para guardar fora da sessão"""
+    __slots__ = ("modelo", "colunas")
+
+    def __init__(self, modelo, colunas: Dict[str, Any]):
+        self.modelo = modelo
+        self.colunas = colunas
+
+    def __reduce__(self):
+        return _Linha, (self.modelo, self.colunas)
+
+
+def _congelar(valor: Any) -> Any:
+    if isinstance(valor, (list, tuple)):
+        return [_congelar(v) for v in valor]
+    if hasattr(valor, "__table__"):
+        mapper = sa_inspect(valor).mapper
+        return _Linha(type(valor), {a.key: getattr(valor, a.key) for a in mapper.column_attrs})
+    return valor
+
+
+def _descongelar(valor: Any) -> Any:
+    if isinstance(valor, list):
+        return [_descongelar(v) for v in valor]
+    if isinstance(valor, _Linha):
+        return valor.modelo(**valor.colunas)
+    if isinstance(valor, dict):
+        return dict(valor)
+    return valor
+
+
+class CacheDuasCamadas:
+    def __init__(self, max_itens: int = CACHE_LOCAL_MAX_ITENS, ttl_local: int = CACHE_LOCAL_TTL,
+                 redis_url: Optional[str] = CACHE_REDIS_URL):
+        self.max_itens = max_itens
+        self.ttl_local = ttl_local
+        self.redis_url = redis_url if REDIS_AVAILABLE else None
+        # chave -> (expira_em, tags, valor congelado)
+        self._local: "OrderedDict[str, Tuple[float, Tuple[str, ...], Any]]" = OrderedDict()
+        self._por_tag: Dict[str, set] = {}
+        # Incrementada a cada invalidação: carregamentos iniciados antes não gravam
+        self._versao_tag: Dict[str, int] = {}
+        self._em_voo: Dict[str, asyncio.Future] = {}
+        self._redis = None
+        self._ouvinte: Optional[asyncio.Task] = None
+        self.acertos_local = 0
+        self.acertos_redis = 0
+        self.falhas = 0
+        self.coalescidas = 0
+
+    # ---------- camada local ----------
+
+    def _ler_local(self, chave: str) -> Tuple[bool, Any]:
+        item = self._local.get(chave)
+        if item is None:
+            return False, None
+        if item[0] < time.monotonic():
+            self._remover_local(chave)
+            return False, None
+        self._local.move_to_end(chave)
+        return True, item[2]
+
+    def _gravar_local(self, chave: str, valor: Any, ttl: int, tags: Tuple[str, ...]) -> None:
+        self._remover_local(chave)
+        self._local[chave] = (time.monotonic() + min(ttl, self.ttl_local), tags, valor)
+        for tag in tags:
+            self._por_tag.setdefault(tag, set()).add(chave)
+        while len(self._local) > self.max_itens:
+            self._remover_local(next(iter(self._local)))
+
+    def _remover_local(self, chave: str) -> None:
+        item = self._local.pop(chave, None)
+        if item is None:
+            return
+        for tag in item[1]:
+            chaves = self._por_tag.get(tag)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._por_tag[tag]
+
+    def _invalidar_local(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self._versao_tag[tag] = self._versao_tag.get(tag, 0) + 1
+            for chave in list(self._por_tag.get(tag, ())):
+                self._remover_local(chave)
+
+    # ---------- camada Redis ----------
+
+    def _cliente_redis(self):
+        if self.redis_url and self._redis is None:
+            self._redis = aioredis.from_url(self.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return self._redis
+
+    async def _ler_redis(self, chave: str) -> Tuple[bool, Any]:
+        cliente = self._cliente_redis()
+        if cliente is None:
+            return False, None
+        try:
+            dados = await cliente.get(_PREFIXO + chave)
+        except Exception as e:
+            logger.warning(f"Cache Redis indisponível na leitura: {e}")
+            return False, None
+        if dados is None:
+            return False, None
+        return True, pickle.loads(dados)
+
+    async def _gravar_redis(self, chave: str, valor: Any, ttl: int, tags: Tuple[str, ...]) -> None:
+        cliente = self._cliente_redis()
+        if cliente is None:
+            return
+        try:
+            async with cliente.pipeline(transaction=False) as pipe:
+                pipe.set(_PREFIXO + chave, pickle.dumps(valor), ex=ttl)
+                for tag in tags:
+                    pipe.sadd(f"{_PREFIXO}tag:{tag}", chave)
+                    pipe.expire(f"{_PREFIXO}tag:{tag}", ttl * 2)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Cache Redis indisponível na gravação: {e}")
+
+    async def _invalidar_redis(self, tags: Tuple[str, ...]) -> None:
+        cliente = self._cliente_redis()
+        if cliente is None:
+            return
+        try:
+            for tag in tags:
+                chave_tag = f"{_PREFIXO}tag:{tag}"
+                chaves = await cliente.smembers(chave_tag)
+                await cliente.delete(chave_tag, *[_PREFIXO + c.decode() for c in chaves])
+            await cliente.publish(_CANAL, "\n".join(tags))
+        except Exception as e:
+            logger.warning(f"Cache Redis indisponível na invalidação: {e}")
+
+    async def _ouvir_invalidacoes(self) -> None:
+        pubsub = self._cliente_redis().pubsub()
+        await pubsub.subscribe(_CANAL)
+        try:
+            async for mensagem in pubsub.listen():
+                if mensagem.get("type") == "message":
+                    self._invalidar_local(mensagem["data"].decode().split("\n"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Ouvinte de invalidação do cache parou: {e}")
+        finally:
+            await pubsub.reset()
+
+    # ---------- API ----------
+
+    async def iniciar(self) -> None:
+        """Startup do app: assina as invalidações dos outros processos"""
+        if self._cliente_redis() is not None and self._ouvinte is None:
+            self._ouvinte = asyncio.create_task(self._ouvir_invalidacoes())
+
+    async def encerrar(self) -> None:
+        if self._ouvinte is not None:
+            self._ouvinte.cancel()
+            try:
+                await self._ouvinte
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._ouvinte = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def obter_ou_carregar(self, chave: str, carregar: Callable[[], Awaitable[Any]],
+                                ttl: int = CACHE_TTL_PADRAO, tags: Iterable[str] = ()) -> Any:
+        if not CACHE_ATIVO:
+            return await carregar()
+        tags = tuple(tags)
+        achou, valor = self._ler_local(chave)
+        if achou:
+            self.acertos_local += 1
+            return _descongelar(valor)
+
+        em_voo = self._em_voo.get(chave)
+        if em_voo is not None:
+            self.coalescidas += 1
+            return _descongelar(await asyncio.shield(em_voo))
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._em_voo[chave] = futuro
+        try:
+            achou, valor = await self._ler_redis(chave)
+            if achou:
+                self.acertos_redis += 1
+                self._gravar_local(chave, valor, ttl, tags)
+            else:
+                self.falhas += 1
+                versoes = [self._versao_tag.get(t, 0) for t in tags]
+                valor = _congelar(await carregar())
+                # Invalidado durante o carregamento: devolve, mas não guarda
+                if versoes == [self._versao_tag.get(t, 0) for t in tags]:
+                    self._gravar_local(chave, valor, ttl, tags)
+                    await self._gravar_redis(chave, valor, ttl, tags)
+            futuro.set_result(valor)
+        except BaseException as e:
+            futuro.set_exception(e)
+            # Evita "exception was never retrieved" quando ninguém esperava
+            futuro.exception()
+            raise
+        finally:
+            self._em_voo.pop(chave, None)
+        return _descongelar(valor)
+
+    async def invalidar(self, *tags: str) -> None:
+        self._invalidar_local(tags)
+        await self._invalidar_redis(tags)
+
+    def limpar(self) -> None:
+        self._local.clear()
+        self._por_tag.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "itens_local": len(self._local),
+            "redis": bool(self.redis_url),
+            "acertos_local": self.acertos_local,
+            "acertos_redis": self.acertos_redis,
+            "falhas": self.falhas,
+            "coalescidas": self.coalescidas,
+        }
+
+
+cache = CacheDuasCamadas()
+
+
+def _chave(funcao, argumentos: Dict[str, Any]) -> str:
+    partes = ",".join(f"{k}={v!r}" for k, v in argumentos.items())
+    return f"{funcao.__module__}.{funcao.__qualname__}({partes})"
+
+
+def cached(tags: Iterable[str] = (), ttl: int = CACHE_TTL_PADRAO):
+    """
+    Cacheia o resultado de um método assíncrono de repositório.
+
+    A chave é o nome qualificado mais os argumentos (sem self); `tags` são
+    formatadas com os argumentos, ex.: "idoso:{idoso_id}".
+    """
+    modelos_tag: List[str] = list(tags)
+
+    def decorador(funcao):
+        assinatura = inspect.signature(funcao)
+
+        @functools.wraps(funcao)
+        async def envolvida(*args, **kwargs):
+            if not CACHE_ATIVO:
+                return await funcao(*args, **kwargs)
+            ligados = assinatura.bind(*args, **kwargs)
+            ligados.apply_defaults()
+            argumentos = {k: v for k, v in ligados.arguments.items() if k != "self"}
+            tags_chamada = [t.format(**argumentos) for t in modelos_tag]
+            return await cache.obter_ou_carregar(
+                _chave(funcao, argumentos), lambda: funcao(*args, **kwargs), ttl, tags_chamada
+            )
+
+        return envolvida
+
+    return decorador
+
+
+async def invalidar(*tags: str) -> None:
+    """Invalida as tags nas duas camadas (chamar depois do commit)"""
+    await cache.invalidar(*tags)
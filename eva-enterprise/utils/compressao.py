@@ -0,0 +1,136 @@
+"""
+Compressão das respostas HTTP (brotli ou gzip)
+
+Middleware ASGI no molde do GZipMiddleware do Starlette, com brotli
+quando o pacote está instalado e o cliente aceita "br":
+- respostas abaixo de COMPRESSAO_MINIMO_BYTES saem sem compressão
+- respostas já codificadas (Content-Encoding) passam intactas
+- respostas em streaming (NDJSON) são comprimidas pedaço a pedaço
+- text/event-stream nunca é comprimido (o buffer do compressor atrasaria os eventos)
+"""
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSAO_MINIMO_BYTES = int(os.getenv("COMPRESSAO_MINIMO_BYTES", "1024"))
+GZIP_NIVEL = int(os.getenv("GZIP_NIVEL", "6"))
+# 4-5 é o ponto de equilíbrio do brotli para conteúdo dinâmico
+BROTLI_QUALIDADE = int(os.getenv("BROTLI_QUALIDADE", "4"))
+
+_SEM_COMPRESSAO = ("text/event-stream", "image/", "audio/", "video/", "application/gzip", "application/zip")
+
+
+def escolher_codificacao(accept_encoding: str) -> Optional[str]:
+    """br ou gzip conforme o Accept-Encoding (q=0 desabilita), ou None"""
+    aceitas = {}
+    for parte in accept_encoding.lower().split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        q = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                q = float(parametros.strip()[2:])
+            except ValueError:
+                q = 0.0
+        aceitas[nome.strip()] = q
+
+    if BROTLI_AVAILABLE and aceitas.get("br", 0) > 0:
+        return "br"
+    if aceitas.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, codificacao: str):
+        if codificacao == "br":
+            self._obj = brotli.Compressor(quality=BROTLI_QUALIDADE)
+            self._comprimir, self._descarregar, self._finalizar = (
+                self._obj.process, self._obj.flush, self._obj.finish
+            )
+        else:
+            self._obj = zlib.compressobj(GZIP_NIVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._comprimir = self._obj.compress
+            self._descarregar = lambda: self._obj.flush(zlib.Z_SYNC_FLUSH)
+            self._finalizar = self._obj.flush
+
+    def parte(self, dados: bytes) -> bytes:
+        # Streaming: descarrega a cada pedaço para o cliente não ficar esperando
+        return self._comprimir(dados) + self._descarregar()
+
+    def fim(self, dados: bytes) -> bytes:
+        return self._comprimir(dados) + self._finalizar()
+
+
+class CompressaoMiddleware:
+    def __init__(self, app: ASGIApp, minimo_bytes: int = COMPRESSAO_MINIMO_BYTES) -> None:
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        codificacao = escolher_codificacao(Headers(scope=scope).get("accept-encoding", ""))
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio: Message = {}
+        estado = {"decidido": False, "comprimir": False}
+        compressor = _Compressor(codificacao)
+
+        async def enviar(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Só envia o início depois de saber se a resposta será comprimida
+                inicio.update(message)
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            corpo = message.get("body", b"")
+            mais = message.get("more_body", False)
+
+            if not estado["decidido"]:
+                estado["decidido"] = True
+                headers = MutableHeaders(raw=inicio["headers"])
+                tipo = headers.get("content-type", "")
+                estado["comprimir"] = (
+                    "content-encoding" not in headers
+                    and not tipo.startswith(_SEM_COMPRESSAO)
+                    and inicio.get("status", 200) not in (204, 304)
+                    and (mais or len(corpo) >= self.minimo_bytes)
+                )
+                if not estado["comprimir"]:
+                    await send(inicio)
+                    await send(message)
+                    return
+
+                headers["Content-Encoding"] = codificacao
+                headers.add_vary_header("Accept-Encoding")
+                if mais:
+                    del headers["Content-Length"]
+                    message["body"] = compressor.parte(corpo)
+                else:
+                    message["body"] = compressor.fim(corpo)
+                    headers["Content-Length"] = str(len(message["body"]))
+                await send(inicio)
+                await send(message)
+                return
+
+            if estado["comprimir"]:
+                message["body"] = compressor.parte(corpo) if mais else compressor.fim(corpo)
+            await send(message)
+
+        await self.app(scope, receive, enviar)
@@ -0,0 +1,119 @@
+"""
+ETag e GET condicional (If-None-Match -> 304)
+
+Dois caminhos:
+- hash da resposta (middleware aplicar_etag): toda resposta JSON 200 de
+  GET/HEAD sem ETag recebe um ETag fraco do corpo. Economiza a transferência.
+- versão da linha (exigir_modificado): a rota consulta só a coluna de versão
+  (atualizado_em) antes de carregar a linha; se bater com o If-None-Match
+  responde 304 sem carregar nem serializar nada. Opt-in por rota.
+"""
+import hashlib
+import os
+from typing import Any, Iterable, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Muda todos os ETags de versão quando o formato das respostas muda (deploy)
+ETAG_VERSAO_API = os.getenv("ETAG_VERSAO_API", "1")
+# Respostas maiores não são hasheadas no middleware
+ETAG_MAX_CORPO_BYTES = int(os.getenv("ETAG_MAX_CORPO_BYTES", str(512 * 1024)))
+
+_METODOS = ("GET", "HEAD")
+_CACHE_CONTROL = "private, no-cache"
+
+
+def _resumo(dados: bytes) -> str:
+    return hashlib.blake2b(dados, digest_size=12).hexdigest()
+
+
+def etag_fraco(*partes: Any) -> str:
+    """ETag fraco a partir de valores (ids, timestamps de versão...)"""
+    return f'W/"{_resumo("|".join(map(str, (ETAG_VERSAO_API, *partes))).encode())}"'
+
+
+def etag_do_corpo(corpo: bytes) -> str:
+    return f'W/"{_resumo(corpo)}"'
+
+
+def _opacos(etags: Iterable[str]) -> set:
+    # Comparação fraca: ignora o prefixo W/
+    return {e.strip().removeprefix("W/") for e in etags}
+
+
+def corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match contém `etag` (ou é *)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in _opacos(if_none_match.split(","))
+
+
+async def exigir_modificado(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    coluna_versao,
+    *criterios
+) -> Optional[str]:
+    """
+    Caminho rápido por versão: consulta max(coluna_versao) com `criterios`
+    e responde 304 se o cliente já tem essa versão. Caso contrário define o
+    ETag na resposta e a rota segue normalmente.
+
+    Retorna o ETag, ou None quando não há linha (a rota decide o 404).
+    """
+    versao = await db.scalar(select(func.max(coluna_versao)).where(*criterios))
+    if versao is None:
+        return None
+
+    etag = etag_fraco(request.url.path, request.url.query, versao)
+    if corresponde(request.headers.get("if-none-match"), etag):
+        raise HTTPException(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": _CACHE_CONTROL}
+        )
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = _CACHE_CONTROL
+    return etag
+
+
+def _nao_modificado(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag, "Cache-Control": _CACHE_CONTROL})
+
+
+async def aplicar_etag(request: Request, response: Response) -> Response:
+    """
+    Middleware: ETag por hash do corpo para GET/HEAD JSON 200 e 304 quando
+    o If-None-Match bate. Respostas que já trazem ETag (caminho por versão)
+    só são comparadas.
+    """
+    if request.method not in _METODOS or response.status_code != status.HTTP_200_OK:
+        return response
+
+    if_none_match = request.headers.get("if-none-match")
+    etag = response.headers.get("etag")
+    if etag:
+        return _nao_modificado(etag) if corresponde(if_none_match, etag) else response
+
+    if (
+        not response.headers.get("content-type", "").startswith("application/json")
+        or "content-encoding" in response.headers
+        or int(response.headers.get("content-length", 0)) > ETAG_MAX_CORPO_BYTES
+    ):
+        return response
+
+    corpo = b"".join([parte async for parte in response.body_iterator])
+    etag = etag_do_corpo(corpo)
+    if corresponde(if_none_match, etag):
+        return _nao_modificado(etag)
+
+    headers = dict(response.headers)
+    headers["etag"] = etag
+    headers.setdefault("cache-control", _CACHE_CONTROL)
+    return Response(content=corpo, status_code=response.status_code, headers=headers,
+                    media_type=response.media_type)
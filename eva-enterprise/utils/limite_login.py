@@ -0,0 +1,113 @@
+"""
+Limite de tentativas de login por IP
+
+Janela deslizante em memória: no máximo LOGIN_MAX_TENTATIVAS falhas por IP
+em LOGIN_JANELA_SEGUNDOS. Só falhas de credencial (401) contam: logins
+certos não bloqueiam quem divide o IP (NAT), e também não zeram o contador,
+senão uma conta válida bastaria para continuar tentando senhas de outra.
+A verificação acontece antes do bcrypt, então um IP bloqueado não consome o
+pool de senhas. O limite vale por processo (worker).
+
+X-Forwarded-For só é lido quando a conexão vem de um proxy listado em
+LOGIN_PROXIES_CONFIAVEIS (IPs ou redes, separados por vírgula, ex: o nginx
+em 127.0.0.1); o IP do cliente é então o último salto que não é proxy.
+Sem a variável, vale o IP da conexão: o cabeçalho é do cliente e pode ser
+forjado.
+"""
+import ipaddress
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque
+
+from fastapi import HTTPException, Request, status
+
+LOGIN_MAX_TENTATIVAS = int(os.getenv("LOGIN_MAX_TENTATIVAS", "10"))
+LOGIN_JANELA_SEGUNDOS = int(os.getenv("LOGIN_JANELA_SEGUNDOS", "60"))
+LOGIN_PROXIES_CONFIAVEIS = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.getenv("LOGIN_PROXIES_CONFIAVEIS", "").split(",") if proxy.strip()
+]
+# IPs acompanhados ao mesmo tempo (os mais antigos saem primeiro)
+LOGIN_MAX_IPS = int(os.getenv("LOGIN_MAX_IPS", "100000"))
+
+
+def _eh_proxy(ip: str) -> bool:
+    try:
+        endereco = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(endereco in rede for rede in LOGIN_PROXIES_CONFIAVEIS)
+
+
+def ip_cliente(request: Request) -> str:
+    ip = request.client.host if request.client else "desconhecido"
+    encaminhado = request.headers.get("x-forwarded-for")
+    if not encaminhado or not _eh_proxy(ip):
+        return ip
+    # Da direita para a esquerda: cada proxy confiável acrescentou o salto anterior
+    for salto in reversed([s.strip() for s in encaminhado.split(",") if s.strip()]):
+        ip = salto
+        if not _eh_proxy(salto):
+            break
+    return ip
+
+
+class LimitadorLogin:
+    def __init__(self, max_tentativas: int = LOGIN_MAX_TENTATIVAS, janela: int = LOGIN_JANELA_SEGUNDOS,
+                 max_ips: int = LOGIN_MAX_IPS):
+        self.max_tentativas = max_tentativas
+        self.janela = janela
+        self.max_ips = max_ips
+        self._tentativas: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    def verificar(self, ip: str) -> None:
+        """429 com Retry-After quando o IP já passou do limite (não conta tentativa)"""
+        tentativas = self._tentativas.get(ip)
+        if not tentativas:
+            return
+        agora = time.monotonic()
+        while tentativas and tentativas[0] <= agora - self.janela:
+            tentativas.popleft()
+        if len(tentativas) >= self.max_tentativas:
+            espera = int(tentativas[0] + self.janela - agora) + 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Muitas tentativas de login. Tente novamente mais tarde.",
+                headers={"Retry-After": str(espera)}
+            )
+
+    def registrar(self, ip: str) -> None:
+        """Conta uma tentativa do IP; 429 se ele já estava no limite"""
+        self.verificar(ip)
+        tentativas = self._tentativas.get(ip)
+        if tentativas is None:
+            tentativas = self._tentativas[ip] = deque()
+            while len(self._tentativas) > self.max_ips:
+                self._tentativas.popitem(last=False)
+        else:
+            self._tentativas.move_to_end(ip)
+        tentativas.append(time.monotonic())
+
+    def limpar(self) -> None:
+        self._tentativas.clear()
+
+
+limitador_login = LimitadorLogin()
+
+
+async def limitar_login(request: Request):
+    """Dependency das rotas que conferem senha: bloqueia o IP no limite e conta as respostas 401"""
+    ip = ip_cliente(request)
+    limitador_login.verificar(ip)
+    try:
+        yield
+    except HTTPException as erro:
+        if erro.status_code == status.HTTP_401_UNAUTHORIZED:
+            limitador_login.registrar(ip)
+        raise
+
+
+async def limitar_cadastro(request: Request) -> None:
+    """Dependency do cadastro: não há senha a errar, cada tentativa conta (custa um hash)"""
+    limitador_login.registrar(ip_cliente(request))
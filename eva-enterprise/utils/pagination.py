@@ -1,7 +1,12 @@
-from typing import TypeVar, Generic, List, Optional
+import base64
+import json
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import TypeVar, Generic, List, Optional, Sequence, Any, Dict, Tuple
 from pydantic import BaseModel
-from fastapi import Query
-from sqlalchemy import func, select
+from fastapi import Query, HTTPException
+from sqlalchemy import func, select, text, and_, or_, false
 from sqlalchemy.ext.asyncio import AsyncSession
 
 T = TypeVar('T')
@@ -19,19 +24,30 @@ class PaginationParams(BaseModel):
     class Config:
         frozen = True
 
+class CursorParams(BaseModel):
+    """Parâmetros de paginação por cursor (keyset)"""
+    cursor: Optional[str] = None
+    limit: int = 10
+    with_total: bool = False
+
+    class Config:
+        frozen = True
+
 class PaginationMeta(BaseModel):
-    """Metadados de paginação"""
-    page: int
+    """Metadados de paginação (page/pages ficam vazios na paginação por cursor)"""
+    page: Optional[int] = None
     limit: int
-    total: int
-    pages: int
+    total: Optional[int] = None
+    pages: Optional[int] = None
     has_next: bool
     has_prev: bool
+    total_is_estimate: bool = False
 
 class PaginatedResponse(BaseModel, Generic[T]):
     """Resposta paginada genérica"""
     items: List[T]
     pagination: PaginationMeta
+    next_cursor: Optional[str] = None
     
     @classmethod
     def create(
@@ -56,6 +72,29 @@ class PaginatedResponse(BaseModel, Generic[T]):
             )
         )
 
+    @classmethod
+    def create_from_cursor(
+        cls,
+        items: List[T],
+        limit: int,
+        next_cursor: Optional[str],
+        has_prev: bool = False,
+        total: Optional[int] = None,
+        total_is_estimate: bool = False
+    ) -> "PaginatedResponse[T]":
+        """Cria resposta de uma página obtida por cursor"""
+        return cls(
+            items=items,
+            next_cursor=next_cursor,
+            pagination=PaginationMeta(
+                limit=limit,
+                total=total,
+                has_next=next_cursor is not None,
+                has_prev=has_prev,
+                total_is_estimate=total_is_estimate
+            )
+        )
+
 def get_pagination_params(
     page: int = Query(1, ge=1, description="Número da página (inicia em 1)"),
     limit: int = Query(10, ge=1, le=100, description="Itens por página (máximo 100)")
@@ -63,6 +102,14 @@ def get_pagination_params(
     """Dependency para extrair parâmetros de paginação"""
     return PaginationParams(page=page, limit=limit)
 
+def get_cursor_params(
+    cursor: Optional[str] = Query(None, description="Cursor opaco retornado em next_cursor"),
+    limit: int = Query(10, ge=1, le=100, description="Itens por página (máximo 100)"),
+    with_total: bool = Query(False, description="Inclui total (estimado/cacheado) na resposta")
+) -> CursorParams:
+    """Dependency para extrair parâmetros de paginação por cursor"""
+    return CursorParams(cursor=cursor, limit=limit, with_total=with_total)
+
 async def paginate_query(
     db: AsyncSession,
     query,
@@ -94,3 +141,167 @@ async def paginate_query(
     items = result.scalars().all()
     
     return items, total
+
+
+# ==========================================
+# PAGINAÇÃO POR CURSOR (KEYSET)
+# ==========================================
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"$dec": str(value)}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        if "$d" in value:
+            return date.fromisoformat(value["$d"])
+        if "$dec" in value:
+            return Decimal(value["$dec"])
+    return value
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Codifica os valores da chave de ordenação da última linha em um cursor opaco"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: Optional[int] = None) -> List[Any]:
+    """Decodifica cursor opaco. Levanta HTTP 400 se o cursor for inválido."""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        if not isinstance(values, list) or (size is not None and len(values) != size):
+            raise ValueError("tamanho inesperado")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+
+def _after_predicate(columns: Sequence, values: Sequence[Any], descending: bool):
+    """
+    Predicado "estritamente depois de (values)" para ORDER BY columns NULLS LAST.
+    A última coluna (desempate, normalmente a PK) nunca é nula.
+    """
+    if not columns:
+        return false()
+
+    column, value = columns[0], values[0]
+    rest = _after_predicate(columns[1:], values[1:], descending)
+
+    if value is None:
+        # NULLs ficam no fim: depois de um NULL só vêm outros NULLs
+        return and_(column.is_(None), rest)
+
+    beyond = column < value if descending else column > value
+    if len(columns) == 1:
+        return beyond
+    return or_(beyond, column.is_(None), and_(column == value, rest))
+
+def _row_value(item: Any, column) -> Any:
+    return getattr(item, column.key)
+
+async def paginate_keyset(
+    db: AsyncSession,
+    query,
+    sort_columns: Sequence,
+    cursor: Optional[str] = None,
+    limit: int = 10,
+    descending: bool = True,
+    scalars: bool = True
+) -> Tuple[List, Optional[str]]:
+    """
+    Aplica paginação por cursor (keyset) a uma query SQLAlchemy.
+
+    Em vez de OFFSET, a página seguinte começa "depois" da última linha vista,
+    de modo que o custo de cada página não cresce com a profundidade.
+
+    Args:
+        db: Sessão do banco
+        query: Query SQLAlchemy (sem ORDER BY/LIMIT)
+        sort_columns: Colunas da chave de ordenação; a última deve ser única (ex: id)
+        cursor: Cursor recebido do cliente (next_cursor da página anterior)
+        limit: Itens por página
+        descending: Ordena do maior para o menor (mais recentes primeiro)
+        scalars: True para entidades ORM, False para linhas de colunas
+
+    Returns:
+        Tupla (items, next_cursor) — next_cursor é None na última página
+    """
+    if cursor:
+        values = decode_cursor(cursor, size=len(sort_columns))
+        query = query.where(_after_predicate(sort_columns, values, descending))
+
+    order_by = [
+        (col.desc() if descending else col.asc()).nulls_last()
+        for col in sort_columns
+    ]
+    result = await db.execute(query.order_by(*order_by).limit(limit + 1))
+    rows = result.scalars().all() if scalars else result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([_row_value(rows[-1], col) for col in sort_columns])
+
+    return rows, next_cursor
+
+# Cache em memória de contagens: chave -> (expira_em, total, estimado)
+_COUNT_CACHE: Dict[str, Tuple[float, int, bool]] = {}
+_COUNT_CACHE_MAX = 1024
+
+def _count_cache_key(query) -> str:
+    compiled = query.compile()
+    return f"{compiled}|{sorted(compiled.params.items(), key=lambda kv: kv[0])!r}"
+
+async def _estimate_count(db: AsyncSession, query) -> Optional[int]:
+    """Estimativa do planejador do PostgreSQL (EXPLAIN), sem varrer a tabela"""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    try:
+        compiled = query.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True})
+    except Exception:
+        return None
+    try:
+        # Savepoint: um EXPLAIN com erro não pode abortar a transação do chamador
+        async with db.begin_nested():
+            result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+            plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception:
+        return None
+
+async def count_total(
+    db: AsyncSession,
+    query,
+    estimate: bool = True,
+    cache_ttl: int = 60
+) -> Tuple[int, bool]:
+    """
+    Total de registros da query, com cache curto e estimativa opcional.
+
+    Returns:
+        Tupla (total, estimado) — estimado=True quando veio do planejador
+    """
+    key = _count_cache_key(query)
+    now = time.monotonic()
+    cached = _COUNT_CACHE.get(key)
+    if cached and cached[0] > now:
+        return cached[1], cached[2]
+
+    total = await _estimate_count(db, query) if estimate else None
+    is_estimate = total is not None
+    if total is None:
+        total = await db.scalar(select(func.count()).select_from(query.subquery())) or 0
+
+    if len(_COUNT_CACHE) >= _COUNT_CACHE_MAX:
+        _COUNT_CACHE.clear()
+    _COUNT_CACHE[key] = (now + cache_ttl, total, is_estimate)
+    return total, is_estimate
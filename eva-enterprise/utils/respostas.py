@@ -0,0 +1,63 @@
+"""
+Serialização JSON rápida das respostas
+
+- RespostaJSONRapida: default_response_class dos apps, orjson no lugar do
+  json da stdlib. Aceita Decimal, datetime/date, UUID, sets e modelos
+  pydantic, então rotas que montam a resposta direto (sem response_model)
+  não precisam passar por jsonable_encoder.
+- resposta_orm: caminho confiável para listagens de linhas do ORM. As linhas
+  vêm do nosso próprio banco, então em vez de validar cada uma contra o
+  response_model (model_validate + jsonable_encoder + json.dumps) monta os
+  modelos sem validação (model_construct) e serializa direto em bytes pelo
+  pydantic-core. Saída idêntica à do caminho validado; só para schemas
+  planos cujos campos têm o mesmo nome das colunas.
+"""
+import datetime
+import decimal
+from functools import lru_cache
+from typing import Any, Iterable, List, Type
+
+import orjson
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+_OPCOES = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _padrao(obj: Any) -> Any:
+    # Decimal como o jsonable_encoder: inteiro quando não tem casas decimais
+    if isinstance(obj, decimal.Decimal):
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, datetime.timedelta):
+        return obj.total_seconds()
+    raise TypeError(f"Tipo não serializável em JSON: {type(obj).__name__}")
+
+
+def dumps(conteudo: Any) -> bytes:
+    return orjson.dumps(conteudo, default=_padrao, option=_OPCOES)
+
+
+class RespostaJSONRapida(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def _adaptador_lista(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def construir(schema: Type[BaseModel], linha: Any) -> BaseModel:
+    """Instância de `schema` a partir dos atributos da linha, sem validar"""
+    return schema.model_construct(**{campo: getattr(linha, campo) for campo in schema.model_fields})
+
+
+def resposta_orm(schema: Type[BaseModel], linhas: Iterable[Any], status_code: int = 200) -> Response:
+    """Lista de linhas do ORM serializada como List[schema] sem re-validação"""
+    itens = [construir(schema, linha) for linha in linhas]
+    corpo = _adaptador_lista(schema).dump_json(itens, warnings=False)
+    return Response(content=corpo, status_code=status_code, media_type="application/json")
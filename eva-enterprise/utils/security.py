@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 import os
@@ -8,6 +10,7 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from database.connection import get_db
+from utils.cache import cache, invalidar
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,9 +19,23 @@ logger = logging.getLogger(__name__)
 SECRET_KEY = os.getenv("SECRET_KEY", "eva_secret_key_change_me_in_production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
+# Usuário autenticado em cache por `sub` (email): evita o SELECT em usuarios a
+# cada requisição. Alterações passam por invalidar_principal; o TTL curto
+# limita a defasagem de mudanças feitas direto no banco.
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+
+# bcrypt (custo 12, ~250 ms de CPU) roda num pool de threads dedicado: a
+# extensão do bcrypt solta o GIL, então o event loop segue atendendo as outras
+# requisições. Com a fila cheia a operação é recusada com 503 em vez de
+# acumular logins esperando.
+SENHA_POOL_WORKERS = int(os.getenv("SENHA_POOL_WORKERS", str(os.cpu_count() or 2)))
+SENHA_FILA_MAX = int(os.getenv("SENHA_FILA_MAX", str(SENHA_POOL_WORKERS * 8)))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+_pool_senhas = ThreadPoolExecutor(max_workers=SENHA_POOL_WORKERS, thread_name_prefix="bcrypt")
+_senhas_pendentes = 0
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -87,6 +104,36 @@ def get_password_hash(password: str) -> str:
         )
 
 
+async def _no_pool_senhas(funcao, *args):
+    global _senhas_pendentes
+    if _senhas_pendentes >= SENHA_FILA_MAX:
+        logger.warning(f"Fila de hash de senhas cheia ({_senhas_pendentes})")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, tente novamente em instantes",
+            headers={"Retry-After": "1"}
+        )
+    _senhas_pendentes += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_pool_senhas, funcao, *args)
+    finally:
+        _senhas_pendentes -= 1
+
+
+async def verificar_senha(plain_password: str, hashed_password: str) -> bool:
+    """verify_password fora do event loop (pool bcrypt)"""
+    return await _no_pool_senhas(verify_password, plain_password, hashed_password)
+
+
+async def gerar_hash_senha(password: str) -> str:
+    """get_password_hash fora do event loop (pool bcrypt)"""
+    return await _no_pool_senhas(get_password_hash, password)
+
+
+def estado_pool_senhas() -> dict:
+    return {"workers": SENHA_POOL_WORKERS, "pendentes": _senhas_pendentes, "fila_max": SENHA_FILA_MAX}
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -126,44 +173,63 @@ async def get_current_user(
         raise credentials_exception
     
     try:
-        # Query database for user
-        result = await db.execute(
-            text("""
-                SELECT 
-                    id, 
-                    nome as name, 
-                    email, 
-                    tipo as role, 
-                    ativo as active
-                FROM usuarios 
-                WHERE email = :email
-            """), 
-            {"email": email}
+        user = await cache.obter_ou_carregar(
+            f"principal:{email}",
+            lambda: _carregar_principal(db, email),
+            PRINCIPAL_CACHE_TTL,
+            (_tag_principal(email),)
         )
-        user = result.mappings().first()
-        
-        if user is None:
-            logger.warning(f"User not found in database: {email}")
-            raise credentials_exception
-            
-        if not user["active"]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Inactive user account"
-            )
-        
-        # Add user_id as alias for id (for compatibility with existing code)
-        user_dict = dict(user)
-        user_dict["user_id"] = user_dict["id"]
-        
-        return user_dict
-        
-    except HTTPException:
-        raise
     except Exception as e:
         logger.error(f"Database error in get_current_user: {e}", exc_info=True)
         raise credentials_exception
 
+    if user is None:
+        logger.warning(f"User not found in database: {email}")
+        raise credentials_exception
+
+    if not user["active"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Inactive user account"
+        )
+
+    # Add user_id as alias for id (for compatibility with existing code)
+    user_dict = dict(user)
+    user_dict["user_id"] = user_dict["id"]
+    # Plano vem do token: require_subscription decide sem consultar o banco
+    user_dict["subscription_tier"] = payload.get("subscription_tier", "basic")
+
+    return user_dict
+
+
+def _tag_principal(email: str) -> str:
+    return f"principal:{email}"
+
+
+async def _carregar_principal(db: AsyncSession, email: str) -> Optional[dict]:
+    result = await db.execute(
+        text("""
+            SELECT 
+                id, 
+                nome as name, 
+                email, 
+                tipo as role, 
+                ativo as active
+            FROM usuarios 
+            WHERE email = :email
+        """), 
+        {"email": email}
+    )
+    user = result.mappings().first()
+    return dict(user) if user else None
+
+
+async def invalidar_principal(*emails: Optional[str]):
+    """Descarta o usuário autenticado em cache (perfil, senha, papel, ativação)"""
+    tags = [_tag_principal(e) for e in emails if e]
+    if tags:
+        await invalidar(*tags)
+
 
 def check_role(required_roles: list):
     """Dependency to check if user has required role"""
@@ -1,9 +1,11 @@
-import os, datetime, asyncio, uuid
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+import os, datetime, asyncio, uuid, json, base64
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
+from sqlalchemy import select, func, and_, or_
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from twilio.rest import Client
 from database import SessionLocal, Agendamento, Alerta, Idoso, Familiar, Atendente, VideoCall
@@ -11,7 +13,7 @@ from dotenv import load_dotenv
 from websocket_manager import manager
 
 load_dotenv()
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # CORS configurado
 app.add_middleware(
@@ -22,6 +24,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Listagens e exportações NDJSON comprimidas; respostas pequenas saem como estão
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 scheduler = AsyncIOScheduler()
 
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
@@ -29,6 +34,11 @@ TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 SERVICE_DOMAIN = os.getenv("SERVICE_DOMAIN")
 
+# Paginação das listagens (keyset) e exportação NDJSON
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+STREAM_BATCH_SIZE = 500
+
 
 # ====================================
 # MODELOS DE DADOS PARA A API
@@ -68,6 +78,124 @@ class LogRequest(BaseModel):
     app_version: Optional[str] = None
     user_cpf: Optional[str] = None
 
+# ====================================
+# PAGINAÇÃO POR CURSOR (KEYSET) E EXPORTAÇÃO NDJSON
+# ====================================
+
+def _serializar_valor(valor):
+    if isinstance(valor, (datetime.datetime, datetime.date)):
+        return valor.isoformat()
+    return valor
+
+
+def _encode_cursor(ordem, id_):
+    """Gera cursor opaco a partir da última linha (valor de ordenação + id)"""
+    payload = json.dumps([_serializar_valor(ordem), id_], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor, eh_data=False):
+    """Decodifica cursor opaco. Retorna (valor_ordem, id)"""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        ordem, id_ = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        if eh_data and ordem is not None:
+            ordem = datetime.datetime.fromisoformat(ordem)
+        return ordem, int(id_)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _montar_consulta_keyset(colunas, coluna_ordem, coluna_id, filtros=(), cursor=None,
+                            descendente=False, eh_data=False, aceita_nulo=False):
+    """
+    Monta SELECT apenas com as colunas necessárias, ordenado por (coluna_ordem, id).
+    O cursor vira um predicado "depois da última linha vista", sem OFFSET.
+    Coluna de ordenação que aceita NULL (`aceita_nulo`) ordena NULLS LAST e o
+    predicado trata o NULL à parte, sem COALESCE: a coluna continua indexável.
+    """
+    stmt = select(*colunas)
+    condicoes = list(filtros)
+
+    if cursor:
+        ultimo_valor, ultimo_id = _decode_cursor(cursor, eh_data=eh_data)
+        depois_do_id = coluna_id < ultimo_id if descendente else coluna_id > ultimo_id
+        if ultimo_valor is None:
+            # NULLs ficam no fim: depois de um NULL só vêm outros NULLs
+            condicoes.append(and_(coluna_ordem.is_(None), depois_do_id))
+        else:
+            depois = [
+                coluna_ordem < ultimo_valor if descendente else coluna_ordem > ultimo_valor,
+                and_(coluna_ordem == ultimo_valor, depois_do_id),
+            ]
+            if aceita_nulo:
+                depois.append(coluna_ordem.is_(None))
+            condicoes.append(or_(*depois))
+
+    if condicoes:
+        stmt = stmt.where(*condicoes)
+
+    ordem = [coluna_ordem.desc(), coluna_id.desc()] if descendente else [coluna_ordem.asc(), coluna_id.asc()]
+    if aceita_nulo:
+        ordem[0] = ordem[0].nulls_last()
+    return stmt.order_by(*ordem)
+
+
+def _contar(coluna_id, filtros=(), cursor=None):
+    """Total da listagem (com os filtros, sem o cursor); só na primeira página"""
+    if cursor:
+        return None
+    stmt = select(func.count(coluna_id))
+    return stmt.where(*filtros) if filtros else stmt
+
+
+def _listar_pagina(stmt, contagem, chave_lista, campo_ordem, limite):
+    """
+    Executa uma página (limite + 1 linhas para saber se há próxima).
+    O total (COUNT) só roda quando há `contagem`; nas páginas seguintes vem None.
+    """
+    db = SessionLocal()
+    try:
+        linhas = db.execute(stmt.limit(limite + 1)).mappings().all()
+        total = db.execute(contagem).scalar() if contagem is not None else None
+    finally:
+        db.close()
+
+    tem_mais = len(linhas) > limite
+    linhas = linhas[:limite]
+    itens = [{k: _serializar_valor(v) for k, v in linha.items()} for linha in linhas]
+
+    next_cursor = None
+    if tem_mais and linhas:
+        ultima = linhas[-1]
+        next_cursor = _encode_cursor(ultima[campo_ordem], ultima["id"])
+
+    return {
+        "total": total,
+        chave_lista: itens,
+        "next_cursor": next_cursor
+    }
+
+
+def _stream_ndjson(stmt):
+    """
+    Exporta o resultado linha a linha (uma linha JSON por registro).
+    Usa yield_per para que a memória fique constante independente do tamanho da tabela.
+    """
+    def gerar():
+        db = SessionLocal()
+        try:
+            resultado = db.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+            for linha in resultado.mappings():
+                yield json.dumps(
+                    {k: _serializar_valor(v) for k, v in linha.items()},
+                    ensure_ascii=False
+                ) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(gerar(), media_type="application/x-ndjson")
+
 
 # ====================================
 # ENDPOINTS PARA IDOSOS
@@ -106,28 +234,28 @@ async def criar_idoso(request: IdosoRequest):
 
 
 @app.get("/idosos")
-async def listar_idosos():
-    """Lista todos os idosos cadastrados"""
-    db = SessionLocal()
-    try:
-        idosos = db.query(Idoso).order_by(Idoso.nome).all()
+def listar_idosos(
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    formato: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """
+    Lista os idosos cadastrados, ordenados por nome.
 
-        return {
-            "total": len(idosos),
-            "idosos": [
-                {
-                    "id": i.id,
-                    "nome": i.nome,
-                    "telefone": i.telefone,
-                    "endereco": i.endereco,
-                    "condicoes_medicas": i.condicoes_medicas,
-                    "medicamentos_regulares": i.medicamentos_regulares
-                }
-                for i in idosos
-            ]
-        }
-    finally:
-        db.close()
+    - Paginação por cursor: use o `next_cursor` da resposta no parâmetro `cursor`
+    - `total` só vem na primeira página (sem `cursor`); nas seguintes é null
+    - `formato=ndjson`: exporta todos os registros (a partir do cursor) em streaming
+    """
+    stmt = _montar_consulta_keyset(
+        [Idoso.id, Idoso.nome, Idoso.telefone, Idoso.endereco,
+         Idoso.condicoes_medicas, Idoso.medicamentos_regulares],
+        Idoso.nome, Idoso.id, cursor=cursor
+    )
+
+    if formato == "ndjson":
+        return _stream_ndjson(stmt)
+
+    return _listar_pagina(stmt, _contar(Idoso.id, cursor=cursor), "idosos", "nome", limite)
 
 
 @app.get("/idosos/{idoso_id}")
@@ -257,28 +385,22 @@ async def criar_familiar(request: FamiliarRequest):
 
 
 @app.get("/familiares")
-async def listar_familiares():
-    """Lista todos os familiares cadastrados"""
-    db = SessionLocal()
-    try:
-        familiares = db.query(Familiar).order_by(Familiar.nome).all()
+def listar_familiares(
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    formato: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """Lista os familiares cadastrados, ordenados por nome (paginação por cursor ou NDJSON)"""
+    stmt = _montar_consulta_keyset(
+        [Familiar.id, Familiar.nome, Familiar.parentesco, Familiar.telefone,
+         Familiar.email, Familiar.eh_responsavel],
+        Familiar.nome, Familiar.id, cursor=cursor
+    )
 
-        return {
-            "total": len(familiares),
-            "familiares": [
-                {
-                    "id": f.id,
-                    "nome": f.nome,
-                    "parentesco": f.parentesco,
-                    "telefone": f.telefone,
-                    "email": f.email,
-                    "eh_responsavel": f.eh_responsavel
-                }
-                for f in familiares
-            ]
-        }
-    finally:
-        db.close()
+    if formato == "ndjson":
+        return _stream_ndjson(stmt)
+
+    return _listar_pagina(stmt, _contar(Familiar.id, cursor=cursor), "familiares", "nome", limite)
 
 
 @app.put("/familiares/{familiar_id}")
@@ -458,34 +580,32 @@ async def agendar(request: AgendamentoRequest):
 
 
 @app.get("/agendamentos")
-async def listar_agendamentos(status: str = None):
-    """Lista todos os agendamentos"""
-    db = SessionLocal()
-    try:
-        query = db.query(Agendamento)
+def listar_agendamentos(
+    status: str = None,
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    formato: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """
+    Lista os agendamentos, do mais recente para o mais antigo.
 
-        if status:
-            query = query.filter(Agendamento.status == status)
+    - Paginação por cursor sobre (horario, id): use o `next_cursor` da resposta
+    - `total` só vem na primeira página (sem `cursor`); nas seguintes é null
+    - `formato=ndjson`: exporta todos os registros (a partir do cursor) em streaming
+    """
+    filtros = [Agendamento.status == status] if status else []
 
-        agendamentos = query.order_by(Agendamento.horario.desc()).all()
+    stmt = _montar_consulta_keyset(
+        [Agendamento.id, Agendamento.nome_idoso.label("nome"), Agendamento.telefone,
+         Agendamento.horario, Agendamento.remedios, Agendamento.status],
+        Agendamento.horario, Agendamento.id, filtros=filtros, cursor=cursor,
+        descendente=True, eh_data=True, aceita_nulo=True
+    )
 
-        return {
-            "total": len(agendamentos),
-            "agendamentos": [
-                {
-                    "id": a.id,
-                    "nome": a.nome_idoso,
-                    "telefone": a.telefone,
-                    "horario": a.horario.isoformat(),
-                    "remedios": a.remedios,
-                    "status": a.status
-                }
-                for a in agendamentos
-            ]
-        }
+    if formato == "ndjson":
+        return _stream_ndjson(stmt)
 
-    finally:
-        db.close()
+    return _listar_pagina(stmt, _contar(Agendamento.id, filtros, cursor), "agendamentos", "horario", limite)
 
 
 @app.delete("/agendamento/{agendamento_id}")
@@ -894,20 +1014,20 @@ async def root():
         "endpoints": {
             "Idosos": {
                 "POST /idosos": "Cria um novo idoso",
-                "GET /idosos": "Lista todos os idosos",
+                "GET /idosos": "Lista idosos (paginado por cursor, ?formato=ndjson exporta tudo)",
                 "GET /idosos/{id}": "Obtém um idoso específico",
                 "PUT /idosos/{id}": "Atualiza um idoso",
                 "DELETE /idosos/{id}": "Exclui um idoso"
             },
             "Familiares": {
                 "POST /familiares": "Cria um novo familiar",
-                "GET /familiares": "Lista todos os familiares",
+                "GET /familiares": "Lista familiares (paginado por cursor, ?formato=ndjson exporta tudo)",
                 "PUT /familiares/{id}": "Atualiza um familiar",
                 "DELETE /familiares/{id}": "Exclui um familiar"
             },
             "Agendamentos": {
                 "POST /agendar": "Cria um novo agendamento",
-                "GET /agendamentos": "Lista todos os agendamentos",
+                "GET /agendamentos": "Lista agendamentos (paginado por cursor, ?formato=ndjson exporta tudo)",
                 "DELETE /agendamento/{id}": "Cancela um agendamento pendente"
             },
             "Alertas": {